@@ -0,0 +1,161 @@
+"""
+Combined vs. Separate Structuring Benchmark
+
+Compares one joint completion (``process_transcript_to_all``) against three
+single-format completions issued in parallel, reporting wall-clock latency
+and prompt/completion tokens taken from each response's ``usage``.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_combined --fake
+    python -m benchmarks.bench_combined --transcript memo.txt --runs 5
+
+Without --fake the OpenRouter client is built from OPENROUTER_API_KEY. The
+fake client replays the demo data with a latency model that grows with
+input and output tokens, which is enough to compare request shapes offline.
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+backend_dir = Path(__file__).parent.parent
+if str(backend_dir) not in sys.path:
+    sys.path.append(str(backend_dir))
+
+from config import settings
+from services import (
+    process_transcript_to_tasks,
+    process_transcript_to_roadmap,
+    process_transcript_to_process_doc,
+    process_transcript_to_all
+)
+from services.clients import create_openrouter_client
+from utils import get_demo_tasks, get_demo_roadmap, get_demo_process_doc, get_demo_all
+
+SAMPLE_TRANSCRIPT = (
+    "Okay so for the launch next month we need to finish the onboarding flow first, "
+    "then get legal to sign off on the new terms. Maria owns the pricing page and "
+    "should have a draft by Friday. We also want to measure activation rate and "
+    "churn in the first thirty days. To deploy, we branch from main, run the smoke "
+    "tests on staging, and only then promote to production during off-peak hours."
+)
+
+FAKE_PAYLOADS = {
+    "emit_processed_output": lambda: get_demo_tasks().model_dump(),
+    "emit_strategic_roadmap": lambda: get_demo_roadmap().model_dump(),
+    "emit_process_document": lambda: get_demo_process_doc().model_dump(),
+    "emit_combined_output": lambda: get_demo_all().model_dump()
+}
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+class FakeClient:
+    """Stand-in chat client: demo payloads, usage estimates and token-proportional latency."""
+
+    def __init__(self, base_latency: float = 0.3, per_output_token: float = 0.004, per_input_token: float = 0.0):
+        self.base_latency = base_latency
+        self.per_output_token = per_output_token
+        self.per_input_token = per_input_token
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, tools, tool_choice, **kwargs):
+        name = tool_choice["function"]["name"]
+        if name.endswith("_batch"):
+            # A micro-batch of short memos: one demo result per memo
+            memos = re.findall(r'<memo id="(\d+)">', messages[-1]["content"])
+            payload = {"results": [{"memo": int(memo), "output": FAKE_PAYLOADS[name[:-len("_batch")]]()} for memo in memos]}
+        else:
+            payload = FAKE_PAYLOADS[name]()
+        arguments = json.dumps(payload)
+        prompt_tokens = _estimate_tokens(json.dumps(messages) + json.dumps(tools))
+        completion_tokens = _estimate_tokens(arguments)
+        time.sleep(
+            self.base_latency + prompt_tokens * self.per_input_token + completion_tokens * self.per_output_token
+        )
+        call = SimpleNamespace(function=SimpleNamespace(arguments=arguments))
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=None, tool_calls=[call]))],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        )
+
+class UsageRecorder:
+    """Wraps a chat client and sums the token usage of every completion."""
+
+    def __init__(self, client):
+        self._client = client
+        self._lock = threading.Lock()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        response = self._client.chat.completions.create(**kwargs)
+        usage = getattr(response, "usage", None)
+        with self._lock:
+            self.calls += 1
+            if usage is not None:
+                self.prompt_tokens += usage.prompt_tokens
+                self.completion_tokens += usage.completion_tokens
+        return response
+
+async def _run_separate(transcript: str, client) -> None:
+    await asyncio.gather(*(
+        fn(transcript, client)
+        for fn in (process_transcript_to_tasks, process_transcript_to_roadmap, process_transcript_to_process_doc)
+    ))
+
+async def _run_combined(transcript: str, client) -> None:
+    await process_transcript_to_all(transcript, client)
+
+def _measure(name: str, runner, transcript: str, base_client, runs: int) -> dict:
+    latencies = []
+    recorder = UsageRecorder(base_client)
+    for _ in range(runs):
+        start = time.perf_counter()
+        asyncio.run(runner(transcript, recorder))
+        latencies.append(time.perf_counter() - start)
+    return {
+        "mode": name,
+        "runs": runs,
+        "median_latency_s": round(statistics.median(latencies), 3),
+        "max_latency_s": round(max(latencies), 3),
+        "calls_per_run": recorder.calls / runs,
+        "prompt_tokens_per_run": recorder.prompt_tokens // runs,
+        "completion_tokens_per_run": recorder.completion_tokens // runs
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transcript", type=Path, help="Transcript text file (defaults to a built-in sample)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--fake", action="store_true", help="Use the offline stand-in client")
+    args = parser.parse_args()
+
+    transcript = args.transcript.read_text() if args.transcript else SAMPLE_TRANSCRIPT
+    client = FakeClient() if args.fake else create_openrouter_client(settings.OPENROUTER_API_KEY)
+
+    results = [
+        _measure("separate x3 (parallel)", _run_separate, transcript, client, args.runs),
+        _measure("combined x1", _run_combined, transcript, client, args.runs)
+    ]
+    for row in results:
+        print(json.dumps(row))
+
+    separate, combined = results
+    print(
+        f"\nCombined uses {combined['prompt_tokens_per_run'] / max(1, separate['prompt_tokens_per_run']):.0%} "
+        f"of the prompt tokens and {combined['median_latency_s'] / max(1e-9, separate['median_latency_s']):.0%} "
+        f"of the median latency of three parallel calls."
+    )
+
+if __name__ == "__main__":
+    main()
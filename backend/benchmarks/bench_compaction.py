@@ -0,0 +1,116 @@
+"""
+Transcript Compaction Benchmark
+
+For each compaction level, reports how many transcript tokens the corpus
+loses, how long compaction itself takes, and what that does to a real
+structuring request: prompt tokens, median latency and estimated cost per
+thousand requests at the configured model prices.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_compaction --fake
+    python -m benchmarks.bench_compaction --corpus memos/ --levels off standard --runs 3
+
+Without --fake the OpenRouter client is built from OPENROUTER_API_KEY. The
+fake client charges latency for input tokens as well as output tokens, so
+offline numbers show the direction of the change, not its size. Whether
+compaction costs extraction quality is the eval harness's job: run
+``benchmarks.eval_corpus`` with TRANSCRIPT_COMPACTION=off and again with
+the level you want, using the first run as --baseline.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent
+if str(backend_dir) not in sys.path:
+    sys.path.append(str(backend_dir))
+
+from config import settings
+from services import process_transcript_to_tasks, structuring_batcher
+from services.clients import create_openrouter_client
+from services.generation import DEFAULT_MODEL
+from utils.compaction import LEVELS, compact_transcript, estimate_tokens
+from .bench_combined import FakeClient, UsageRecorder
+from .eval_corpus import DEFAULT_CORPUS, load_corpus
+
+def _compaction_row(level: str, transcripts: list, repeats: int = 200) -> dict:
+    before = sum(estimate_tokens(text) for text in transcripts)
+    after = sum(estimate_tokens(compact_transcript(text, level)) for text in transcripts)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for text in transcripts:
+            compact_transcript(text, level)
+    elapsed = (time.perf_counter() - started) / (repeats * len(transcripts))
+    return {
+        "level": level,
+        "transcript_tokens": before,
+        "compacted_tokens": after,
+        "reduction": round(1 - after / before, 3) if before else 0.0,
+        "compaction_ms": round(elapsed * 1000, 3)
+    }
+
+def _request_row(level: str, transcripts: list, client, runs: int) -> dict:
+    settings.TRANSCRIPT_COMPACTION = level
+    recorder = UsageRecorder(client)
+    latencies = []
+    for _ in range(runs):
+        for text in transcripts:
+            started = time.perf_counter()
+            asyncio.run(process_transcript_to_tasks(text, recorder))
+            latencies.append(time.perf_counter() - started)
+    requests = len(latencies)
+    prices = settings.MODEL_PRICES_PER_MTOK.get(DEFAULT_MODEL, {"prompt": 0.0, "completion": 0.0})
+    cost = (recorder.prompt_tokens * prices["prompt"] + recorder.completion_tokens * prices["completion"]) / 1e6
+    return {
+        "level": level,
+        "requests": requests,
+        "prompt_tokens_per_request": recorder.prompt_tokens // requests,
+        "completion_tokens_per_request": recorder.completion_tokens // requests,
+        "median_latency_s": round(statistics.median(latencies), 3),
+        "usd_per_1k_requests": round(cost / requests * 1000, 4)
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS, help="Directory of <name>.txt transcripts")
+    parser.add_argument("--levels", nargs="+", choices=LEVELS, default=list(LEVELS))
+    parser.add_argument("--runs", type=int, default=1, help="Structuring requests per transcript and level")
+    parser.add_argument("--fake", action="store_true", help="Use the offline stand-in client")
+    args = parser.parse_args()
+
+    transcripts = [item["transcript"] for item in load_corpus(args.corpus).values()]
+    if not transcripts:
+        parser.error(f"No transcripts in {args.corpus}")
+    if args.fake:
+        client = FakeClient(per_input_token=0.0005)
+    else:
+        client = create_openrouter_client(settings.OPENROUTER_API_KEY)
+    # Measure one request at a time; batching would blur the per-request numbers
+    structuring_batcher.enabled = False
+
+    print("Compaction:")
+    for level in args.levels:
+        print(json.dumps(_compaction_row(level, transcripts)))
+
+    print("\nStructuring (tasks):")
+    rows = [_request_row(level, transcripts, client, args.runs) for level in args.levels]
+    for row in rows:
+        print(json.dumps(row))
+
+    baseline = rows[0]
+    print()
+    for row in rows[1:]:
+        print(
+            f"{row['level']} vs {baseline['level']}: "
+            f"{row['prompt_tokens_per_request'] / max(1, baseline['prompt_tokens_per_request']):.0%} of the prompt tokens, "
+            f"{row['median_latency_s'] / max(1e-9, baseline['median_latency_s']):.0%} of the median latency, "
+            f"{row['usd_per_1k_requests'] / max(1e-9, baseline['usd_per_1k_requests']):.0%} of the cost."
+        )
+
+if __name__ == "__main__":
+    main()
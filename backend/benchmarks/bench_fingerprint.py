@@ -0,0 +1,96 @@
+"""
+Fingerprint Microbenchmark
+
+Times fingerprinting the start of a recording and looking a fingerprint
+up in indexes of growing size. The indexed recordings are synthetic hash
+sets with the size and hash distribution of real 2-minute fingerprints,
+so the lookup numbers show how the sorted inverted index scales without
+needing thousands of recordings.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_fingerprint
+    python -m benchmarks.bench_fingerprint --seconds 120 --sizes 100 1000 10000
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent
+if str(backend_dir) not in sys.path:
+    sys.path.append(str(backend_dir))
+
+import numpy as np
+from services import AudioArchive, FingerprintIndex
+from utils import Fingerprint
+from utils.fingerprint import SAMPLE_RATE, fingerprint
+
+def speech_like(seconds: float, seed: int = 1) -> np.ndarray:
+    """Syllable-length harmonic bursts at 8 kHz; enough structure for realistic peak density."""
+    rng = np.random.default_rng(seed)
+    out = np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+    position = 0
+    while position < len(out):
+        length = int(rng.uniform(0.08, 0.3) * SAMPLE_RATE)
+        t = np.arange(min(length, len(out) - position)) / SAMPLE_RATE
+        f0 = rng.uniform(100, 250)
+        burst = sum(rng.uniform(0.2, 1) / k * np.sin(2 * np.pi * f0 * k * t) for k in range(1, 12))
+        out[position:position + len(t)] += np.sin(np.pi * t / (length / SAMPLE_RATE)) * burst
+        position += length + int(rng.uniform(0, 0.15) * SAMPLE_RATE)
+    return out
+
+def synthetic(real: Fingerprint, seed: int) -> Fingerprint:
+    rng = np.random.default_rng(seed)
+    hashes = rng.choice(real.hashes, size=len(real)) ^ rng.integers(0, 1 << 22, size=len(real), dtype=np.uint32)
+    order = np.argsort(hashes)
+    return Fingerprint(hashes=hashes[order].astype(np.uint32), offsets=real.offsets[order], duration_seconds=real.duration_seconds)
+
+def time_call(func, runs: int) -> float:
+    func()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 3)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=120, help="Audio fingerprinted per recording")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000], help="Index sizes to time")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="Print a single JSON object for tracking")
+    args = parser.parse_args()
+
+    samples = speech_like(args.seconds)
+    query = fingerprint(samples, duration_seconds=args.seconds)
+    results = {
+        "fingerprint_ms": time_call(lambda: fingerprint(samples, duration_seconds=args.seconds), max(3, args.runs // 4)),
+        "hashes": len(query),
+        "bytes": len(query.to_bytes()),
+        "match_ms": {}
+    }
+    with tempfile.TemporaryDirectory() as root:
+        for size in args.sizes:
+            index = FingerprintIndex(AudioArchive(root), refresh_seconds=float("inf"))
+            for i in range(size):
+                index.add(f"recording-{i}", synthetic(query, i))
+            index.add("original", query)
+            index.match(query)  # builds the sorted arrays
+            results["match_ms"][size] = time_call(lambda: index.match(query), args.runs)
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"Fingerprint of {args.seconds:.0f}s: {results['fingerprint_ms']} ms, "
+          f"{results['hashes']} hashes, {results['bytes'] / 1024:.1f} KB")
+    for size, ms in results["match_ms"].items():
+        print(f"  match against {size:6d} recordings: {ms:8.3f} ms")
+
+if __name__ == "__main__":
+    main()
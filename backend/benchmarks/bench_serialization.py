@@ -0,0 +1,104 @@
+"""
+Response Serialization Microbenchmark
+
+Times validating and serializing a large ``StrategicRoadmap`` the old way
+(``Model(**data)`` in the route, then FastAPI's ``response_model``
+re-validation, ``jsonable_encoder`` and ``json.dumps``) against the current
+path (one cached ``TypeAdapter`` validation, then ``dump_json`` to bytes).
+orjson is included for reference when it happens to be installed.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --sections 200 --items 20 --runs 50
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent
+if str(backend_dir) not in sys.path:
+    sys.path.append(str(backend_dir))
+
+from fastapi.encoders import jsonable_encoder
+from models import StrategicRoadmap
+from utils import dump_json, get_adapter, validate
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ROADMAP_LISTS = ("market_analysis", "resource_requirements", "dependencies", "milestones", "success_metrics")
+
+def make_roadmap_payload(sections: int, items: int) -> dict:
+    """Build a raw roadmap dict (as returned by the model) with sections per list."""
+    def section(kind: str, i: int) -> dict:
+        return {
+            "title": f"{kind} section {i}",
+            "priority": ("High", "Medium", "Low")[i % 3],
+            "timeline": f"Q{i % 4 + 1} 2025",
+            "content": [f"Point {j} about {kind} — with “quotes” and détails" for j in range(items)]
+        }
+    payload = {kind: [section(kind, i) for i in range(sections)] for kind in ROADMAP_LISTS}
+    payload["summary"] = "A long strategic summary. " * 50
+    return payload
+
+def legacy_path(data: dict) -> bytes:
+    """What the routes did before: validate in the route, re-validate and encode in FastAPI."""
+    result = StrategicRoadmap(**data)
+    revalidated = StrategicRoadmap.model_validate(result.model_dump())
+    return json.dumps(
+        jsonable_encoder(revalidated),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+def adapter_path(data: dict) -> bytes:
+    return dump_json(validate(StrategicRoadmap, data))
+
+def orjson_path(data: dict) -> bytes:
+    return orjson.dumps(validate(StrategicRoadmap, data).model_dump())
+
+def time_call(func, data: dict, runs: int) -> dict:
+    func(data)
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(data)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": round(statistics.median(samples), 3), "min_ms": round(min(samples), 3)}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=100, help="Sections in each roadmap list")
+    parser.add_argument("--items", type=int, default=10, help="Content points per section")
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--json", action="store_true", help="Print a single JSON object for tracking")
+    args = parser.parse_args()
+
+    data = make_roadmap_payload(args.sections, args.items)
+    get_adapter(StrategicRoadmap)
+    paths = {"legacy": legacy_path, "adapter": adapter_path}
+    if orjson is not None:
+        paths["adapter+orjson"] = orjson_path
+
+    results = {name: time_call(func, data, args.runs) for name, func in paths.items()}
+    payload_bytes = len(adapter_path(data))
+
+    if args.json:
+        print(json.dumps({"payload_bytes": payload_bytes, "results": results}))
+        return
+
+    print(f"Roadmap payload: {payload_bytes / 1024:.1f} KB, {args.runs} runs")
+    baseline = results["legacy"]["median_ms"]
+    for name, result in results.items():
+        print(f"  {name:15s} median {result['median_ms']:8.3f} ms  ({baseline / result['median_ms']:.1f}x)")
+
+if __name__ == "__main__":
+    main()
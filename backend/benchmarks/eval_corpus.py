@@ -0,0 +1,367 @@
+"""
+Offline Structuring Evaluation
+
+Runs a directory of transcripts through the ``process_transcript_to_*``
+functions for every requested model and format, concurrently, and
+reports per model and format:
+
+- latency (p50/p95) and prompt/completion tokens per run
+- completions per run, including repair calls
+- parse-failure rate: completions with no usable JSON
+- first-pass validity: primary completions whose payload validated
+  without repair
+- final schema validity and the error rate
+- quality signals: item counts (tasks, steps, roadmap sections) and,
+  where a reference output exists, word-overlap F1 against it
+
+Pass ``--baseline`` with an earlier report to list regressions; the exit
+status is 1 when there are any, so it can gate a deploy.
+
+Corpus layout: ``<name>.txt`` transcripts, with optional references next
+to them as ``<name>.<format>.json`` (e.g. ``launch.tasks.json``); the
+combined format is scored against single-format references when it has
+none of its own.
+
+Usage (from the backend directory):
+    python -m benchmarks.eval_corpus --fake
+    python -m benchmarks.eval_corpus --corpus memos/ --models anthropic/claude-3.5-sonnet openai/gpt-4o-mini --out eval.json
+    python -m benchmarks.eval_corpus --base-url http://localhost:8080/v1 --baseline eval.json
+
+Without --fake or --base-url the OpenRouter client is built from
+OPENROUTER_API_KEY. --base-url points at any OpenAI-compatible server,
+such as a local stand-in.
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+backend_dir = Path(__file__).parent.parent
+if str(backend_dir) not in sys.path:
+    sys.path.append(str(backend_dir))
+
+from pydantic import ValidationError
+from config import settings
+from services import (
+    FORMAT_SPECS,
+    process_transcript_to_tasks,
+    process_transcript_to_roadmap,
+    process_transcript_to_process_doc,
+    process_transcript_to_all
+)
+from services.batcher import batch_model
+from services.clients import create_openrouter_client
+from services.generation import DEFAULT_MODEL, extract_payload, tool_name
+from utils import validate
+from .bench_combined import FakeClient
+
+DEFAULT_CORPUS = Path(__file__).parent / "corpus"
+
+PROCESSORS = {
+    "tasks": process_transcript_to_tasks,
+    "roadmap": process_transcript_to_roadmap,
+    "process": process_transcript_to_process_doc,
+    "all": process_transcript_to_all
+}
+
+ROADMAP_LISTS = ("market_analysis", "resource_requirements", "dependencies", "milestones", "success_metrics")
+
+# Primary (non-repair) completions, by the tool they were forced to call; batches count as one each
+PRIMARY_TOOLS = {tool_name(spec["model_cls"]): spec["model_cls"] for spec in FORMAT_SPECS.values()}
+PRIMARY_TOOLS.update({tool_name(batch_model(model_cls)): batch_model(model_cls) for model_cls in list(PRIMARY_TOOLS.values())})
+
+# A regression is a change beyond these, relative for latency/tokens and absolute for rates
+TOLERANCES = {
+    "latency_p50_s": 0.20,
+    "prompt_tokens": 0.10,
+    "completion_tokens": 0.15,
+    "parse_failure_rate": 0.05,
+    "first_pass_valid_rate": -0.05,
+    "schema_valid_rate": -0.05,
+    "error_rate": 0.05,
+    "overlap_f1": -0.05
+}
+RELATIVE_METRICS = ("latency_p50_s", "prompt_tokens", "completion_tokens")
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+class CallRecorder:
+    """Chat client wrapper for one run: forces the model and records every completion."""
+
+    def __init__(self, client, model: str):
+        self._client = client
+        self.model = model
+        self._lock = threading.Lock()
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        kwargs["model"] = self.model
+        response = self._client.chat.completions.create(**kwargs)
+        tool = kwargs["tool_choice"]["function"]["name"]
+        payload = extract_payload(response.choices[0].message)
+        valid = None
+        if tool in PRIMARY_TOOLS and payload is not None:
+            try:
+                validate(PRIMARY_TOOLS[tool], payload)
+                valid = True
+            except ValidationError:
+                valid = False
+        usage = getattr(response, "usage", None)
+        with self._lock:
+            self.calls.append({
+                "tool": tool,
+                "parsed": payload is not None,
+                "valid": valid,
+                "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+                "completion_tokens": getattr(usage, "completion_tokens", 0) or 0
+            })
+        return response
+
+def load_corpus(directory: Path) -> dict:
+    """Return ``{name: {"transcript": text, "references": {format: output}}}``."""
+    corpus = {}
+    for path in sorted(directory.glob("*.txt")):
+        references = {}
+        for output_format in PROCESSORS:
+            reference = path.with_name(f"{path.stem}.{output_format}.json")
+            if reference.exists():
+                references[output_format] = json.loads(reference.read_text())
+        corpus[path.stem] = {"transcript": path.read_text(), "references": references}
+    return corpus
+
+def _items(output: dict, output_format: str) -> dict:
+    """The texts of each kind of extracted item in an output."""
+    if output_format == "all":
+        items = {}
+        for part in ("tasks", "roadmap", "process"):
+            items.update(_items(output[part], part))
+        return items
+    if output_format == "tasks":
+        return {
+            "tasks": [f"{task['title']} {task.get('description') or ''}" for task in output["tasks"]],
+            "next_steps": list(output["next_steps"])
+        }
+    if output_format == "roadmap":
+        return {
+            "roadmap_sections": [
+                f"{section['title']} {' '.join(section['content'])}"
+                for kind in ROADMAP_LISTS for section in output[kind]
+            ]
+        }
+    return {"steps": [f"{step['action']} {step['details']}" for step in output["steps"]]}
+
+def _words(text: str) -> set:
+    return {word for word in _WORD.findall(text.lower()) if len(word) > 2}
+
+def _best_match_mean(items: list, others: list) -> float:
+    """Mean over items of the best Jaccard similarity to any of others."""
+    if not items:
+        return 1.0 if not others else 0.0
+    other_words = [_words(other) for other in others]
+    scores = []
+    for item in items:
+        words = _words(item)
+        scores.append(max((len(words & other) / len(words | other) for other in other_words if words | other), default=0.0))
+    return sum(scores) / len(scores)
+
+def overlap_f1(output: dict, reference: dict, output_format: str) -> float:
+    """Word-overlap F1 between an output's items and a reference's, averaged over item kinds."""
+    produced, expected = _items(output, output_format), _items(reference, output_format)
+    scores = []
+    for kind, reference_items in expected.items():
+        precision = _best_match_mean(produced.get(kind, []), reference_items)
+        recall = _best_match_mean(reference_items, produced.get(kind, []))
+        scores.append(0.0 if precision + recall == 0 else 2 * precision * recall / (precision + recall))
+    return sum(scores) / len(scores) if scores else 0.0
+
+def _reference_f1(output: dict, references: dict, output_format: str) -> float | None:
+    if output_format in references:
+        return round(overlap_f1(output, references[output_format], output_format), 3)
+    if output_format == "all":
+        # Score the combined output against whichever single-format references exist
+        scores = [overlap_f1(output[part], references[part], part) for part in ("tasks", "roadmap", "process") if part in references]
+        if scores:
+            return round(sum(scores) / len(scores), 3)
+    return None
+
+async def run_one(client, model: str, output_format: str, name: str, sample: dict, semaphore: asyncio.Semaphore) -> dict:
+    recorder = CallRecorder(client, model)
+    row = {"model": model, "format": output_format, "transcript": name}
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            output = await PROCESSORS[output_format](sample["transcript"], recorder)
+            error = None
+        except Exception as e:
+            output, error = None, getattr(e, "detail", None) or str(e)
+        row["latency_s"] = round(time.perf_counter() - started, 3)
+
+    calls = recorder.calls
+    primary = [call for call in calls if call["tool"] in PRIMARY_TOOLS]
+    row.update({
+        "error": error,
+        "calls": len(calls),
+        "repair_calls": sum(1 for call in calls if call["tool"] not in PRIMARY_TOOLS),
+        "parse_failures": sum(1 for call in calls if not call["parsed"]),
+        "primary_calls": len(primary),
+        "primary_valid": sum(1 for call in primary if call["valid"]),
+        "prompt_tokens": sum(call["prompt_tokens"] for call in calls),
+        "completion_tokens": sum(call["completion_tokens"] for call in calls),
+        "schema_valid": False,
+        "counts": {},
+        "overlap_f1": None
+    })
+    if output is not None:
+        try:
+            validate(FORMAT_SPECS[output_format]["model_cls"], output)
+            row["schema_valid"] = True
+        except ValidationError:
+            pass
+        row["counts"] = {kind: len(items) for kind, items in _items(output, output_format).items()}
+        row["overlap_f1"] = _reference_f1(output, sample["references"], output_format)
+    return row
+
+def _percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def summarize(rows: list) -> dict:
+    """Aggregate run rows per ``model|format``."""
+    groups = defaultdict(list)
+    for row in rows:
+        groups[f"{row['model']}|{row['format']}"].append(row)
+
+    summary = {}
+    for key, group in sorted(groups.items()):
+        ok = [row for row in group if row["error"] is None]
+        latencies = [row["latency_s"] for row in ok] or [0.0]
+        calls = sum(row["calls"] for row in group)
+        primary = sum(row["primary_calls"] for row in group)
+        counts = defaultdict(list)
+        for row in ok:
+            for kind, count in row["counts"].items():
+                counts[kind].append(count)
+        overlaps = [row["overlap_f1"] for row in ok if row["overlap_f1"] is not None]
+        summary[key] = {
+            "runs": len(group),
+            "error_rate": round(1 - len(ok) / len(group), 3),
+            "latency_p50_s": round(statistics.median(latencies), 3),
+            "latency_p95_s": round(_percentile(latencies, 0.95), 3),
+            "prompt_tokens": round(statistics.mean(row["prompt_tokens"] for row in group)),
+            "completion_tokens": round(statistics.mean(row["completion_tokens"] for row in group)),
+            "calls_per_run": round(calls / len(group), 2),
+            "repair_calls_per_run": round(sum(row["repair_calls"] for row in group) / len(group), 2),
+            "parse_failure_rate": round(sum(row["parse_failures"] for row in group) / calls, 3) if calls else 0.0,
+            "first_pass_valid_rate": round(sum(row["primary_valid"] for row in group) / primary, 3) if primary else 0.0,
+            "schema_valid_rate": round(sum(row["schema_valid"] for row in group) / len(group), 3),
+            "item_counts": {kind: round(statistics.mean(values), 1) for kind, values in sorted(counts.items())},
+            "overlap_f1": round(statistics.mean(overlaps), 3) if overlaps else None
+        }
+    return summary
+
+def find_regressions(summary: dict, baseline: dict) -> list:
+    """Describe every metric that got worse than the baseline by more than its tolerance."""
+    regressions = []
+    for key, current in summary.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric, tolerance in TOLERANCES.items():
+            old, new = previous.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if metric in RELATIVE_METRICS and old else new - old
+            if (tolerance > 0 and change > tolerance) or (tolerance < 0 and change < tolerance):
+                shown = f"{change:+.0%}" if metric in RELATIVE_METRICS else f"{change:+.3f}"
+                regressions.append(f"{key}: {metric} {old} -> {new} ({shown})")
+    return regressions
+
+def print_report(summary: dict) -> None:
+    header = f"{'model|format':48s} {'runs':>4s} {'err':>5s} {'p50 s':>7s} {'p95 s':>7s} {'in tok':>7s} {'out tok':>7s} " \
+             f"{'calls':>5s} {'parse':>6s} {'1st ok':>6s} {'valid':>6s} {'F1':>5s}  items"
+    print(header)
+    print("-" * len(header))
+    for key, row in summary.items():
+        f1 = "-" if row["overlap_f1"] is None else f"{row['overlap_f1']:.2f}"
+        items = ", ".join(f"{kind} {count:g}" for kind, count in row["item_counts"].items())
+        print(
+            f"{key:48s} {row['runs']:4d} {row['error_rate']:5.0%} {row['latency_p50_s']:7.2f} {row['latency_p95_s']:7.2f} "
+            f"{row['prompt_tokens']:7d} {row['completion_tokens']:7d} {row['calls_per_run']:5.2f} "
+            f"{row['parse_failure_rate']:6.1%} {row['first_pass_valid_rate']:6.1%} {row['schema_valid_rate']:6.1%} {f1:>5s}  {items}"
+        )
+
+async def evaluate(client, corpus: dict, models: list, formats: list, repeats: int, concurrency: int) -> list:
+    # Every completion runs on a worker thread; make sure the pool isn't the limit
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency * 4))
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*(
+        run_one(client, model, output_format, name, sample, semaphore)
+        for model in models
+        for output_format in formats
+        for name, sample in corpus.items()
+        for _ in range(repeats)
+    ))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS, help="Directory of .txt transcripts and references")
+    parser.add_argument("--models", nargs="+", default=[DEFAULT_MODEL])
+    parser.add_argument("--formats", nargs="+", default=list(PROCESSORS), choices=list(PROCESSORS))
+    parser.add_argument("--repeats", type=int, default=1, help="Runs per transcript, model and format")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--fake", action="store_true", help="Use the offline stand-in client")
+    parser.add_argument("--base-url", help="OpenAI-compatible server to use instead of OpenRouter")
+    parser.add_argument("--out", type=Path, help="Write the full report (summary and every run) as JSON")
+    parser.add_argument("--baseline", type=Path, help="Earlier report to check for regressions")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        parser.error(f"No .txt transcripts in {args.corpus}")
+    if args.fake:
+        client = FakeClient(base_latency=0.05, per_output_token=0.0005)
+    elif args.base_url:
+        from openai import OpenAI
+        client = OpenAI(base_url=args.base_url, api_key=settings.OPENROUTER_API_KEY or "local")
+    else:
+        client = create_openrouter_client(settings.OPENROUTER_API_KEY)
+
+    started = time.perf_counter()
+    rows = asyncio.run(evaluate(client, corpus, args.models, args.formats, args.repeats, args.concurrency))
+    summary = summarize(rows)
+    print(f"{len(rows)} runs over {len(corpus)} transcripts in {time.perf_counter() - started:.1f}s\n")
+    print_report(summary)
+
+    if args.out:
+        report = {
+            "corpus": str(args.corpus),
+            "models": args.models,
+            "formats": args.formats,
+            "repeats": args.repeats,
+            "summary": summary,
+            "runs": rows
+        }
+        args.out.write_text(json.dumps(report, indent=2))
+        print(f"\nReport written to {args.out}")
+
+    if args.baseline:
+        regressions = find_regressions(summary, json.loads(args.baseline.read_text())["summary"])
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
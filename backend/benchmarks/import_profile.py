@@ -0,0 +1,72 @@
+"""
+Import-Time Profile
+
+Imports the app in a fresh interpreter with ``python -X importtime`` and
+reports the total import time plus the most expensive top-level packages,
+so startup regressions show up before they reach a cold Render instance.
+
+Usage (from the backend directory):
+    python -m benchmarks.import_profile
+    python -m benchmarks.import_profile --top 20 --json
+    python -m benchmarks.import_profile --budget-ms 600   # exit 1 if over budget
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent
+
+def profile_imports(module: str = "main") -> list:
+    """Return (name, self_us, cumulative_us, depth) rows for importing module."""
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=backend_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="Print a single JSON object for tracking")
+    parser.add_argument("--budget-ms", type=float, help="Fail when the total exceeds this many milliseconds")
+    args = parser.parse_args()
+
+    rows = profile_imports(args.module)
+    total_ms = next(cumulative for name, _, cumulative, _ in rows if name == args.module) / 1000
+    # Direct dependencies of the app module, i.e. what each top-level import costs
+    top = sorted((row for row in rows if row[3] == 1), key=lambda row: row[2], reverse=True)[:args.top]
+
+    if args.json:
+        print(json.dumps({
+            "module": args.module,
+            "total_ms": round(total_ms, 1),
+            "top": {name: round(cumulative / 1000, 1) for name, _, cumulative, _ in top}
+        }))
+    else:
+        print(f"import {args.module}: {total_ms:.1f} ms")
+        for name, _, cumulative, _ in top:
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"Startup import budget exceeded: {total_ms:.1f} ms > {args.budget_ms} ms", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
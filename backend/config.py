@@ -9,6 +9,56 @@ Environment Variables:
     ANTHROPIC_API_KEY: API key for Anthropic services
     OPENROUTER_API_KEY: API key for OpenRouter services
     CORS_ORIGINS: List of allowed origins for CORS
+    TRANSCRIPT_TTL_SECONDS: Lifetime of transcript handles returned by /transcribe
+    TRANSCRIPT_DIR: Directory of transcript handles, shared by all workers
+    TRANSCRIPTION_CONCURRENCY: Whisper calls run at once per worker
+    STRUCTURING_CONCURRENCY: LLM structuring calls run at once per worker
+    SCHEDULER_AGING_RATE: Seconds of priority a queued job gains per second waited
+    MAX_AUDIO_SECONDS: Longest accepted recording, read from the file header (0 disables)
+    MAX_UPLOAD_MB: Largest accepted upload
+    UPLOAD_MEMORY_BUDGET_MB, UPLOAD_BUDGET_WAIT_SECONDS: Bytes all in-flight request bodies
+        may hold at once per worker, and how long a request waits for room before a 503
+    PORT, WEB_CONCURRENCY, WORKER_MEMORY_MB, MEMORY_BUDGET_MB,
+    MAX_REQUESTS_PER_WORKER, DRAIN_TIMEOUT_SECONDS: Production server sizing (see server.py)
+    WARMUP_ON_START: Pre-open upstream connections and build validators after boot
+    UPSTREAM_KEEPALIVE_SECONDS: How long idle upstream connections stay pooled
+    READINESS_PROBE_INTERVAL: Seconds between background upstream probes
+    READY_MAX_QUEUE_DEPTH, READY_MAX_RSS_MB: Load-shedding limits for /health/ready (0 disables)
+    RATE_LIMIT_*: Token buckets per client IP / X-API-Key, measured in audio seconds
+    RATE_LIMIT_API_KEYS: JSON list of X-API-Key values that get their own, larger bucket; other keys are ignored
+    TRUST_FORWARDED_FOR: Take the client IP from the last X-Forwarded-For entry (set behind one proxy)
+    LEDGER_*: Per-request usage ledger (JSONL file, batched writes) behind /stats
+    WHISPER_USD_PER_MINUTE, MODEL_PRICES_PER_MTOK: Prices used for ledger cost estimates
+    BREAKER_*: Per-upstream circuit breakers (failure/slow-call rate, open time); a Whisper call is slow
+        after BREAKER_WHISPER_SLOW_CALL_SECONDS plus BREAKER_WHISPER_SLOW_CALL_PER_AUDIO_SECOND per second of audio
+    RESULT_CACHE_ENTRIES: Recent results kept for degraded responses during outages
+    RESULT_REUSE_SECONDS: Serve an identical upload's recent result without new upstream calls (0 disables)
+    REQUEST_DEADLINE_SECONDS: Longest a processing request may take end to end
+    ARCHIVE_ENABLED: Keep uploaded audio (deduplicated by content) for playback at /audio/{id}
+    ARCHIVE_DIR: Directory of the audio archive
+    ARCHIVE_MAX_MB: Archive size above which the least recently used recordings are removed
+    FINGERPRINT_ENABLED: Reuse the transcript of an archived recording that sounds the same (needs NumPy; ffmpeg for non-WAV)
+    FINGERPRINT_MIN_CONFIDENCE: Share of aligned fingerprint hashes needed to treat two recordings as one
+    FINGERPRINT_MIN_MATCHES: Aligned hashes needed as well, so very short clips never match by chance
+    WHISPER_TIMESTAMPS: Timestamp detail requested from Whisper: "segment", "word" or "" for none
+    BATCH_ENABLED: Share one completion between concurrent short transcripts of the same format
+    BATCH_MAX_CHARS: Longest transcript that is batched (about 30 seconds of speech)
+    BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS: Most memos per shared completion, and the longest a batch waits for more
+    PROGRESSIVE_ENABLED: Allow ?progressive=true: a fast DRAFT_MODEL result now, the full model's upgrade later
+    DRAFT_MODEL: OpenRouter model used for progressive drafts
+    UPGRADE_DIR: Directory of progressive upgrades, shared by all workers
+    UPGRADE_TTL_SECONDS: How long a finished upgrade can be fetched from /upgrades/{id}
+    DRAFT_GOOD_ENOUGH_SIMILARITY: Draft/upgrade similarity at which the draft counts as good enough
+    LIVE_ENABLED: Accept live recordings over the /live/{format} WebSocket
+    LIVE_MAX_SESSIONS: Live recordings one worker takes at a time
+    LIVE_SEGMENT_MIN_SECONDS, LIVE_SEGMENT_MAX_SECONDS: A live segment is cut at the first pause after the minimum, or at the maximum
+    LIVE_PAUSE_SECONDS: Silence that counts as a pause between live segments
+    LIVE_IDLE_SECONDS: A live recording that sends nothing for this long is dropped
+    UPLOAD_DIR: Directory of resumable (chunked) uploads in progress, shared by all workers
+    UPLOAD_CHUNK_BYTES: Chunk size of resumable uploads
+    UPLOAD_SESSION_TTL_SECONDS: A resumable upload with no new chunk for this long is discarded
+    TRANSCRIPT_COMPACTION: Disfluency removal before structuring: "off", "light", "standard" or "aggressive"
+    ADMIN_TOKEN: Enables the /admin profiling routes and /stats (X-Admin-Token header); empty disables them
 
 The Settings class uses Pydantic for validation and provides default values
 where appropriate. Settings are loaded from environment variables or .env file.
@@ -16,7 +66,8 @@ where appropriate. Settings are loaded from environment variables or .env file.
 
 import os
 import json
-from typing import List
+import tempfile
+from typing import Dict, List
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -29,6 +80,117 @@ class Settings(BaseSettings):
     
     # CORS Settings - Parse from environment or use default
     CORS_ORIGINS: List[str] = json.loads(os.getenv("CORS_ORIGINS", '["*"]'))
+
+    # Transcript handles
+    TRANSCRIPT_TTL_SECONDS: int = 900
+    TRANSCRIPT_DIR: str = os.path.join(tempfile.gettempdir(), "voicepm-transcripts")
+
+    # Shortest-job-first scheduling of upstream work
+    TRANSCRIPTION_CONCURRENCY: int = 4
+    STRUCTURING_CONCURRENCY: int = 4
+    SCHEDULER_AGING_RATE: float = 10.0
+
+    # Upload limits
+    MAX_AUDIO_SECONDS: int = 7200
+    MAX_UPLOAD_MB: int = 25
+    UPLOAD_MEMORY_BUDGET_MB: int = 128
+    UPLOAD_BUDGET_WAIT_SECONDS: float = 10.0
+
+    # Production server (server.py)
+    PORT: int = 8000
+    WEB_CONCURRENCY: int = 0
+    WORKER_MEMORY_MB: int = 256
+    MEMORY_BUDGET_MB: int = 0
+    MAX_REQUESTS_PER_WORKER: int = 1000
+    DRAIN_TIMEOUT_SECONDS: int = 90
+
+    # Cold start
+    WARMUP_ON_START: bool = True
+    UPSTREAM_KEEPALIVE_SECONDS: float = 60.0
+
+    # Readiness (/health/ready)
+    READINESS_PROBE_INTERVAL: float = 30.0
+    READY_MAX_QUEUE_DEPTH: int = 50
+    READY_MAX_RSS_MB: int = 0
+
+    # Rate limiting, in estimated audio seconds (shared by workers via a SQLite file)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_CAPACITY: float = 3600.0
+    RATE_LIMIT_REFILL_PER_SECOND: float = 1.0
+    RATE_LIMIT_REQUEST_COST: float = 10.0
+    RATE_LIMIT_KEY_MULTIPLIER: float = 5.0
+    RATE_LIMIT_API_KEYS: List[str] = []
+    RATE_LIMIT_DB: str = os.path.join(tempfile.gettempdir(), "voicepm-ratelimit.sqlite3")
+    TRUST_FORWARDED_FOR: bool = True
+
+    # Usage ledger and cost estimates (/stats)
+    LEDGER_ENABLED: bool = True
+    LEDGER_PATH: str = os.path.join(tempfile.gettempdir(), "voicepm-usage.jsonl")
+    LEDGER_FLUSH_SECONDS: float = 5.0
+    LEDGER_MAX_BATCH: int = 200
+    LEDGER_MAX_BYTES: int = 50 * 1024 * 1024
+    WHISPER_USD_PER_MINUTE: float = 0.006
+    MODEL_PRICES_PER_MTOK: Dict[str, Dict[str, float]] = {
+        "anthropic/claude-3.5-sonnet": {"prompt": 3.0, "completion": 15.0},
+        "openai/gpt-4o-mini": {"prompt": 0.15, "completion": 0.6}
+    }
+
+    # Circuit breakers and degraded responses during upstream outages
+    BREAKER_WINDOW: int = 20
+    BREAKER_MIN_CALLS: int = 5
+    BREAKER_FAILURE_RATE: float = 0.5
+    BREAKER_SLOW_CALL_SECONDS: float = 120.0
+    BREAKER_WHISPER_SLOW_CALL_SECONDS: float = 20.0
+    BREAKER_WHISPER_SLOW_CALL_PER_AUDIO_SECOND: float = 0.5
+    BREAKER_OPEN_SECONDS: float = 30.0
+    RESULT_CACHE_ENTRIES: int = 256
+    RESULT_REUSE_SECONDS: int = 600
+
+    # Deadlines and cancellation
+    REQUEST_DEADLINE_SECONDS: float = 600.0
+
+    # Audio archive and timestamps (/audio/{id})
+    ARCHIVE_ENABLED: bool = True
+    ARCHIVE_DIR: str = os.path.join(tempfile.gettempdir(), "voicepm-audio")
+    ARCHIVE_MAX_MB: int = 2048
+    WHISPER_TIMESTAMPS: str = "segment"
+
+    # Acoustic-fingerprint reuse of transcripts for re-encoded duplicates
+    FINGERPRINT_ENABLED: bool = True
+    FINGERPRINT_MIN_CONFIDENCE: float = 0.2
+    FINGERPRINT_MIN_MATCHES: int = 20
+
+    # Micro-batching of short transcripts into shared structuring completions
+    BATCH_ENABLED: bool = True
+    BATCH_MAX_CHARS: int = 600
+    BATCH_MAX_SIZE: int = 8
+    BATCH_MAX_WAIT_MS: int = 300
+
+    # Progressive results: a draft from a fast model, upgraded in the background
+    PROGRESSIVE_ENABLED: bool = True
+    DRAFT_MODEL: str = "openai/gpt-4o-mini"
+    UPGRADE_DIR: str = os.path.join(tempfile.gettempdir(), "voicepm-upgrades")
+    UPGRADE_TTL_SECONDS: int = 900
+    DRAFT_GOOD_ENOUGH_SIMILARITY: float = 0.8
+
+    # Live recording over WebSocket, transcribed segment by segment
+    LIVE_ENABLED: bool = True
+    LIVE_MAX_SESSIONS: int = 20
+    LIVE_SEGMENT_MIN_SECONDS: float = 5.0
+    LIVE_SEGMENT_MAX_SECONDS: float = 20.0
+    LIVE_PAUSE_SECONDS: float = 0.5
+    LIVE_IDLE_SECONDS: float = 30.0
+
+    # Resumable chunked uploads (/uploads)
+    UPLOAD_DIR: str = os.path.join(tempfile.gettempdir(), "voicepm-uploads")
+    UPLOAD_CHUNK_BYTES: int = 1024 * 1024
+    UPLOAD_SESSION_TTL_SECONDS: int = 3600
+
+    # Local transcript compaction before structuring (see utils/compaction.py)
+    TRANSCRIPT_COMPACTION: str = "standard"
+
+    # Admin routes (/admin/profile, /admin/tasks)
+    ADMIN_TOKEN: str = ""
     
     class Config:
         """Pydantic config for settings."""
@@ -0,0 +1,123 @@
+"""Helpers and fixtures shared by the test modules: generated audio, fake upstream clients and the app in production mode."""
+
+import asyncio
+import io
+import json
+import math
+import re
+import wave
+from array import array
+from types import SimpleNamespace
+import pytest
+from fastapi.testclient import TestClient
+from .main import app
+
+from models import ProcessedOutput
+from services import whisper_breaker, openrouter_breaker
+from services.breaker import CLOSED
+from services.generation import generate_structured
+
+VALID_TASKS = {
+    "tasks": [{"title": "Ship it", "priority": "High", "description": None}],
+    "next_steps": ["Deploy"],
+    "notes": ["None"]
+}
+
+def make_wav(seconds: float = 1.5, rate: int = 16000, channels: int = 1) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\x00\x00" * channels * int(rate * seconds))
+    return buffer.getvalue()
+
+def make_tone(seconds: float, rate: int = 8000) -> bytes:
+    """A 440 Hz tone as 16-bit mono PCM, loud enough to count as speech."""
+    return array("h", (int(8000 * math.sin(2 * math.pi * 440 * i / rate)) for i in range(int(seconds * rate)))).tobytes()
+
+class FakeClient:
+    """Chat client that replays scripted tool-call arguments and records requests."""
+
+    def __init__(self, *payloads):
+        self.payloads = list(payloads)
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.requests.append(kwargs)
+        call = SimpleNamespace(function=SimpleNamespace(arguments=json.dumps(self.payloads.pop(0))))
+        message = SimpleNamespace(content=None, tool_calls=[call])
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+class MemoClient:
+    """Chat client that answers each memo with a task named after the memo's text."""
+
+    def __init__(self, broken_batches: bool = False, drop_memo: int | None = None):
+        self.broken_batches = broken_batches
+        self.drop_memo = drop_memo
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    @staticmethod
+    def _tasks(text: str) -> dict:
+        return {"tasks": [{"title": text.strip(), "priority": "High"}], "next_steps": [], "notes": []}
+
+    def _create(self, **kwargs):
+        self.requests.append(kwargs)
+        prompt = kwargs["messages"][1]["content"]
+        if kwargs["tool_choice"]["function"]["name"].endswith("_batch"):
+            if self.broken_batches:
+                message = SimpleNamespace(content="Sorry, I can't do several at once.", tool_calls=[])
+                return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+            memos = re.findall(r'<memo id="(\d+)">\n(.*?)\n</memo>', prompt, re.S)
+            payload = {"results": [
+                {"memo": int(memo_id), "output": self._tasks(text)}
+                for memo_id, text in memos if int(memo_id) != self.drop_memo
+            ]}
+        else:
+            payload = self._tasks(prompt.rsplit("Transcript:", 1)[1])
+        call = SimpleNamespace(function=SimpleNamespace(arguments=json.dumps(payload)))
+        message = SimpleNamespace(content=None, tool_calls=[call])
+        usage = SimpleNamespace(prompt_tokens=1000, completion_tokens=100)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+class WhisperClient:
+    """Transcription client naming each segment in order and recording the prompts it got."""
+
+    def __init__(self):
+        self.prompts = []
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, file, prompt="", **kwargs):
+        self.prompts.append(prompt)
+        text = f"Part {len(self.prompts)} renew the certificate."
+        return SimpleNamespace(text=text, segments=[{"start": 0.0, "end": 1.0, "text": text}], duration=1.0, language="en")
+
+def run_generation(client):
+    """Structure a fixed transcript as tasks with the given chat client."""
+    return asyncio.run(generate_structured(
+        client,
+        ProcessedOutput,
+        system_prompt="system",
+        user_prompt="user",
+        transcript="we need to ship it",
+        label="tasks"
+    ))
+
+@pytest.fixture
+def production_client():
+    """The app in production mode, with fake upstream clients and fresh breakers."""
+    whisper = SimpleNamespace(audio=SimpleNamespace(transcriptions=SimpleNamespace(
+        create=lambda **kwargs: SimpleNamespace(text="we need to ship it")
+    )))
+    saved = (app.state.demo_mode, app.state.clients)
+    app.state.demo_mode = False
+    app.state.clients = SimpleNamespace(openai=whisper, openrouter=FakeClient(*[VALID_TASKS] * 5))
+    try:
+        yield TestClient(app)
+    finally:
+        app.state.demo_mode, app.state.clients = saved
+        for breaker in (whisper_breaker, openrouter_breaker):
+            breaker.state = CLOSED
+            breaker._outcomes.clear()
@@ -1,9 +1,10 @@
-import os
-from fastapi import FastAPI, Depends
+import time
+_import_started = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from openai import OpenAI
 from pathlib import Path
 import sys
 
@@ -15,12 +16,81 @@ if str(backend_dir) not in sys.path:
 from config import settings
 from routes.audio import router as audio_router
 from routes.health import router as health_router
-from services.audio import create_openrouter_client
+from routes.static import router as static_router
+from routes.stats import router as stats_router
+from routes.admin import router as admin_router
+from routes.playback import router as playback_router
+from routes.upgrades import router as upgrades_router
+from routes.live import router as live_router
+from routes.uploads import router as uploads_router
+from middleware import (
+    InFlightMiddleware,
+    RateLimitMiddleware,
+    SQLiteBucketStore,
+    UsageMiddleware,
+    DeadlineMiddleware,
+    ByteBudget,
+    UploadBudgetMiddleware
+)
+from services import ClientProvider, UpstreamProber, usage_ledger
+from services.generation import warm_validators
+from utils import metrics, fingerprint_available
+from utils.assets import AssetManifest
 
 # Get the project root directory
 ROOT_DIR = Path(__file__).parent.parent
 
-app = FastAPI(title="VoicePM API", version="1.0.0")
+async def warmup():
+    """Pre-open upstream connections, build validators and static assets, and import NumPy after boot."""
+    started = time.perf_counter()
+    await asyncio.to_thread(warm_validators)
+    await asyncio.to_thread(app.state.assets.load)
+    if settings.FINGERPRINT_ENABLED:
+        await asyncio.to_thread(fingerprint_available)
+    if not DEMO_MODE:
+        await asyncio.to_thread(clients.warmup)
+    metrics.set_gauge("startup.warmup_seconds", round(time.perf_counter() - started, 4))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the warmup hook, upstream probes and ledger flusher; drain them on shutdown."""
+    warmup_task = asyncio.create_task(warmup()) if settings.WARMUP_ON_START else None
+    if app.state.prober:
+        app.state.prober.start()
+    if settings.LEDGER_ENABLED:
+        usage_ledger.start()
+    # /health/ready reports draining from the moment the shutdown signal arrives (see server.py)
+    yield
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    if app.state.prober:
+        await app.state.prober.stop()
+    if settings.LEDGER_ENABLED:
+        await usage_ledger.stop()
+
+app = FastAPI(title="VoicePM API", version="1.0.0", lifespan=lifespan)
+
+# Innermost: only requests that pass the rate limit reserve memory for their body
+app.add_middleware(
+    UploadBudgetMiddleware,
+    budget=ByteBudget(settings.UPLOAD_MEMORY_BUDGET_MB * 1024 * 1024),
+    # Multipart framing adds a little on top of the file itself
+    max_body_bytes=(settings.MAX_UPLOAD_MB + 1) * 1024 * 1024,
+    wait_seconds=settings.UPLOAD_BUDGET_WAIT_SECONDS
+)
+
+# Added before CORS so 429 responses still carry CORS headers
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        RateLimitMiddleware,
+        store=SQLiteBucketStore(settings.RATE_LIMIT_DB),
+        capacity=settings.RATE_LIMIT_CAPACITY,
+        refill_per_second=settings.RATE_LIMIT_REFILL_PER_SECOND,
+        request_cost=settings.RATE_LIMIT_REQUEST_COST,
+        key_multiplier=settings.RATE_LIMIT_KEY_MULTIPLIER,
+        trust_forwarded_for=settings.TRUST_FORWARDED_FOR,
+        api_keys=settings.RATE_LIMIT_API_KEYS
+    )
 
 # Enable CORS with more permissive settings for local development
 app.add_middleware(
@@ -32,12 +102,25 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
-# Mount static files
-app.mount("/static", StaticFiles(directory=str(ROOT_DIR / "static")), name="static")
+# Outside the rate limiter so rejected requests are ledgered too
+if settings.LEDGER_ENABLED:
+    app.add_middleware(
+        UsageMiddleware,
+        ledger=usage_ledger,
+        trust_forwarded_for=settings.TRUST_FORWARDED_FOR,
+        api_keys=settings.RATE_LIMIT_API_KEYS
+    )
+
+app.add_middleware(InFlightMiddleware)
+
+# Outermost, so the deadline also covers reading the upload
+app.add_middleware(DeadlineMiddleware, default_seconds=settings.REQUEST_DEADLINE_SECONDS)
+
+# Static files are hashed and precompressed by the warmup hook (or the first request), not at import
+app.state.assets = AssetManifest(ROOT_DIR / "static", ROOT_DIR / "index.html")
 
-# Initialize clients
-openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
-openrouter_client = create_openrouter_client(settings.OPENROUTER_API_KEY)
+# Clients are built on first use (or by the warmup hook) to keep cold starts fast
+clients = ClientProvider(settings.OPENAI_API_KEY, settings.OPENROUTER_API_KEY)
 
 # Check if we have valid API keys
 DEMO_MODE = (
@@ -57,18 +140,24 @@ else:
 # Include routers
 app.include_router(audio_router)
 app.include_router(health_router)
+app.include_router(static_router)
+app.include_router(stats_router)
+app.include_router(admin_router)
+app.include_router(playback_router)
+app.include_router(upgrades_router)
+app.include_router(live_router)
+app.include_router(uploads_router)
 
 # Make dependencies available to routes
 app.state.demo_mode = DEMO_MODE
-app.state.openai_client = openai_client
-app.state.openrouter_client = openrouter_client
+app.state.clients = clients
+app.state.draining = False
+# Demo mode never calls the upstreams, so there is nothing to probe
+app.state.prober = None if DEMO_MODE else UpstreamProber(clients, settings.READINESS_PROBE_INTERVAL)
 
-@app.get("/")
-async def read_root():
-    """Serve the main HTML page."""
-    return FileResponse(str(ROOT_DIR / "index.html"))
+metrics.set_gauge("startup.import_seconds", round(time.perf_counter() - _import_started, 4))
 
 if __name__ == "__main__":
-    import uvicorn
+    from server import main as serve
     print(f"\nStarting server in {'DEMO' if DEMO_MODE else 'PRODUCTION'} mode...")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    serve()
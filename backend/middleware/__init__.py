@@ -0,0 +1,19 @@
+from .inflight import InFlightMiddleware
+from .rate_limit import RateLimitMiddleware, MemoryBucketStore, SQLiteBucketStore, client_key, hash_api_key
+from .usage import UsageMiddleware, ledger_client
+from .deadline import DeadlineMiddleware
+from .upload_budget import ByteBudget, UploadBudgetMiddleware
+
+__all__ = [
+    'InFlightMiddleware',
+    'RateLimitMiddleware',
+    'MemoryBucketStore',
+    'SQLiteBucketStore',
+    'client_key',
+    'hash_api_key',
+    'UsageMiddleware',
+    'ledger_client',
+    'DeadlineMiddleware',
+    'ByteBudget',
+    'UploadBudgetMiddleware'
+]
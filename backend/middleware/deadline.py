@@ -0,0 +1,25 @@
+from services.deadline import start_deadline
+
+class DeadlineMiddleware:
+    """Pure ASGI middleware that starts each request's deadline as it arrives.
+
+    The deadline is ``default_seconds``, or less when the client says it
+    will give up sooner via an ``X-Request-Timeout`` header (in seconds).
+    """
+
+    def __init__(self, app, default_seconds: float):
+        self.app = app
+        self.default_seconds = default_seconds
+
+    def _seconds(self, scope) -> float:
+        header = dict(scope["headers"]).get(b"x-request-timeout")
+        try:
+            requested = float(header) if header else 0.0
+        except ValueError:
+            requested = 0.0
+        return min(requested, self.default_seconds) if requested > 0 else self.default_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            start_deadline(self._seconds(scope))
+        await self.app(scope, receive, send)
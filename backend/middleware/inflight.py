@@ -0,0 +1,21 @@
+from utils import metrics
+
+class InFlightMiddleware:
+    """Pure ASGI middleware that tracks how many HTTP requests are being served."""
+
+    def __init__(self, app):
+        self.app = app
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        self.in_flight += 1
+        metrics.set_gauge("http.in_flight", self.in_flight)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            metrics.set_gauge("http.in_flight", self.in_flight)
@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from starlette.responses import JSONResponse
+from starlette.websockets import WebSocketClose
+from services.scheduler import estimate_audio_seconds
+from utils import metrics
+
+def hash_api_key(api_key: str | bytes) -> str:
+    # Never store raw keys on disk
+    if isinstance(api_key, str):
+        api_key = api_key.encode("latin-1")
+    return hashlib.sha256(api_key).hexdigest()[:32]
+
+def client_key(scope, trust_forwarded_for: bool = True, api_keys: frozenset = frozenset()) -> str:
+    """Identify the caller: a hash of its X-API-Key, or its IP address without one.
+
+    Only keys whose hash is in ``api_keys`` (see ``hash_api_key``) count;
+    any other key is ignored, so made-up keys can't mint fresh buckets.
+    With ``trust_forwarded_for`` the IP is the last X-Forwarded-For entry,
+    the one appended by the proxy in front of the app; earlier entries come
+    from the client and can be forged.
+    """
+    headers = dict(scope["headers"])
+    api_key = headers.get(b"x-api-key")
+    if api_key and hash_api_key(api_key) in api_keys:
+        return "key:" + hash_api_key(api_key)
+    forwarded = headers.get(b"x-forwarded-for") if trust_forwarded_for else None
+    if forwarded and forwarded.split(b",")[-1].strip():
+        return "ip:" + forwarded.decode("latin-1").split(",")[-1].strip()
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+class MemoryBucketStore:
+    """Token buckets held in this process only (tests and single-worker runs)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def take(self, key: str, cost: float, capacity: float, rate: float, now: float) -> float:
+        """Take cost tokens if available; return 0 on success or the seconds to wait."""
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            return (cost - tokens) / rate
+
+class SQLiteBucketStore:
+    """Token buckets in a local SQLite file shared by every worker on the instance.
+
+    Each take is one short IMMEDIATE transaction, so concurrent workers
+    serialize on the file lock and never double-spend a bucket.
+    """
+
+    # Every this many takes, drop buckets idle long enough to be full again
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # SQLite connections must not cross fork(), and the app is preloaded in the master
+        if getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return self._local.conn
+
+    def take(self, key: str, cost: float, capacity: float, rate: float, now: float) -> float:
+        """Take cost tokens if available; return 0 on success or the seconds to wait."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+            wait = 0.0 if tokens >= cost else (cost - tokens) / rate
+            if not wait:
+                tokens -= cost
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                (key, tokens, now)
+            )
+            self._takes += 1
+            if self._takes % self.PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - capacity / rate,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+class RateLimitMiddleware:
+    """Token-bucket rate limiting per API key, or per client IP without one.
+
+    Buckets are measured in estimated audio seconds: every POST costs a flat
+    ``request_cost`` plus the audio duration estimated from Content-Length,
+    so one long upload weighs as much as many short ones. The chunks of a
+    resumable upload (PUT) cost their audio estimate only, so a file sent
+    in pieces weighs about what it would in one POST. Requests with one of
+    the configured ``api_keys`` in ``X-API-Key`` draw from that key's
+    bucket, which is ``key_multiplier`` times larger; unknown keys share
+    their IP's bucket. Rejections get a 429 with Retry-After.
+
+    A WebSocket costs ``request_cost`` to open and is refused (close code
+    1013) when that is not available. Its audio arrives after the
+    handshake, so the route pays for it as it goes: ``scope["state"]
+    ["rate_limit"]`` is an async ``charge(seconds)`` that takes from the
+    same bucket and returns 0 or the seconds until enough is available.
+    """
+
+    def __init__(
+        self,
+        app,
+        store,
+        capacity: float,
+        refill_per_second: float,
+        request_cost: float,
+        key_multiplier: float = 1.0,
+        trust_forwarded_for: bool = True,
+        api_keys=()
+    ):
+        self.app = app
+        self.store = store
+        self.api_keys = frozenset(hash_api_key(key) for key in api_keys)
+        self.capacity = capacity
+        self.rate = refill_per_second
+        self.request_cost = request_cost
+        self.key_multiplier = key_multiplier
+        self.trust_forwarded_for = trust_forwarded_for
+
+    def _client_key(self, scope) -> tuple:
+        key = client_key(scope, self.trust_forwarded_for, self.api_keys)
+        return key, self.key_multiplier if key.startswith("key:") else 1.0
+
+    def _cost(self, scope) -> float:
+        length = dict(scope["headers"]).get(b"content-length", b"0")
+        try:
+            num_bytes = int(length)
+        except ValueError:
+            num_bytes = 0
+        flat = self.request_cost if scope["method"] == "POST" else 0.0
+        return flat + estimate_audio_seconds(num_bytes, None)
+
+    async def _take(self, scope, cost: float) -> float:
+        key, multiplier = self._client_key(scope)
+        capacity, rate = self.capacity * multiplier, self.rate * multiplier
+        # A SQLite take can wait on another worker's transaction; keep it off the event loop
+        return await asyncio.to_thread(self.store.take, key, min(cost, capacity), capacity, rate, time.time())
+
+    async def _websocket(self, scope, receive, send):
+        async def charge(seconds: float) -> float:
+            wait = await self._take(scope, seconds)
+            metrics.incr("rate_limit.rejected" if wait else "rate_limit.allowed")
+            return wait
+
+        if await charge(self.request_cost):
+            await WebSocketClose(code=1013)(scope, receive, send)
+            return
+        scope.setdefault("state", {})["rate_limit"] = charge
+        await self.app(scope, receive, send)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "websocket":
+            await self._websocket(scope, receive, send)
+            return
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT"):
+            await self.app(scope, receive, send)
+            return
+
+        wait = await self._take(scope, self._cost(scope))
+        if not wait:
+            metrics.incr("rate_limit.allowed")
+            await self.app(scope, receive, send)
+            return
+
+        metrics.incr("rate_limit.rejected")
+        retry_after = max(1, math.ceil(wait))
+        response = JSONResponse(
+            {"detail": f"Rate limit exceeded. Try again in {retry_after} seconds."},
+            status_code=429,
+            headers={"Retry-After": str(retry_after)}
+        )
+        await response(scope, receive, send)
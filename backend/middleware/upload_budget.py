@@ -0,0 +1,169 @@
+import asyncio
+import math
+from collections import deque
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from services.deadline import current_deadline
+from utils import metrics
+
+class ByteBudget:
+    """Process-wide budget of bytes that request bodies may hold at once.
+
+    Reservations are granted strictly in arrival order, so a large upload
+    waiting for room is never starved by a stream of small ones.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.reserved = 0
+        self._waiters = deque()
+        metrics.set_gauge("upload_budget.capacity_bytes", capacity)
+        self._update_gauges()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _update_gauges(self) -> None:
+        metrics.set_gauge("upload_budget.reserved_bytes", self.reserved)
+        metrics.set_gauge("upload_budget.waiting", len(self._waiters))
+
+    def _grant(self) -> None:
+        while self._waiters and self.reserved + self._waiters[0][0] <= self.capacity:
+            num_bytes, future = self._waiters.popleft()
+            self.reserved += num_bytes
+            future.set_result(None)
+        self._update_gauges()
+
+    async def reserve(self, num_bytes: int, timeout: float | None) -> bool:
+        """Reserve num_bytes, waiting up to timeout seconds; False if no room in time."""
+        if not self._waiters and self.reserved + num_bytes <= self.capacity:
+            self.reserved += num_bytes
+            self._update_gauges()
+            return True
+
+        entry = (num_bytes, asyncio.get_running_loop().create_future())
+        self._waiters.append(entry)
+        self._update_gauges()
+        try:
+            await asyncio.wait({entry[1]}, timeout=timeout)
+        except asyncio.CancelledError:
+            self._abandon(entry)
+            raise
+        if entry[1].done():
+            return True
+        self._abandon(entry)
+        return False
+
+    def _abandon(self, entry: tuple) -> None:
+        num_bytes, future = entry
+        if future.done():
+            # Granted just as we gave up
+            self.release(num_bytes)
+            return
+        future.cancel()
+        self._waiters.remove(entry)
+        # The head of the queue may have been the only thing blocking smaller requests
+        self._grant()
+
+    def release(self, num_bytes: int) -> None:
+        self.reserved -= num_bytes
+        self._grant()
+
+    def stats(self) -> dict:
+        return {
+            "capacity_bytes": self.capacity,
+            "reserved_bytes": self.reserved,
+            "waiting": len(self._waiters)
+        }
+
+class UploadBudgetMiddleware:
+    """Pure ASGI middleware that reserves a request's body size before it is read.
+
+    The reservation is the ``Content-Length`` (or ``max_body_bytes`` for a
+    chunked body) and is held until the response is finished, covering the
+    multipart parse, the buffered upload and the audio copy made for
+    Whisper. When the budget is exhausted a request waits up to
+    ``wait_seconds`` (bounded by its deadline) and otherwise gets a 503.
+    Bodies over ``max_body_bytes`` are refused with a 413 before any of it
+    is read. The bytes that actually arrive are counted too, so a chunked
+    body (or one longer than its Content-Length) gets a 413 as soon as it
+    outgrows its reservation.
+    """
+
+    def __init__(self, app, budget: ByteBudget, max_body_bytes: int, wait_seconds: float = 10.0):
+        self.app = app
+        self.budget = budget
+        self.max_body_bytes = max_body_bytes
+        self.wait_seconds = wait_seconds
+
+    def _body_size(self, scope) -> int:
+        length = dict(scope["headers"]).get(b"content-length")
+        try:
+            return int(length) if length is not None else self.max_body_bytes
+        except ValueError:
+            return self.max_body_bytes
+
+    def _too_large_detail(self) -> str:
+        return f"File size must be under {self.max_body_bytes // (1024 * 1024)}MB"
+
+    def _counting(self, receive, limit: int):
+        """Wrap receive to refuse the body once more than limit bytes of it have arrived."""
+        received = 0
+
+        async def counted():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    metrics.incr("upload_budget.too_large")
+                    # Raised into whatever is reading the body; the app answers it like any 413
+                    raise HTTPException(status_code=413, detail=self._too_large_detail())
+            return message
+
+        return counted
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            await self.app(scope, receive, send)
+            return
+
+        num_bytes = self._body_size(scope)
+        if num_bytes > self.max_body_bytes:
+            metrics.incr("upload_budget.too_large")
+            response = JSONResponse({"detail": self._too_large_detail()}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        deadline = current_deadline()
+        timeout = min(self.wait_seconds, deadline.remaining()) if deadline else self.wait_seconds
+        if not await self.budget.reserve(num_bytes, timeout):
+            metrics.incr("upload_budget.rejected")
+            retry_after = max(1, math.ceil(self.wait_seconds))
+            response = JSONResponse(
+                {"detail": f"Server is busy with other uploads. Try again in {retry_after} seconds."},
+                status_code=503,
+                headers={"Retry-After": str(retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        metrics.incr("upload_budget.admitted")
+        started = False
+
+        async def tracked_send(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, self._counting(receive, num_bytes), tracked_send)
+        except HTTPException as e:
+            # Only an app with no handler for it lets the 413 get this far
+            if e.status_code != 413 or started:
+                raise
+            await JSONResponse({"detail": e.detail}, status_code=413)(scope, receive, send)
+        finally:
+            self.budget.release(num_bytes)
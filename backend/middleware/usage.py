@@ -0,0 +1,50 @@
+import hashlib
+import time
+from services.usage import UsageLedger, begin_record, end_record
+from .rate_limit import client_key, hash_api_key
+
+def ledger_client(scope, trust_forwarded_for: bool = True, api_keys: frozenset = frozenset()) -> str:
+    """The caller as recorded in the ledger: its API key hash, or a hash of its IP.
+
+    ``api_keys`` holds the ``hash_api_key`` hashes of the configured keys.
+    """
+    key = client_key(scope, trust_forwarded_for, api_keys)
+    if key.startswith("ip:"):
+        return "ip:" + hashlib.sha256(key.encode()).hexdigest()[:16]
+    return key[:20]
+
+class UsageMiddleware:
+    """Pure ASGI middleware that opens a usage record for every POST and ledgers it when done.
+
+    The record lives in a context variable for the duration of the request,
+    so routes and services fill it in as they go. Client IPs are hashed
+    before they reach the ledger.
+    """
+
+    def __init__(self, app, ledger: UsageLedger, trust_forwarded_for: bool = True, api_keys=()):
+        self.app = app
+        self.ledger = ledger
+        self.trust_forwarded_for = trust_forwarded_for
+        self.api_keys = frozenset(hash_api_key(key) for key in api_keys)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        record = begin_record(path=scope["path"], client=ledger_client(scope, self.trust_forwarded_for, self.api_keys), status=None)
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                record["status"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            record["total_seconds"] = round(time.perf_counter() - started, 4)
+            if record["status"] is None:
+                record["status"] = 500
+            end_record()
+            self.ledger.append(record)
@@ -1,12 +1,27 @@
+from .source import SourceSpan
 from .task import Task, ProcessedOutput
 from .roadmap import RoadmapSection, StrategicRoadmap
 from .process import ProcessDocument, ProcessStep
+from .combined import CombinedOutput
+from .transcript import TranscriptResponse, StructureRequest, DegradedResponse
+from .upgrade import ResultChange, ResultDiff, UpgradeStatus
+from .upload import UploadCreate, UploadStatus
 
 __all__ = [
+    'SourceSpan',
     'Task', 
     'ProcessedOutput', 
     'RoadmapSection', 
     'StrategicRoadmap',
     'ProcessDocument',
-    'ProcessStep'
+    'ProcessStep',
+    'CombinedOutput',
+    'TranscriptResponse',
+    'StructureRequest',
+    'DegradedResponse',
+    'ResultChange',
+    'ResultDiff',
+    'UpgradeStatus',
+    'UploadCreate',
+    'UploadStatus'
 ]
@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from .task import ProcessedOutput
+from .roadmap import StrategicRoadmap
+from .process import ProcessDocument
+
+class CombinedOutput(BaseModel):
+    """All three output formats generated from a single completion."""
+    tasks: ProcessedOutput
+    roadmap: StrategicRoadmap
+    process: ProcessDocument
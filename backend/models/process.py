@@ -1,17 +1,23 @@
 from typing import List, Dict
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from .source import SourceSpan, SOURCE_SPANS_DESCRIPTION
 
 class ProcessStep(BaseModel):
     """A single step in a process document."""
     number: int
-    action: str
-    details: str
-    outcome: str
+    action: str = Field(description="Clear action to take")
+    details: str = Field(description="Specific details about how to perform the action")
+    outcome: str = Field(description="What should happen after this step")
+    source_spans: List[SourceSpan] | None = Field(
+        default=None,
+        description=SOURCE_SPANS_DESCRIPTION,
+        json_schema_extra={"readOnly": True}
+    )
 
 class ProcessDocument(BaseModel):
     """A structured process documentation."""
-    title: str
-    overview: str
-    prerequisites: List[str]
+    title: str = Field(description="Clear process name")
+    overview: str = Field(description="Brief description of what this process accomplishes")
+    prerequisites: List[str] = Field(description="Required tools, resources, or conditions")
     steps: List[ProcessStep]
-    notes: List[str]
+    notes: List[str] = Field(description="Important considerations, warnings, edge cases or variations")
@@ -1,11 +1,11 @@
 from typing import List
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class RoadmapSection(BaseModel):
-    title: str
-    priority: str
-    timeline: str
-    content: List[str]
+    title: str = Field(description="Clear section title")
+    priority: str = Field(description="High, Medium or Low")
+    timeline: str = Field(description="Specific timeframe, deadline or measurement period")
+    content: List[str] = Field(description="Detailed, specific points for this section")
 
 class StrategicRoadmap(BaseModel):
     market_analysis: List[RoadmapSection]
@@ -13,4 +13,4 @@ class StrategicRoadmap(BaseModel):
     dependencies: List[RoadmapSection]
     milestones: List[RoadmapSection]
     success_metrics: List[RoadmapSection]
-    summary: str
+    summary: str = Field(description="High-level overview of the strategic roadmap")
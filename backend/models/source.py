@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+
+class SourceSpan(BaseModel):
+    """A stretch of the recording that an extracted item came from."""
+    start: float = Field(description="Seconds from the start of the recording")
+    end: float = Field(description="Seconds from the start of the recording")
+    url: str | None = Field(default=None, description="Playback URL with a #t=start,end media fragment")
+
+# Filled in by the server after generation; readOnly keeps it out of the generation schema
+SOURCE_SPANS_DESCRIPTION = "Where in the recording this was said, best match first"
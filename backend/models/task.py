@@ -1,12 +1,21 @@
 from typing import List
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from .source import SourceSpan, SOURCE_SPANS_DESCRIPTION
 
 class Task(BaseModel):
-    title: str
-    priority: str
-    description: str | None = None
+    title: str = Field(description="Clear, actionable task description")
+    priority: str = Field(description="High, Medium or Low")
+    description: str | None = Field(
+        default=None,
+        description="Additional context, dependencies, or notes specific to this task"
+    )
+    source_spans: List[SourceSpan] | None = Field(
+        default=None,
+        description=SOURCE_SPANS_DESCRIPTION,
+        json_schema_extra={"readOnly": True}
+    )
 
 class ProcessedOutput(BaseModel):
     tasks: List[Task]
-    next_steps: List[str]
-    notes: List[str]
+    next_steps: List[str] = Field(description="Immediate, concrete and specific actions to take")
+    notes: List[str] = Field(description="Context, strategic considerations, risks and resource constraints")
@@ -0,0 +1,32 @@
+from pydantic import BaseModel, model_validator
+
+class TranscriptResponse(BaseModel):
+    """A transcript plus a short-lived handle for re-structuring it."""
+    transcript: str
+    duration_seconds: float | None = None
+    handle: str
+    expires_in: int
+    audio_url: str | None = None
+
+class StructureRequest(BaseModel):
+    """Structuring input: raw transcript text or a handle from /transcribe."""
+    transcript: str | None = None
+    handle: str | None = None
+
+    @model_validator(mode="after")
+    def check_exactly_one_source(self) -> "StructureRequest":
+        if (self.transcript is None) == (self.handle is None):
+            raise ValueError("Provide exactly one of 'transcript' or 'handle'")
+        if self.transcript is not None and not self.transcript.strip():
+            raise ValueError("Transcript must not be empty")
+        return self
+
+class DegradedResponse(BaseModel):
+    """Returned instead of a full result while an upstream's circuit is open."""
+    degraded: bool = True
+    detail: str
+    reason: str
+    retry_after: int
+    transcript: str | None = None
+    handle: str | None = None
+    expires_in: int | None = None
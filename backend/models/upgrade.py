@@ -0,0 +1,25 @@
+from typing import Any, List
+from pydantic import BaseModel, Field
+
+class ResultChange(BaseModel):
+    """One difference between a draft and its upgrade, at a dotted path such as ``tasks.2.priority``."""
+    op: str = Field(description="added, removed or changed")
+    path: str
+    before: Any = None
+    after: Any = None
+
+class ResultDiff(BaseModel):
+    """What the upgrade changed, and the share of the draft that came through unchanged."""
+    changes: List[ResultChange]
+    similarity: float
+
+class UpgradeStatus(BaseModel):
+    """A progressive request's high-quality upgrade, from /upgrades/{id} or its event stream."""
+    id: str
+    status: str = Field(description="pending, ready or failed")
+    format: str
+    draft_model: str
+    model: str
+    result: dict | None = None
+    diff: ResultDiff | None = None
+    detail: str | None = None
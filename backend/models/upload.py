@@ -0,0 +1,21 @@
+from typing import List
+from pydantic import BaseModel, Field
+
+class UploadCreate(BaseModel):
+    """Start a resumable upload of ``size`` bytes."""
+    filename: str = ""
+    content_type: str
+    size: int = Field(gt=0)
+
+class UploadStatus(BaseModel):
+    """Where a resumable upload stands: what has arrived and what is still missing."""
+    id: str
+    size: int
+    chunk_size: int
+    chunks: int
+    received_bytes: int
+    ranges: List[List[int]] = Field(description="Received byte ranges as [start, end) pairs")
+    missing: List[int] = Field(description="Indexes of the chunks still to PUT")
+    complete: bool
+    audio: dict | None = Field(default=None, description="Header facts, once enough leading bytes arrived to probe")
+    expires_in: int
@@ -1,9 +1,15 @@
 from .task_prompt import TASK_SYSTEM_PROMPT
 from .roadmap_prompt import ROADMAP_SYSTEM_PROMPT
 from .process_prompt import PROCESS_SYSTEM_PROMPT
+from .combined_prompt import COMBINED_SYSTEM_PROMPT
+from .repair_prompt import REPAIR_SYSTEM_PROMPT
+from .batch_prompt import BATCH_SYSTEM_PROMPT_SUFFIX
 
 __all__ = [
     'TASK_SYSTEM_PROMPT', 
     'ROADMAP_SYSTEM_PROMPT',
-    'PROCESS_SYSTEM_PROMPT'
+    'PROCESS_SYSTEM_PROMPT',
+    'COMBINED_SYSTEM_PROMPT',
+    'REPAIR_SYSTEM_PROMPT',
+    'BATCH_SYSTEM_PROMPT_SUFFIX'
 ]
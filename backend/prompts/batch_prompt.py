@@ -0,0 +1,3 @@
+BATCH_SYSTEM_PROMPT_SUFFIX = """You will receive several separate voice memo transcripts at once, each wrapped in <memo id="N"> tags. The memos are unrelated to each other.
+
+Structure every memo on its own, exactly as you would if it were the only one: never move, merge or repeat content between memos. Return exactly one result per memo by calling the provided function, with each result's memo set to that memo's id."""
@@ -20,27 +20,7 @@ When analyzing the transcript, focus on:
    - Note exceptions or special cases
    - Preserve critical warnings
 
-Format the output as a JSON object with this exact structure:
-{
-    "title": "Clear process name",
-    "overview": "Brief description of what this process accomplishes",
-    "prerequisites": [
-        "Required tool, resource, or condition",
-        "Additional prerequisites"
-    ],
-    "steps": [
-        {
-            "number": 1,
-            "action": "Clear action to take",
-            "details": "Specific details about how to perform the action",
-            "outcome": "What should happen after this step"
-        }
-    ],
-    "notes": [
-        "Important consideration or warning",
-        "Additional notes about edge cases or variations"
-    ]
-}
+Return the result by calling the provided function. Its JSON Schema defines the exact structure and field meanings; do not reply with free text.
 
 Ensure:
 - Each step is clear and actionable
@@ -0,0 +1,5 @@
+REPAIR_SYSTEM_PROMPT = """You are repairing one field of a structured document that was generated from a voice memo transcript. The rest of the document is already valid and will be kept as is.
+
+You will receive the transcript, the name of the failing field, the invalid value that was produced for it, and the validation errors.
+
+Return only a corrected value for that field by calling the provided function. Keep whatever content from the invalid value is correct, fix the structure and types so they satisfy the schema, and use the transcript to fill in anything that is missing. Do not invent content that is not supported by the transcript."""
@@ -37,65 +37,7 @@ When analyzing the transcript, focus on these key areas:
    - Impact assessment criteria
    - Monitoring and evaluation methods
 
-Format the output as a JSON object with this exact structure:
-{
-    "market_analysis": [
-        {
-            "title": "Clear section title",
-            "priority": "High/Medium/Low",
-            "timeline": "Specific timeframe or deadline",
-            "content": [
-                "Detailed point about market analysis",
-                "Additional market insights"
-            ]
-        }
-    ],
-    "resource_requirements": [
-        {
-            "title": "Resource category",
-            "priority": "High/Medium/Low",
-            "timeline": "When resources are needed",
-            "content": [
-                "Specific resource requirement",
-                "Additional details"
-            ]
-        }
-    ],
-    "dependencies": [
-        {
-            "title": "Dependency category",
-            "priority": "High/Medium/Low",
-            "timeline": "Timing of dependency",
-            "content": [
-                "Specific dependency",
-                "Related considerations"
-            ]
-        }
-    ],
-    "milestones": [
-        {
-            "title": "Milestone name",
-            "priority": "High/Medium/Low",
-            "timeline": "Target completion date",
-            "content": [
-                "Milestone details",
-                "Success criteria"
-            ]
-        }
-    ],
-    "success_metrics": [
-        {
-            "title": "Metric category",
-            "priority": "High/Medium/Low",
-            "timeline": "Measurement period",
-            "content": [
-                "Specific metric",
-                "Measurement method"
-            ]
-        }
-    ],
-    "summary": "High-level overview of the strategic roadmap"
-}
+Return the result by calling the provided function. Its JSON Schema defines the exact structure and field meanings; do not reply with free text.
 
 Ensure each section:
 - Is actionable and specific
@@ -20,26 +20,7 @@ When analyzing the transcript, consider:
    - Note any assumptions or constraints mentioned
    - Preserve relationships between different topics
 
-Format the output as a JSON object with this exact structure:
-{
-    "tasks": [
-        {
-            "title": "Clear, actionable task description",
-            "priority": "High/Medium/Low",
-            "description": "Additional context, dependencies, or notes specific to this task"
-        }
-    ],
-    "next_steps": [
-        "Immediate, concrete actions to take",
-        "Each step should be specific and actionable"
-    ],
-    "notes": [
-        "Important context or background information",
-        "Strategic considerations",
-        "Potential risks or dependencies",
-        "Resource requirements or constraints"
-    ]
-}
+Return the result by calling the provided function. Its JSON Schema defines the exact structure and field meanings; do not reply with free text.
 
 Ensure each task is:
 - Actionable and clear
@@ -1,4 +1,11 @@
 from .audio import router as audio_router
 from .health import router as health_router
+from .static import router as static_router
+from .stats import router as stats_router
+from .admin import router as admin_router
+from .playback import router as playback_router
+from .upgrades import router as upgrades_router
+from .live import router as live_router
+from .uploads import router as uploads_router
 
-__all__ = ['audio_router', 'health_router']
+__all__ = ['audio_router', 'health_router', 'static_router', 'stats_router', 'admin_router', 'playback_router', 'upgrades_router', 'live_router', 'uploads_router']
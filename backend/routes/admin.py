@@ -0,0 +1,54 @@
+import asyncio
+import secrets
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from config import settings
+from services.profiler import ProfilerBusy, sample_stacks, format_collapsed, task_snapshot
+from utils import ModelJSONResponse
+
+router = APIRouter(prefix="/admin")
+
+# Keep a profile from tying up a worker thread (and a reviewer) for long
+MAX_PROFILE_SECONDS = 60.0
+MIN_INTERVAL_MS = 1.0
+
+def require_admin(x_admin_token: str | None = Header(None)) -> None:
+    """Allow the request only with the configured ADMIN_TOKEN; without one the routes don't exist."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@router.get("/profile", dependencies=[Depends(require_admin)])
+async def profile(
+    seconds: float = Query(10.0, gt=0, le=MAX_PROFILE_SECONDS),
+    interval_ms: float = Query(10.0, ge=MIN_INTERVAL_MS, le=1000),
+    format: str = Query("collapsed", pattern="^(collapsed|json)$"),
+    tasks: bool = Query(False, description="Include an asyncio task snapshot (json format only)")
+):
+    """Sample this worker's threads for a few seconds and return the collapsed stacks.
+
+    The default text output feeds straight into flamegraph.pl or speedscope.
+    The sampler runs on its own thread; the event loop keeps serving meanwhile.
+    """
+    try:
+        result = await asyncio.to_thread(sample_stacks, seconds, interval_ms / 1000)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if format == "collapsed":
+        return PlainTextResponse(format_collapsed(result["stacks"]))
+    body = {
+        "samples": result["samples"],
+        "seconds": result["seconds"],
+        "interval_ms": interval_ms,
+        "stacks": dict(result["stacks"].most_common())
+    }
+    if tasks:
+        body["tasks"] = task_snapshot()
+    return ModelJSONResponse(body)
+
+@router.get("/tasks", dependencies=[Depends(require_admin)])
+async def tasks():
+    """Snapshot the pending asyncio tasks, grouped by route, with where each one is awaiting."""
+    return ModelJSONResponse(task_snapshot())
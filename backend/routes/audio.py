@@ -1,13 +1,73 @@
+import asyncio
+import contextvars
+import json
+import math
 import os
+import tempfile
+import time
+from pathlib import Path
 from fastapi import APIRouter, File, UploadFile, HTTPException, Request
-from openai import OpenAI
-from models import ProcessedOutput, StrategicRoadmap, ProcessDocument
+from fastapi.responses import Response
+from pydantic import BaseModel
+from models import (
+    ProcessedOutput,
+    StrategicRoadmap,
+    ProcessDocument,
+    CombinedOutput,
+    TranscriptResponse,
+    StructureRequest,
+    DegradedResponse
+)
 from services import (
-    process_transcript_to_tasks,
-    process_transcript_to_roadmap,
-    process_transcript_to_process_doc
+    FORMAT_SPECS,
+    structure_transcript,
+    transcript_store,
+    transcription_scheduler,
+    structuring_scheduler,
+    estimate_audio_seconds,
+    estimate_structuring_seconds,
+    note,
+    stage,
+    CircuitBreaker,
+    CircuitOpenError,
+    upstream_error,
+    whisper_breaker,
+    openrouter_breaker,
+    ResultCache,
+    result_cache,
+    note_cache_hit,
+    DeadlineExceeded,
+    current_deadline,
+    archive,
+    audio_url,
+    parse_timestamps,
+    attach_source_spans,
+    fingerprint_index,
+    structuring_batcher,
+    upgrade_store,
+    usage_ledger,
+    start_deadline
+)
+from services.deadline import upstream_timeout
+from services.generation import DEFAULT_MODEL
+from services.upgrades import Upgrade
+from services.usage import begin_record, current_record
+
+from config import settings
+from utils import (
+    AudioInfo,
+    AudioProbeError,
+    probe_audio,
+    matches_content_type,
+    ModelJSONResponse,
+    dump_json,
+    metrics,
+    get_demo_json,
+    get_demo_transcript,
+    FingerprintUnavailable,
+    fingerprint_available,
+    fingerprint_file
 )
-from utils import get_demo_tasks, get_demo_roadmap, get_demo_process_doc
 
 router = APIRouter()
 
@@ -15,201 +75,608 @@ ALLOWED_MIME_TYPES = [
     'audio/mp3',
     'audio/mpeg',
     'audio/wav',
+    'audio/x-wav',  # WAV as labeled by Firefox and Safari
+    'audio/wave',
     'audio/x-m4a',  # Added for iOS M4A support
     'audio/m4a'     # Alternative M4A MIME type
 ]
 
-@router.post("/process-audio", response_model=ProcessedOutput)
-async def process_audio_to_tasks(
-    request: Request,
-    file: UploadFile = File(...)
-):
-    """Process an audio file into tasks and return structured information."""
-    # Enhanced MIME type validation
-    if file.content_type not in ALLOWED_MIME_TYPES:
+def _check_content_type(content_type: str | None) -> None:
+    if content_type not in ALLOWED_MIME_TYPES:
         raise HTTPException(
             status_code=400,
-            detail=f"Unsupported file type. Please upload MP3, M4A, or WAV files. Received: {file.content_type}"
+            detail=f"Unsupported file type. Please upload MP3, M4A, or WAV files. Received: {content_type}"
         )
-    
-    # Check file size (25MB limit)
-    file_size = 0
-    content = await file.read()
-    file_size = len(content)
-    if file_size > 25 * 1024 * 1024:  # 25MB in bytes
+
+def _check_audio(info: AudioInfo, content_type: str) -> None:
+    """Reject audio whose header disagrees with its declared type or that runs too long."""
+    if not matches_content_type(info, content_type):
         raise HTTPException(
             status_code=400,
-            detail="File size must be under 25MB"
+            detail=f"File content is {info.container.upper()} audio but was uploaded as {content_type}"
         )
-    
-    if request.app.state.demo_mode:
-        return get_demo_tasks()
-    
-    # Save uploaded file temporarily
-    temp_path = f"temp_{file.filename}"
-    try:
-        with open(temp_path, "wb") as buffer:
-            buffer.write(content)
-        
-        # Step 1: Transcribe audio using OpenAI's Whisper
-        try:
-            with open(temp_path, "rb") as audio_file:
-                transcript = request.app.state.openai_client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file
-                )
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Error transcribing audio: {str(e)}"
-            )
-            
-        # Step 2: Process transcript into tasks
-        try:
-            structured_data = await process_transcript_to_tasks(transcript.text, request.app.state.openrouter_client)
-            return ProcessedOutput(**structured_data)
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Error processing transcript: {str(e)}"
-            )
-        
-    except Exception as e:
+    if settings.MAX_AUDIO_SECONDS and (info.duration_seconds or 0) > settings.MAX_AUDIO_SECONDS:
         raise HTTPException(
-            status_code=500,
-            detail=str(e)
+            status_code=400,
+            detail=f"Audio must be shorter than {settings.MAX_AUDIO_SECONDS // 60} minutes"
         )
-    finally:
-        # Cleanup temporary file
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
 
-@router.post("/process-audio/roadmap", response_model=StrategicRoadmap)
-async def process_audio_to_roadmap(
-    request: Request,
-    file: UploadFile = File(...)
-):
-    """Process an audio file into a strategic roadmap."""
+def _note_original_size(request: Request) -> None:
+    """Ledger the size of the file the user picked, when the browser compressed it before sending."""
+    original = request.headers.get("x-original-size", "")
+    if original.isdigit():
+        note(original_bytes=int(original))
+
+async def _read_upload(request: Request, file: UploadFile) -> bytes:
+    """Validate the upload's type, header, duration and size and return its content.
+
+    The probed AudioInfo is stored on ``request.state.audio_info`` for the
+    rest of the pipeline.
+    """
     # Enhanced MIME type validation
-    if file.content_type not in ALLOWED_MIME_TYPES:
+    _check_content_type(file.content_type)
+
+    # Read only the headers to catch mislabeled or corrupt files before buffering them
+    try:
+        info = probe_audio(file.file)
+    except AudioProbeError as e:
         raise HTTPException(
             status_code=400,
-            detail=f"Unsupported file type. Please upload MP3, M4A, or WAV files. Received: {file.content_type}"
+            detail=f"Could not read audio file: {str(e)}"
         )
-    
-    # Check file size (25MB limit)
-    file_size = 0
+    _check_audio(info, file.content_type)
+    request.state.audio_info = info
+
+    # Check file size (25MB limit by default)
     content = await file.read()
-    file_size = len(content)
-    if file_size > 25 * 1024 * 1024:  # 25MB in bytes
+    note(audio_bytes=len(content), audio_seconds=info.duration_seconds)
+    _note_original_size(request)
+    if len(content) > settings.MAX_UPLOAD_MB * 1024 * 1024:
         raise HTTPException(
             status_code=400,
-            detail="File size must be under 25MB"
+            detail=f"File size must be under {settings.MAX_UPLOAD_MB}MB"
         )
-    
-    if request.app.state.demo_mode:
-        return get_demo_roadmap()
-    
-    # Save uploaded file temporarily
-    temp_path = f"temp_{file.filename}"
+    return content
+
+def _whisper_options() -> dict:
+    """Response format options for the configured WHISPER_TIMESTAMPS detail."""
+    if not settings.WHISPER_TIMESTAMPS:
+        return {}
+    options = {"response_format": "verbose_json"}
+    if settings.WHISPER_TIMESTAMPS == "word":
+        # Segment timings are the default; this SDK version has no parameter for granularities
+        options["extra_body"] = {"timestamp_granularities": ["word"]}
+    return options
+
+def _archive_upload(request: Request, content: bytes, digest: str | None = None) -> None:
+    """Keep the upload in the audio archive for playback; failures only cost the playback link."""
+    request.state.audio_id = request.state.audio_path = None
+    if not settings.ARCHIVE_ENABLED:
+        return
     try:
-        with open(temp_path, "wb") as buffer:
-            buffer.write(content)
-        
-        # Step 1: Transcribe audio using OpenAI's Whisper
-        try:
-            with open(temp_path, "rb") as audio_file:
-                transcript = request.app.state.openai_client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file
-                )
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Error transcribing audio: {str(e)}"
+        request.state.audio_id, request.state.audio_path = archive.put(
+            content, request.state.audio_info.container, digest
+        )
+    except OSError as e:
+        print(f"Could not archive upload: {str(e)}")
+        metrics.incr("archive.errors")
+
+def _archive_transcript(request: Request, transcript: str) -> None:
+    """Keep the transcript and fingerprint beside the recording for playback links and later reuse."""
+    if not request.state.audio_id:
+        return
+    try:
+        archive.put_transcript(request.state.audio_id, {"text": transcript, **(request.state.timestamps or {})})
+        if request.state.fingerprint is not None:
+            archive.put_fingerprint(request.state.audio_id, request.state.fingerprint)
+            fingerprint_index.add(request.state.audio_id, request.state.fingerprint)
+    except OSError as e:
+        print(f"Could not archive transcript: {str(e)}")
+        metrics.incr("archive.errors")
+
+def _reuse_transcript(request: Request) -> str | None:
+    """Return the stored transcript of an archived recording that sounds the same, if any.
+
+    The upload's fingerprint is left on ``request.state.fingerprint`` so a
+    fresh transcript can be indexed under it.
+    """
+    request.state.fingerprint = None
+    if not (settings.FINGERPRINT_ENABLED and request.state.audio_path and fingerprint_available()):
+        return None
+    try:
+        with stage("fingerprint"):
+            fingerprint = fingerprint_file(
+                request.state.audio_path,
+                request.state.audio_info.container,
+                request.state.audio_info.duration_seconds
             )
-            
-        # Step 2: Process transcript into roadmap
-        try:
-            structured_data = await process_transcript_to_roadmap(transcript.text, request.app.state.openrouter_client)
-            return StrategicRoadmap(**structured_data)
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Error processing transcript: {str(e)}"
+    except FingerprintUnavailable as e:
+        metrics.incr("fingerprints.skipped")
+        print(f"Not fingerprinting upload: {str(e)}")
+        return None
+    request.state.fingerprint = fingerprint
+
+    match = fingerprint_index.match(fingerprint)
+    stored = archive.get_transcript(match[0]) if match else None
+    if stored is None or "text" not in stored:
+        metrics.incr("fingerprints.misses")
+        return None
+    matched_id, confidence = match
+    metrics.incr("fingerprints.matches")
+    note_cache_hit("fingerprint")
+    note(fingerprint_confidence=confidence)
+    print(f"Reusing the transcript of {matched_id[:12]} (fingerprint confidence {confidence:.2f})")
+    # The timings belong to the matched recording, which starts at the same point
+    request.state.timestamps = {key: value for key, value in stored.items() if key != "text"} or None
+    if matched_id != request.state.audio_id:
+        _archive_transcript(request, stored["text"])
+    return stored["text"]
+
+def _transcribe(request: Request, content: bytes | None, filename: str) -> str:
+    """Transcribe audio bytes with OpenAI's Whisper and return the text.
+
+    Segment/word timings from the response are left on ``request.state.timestamps``.
+    """
+    # Whisper infers the format from the extension; the archived copy is named for its container
+    temp_path = None
+    path = request.state.audio_path
+    try:
+        if path is None:
+            fd, temp_path = tempfile.mkstemp(prefix="temp_", suffix=Path(filename or "").suffix)
+            with os.fdopen(fd, "wb") as buffer:
+                buffer.write(content)
+            path = temp_path
+
+        started = time.perf_counter()
+        with open(path, "rb") as audio_file:
+            transcript = request.app.state.clients.openai.audio.transcriptions.create(
+                model="whisper-1",
+                file=audio_file,
+                **_whisper_options(),
+                **upstream_timeout("transcription")
             )
-        
+        note(whisper_seconds=round(time.perf_counter() - started, 4))
+        request.state.timestamps = parse_timestamps(transcript)
+        return transcript.text
+    except DeadlineExceeded:
+        raise
     except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=str(e)
-        )
+        raise upstream_error(e, f"Error transcribing audio: {str(e)}")
     finally:
         # Cleanup temporary file
-        if os.path.exists(temp_path):
+        if temp_path and os.path.exists(temp_path):
             os.remove(temp_path)
 
-@router.post("/process-audio/process", response_model=ProcessDocument)
-async def process_audio_to_process_doc(
+def _check_circuit(breaker: CircuitBreaker) -> None:
+    """Fail fast, before queuing, when the upstream's circuit is open."""
+    if breaker.rejects():
+        metrics.incr(f"breaker.{breaker.name}.rejected")
+        raise CircuitOpenError(breaker.name, breaker.retry_after())
+
+async def _schedule_transcription(request: Request, content: bytes, file: UploadFile, digest: str | None = None) -> str:
+    """Archive the upload, reuse the transcript of a matching recording, or queue a Whisper call, shortest audio first."""
+    await asyncio.to_thread(_archive_upload, request, content, digest)
+    return await _transcribe_stored(request, len(content), file.content_type, file.filename, content)
+
+async def _transcribe_stored(
     request: Request,
-    file: UploadFile = File(...)
-):
-    """Process an audio file into a process document."""
-    # Enhanced MIME type validation
-    if file.content_type not in ALLOWED_MIME_TYPES:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Unsupported file type. Please upload MP3, M4A, or WAV files. Received: {file.content_type}"
+    size: int,
+    content_type: str,
+    filename: str | None,
+    content: bytes | None = None
+) -> str:
+    """Transcribe audio that is already on ``request.state.audio_path`` (or in ``content``)."""
+    info: AudioInfo = request.state.audio_info
+    # A re-exported memo needs no Whisper call, even while Whisper's circuit is open
+    transcript = await asyncio.to_thread(_reuse_transcript, request)
+    if transcript is not None:
+        return transcript
+
+    _check_circuit(whisper_breaker)
+    with stage("transcription"):
+        seconds = info.duration_seconds or estimate_audio_seconds(size, content_type)
+        transcript = await transcription_scheduler.run(
+            seconds, whisper_breaker.call, _transcribe, request, content, filename, work_seconds=seconds
         )
-    
-    # Check file size (25MB limit)
-    file_size = 0
-    content = await file.read()
-    file_size = len(content)
-    if file_size > 25 * 1024 * 1024:  # 25MB in bytes
-        raise HTTPException(
-            status_code=400,
-            detail="File size must be under 25MB"
+    await asyncio.to_thread(_archive_transcript, request, transcript)
+    return transcript
+
+async def _schedule_structuring(client, transcript: str, output_format: str, model: str = DEFAULT_MODEL) -> BaseModel:
+    """Queue a structuring call, shortest estimated transcript first."""
+    _check_circuit(openrouter_breaker)
+    with stage("structuring"):
+        if structuring_batcher.accepts(transcript, output_format):
+            # The batcher queues each shared completion for one slot itself
+            return await openrouter_breaker.call(structure_transcript, transcript, client, output_format, model)
+        return await structuring_scheduler.run(
+            estimate_structuring_seconds(transcript),
+            openrouter_breaker.call,
+            structure_transcript, transcript, client, output_format, model, batch=False
         )
-    
-    if request.app.state.demo_mode:
-        return get_demo_process_doc()
-    
-    # Save uploaded file temporarily
-    temp_path = f"temp_{file.filename}"
+
+UPSTREAM_NAMES = {"whisper": "Transcription", "openrouter": "AI analysis"}
+
+def _degraded(cache_key: str | None, error: CircuitOpenError, transcript: str | None = None) -> ModelJSONResponse:
+    """Answer without the failed upstream: a cached result, the transcript alone, or a fast 503.
+
+    Every variant carries an ``X-Degraded`` header naming what was served.
+    """
+    retry_after = max(1, math.ceil(error.retry_after))
+    cached = result_cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        kind = "cached"
+        response = ModelJSONResponse(cached, headers={"X-Degraded": kind})
+    else:
+        reason = f"{UPSTREAM_NAMES.get(error.name, error.name)} is temporarily unavailable"
+        headers = {"Retry-After": str(retry_after)}
+        if transcript is not None:
+            kind = "transcript-only"
+            response = ModelJSONResponse(DegradedResponse(
+                detail=f"{reason}. Here is the transcript; structure it later with the handle.",
+                reason=reason,
+                retry_after=retry_after,
+                transcript=transcript,
+                handle=transcript_store.put(transcript),
+                expires_in=int(transcript_store.ttl)
+            ), status_code=202, headers={**headers, "X-Degraded": kind})
+        else:
+            kind = "unavailable"
+            response = ModelJSONResponse(DegradedResponse(
+                detail=f"{reason}. Please try again in {retry_after} seconds.",
+                reason=reason,
+                retry_after=retry_after
+            ), status_code=503, headers={**headers, "X-Degraded": kind})
+    metrics.incr(f"degraded.{kind}")
+    note(degraded=kind)
+    return response
+
+def _reuse(cache_key: str) -> ModelJSONResponse | None:
+    """Serve an identical request's recent result without calling the upstreams again."""
+    if not settings.RESULT_REUSE_SECONDS:
+        return None
+    cached = result_cache.get(cache_key, max_age=settings.RESULT_REUSE_SECONDS)
+    if cached is None:
+        return None
+    note_cache_hit("results")
+    return ModelJSONResponse(cached, headers={"X-Cache": "hit"})
+
+async def _wait_for_disconnect(request: Request) -> None:
+    # The body has been read, so the next message only arrives once the client is gone
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+def _discard_result(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Background work for a disconnected client failed: {str(task.exception())}")
+
+async def _run_until_disconnect(request: Request, work, keep_on_disconnect=lambda: False):
+    """Await the upstream work, but stop waiting when the client leaves or the deadline passes.
+
+    On a disconnect the work is cancelled (freeing its scheduler slot and
+    skipping later stages) unless ``keep_on_disconnect()`` says its result
+    will be kept, e.g. in the result cache for a retry. On deadline expiry
+    it is always cancelled and the client gets a 504. An upstream call
+    already running on a worker thread cannot be interrupted; it ends on
+    its own deadline-bounded timeout, and everything after it is skipped.
+    """
+    deadline = current_deadline()
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait(
+            {task, watcher},
+            timeout=deadline.remaining() if deadline else None,
+            return_when=asyncio.FIRST_COMPLETED
+        )
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        disconnected = watcher.done() and not watcher.cancelled()
+        watcher.cancel()
+
+    if task.done():
+        try:
+            return task.result()
+        except DeadlineExceeded as e:
+            metrics.incr("requests.cancelled.deadline")
+            note(cancelled="deadline")
+            raise HTTPException(status_code=504, detail=str(e))
+
+    if disconnected:
+        if keep_on_disconnect():
+            metrics.incr("requests.disconnects_kept")
+            note(cancelled="kept")
+            task.add_done_callback(_discard_result)
+        else:
+            task.cancel()
+            metrics.incr("requests.cancelled.disconnect")
+            note(cancelled="disconnect")
+        # Nobody is listening; 499 is what the ledger and access log will show
+        return Response(status_code=499)
+
+    task.cancel()
+    metrics.incr("requests.cancelled.deadline")
+    note(cancelled="deadline")
+    raise HTTPException(
+        status_code=504,
+        detail=f"Processing did not finish within {deadline.seconds:.0f} seconds. Please try a shorter recording."
+    )
+
+def _source_linker(request: Request):
+    """Return a function pointing each task and process step at the stretch of the recording it came from.
+
+    It holds on to the timings only, so it still works after the request is done.
+    """
+    timestamps = getattr(request.state, "timestamps", None)
+    audio_id = getattr(request.state, "audio_id", None)
+
+    def link(result: BaseModel) -> None:
+        if not timestamps:
+            return
+        linked = attach_source_spans(result, timestamps, audio_url(audio_id) if audio_id else None)
+        metrics.incr("timestamps.linked", linked)
+
+    return link
+
+async def _upgrade(upgrade: Upgrade, client, transcript: str, cache_key: str, link, ledger_fields: dict) -> None:
+    """Structure with the full model in the background and publish the result with its diff from the draft.
+
+    Runs in a context of its own, with its own deadline and ledger record,
+    so both results are ledgered: the request's with the draft model, this
+    one (path ``upgrade``) with the full model and how far the draft was off.
+    """
+    start_deadline(settings.REQUEST_DEADLINE_SECONDS)
+    record = begin_record(path="upgrade", status=None, upgrade_id=upgrade.id, draft_model=upgrade.draft_model, **ledger_fields)
+    started = time.perf_counter()
+    try:
+        result = await _schedule_structuring(client, transcript, upgrade.output_format, upgrade.model)
+        link(result)
+        body = dump_json(result)
+        # A retry of the same input gets the full result straight away
+        result_cache.put(cache_key, body)
+        diff = upgrade_store.finish(upgrade, json.loads(body))
+        record.update(
+            status=200,
+            draft_similarity=diff["similarity"],
+            draft_changes=len(diff["changes"]),
+            draft_good_enough=diff["similarity"] >= upgrade_store.good_enough
+        )
+    except CircuitOpenError as e:
+        upgrade_store.fail(upgrade, f"{UPSTREAM_NAMES.get(e.name, e.name)} is temporarily unavailable; the draft stands")
+        record["status"] = 503
+    except DeadlineExceeded as e:
+        upgrade_store.fail(upgrade, str(e))
+        record["status"] = 504
+    except HTTPException as e:
+        upgrade_store.fail(upgrade, str(e.detail))
+        record["status"] = e.status_code
+    except asyncio.CancelledError:
+        upgrade_store.fail(upgrade, "The upgrade was cancelled")
+        record["status"] = 499
+        raise
+    except Exception as e:
+        # Nobody awaits this task: an unexpected error must still end the upgrade, or it stays pending
+        print(f"Upgrade {upgrade.id} failed: {str(e)}")
+        upgrade_store.fail(upgrade, "The upgrade failed; the draft stands")
+        record["status"] = 500
+    finally:
+        record["total_seconds"] = round(time.perf_counter() - started, 4)
+        if settings.LEDGER_ENABLED:
+            usage_ledger.append(record)
+
+def _start_upgrade(request: Request, transcript: str, output_format: str, cache_key: str, draft: BaseModel) -> Upgrade:
+    upgrade = upgrade_store.create(output_format, settings.DRAFT_MODEL, DEFAULT_MODEL, draft.model_dump(mode="json"))
+    record = current_record() or {}
+    ledger_fields = {"format": output_format, "client": record.get("client")}
+    upgrade.task = asyncio.get_running_loop().create_task(
+        _upgrade(upgrade, request.app.state.clients.openrouter, transcript, cache_key, _source_linker(request), ledger_fields),
+        context=contextvars.Context()
+    )
+    note(upgrade_id=upgrade.id)
+    return upgrade
+
+async def _structure_and_cache(
+    request: Request,
+    transcript: str,
+    output_format: str,
+    cache_key: str,
+    progressive: bool = False
+) -> ModelJSONResponse:
+    """Structure a transcript and remember the serialized result for degraded responses.
+
+    With ``progressive`` the response is a draft from DRAFT_MODEL, and the
+    full model's result follows at the URLs in its ``X-Upgrade-*`` headers.
+    """
+    client = request.app.state.clients.openrouter
+    link = _source_linker(request)
+    if progressive and settings.PROGRESSIVE_ENABLED:
+        try:
+            draft = await _schedule_structuring(client, transcript, output_format, settings.DRAFT_MODEL)
+        except CircuitOpenError as e:
+            return _degraded(cache_key, e, transcript)
+        except HTTPException as e:
+            print(f"Draft structuring failed ({str(e.detail)}), answering with the full model")
+            metrics.incr("progressive.draft_failures")
+        else:
+            upgrade = _start_upgrade(request, transcript, output_format, cache_key, draft)
+            link(draft)
+            return ModelJSONResponse(dump_json(draft), headers={
+                "X-Result-Quality": "draft",
+                "X-Upgrade-Id": upgrade.id,
+                "X-Upgrade-Url": f"/upgrades/{upgrade.id}",
+                "X-Upgrade-Events": f"/upgrades/{upgrade.id}/events"
+            })
+
     try:
-        with open(temp_path, "wb") as buffer:
-            buffer.write(content)
-        
+        result = await _schedule_structuring(client, transcript, output_format)
+    except CircuitOpenError as e:
+        return _degraded(cache_key, e, transcript)
+    link(result)
+    body = dump_json(result)
+    result_cache.put(cache_key, body)
+    return ModelJSONResponse(body)
+
+async def _process_upload(request: Request, file: UploadFile, output_format: str, progressive: bool = False) -> ModelJSONResponse:
+    """Validate, transcribe and structure an uploaded file into one output format.
+
+    The result was validated once during generation, so it is serialized
+    straight to bytes; ``response_model`` on the routes is only for the docs.
+    """
+    note(format=output_format)
+    content = await _read_upload(request, file)
+
+    if request.app.state.demo_mode:
+        return ModelJSONResponse(get_demo_json(output_format))
+
+    # Hashing up to 25MB is worth keeping off the event loop
+    cache_key = await asyncio.to_thread(ResultCache.key, content, output_format)
+    reused = _reuse(cache_key)
+    if reused is not None:
+        return reused
+
+    # The cache key starts with the audio's SHA-256, which is also its archive ID
+    digest = cache_key.split(":")[0]
+    return await _transcribe_and_structure(
+        request,
+        lambda: _schedule_transcription(request, content, file, digest),
+        output_format,
+        cache_key,
+        progressive
+    )
+
+async def _transcribe_and_structure(
+    request: Request,
+    transcribe,
+    output_format: str,
+    cache_key: str,
+    progressive: bool = False
+) -> Response:
+    """Run ``transcribe()`` and structure its transcript, stopping early if the client leaves."""
+    transcribed = False
+
+    async def pipeline():
+        nonlocal transcribed
         # Step 1: Transcribe audio using OpenAI's Whisper
         try:
-            with open(temp_path, "rb") as audio_file:
-                transcript = request.app.state.openai_client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file
-                )
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Error transcribing audio: {str(e)}"
-            )
-            
-        # Step 2: Process transcript into process doc
+            transcript = await transcribe()
+        except CircuitOpenError as e:
+            return _degraded(cache_key, e)
+        transcribed = True
+
+        # Step 2: Process transcript into the requested format
+        return await _structure_and_cache(request, transcript, output_format, cache_key, progressive)
+
+    # Once Whisper is paid for, finish into the result cache so a retry of the same file is instant
+    return await _run_until_disconnect(
+        request,
+        pipeline(),
+        keep_on_disconnect=lambda: transcribed and bool(settings.RESULT_REUSE_SECONDS)
+    )
+
+@router.post("/process-audio", response_model=ProcessedOutput)
+async def process_audio_to_tasks(
+    request: Request,
+    file: UploadFile = File(...),
+    progressive: bool = False
+):
+    """Process an audio file into tasks and return structured information."""
+    return await _process_upload(request, file, "tasks", progressive)
+
+@router.post("/process-audio/roadmap", response_model=StrategicRoadmap)
+async def process_audio_to_roadmap(
+    request: Request,
+    file: UploadFile = File(...),
+    progressive: bool = False
+):
+    """Process an audio file into a strategic roadmap."""
+    return await _process_upload(request, file, "roadmap", progressive)
+
+@router.post("/process-audio/process", response_model=ProcessDocument)
+async def process_audio_to_process_doc(
+    request: Request,
+    file: UploadFile = File(...),
+    progressive: bool = False
+):
+    """Process an audio file into a process document."""
+    return await _process_upload(request, file, "process", progressive)
+
+@router.post("/process-audio/all", response_model=CombinedOutput)
+async def process_audio_to_all(
+    request: Request,
+    file: UploadFile = File(...),
+    progressive: bool = False
+):
+    """Process an audio file into tasks, a roadmap and a process document with one AI call."""
+    return await _process_upload(request, file, "all", progressive)
+
+@router.post("/transcribe", response_model=TranscriptResponse)
+async def transcribe_audio(
+    request: Request,
+    file: UploadFile = File(...)
+):
+    """Transcribe an audio file and return the text with a short-lived handle."""
+    note(format="transcript")
+    content = await _read_upload(request, file)
+
+    if request.app.state.demo_mode:
+        transcript = get_demo_transcript()
+    else:
         try:
-            structured_data = await process_transcript_to_process_doc(transcript.text, request.app.state.openrouter_client)
-            return ProcessDocument(**structured_data)
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Error processing transcript: {str(e)}"
-            )
-        
-    except Exception as e:
+            transcript = await _run_until_disconnect(request, _schedule_transcription(request, content, file))
+        except CircuitOpenError as e:
+            return _degraded(None, e)
+        if isinstance(transcript, Response):
+            return transcript
+
+    audio_id = getattr(request.state, "audio_id", None)
+    return ModelJSONResponse(TranscriptResponse(
+        transcript=transcript,
+        duration_seconds=request.state.audio_info.duration_seconds,
+        handle=transcript_store.put(transcript, audio_id),
+        expires_in=int(transcript_store.ttl),
+        audio_url=audio_url(audio_id) if audio_id else None
+    ))
+
+@router.post("/structure/{output_format}")
+async def structure(
+    request: Request,
+    output_format: str,
+    body: StructureRequest,
+    progressive: bool = False
+):
+    """Structure raw transcript text, or a /transcribe handle, into one output format."""
+    if output_format not in FORMAT_SPECS:
         raise HTTPException(
-            status_code=500,
-            detail=str(e)
+            status_code=404,
+            detail=f"Unknown format '{output_format}'. Use one of: {', '.join(FORMAT_SPECS)}"
         )
-    finally:
-        # Cleanup temporary file
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+
+    note(format=output_format)
+    transcript = body.transcript
+    if body.handle is not None:
+        transcript = transcript_store.get(body.handle)
+        if transcript is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Transcript handle is unknown or has expired. Transcribe the audio again."
+            )
+        # Handles from an archived upload link back to its timestamps
+        request.state.audio_id = transcript_store.audio_id(body.handle)
+        if request.state.audio_id:
+            request.state.timestamps = await asyncio.to_thread(archive.get_transcript, request.state.audio_id)
+
+    if request.app.state.demo_mode:
+        return ModelJSONResponse(get_demo_json(output_format))
+
+    cache_key = ResultCache.key(transcript, output_format)
+    reused = _reuse(cache_key)
+    if reused is not None:
+        return reused
+    return await _run_until_disconnect(
+        request,
+        _structure_and_cache(request, transcript, output_format, cache_key, progressive),
+        keep_on_disconnect=lambda: bool(settings.RESULT_REUSE_SECONDS)
+    )
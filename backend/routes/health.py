@@ -1,4 +1,17 @@
 from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from config import settings
+from utils import metrics
+from services import (
+    generation_stats,
+    readiness_report,
+    transcription_scheduler,
+    structuring_scheduler,
+    whisper_breaker,
+    openrouter_breaker,
+    structuring_batcher,
+    upgrade_store
+)
 
 router = APIRouter()
 
@@ -12,5 +25,47 @@ async def health_check(request: Request):
         }
     return {
         "status": "production",
-        "message": "Running in production mode with valid API key"
+        "message": "Running in production mode with valid API key",
+        "generation": generation_stats(),
+        "scheduler": {
+            "transcription": transcription_scheduler.stats(),
+            "structuring": structuring_scheduler.stats()
+        },
+        "batching": structuring_batcher.stats(),
+        "progressive": upgrade_store.stats(),
+        "live": {
+            "sessions": metrics.get("live.sessions"),
+            "started": metrics.get("live.started"),
+            "rejected": metrics.get("live.rejected"),
+            "segments": metrics.get("live.segments"),
+            "silent_segments": metrics.get("live.silent_segments")
+        },
+        "uploads": {
+            "created": metrics.get("uploads.created"),
+            "chunks": metrics.get("uploads.chunks"),
+            "rejected": metrics.get("uploads.rejected"),
+            "probed_early": metrics.get("uploads.probed_early"),
+            "finalize_hashed_bytes": metrics.get("uploads.finalize_hashed_bytes")
+        },
+        "compaction": {
+            "level": settings.TRANSCRIPT_COMPACTION,
+            "tokens_saved": metrics.get("compaction.tokens_before") - metrics.get("compaction.tokens_after"),
+            "token_ratio": metrics.ratio("compaction.tokens_after", "compaction.tokens_before")
+        },
+        "breakers": {breaker.name: breaker.stats() for breaker in (whisper_breaker, openrouter_breaker)},
+        "cancellations": {
+            "disconnect": metrics.get("requests.cancelled.disconnect"),
+            "deadline": metrics.get("requests.cancelled.deadline"),
+            "kept_after_disconnect": metrics.get("requests.disconnects_kept")
+        }
     }
+
+@router.get("/health/ready")
+async def readiness_check(request: Request):
+    """Readiness endpoint: 503 when this instance should shed load.
+
+    Reads cached upstream probe results and live counters only, so it
+    never waits on the network.
+    """
+    ready, report = readiness_report(request.app.state.prober, request.app.state.draining)
+    return JSONResponse(report, status_code=200 if ready else 503)
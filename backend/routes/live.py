@@ -0,0 +1,300 @@
+import asyncio
+import json
+import math
+import time
+from fastapi import APIRouter, HTTPException, WebSocket
+from services import (
+    FORMAT_SPECS,
+    transcription_scheduler,
+    whisper_breaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    archive,
+    audio_url,
+    parse_timestamps,
+    attach_source_spans,
+    transcript_store,
+    usage_ledger,
+    start_deadline,
+    stage,
+    LiveSession
+)
+from services.breaker import upstream_status
+from services.deadline import upstream_timeout
+from services.usage import begin_record
+from middleware import hash_api_key, ledger_client
+
+from config import settings
+from utils import metrics, get_demo_json, get_demo_transcript
+from .audio import UPSTREAM_NAMES, _check_circuit, _schedule_structuring, _whisper_options
+
+router = APIRouter()
+
+# WebSocket close codes
+CLOSE_POLICY = 1008
+CLOSE_ERROR = 1011
+CLOSE_TRY_LATER = 1013
+
+# Live audio is charged to the caller's rate-limit bucket in steps of this many seconds
+CHARGE_SECONDS = 5.0
+
+_sessions = 0
+_API_KEYS = frozenset(hash_api_key(key) for key in settings.RATE_LIMIT_API_KEYS)
+
+def _transcribe_segment(openai_client, wav: bytes, prompt: str) -> tuple:
+    """Transcribe one WAV segment; the transcript so far is Whisper's prompt for continuity."""
+    transcription = openai_client.audio.transcriptions.create(
+        model="whisper-1",
+        file=("segment.wav", wav),
+        **({"prompt": prompt} if prompt else {}),
+        **_whisper_options(),
+        **upstream_timeout("transcription")
+    )
+    return transcription.text, parse_timestamps(transcription)
+
+def _archive_recording(session: LiveSession, transcript: str) -> str | None:
+    """Keep the recording and its timings for playback links, when it was short enough to hold."""
+    wav = session.wav()
+    if not (settings.ARCHIVE_ENABLED and wav):
+        return None
+    try:
+        audio_id, _ = archive.put(wav, "wav")
+        archive.put_transcript(audio_id, {"text": transcript, **(session.timestamps() or {})})
+        return audio_id
+    except OSError as e:
+        print(f"Could not archive live recording: {str(e)}")
+        metrics.incr("archive.errors")
+        return None
+
+async def _send(websocket: WebSocket, message: dict) -> None:
+    try:
+        await websocket.send_text(json.dumps(message))
+    except (RuntimeError, OSError):
+        pass  # the client is already gone
+
+async def _close(websocket: WebSocket, message: dict, code: int = 1000) -> None:
+    await _send(websocket, message)
+    try:
+        await websocket.close(code)
+    except (RuntimeError, OSError):
+        pass
+
+def _failure(error: Exception) -> tuple:
+    """The closing message, close code and ledger status for a failed recording."""
+    if isinstance(error, CircuitOpenError):
+        reason = f"{UPSTREAM_NAMES.get(error.name, error.name)} is temporarily unavailable"
+        return {"type": "error", "detail": reason, "retry_after": max(1, round(error.retry_after))}, CLOSE_TRY_LATER, 503
+    if isinstance(error, DeadlineExceeded):
+        return {"type": "error", "detail": str(error)}, CLOSE_ERROR, 504
+    if isinstance(error, HTTPException):
+        return {"type": "error", "detail": str(error.detail)}, CLOSE_ERROR, error.status_code
+    return {"type": "error", "detail": f"Error transcribing audio: {str(error)}"}, CLOSE_ERROR, upstream_status(error) or 500
+
+async def _receive_audio(websocket: WebSocket, on_audio) -> str:
+    """Hand binary messages to on_audio until the client stops; returns why it ended.
+
+    ``on_audio(chunk)`` is awaited with each message and returns None to
+    keep going or the reason to stop (``"limit"``, ``"rate_limited"``).
+    """
+    while True:
+        try:
+            message = await asyncio.wait_for(websocket.receive(), settings.LIVE_IDLE_SECONDS)
+        except asyncio.TimeoutError:
+            return "idle"
+        if message["type"] == "websocket.disconnect":
+            return "disconnect"
+        if message.get("bytes"):
+            ended = await on_audio(message["bytes"])
+            if ended:
+                return ended
+        elif message.get("text"):
+            try:
+                if json.loads(message["text"]).get("type") == "stop":
+                    return "stop"
+            except (ValueError, AttributeError):
+                pass
+
+async def _record(websocket: WebSocket, output_format: str, sample_rate: int, record: dict) -> None:
+    clients = websocket.app.state.clients
+
+    async def transcribe(wav: bytes, prompt: str, seconds: float) -> tuple:
+        _check_circuit(whisper_breaker)
+        started = time.perf_counter()
+        result = await transcription_scheduler.run(
+            seconds, whisper_breaker.call, _transcribe_segment, clients.openai, wav, prompt, work_seconds=seconds
+        )
+        record["whisper_seconds"] = round(record["whisper_seconds"] + time.perf_counter() - started, 4)
+        return result
+
+    async def on_segment(segment: dict) -> None:
+        await _send(websocket, {"type": "segment", **segment})
+
+    session = LiveSession(
+        transcribe,
+        sample_rate,
+        min_segment=settings.LIVE_SEGMENT_MIN_SECONDS,
+        max_segment=settings.LIVE_SEGMENT_MAX_SECONDS,
+        pause=settings.LIVE_PAUSE_SECONDS,
+        keep_bytes=settings.MAX_UPLOAD_MB * 1024 * 1024 if settings.ARCHIVE_ENABLED else 0,
+        on_segment=on_segment
+    )
+
+    # Set by RateLimitMiddleware when rate limiting is on
+    charge = websocket.scope.get("state", {}).get("rate_limit")
+    charged = 0.0
+    retry_after = 0
+
+    async def on_audio(chunk: bytes) -> str | None:
+        nonlocal charged, retry_after
+        session.feed(chunk)
+        if charge is not None and session.seconds - charged >= CHARGE_SECONDS:
+            wait = await charge(session.seconds - charged)
+            if wait:
+                retry_after = max(1, math.ceil(wait))
+                return "rate_limited"
+            charged = session.seconds
+        if settings.MAX_AUDIO_SECONDS and session.seconds >= settings.MAX_AUDIO_SECONDS:
+            return "limit"
+        return None
+
+    await _send(websocket, {"type": "ready", "sample_rate": sample_rate})
+    try:
+        ended = await _receive_audio(websocket, on_audio)
+        if ended in ("disconnect", "idle"):
+            await session.cancel()
+            record.update(status=499, cancelled=ended)
+            if ended == "idle":
+                await _close(websocket, {"type": "error", "detail": f"No audio for {settings.LIVE_IDLE_SECONDS:.0f} seconds"}, CLOSE_POLICY)
+            return
+        if ended == "rate_limited":
+            await session.cancel()
+            record.update(status=429, audio_seconds=round(session.seconds, 2))
+            await _close(websocket, {
+                "type": "error",
+                "detail": f"Rate limit exceeded. Try again in {retry_after} seconds.",
+                "retry_after": retry_after
+            }, CLOSE_TRY_LATER)
+            return
+        if ended == "limit":
+            record["truncated"] = True
+
+        # From here on the user is waiting for the result
+        stopped = time.perf_counter()
+        start_deadline(settings.REQUEST_DEADLINE_SECONDS)
+        with stage("transcription"):
+            transcript = await session.finish()
+        record.update(audio_bytes=session.received_bytes, audio_seconds=round(session.seconds, 2))
+        await _send(websocket, {
+            "type": "transcript",
+            "text": transcript,
+            "duration_seconds": round(session.seconds, 2),
+            "truncated": ended == "limit"
+        })
+        if not transcript:
+            record["status"] = 422
+            await _close(websocket, {"type": "error", "detail": "No speech was recognized in the recording"})
+            return
+
+        audio_id = await asyncio.to_thread(_archive_recording, session, transcript)
+        try:
+            result = await _schedule_structuring(clients.openrouter, transcript, output_format)
+        except CircuitOpenError as e:
+            message, _, _ = _failure(e)
+            record.update(status=202, degraded="transcript-only")
+            await _close(websocket, {
+                **message,
+                "type": "degraded",
+                "transcript": transcript,
+                "handle": transcript_store.put(transcript, audio_id),
+                "expires_in": int(transcript_store.ttl)
+            })
+            return
+        linked = attach_source_spans(result, session.timestamps(), audio_url(audio_id) if audio_id else None)
+        metrics.incr("timestamps.linked", linked)
+        record.update(status=200, stop_to_result_seconds=round(time.perf_counter() - stopped, 4))
+        await _close(websocket, {
+            "type": "result",
+            "format": output_format,
+            "audio_url": audio_url(audio_id) if audio_id else None,
+            "result": result.model_dump(mode="json")
+        })
+    except asyncio.CancelledError:
+        await session.cancel()
+        raise
+    except Exception as e:
+        await session.cancel()
+        message, code, status = _failure(e)
+        record["status"] = status
+        await _close(websocket, message, code)
+
+async def _record_demo(websocket: WebSocket, output_format: str, record: dict) -> None:
+    """Demo mode: take the audio, then answer with the demo transcript and result."""
+    await _send(websocket, {"type": "ready", "sample_rate": None})
+    received = 0
+
+    async def on_audio(chunk: bytes) -> None:
+        nonlocal received
+        received += len(chunk)
+
+    if await _receive_audio(websocket, on_audio) != "stop":
+        record["status"] = 499
+        return
+    record.update(status=200, audio_bytes=received)
+    await _send(websocket, {"type": "transcript", "text": get_demo_transcript(), "duration_seconds": None, "truncated": False})
+    await _close(websocket, {
+        "type": "result",
+        "format": output_format,
+        "audio_url": None,
+        "result": json.loads(get_demo_json(output_format))
+    })
+
+@router.websocket("/live/{output_format}")
+async def live_recording(websocket: WebSocket, output_format: str, sample_rate: int = 16000):
+    """Record over a WebSocket: 16-bit mono PCM in, segment transcripts and then the structured result out.
+
+    Binary messages carry audio at ``sample_rate``; the text message
+    ``{"type": "stop"}`` ends the recording. The server sends JSON messages:
+    ``ready``, one ``segment`` per transcribed stretch (with the rolling
+    transcript), ``transcript`` once everything is transcribed, then
+    ``result`` (or ``degraded`` with a transcript handle, or ``error``) and
+    closes the connection.
+    """
+    global _sessions
+    await websocket.accept()
+    if output_format not in FORMAT_SPECS:
+        await _close(websocket, {
+            "type": "error",
+            "detail": f"Unknown format '{output_format}'. Use one of: {', '.join(FORMAT_SPECS)}"
+        }, CLOSE_POLICY)
+        return
+    if not 8000 <= sample_rate <= 48000:
+        await _close(websocket, {"type": "error", "detail": "sample_rate must be between 8000 and 48000"}, CLOSE_POLICY)
+        return
+    if not settings.LIVE_ENABLED or _sessions >= settings.LIVE_MAX_SESSIONS:
+        metrics.incr("live.rejected")
+        await _close(websocket, {"type": "error", "detail": "Live recording is not available right now. Please upload the file instead."}, CLOSE_TRY_LATER)
+        return
+
+    record = begin_record(
+        path=websocket.url.path,
+        format=output_format,
+        client=ledger_client(websocket.scope, settings.TRUST_FORWARDED_FOR, _API_KEYS),
+        status=None
+    )
+    started = time.perf_counter()
+    _sessions += 1
+    metrics.set_gauge("live.sessions", _sessions)
+    metrics.incr("live.started")
+    try:
+        if websocket.app.state.demo_mode:
+            await _record_demo(websocket, output_format, record)
+        else:
+            await _record(websocket, output_format, sample_rate, record)
+    finally:
+        _sessions -= 1
+        metrics.set_gauge("live.sessions", _sessions)
+        record["total_seconds"] = round(time.perf_counter() - started, 4)
+        if record["status"] is None:
+            record["status"] = 500
+        if settings.LEDGER_ENABLED:
+            usage_ledger.append(record)
@@ -0,0 +1,34 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Request
+from services import archive
+from utils import ModelJSONResponse, RangeFileResponse
+
+router = APIRouter()
+
+# Content-addressed: the bytes behind an ID never change. Private: these are users' recordings,
+# which browsers may keep but shared proxies and CDNs must not
+IMMUTABLE_CACHE = "private, max-age=31536000, immutable"
+
+@router.api_route("/audio/{audio_id}", methods=["GET", "HEAD"])
+async def play_audio(request: Request, audio_id: str):
+    """Stream an archived recording, honouring Range requests for seeking."""
+    found = await asyncio.to_thread(archive.find, audio_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Recording not found")
+    path, media_type = found
+    return RangeFileResponse(
+        path,
+        request.headers,
+        media_type=media_type,
+        etag=audio_id,
+        method=request.method,
+        headers={"Cache-Control": IMMUTABLE_CACHE}
+    )
+
+@router.get("/audio/{audio_id}/timestamps")
+async def audio_timestamps(audio_id: str):
+    """Whisper's segment (and word, if requested) timings for an archived recording."""
+    transcript = await asyncio.to_thread(archive.get_transcript, audio_id)
+    if transcript is None or not transcript.get("segments"):
+        raise HTTPException(status_code=404, detail="No timestamps for this recording")
+    return ModelJSONResponse(transcript)
@@ -0,0 +1,49 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Request, Response
+from utils.assets import Asset, AssetManifest
+
+router = APIRouter()
+
+def _asset_response(request: Request, asset: Asset) -> Response:
+    """Serve an asset with ETag revalidation and Accept-Encoding negotiation."""
+    encoding, body = asset.negotiate(request.headers.get("accept-encoding", ""))
+    # Each encoding is a different representation, so it gets its own validator
+    etag = f'{asset.etag[:-1]}-{encoding}"' if encoding else asset.etag
+    headers = {
+        "ETag": etag,
+        "Cache-Control": asset.cache_control,
+        "Vary": "Accept-Encoding"
+    }
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    headers["Content-Length"] = str(len(body))
+    return Response(
+        content=b"" if request.method == "HEAD" else body,
+        media_type=asset.content_type,
+        headers=headers
+    )
+
+async def _manifest(request: Request) -> AssetManifest:
+    manifest = request.app.state.assets
+    if not manifest.loaded:
+        # Normally done by the warmup hook; hashing and brotli must not block the event loop
+        await asyncio.to_thread(manifest.load)
+    return manifest
+
+@router.api_route("/", methods=["GET", "HEAD"])
+async def read_root(request: Request):
+    """Serve the main HTML page."""
+    return _asset_response(request, (await _manifest(request)).index)
+
+@router.api_route("/static/{path:path}", methods=["GET", "HEAD"])
+async def static_asset(request: Request, path: str):
+    """Serve a static file by its hashed (immutable) or original name."""
+    asset = (await _manifest(request)).get(path)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return _asset_response(request, asset)
@@ -0,0 +1,23 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query
+from services import usage_ledger
+from services.usage import GROUP_BY
+from utils import ModelJSONResponse
+from .admin import require_admin
+
+router = APIRouter()
+
+# Per-client usage and spend are for operators only
+@router.get("/stats", dependencies=[Depends(require_admin)])
+async def usage_stats(
+    window: float = Query(86400, gt=0, description="Look-back window in seconds"),
+    group_by: str = Query("format", description=f"One of: {', '.join(GROUP_BY)}")
+):
+    """Aggregate the usage ledger: requests, audio, tokens and estimated cost per group."""
+    if group_by not in GROUP_BY:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown group_by '{group_by}'. Use one of: {', '.join(GROUP_BY)}"
+        )
+    # Reading the ledger is file I/O; keep it off the event loop
+    return ModelJSONResponse(await asyncio.to_thread(usage_ledger.stats, window, group_by))
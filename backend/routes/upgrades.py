@@ -0,0 +1,58 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from models import UpgradeStatus
+from services import upgrade_store
+from services.upgrades import FAILED, PENDING, Upgrade
+from utils import ModelJSONResponse, dump_json
+
+router = APIRouter()
+
+# Comment lines keep proxies from closing an idle event stream
+HEARTBEAT_SECONDS = 15.0
+POLL_RETRY_SECONDS = 2
+
+def _find(upgrade_id: str) -> Upgrade:
+    upgrade = upgrade_store.get(upgrade_id)
+    if upgrade is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Upgrade is unknown or has expired. The draft result is final."
+        )
+    return upgrade
+
+@router.get("/upgrades/{upgrade_id}", response_model=UpgradeStatus)
+async def upgrade_status(upgrade_id: str):
+    """Poll a progressive request's upgrade: 202 while pending, then the result and its diff from the draft."""
+    upgrade = _find(upgrade_id)
+    if upgrade.state == PENDING:
+        return ModelJSONResponse(upgrade.status(), status_code=202, headers={"Retry-After": str(POLL_RETRY_SECONDS)})
+    return ModelJSONResponse(upgrade.status())
+
+@router.get("/upgrades/{upgrade_id}/events")
+async def upgrade_events(request: Request, upgrade_id: str):
+    """Server-sent events: one ``ready`` or ``failed`` event carrying the upgrade status, then the stream ends."""
+    upgrade = _find(upgrade_id)
+
+    async def events():
+        # Don't let EventSource reconnect quickly once the stream has ended
+        yield f"retry: {int(HEARTBEAT_SECONDS * 1000)}\n\n"
+        latest = upgrade
+        while latest.state == PENDING:
+            # Woken by the worker running the upgrade, or by rereading it from another one
+            latest = await upgrade_store.wait(latest, HEARTBEAT_SECONDS)
+            if latest is None:
+                latest = Upgrade(
+                    upgrade.id, upgrade.output_format, upgrade.draft_model, upgrade.model, upgrade.draft,
+                    state=FAILED, detail="The upgrade expired; the draft stands"
+                )
+            elif latest.state == PENDING:
+                if await request.is_disconnected():
+                    return
+                yield ": waiting\n\n"
+        yield f"event: {latest.state}\ndata: {dump_json(latest.status()).decode()}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
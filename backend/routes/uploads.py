@@ -0,0 +1,149 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response
+from models import UploadCreate, UploadStatus
+from services import FORMAT_SPECS, ResultCache, archive, note, upload_store, UploadError
+from services.uploads import Upload
+
+from config import settings
+from utils import AudioProbeError, ModelJSONResponse, metrics, get_demo_json
+from .audio import (
+    _check_audio,
+    _check_content_type,
+    _note_original_size,
+    _reuse,
+    _transcribe_and_structure,
+    _transcribe_stored
+)
+
+router = APIRouter()
+
+def _find(upload_id: str) -> Upload:
+    upload = upload_store.get(upload_id)
+    if upload is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Upload is unknown or has expired. Please start the upload again."
+        )
+    return upload
+
+def _probe_error(e: AudioProbeError) -> HTTPException:
+    return HTTPException(status_code=400, detail=f"Could not read audio file: {str(e)}")
+
+def _probe_early(upload: Upload) -> None:
+    """Check the header as soon as it has arrived, refusing the rest of a file that can't be processed."""
+    try:
+        info = upload_store.probe(upload)
+        if info is None:
+            return
+        _check_audio(info, upload.content_type)
+    except (AudioProbeError, HTTPException) as e:
+        error = _probe_error(e) if isinstance(e, AudioProbeError) else e
+        upload_store.reject(upload, error.detail)
+        raise error
+    upload_store.update(upload, info=info.to_dict())
+    metrics.incr("uploads.probed_early")
+
+def _store_upload(request: Request, upload: Upload, digest: str) -> None:
+    """Point the pipeline at the assembled file: linked into the archive when it is on, used in place otherwise."""
+    request.state.audio_id, request.state.audio_path = None, upload.path
+    if not settings.ARCHIVE_ENABLED:
+        return
+    try:
+        request.state.audio_id, request.state.audio_path = archive.put_file(
+            upload.path, request.state.audio_info.container, digest
+        )
+    except OSError as e:
+        print(f"Could not archive upload: {str(e)}")
+        metrics.incr("archive.errors")
+
+@router.post("/uploads", response_model=UploadStatus, status_code=201)
+async def create_upload(body: UploadCreate):
+    """Start a resumable upload; PUT its chunks, then finalize it."""
+    _check_content_type(body.content_type)
+    try:
+        upload = await asyncio.to_thread(upload_store.create, body.size, body.content_type, body.filename)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    return ModelJSONResponse(upload_store.status(upload), status_code=201, headers={"Location": f"/uploads/{upload.id}"})
+
+@router.get("/uploads/{upload_id}", response_model=UploadStatus)
+async def upload_status(upload_id: str):
+    """Which byte ranges have arrived and which chunks are still missing."""
+    return ModelJSONResponse(upload_store.status(_find(upload_id)))
+
+@router.put("/uploads/{upload_id}/chunks/{index}", response_model=UploadStatus)
+async def put_chunk(request: Request, upload_id: str, index: int):
+    """Store one chunk (the raw request body); chunks may arrive in any order and be resent unchanged."""
+    upload = _find(upload_id)
+    try:
+        await upload_store.write_chunk(upload, index, request.stream())
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    if upload.meta["info"] is None:
+        await asyncio.to_thread(_probe_early, upload)
+    return ModelJSONResponse(upload_store.status(upload))
+
+@router.delete("/uploads/{upload_id}", status_code=204)
+async def delete_upload(upload_id: str):
+    """Abandon an upload and free its disk space."""
+    await asyncio.to_thread(upload_store.discard, _find(upload_id))
+    return Response(status_code=204)
+
+@router.post("/uploads/{upload_id}/finalize")
+async def finalize_upload(
+    request: Request,
+    upload_id: str,
+    output_format: str = Query("tasks", alias="format"),
+    progressive: bool = False
+):
+    """Process a complete upload into one output format, like the /process-audio routes."""
+    if output_format not in FORMAT_SPECS:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown format '{output_format}'. Use one of: {', '.join(FORMAT_SPECS)}"
+        )
+    note(format=output_format)
+    upload = _find(upload_id)
+    status = upload_store.status(upload)
+    if not status.complete:
+        raise HTTPException(
+            status_code=409,
+            detail=f"{len(status.missing)} of {status.chunks} chunks have not arrived yet"
+        )
+
+    # An early probe saw part of the file; the header of the whole one is what counts
+    try:
+        info = await asyncio.to_thread(upload_store.probe, upload)
+    except AudioProbeError as e:
+        raise _probe_error(e)
+    _check_audio(info, upload.content_type)
+    request.state.audio_info = info
+    note(audio_bytes=upload.size, audio_seconds=info.duration_seconds)
+    _note_original_size(request)
+
+    if request.app.state.demo_mode:
+        await asyncio.to_thread(upload_store.discard, upload)
+        return ModelJSONResponse(get_demo_json(output_format))
+
+    digest = await asyncio.to_thread(upload_store.digest, upload)
+    cache_key = ResultCache.digest_key(digest, output_format)
+    reused = _reuse(cache_key)
+    if reused is not None:
+        await asyncio.to_thread(upload_store.discard, upload)
+        return reused
+
+    # No more chunks: the file is about to be read (and possibly linked into the archive)
+    await asyncio.to_thread(upload_store.update, upload, finalized=True)
+    await asyncio.to_thread(_store_upload, request, upload, digest)
+    response = await _transcribe_and_structure(
+        request,
+        lambda: _transcribe_stored(request, upload.size, upload.content_type, upload.filename),
+        output_format,
+        cache_key,
+        progressive
+    )
+    # Keep the upload for a retry of a failed finalize; work kept running for a gone client may still read it
+    if response.status_code < 499:
+        await asyncio.to_thread(upload_store.discard, upload)
+    return response
@@ -0,0 +1,157 @@
+"""
+Production Server Module
+
+Launches the VoicePM API for production: multiple worker processes sized
+from the CPU count and memory budget, the app preloaded in the master
+before forking, workers recycled after a bounded number of requests, and
+graceful draining on SIGTERM.
+
+On SIGTERM (e.g. a Render deploy) each worker marks the app as draining,
+so /health/ready starts failing right away, stops accepting connections, lets
+in-flight memo processing finish for up to DRAIN_TIMEOUT_SECONDS and then
+exits; the master waits slightly longer before killing stragglers.
+
+Usage (from the backend directory):
+    python server.py
+
+Environment Variables:
+    PORT: Port to bind (Render sets this)
+    WEB_CONCURRENCY: Fixed worker count; 0 sizes it automatically
+    WORKER_MEMORY_MB: Expected resident memory of one worker
+    MEMORY_BUDGET_MB: Memory available to all workers; 0 reads the cgroup limit
+    MAX_REQUESTS_PER_WORKER: Requests served before a worker is recycled (0 disables)
+    DRAIN_TIMEOUT_SECONDS: How long in-flight requests may run after SIGTERM
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Add the backend directory to Python path
+backend_dir = Path(__file__).parent
+if str(backend_dir) not in sys.path:
+    sys.path.append(str(backend_dir))
+
+from config import settings
+
+# Cgroup files that hold the container memory limit (v2, then v1)
+CGROUP_MEMORY_LIMITS = (
+    "/sys/fs/cgroup/memory.max",
+    "/sys/fs/cgroup/memory/memory.limit_in_bytes"
+)
+
+# Extra seconds the master waits after the worker drain deadline before SIGKILL
+SHUTDOWN_MARGIN_SECONDS = 5
+
+def memory_budget_mb() -> int | None:
+    """Return the configured memory budget, else the container limit, else None."""
+    if settings.MEMORY_BUDGET_MB:
+        return settings.MEMORY_BUDGET_MB
+    for path in CGROUP_MEMORY_LIMITS:
+        try:
+            value = Path(path).read_text().strip()
+        except OSError:
+            continue
+        # "max" or a huge number means the cgroup is unlimited
+        if value.isdigit() and int(value) < 1 << 50:
+            return int(value) // (1024 * 1024)
+    return None
+
+def worker_count() -> int:
+    """Size the worker pool from CPU count, capped by what fits in the memory budget."""
+    if settings.WEB_CONCURRENCY:
+        return settings.WEB_CONCURRENCY
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    workers = cpus
+    budget = memory_budget_mb()
+    if budget:
+        workers = min(workers, budget // settings.WORKER_MEMORY_MB)
+    return max(1, workers)
+
+def gunicorn_options() -> dict:
+    """Return the gunicorn settings for the production server."""
+    return {
+        "bind": f"0.0.0.0:{settings.PORT}",
+        "workers": worker_count(),
+        "worker_class": "server.DrainingUvicornWorker",
+        "preload_app": True,
+        "max_requests": settings.MAX_REQUESTS_PER_WORKER,
+        "max_requests_jitter": settings.MAX_REQUESTS_PER_WORKER // 10,
+        "graceful_timeout": settings.DRAIN_TIMEOUT_SECONDS + SHUTDOWN_MARGIN_SECONDS,
+        # Uvicorn workers heartbeat from the event loop, so this only catches hung loops
+        "timeout": 120,
+        "keepalive": 5
+    }
+
+try:
+    from gunicorn.app.base import BaseApplication
+    from gunicorn.arbiter import Arbiter
+    from uvicorn.server import Server
+    from uvicorn.workers import UvicornWorker
+except ImportError:  # gunicorn is not available on Windows
+    BaseApplication = None
+else:
+    class DrainingServer(Server):
+        """Uvicorn server that marks the app as draining as soon as a shutdown signal arrives."""
+
+        def handle_exit(self, sig, frame) -> None:
+            # The lifespan shutdown only runs once in-flight requests are done, far too late for /health/ready
+            state = getattr(self.config.app, "state", None)
+            if state is not None:
+                state.draining = True
+            super().handle_exit(sig, frame)
+
+    class DrainingUvicornWorker(UvicornWorker):
+        """Uvicorn worker that waits for in-flight requests on shutdown, up to the drain deadline."""
+        CONFIG_KWARGS = {
+            **UvicornWorker.CONFIG_KWARGS,
+            "timeout_graceful_shutdown": settings.DRAIN_TIMEOUT_SECONDS
+        }
+
+        async def _serve(self) -> None:
+            # UvicornWorker._serve, with the server that flags draining
+            self.config.app = self.wsgi
+            server = DrainingServer(config=self.config)
+            self._install_sigquit_handler()
+            await server.serve(sockets=self.sockets)
+            if not server.started:
+                sys.exit(Arbiter.WORKER_BOOT_ERROR)
+
+    class VoicePMApplication(BaseApplication):
+        """Gunicorn application that serves main:app with the given options."""
+
+        def __init__(self, options: dict):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from main import app
+            return app
+
+def main() -> None:
+    """Start the production server, falling back to plain uvicorn without gunicorn."""
+    options = gunicorn_options()
+    print(
+        f"\nStarting {options['workers']} worker(s) on {options['bind']} "
+        f"(recycle after ~{options['max_requests']} requests, drain {settings.DRAIN_TIMEOUT_SECONDS}s)\n"
+    )
+    if BaseApplication is not None:
+        VoicePMApplication(options).run()
+        return
+
+    import uvicorn
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=settings.PORT,
+        workers=options["workers"],
+        limit_max_requests=options["max_requests"] or None,
+        timeout_graceful_shutdown=settings.DRAIN_TIMEOUT_SECONDS
+    )
+
+if __name__ == "__main__":
+    main()
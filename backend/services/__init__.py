@@ -1,11 +1,87 @@
 from .audio import (
+    FORMAT_SPECS,
+    structure_transcript,
     process_transcript_to_tasks,
     process_transcript_to_roadmap,
-    process_transcript_to_process_doc
+    process_transcript_to_process_doc,
+    process_transcript_to_all
 )
+from .generation import generate_structured, generation_stats
+from .clients import ClientProvider, create_openai_client, create_openrouter_client
+from .readiness import UpstreamProber, readiness_report
+from .transcripts import TranscriptStore, transcript_store
+from .scheduler import (
+    JobScheduler,
+    transcription_scheduler,
+    structuring_scheduler,
+    estimate_audio_seconds,
+    estimate_structuring_seconds
+)
+from .usage import UsageLedger, usage_ledger, note, note_cache_hit, stage
+from .breaker import CircuitBreaker, CircuitOpenError, UpstreamError, upstream_error, whisper_breaker, openrouter_breaker
+from .results import ResultCache, result_cache
+from .deadline import Deadline, DeadlineExceeded, start_deadline, current_deadline
+from .archive import AudioArchive, archive, audio_url
+from .timestamps import parse_timestamps, attach_source_spans
+from .fingerprints import FingerprintIndex, fingerprint_index
+from .batcher import StructuringBatcher, structuring_batcher
+from .upgrades import Upgrade, UpgradeStore, upgrade_store
+from .live import LiveSession
+from .uploads import Upload, UploadError, UploadStore, upload_store
 
 __all__ = [
+    'FORMAT_SPECS',
+    'structure_transcript',
     'process_transcript_to_tasks',
     'process_transcript_to_roadmap',
-    'process_transcript_to_process_doc'
+    'process_transcript_to_process_doc',
+    'process_transcript_to_all',
+    'generate_structured',
+    'generation_stats',
+    'ClientProvider',
+    'create_openai_client',
+    'create_openrouter_client',
+    'UpstreamProber',
+    'readiness_report',
+    'TranscriptStore',
+    'transcript_store',
+    'JobScheduler',
+    'transcription_scheduler',
+    'structuring_scheduler',
+    'estimate_audio_seconds',
+    'estimate_structuring_seconds',
+    'UsageLedger',
+    'usage_ledger',
+    'note',
+    'note_cache_hit',
+    'stage',
+    'CircuitBreaker',
+    'CircuitOpenError',
+    'UpstreamError',
+    'upstream_error',
+    'whisper_breaker',
+    'openrouter_breaker',
+    'ResultCache',
+    'result_cache',
+    'Deadline',
+    'DeadlineExceeded',
+    'start_deadline',
+    'current_deadline',
+    'AudioArchive',
+    'archive',
+    'audio_url',
+    'parse_timestamps',
+    'attach_source_spans',
+    'FingerprintIndex',
+    'fingerprint_index',
+    'StructuringBatcher',
+    'structuring_batcher',
+    'Upgrade',
+    'UpgradeStore',
+    'upgrade_store',
+    'LiveSession',
+    'Upload',
+    'UploadError',
+    'UploadStore',
+    'upload_store'
 ]
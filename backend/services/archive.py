@@ -0,0 +1,167 @@
+"""
+Audio Archive
+
+Content-addressed storage for uploaded recordings. Each file is stored
+once under the SHA-256 of its bytes, named by its probed container rather
+than the client's file name, so repeated uploads of the same memo share
+one copy and Whisper always sees the right extension. A recording's
+transcript (text and Whisper timings) is kept next to it as JSON, and its
+acoustic fingerprint as ``.fp``.
+
+Writes go to a temporary file that is renamed into place, so readers
+(including other workers sharing the directory) never see a partial file.
+Once the archive outgrows ``max_bytes`` the least recently used
+recordings are removed.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+from config import settings
+from utils import metrics
+from utils.fingerprint import Fingerprint
+
+# Stored extension and served MIME type for each probed container
+CONTAINERS = {
+    "mp3": (".mp3", "audio/mpeg"),
+    "mp4": (".m4a", "audio/mp4"),
+    "wav": (".wav", "audio/wav")
+}
+
+_AUDIO_ID = re.compile(r"^[0-9a-f]{64}$")
+# Files kept beside a recording, removed with it
+SIDECARS = (".json", ".fp")
+
+def audio_id(content: bytes) -> str:
+    """The archive ID of a recording: the hex SHA-256 of its bytes."""
+    return hashlib.sha256(content).hexdigest()
+
+def audio_url(audio_id: str) -> str:
+    return f"/audio/{audio_id}"
+
+class AudioArchive:
+    """Deduplicated on-disk store of recordings and their timestamp indexes."""
+
+    def __init__(self, root: str, max_bytes: int = 0):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _dir(self, audio_id: str) -> Path:
+        return self.root / audio_id[:2]
+
+    def _write(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp_")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def put(self, content: bytes, container: str, digest: str | None = None) -> tuple:
+        """Store a recording unless it is already archived; returns ``(audio_id, path)``."""
+        digest = digest or audio_id(content)
+        path = self._dir(digest) / (digest + CONTAINERS[container][0])
+        if path.exists():
+            # Keep recordings that are still being replayed or re-uploaded at the back of the eviction order
+            os.utime(path)
+            metrics.incr("archive.deduplicated")
+            return digest, path
+        self._write(path, content)
+        metrics.incr("archive.stored")
+        if self.max_bytes:
+            self.prune()
+        return digest, path
+
+    def put_file(self, source: Path, container: str, digest: str) -> tuple:
+        """Store a recording that is already on disk, hard-linked rather than copied when possible."""
+        path = self._dir(digest) / (digest + CONTAINERS[container][0])
+        if path.exists():
+            os.utime(path)
+            metrics.incr("archive.deduplicated")
+            return digest, path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(source, path)
+        except FileExistsError:
+            pass  # another worker stored the same recording first
+        except OSError:
+            # A different filesystem (or no hard links): copy it the usual way
+            self._write(path, Path(source).read_bytes())
+        metrics.incr("archive.stored")
+        if self.max_bytes:
+            self.prune()
+        return digest, path
+
+    def find(self, audio_id: str) -> tuple | None:
+        """Return ``(path, media_type)`` for an archived recording, or None."""
+        if not _AUDIO_ID.match(audio_id):
+            return None
+        for extension, media_type in CONTAINERS.values():
+            path = self._dir(audio_id) / (audio_id + extension)
+            if path.exists():
+                return path, media_type
+        return None
+
+    def put_transcript(self, audio_id: str, transcript: dict) -> None:
+        self._write(self._dir(audio_id) / f"{audio_id}.json", json.dumps(transcript, separators=(",", ":")).encode("utf-8"))
+
+    def get_transcript(self, audio_id: str) -> dict | None:
+        """Return a recording's ``{text, segments, words, ...}``, or None if it has none."""
+        if not _AUDIO_ID.match(audio_id):
+            return None
+        try:
+            with open(self._dir(audio_id) / f"{audio_id}.json", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put_fingerprint(self, audio_id: str, fingerprint: Fingerprint) -> None:
+        self._write(self._dir(audio_id) / f"{audio_id}.fp", fingerprint.to_bytes())
+
+    def get_fingerprint(self, audio_id: str) -> Fingerprint | None:
+        try:
+            return Fingerprint.from_bytes((self._dir(audio_id) / f"{audio_id}.fp").read_bytes())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def fingerprint_ids(self) -> list:
+        """IDs of every recording with an archived fingerprint."""
+        if not self.root.exists():
+            return []
+        return [path.stem for path in self.root.glob("??/*.fp")]
+
+    def prune(self) -> int:
+        """Remove least recently used recordings until under max_bytes; returns how many went."""
+        with self._lock:
+            recordings = []
+            total = 0
+            directories = [d for d in self.root.iterdir() if d.is_dir()] if self.root.exists() else []
+            for directory in directories:
+                for entry in os.scandir(directory):
+                    if entry.name.startswith(".") or entry.name.endswith(SIDECARS):
+                        continue
+                    stat = entry.stat()
+                    recordings.append((stat.st_mtime, stat.st_size, Path(entry.path)))
+                    total += stat.st_size
+            removed = 0
+            for _, size, path in sorted(recordings):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                for suffix in SIDECARS:
+                    path.with_suffix(suffix).unlink(missing_ok=True)
+                total -= size
+                removed += 1
+        if removed:
+            metrics.incr("archive.evicted", removed)
+        return removed
+
+archive = AudioArchive(settings.ARCHIVE_DIR, max_bytes=settings.ARCHIVE_MAX_MB * 1024 * 1024)
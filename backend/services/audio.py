@@ -1,213 +1,178 @@
-import json
+from typing import TYPE_CHECKING
 from fastapi import HTTPException
-from openai import OpenAI
-from prompts import TASK_SYSTEM_PROMPT, ROADMAP_SYSTEM_PROMPT, PROCESS_SYSTEM_PROMPT
-
-def create_openrouter_client(api_key: str) -> OpenAI:
-    """Create an OpenRouter client."""
-    return OpenAI(
-        base_url="https://openrouter.ai/api/v1",
-        api_key=api_key,
-        default_headers={
-            "HTTP-Referer": "https://voxify.app",
-            "X-Title": "Voxify"
-        }
-    )
+from pydantic import BaseModel, ValidationError
+from models import ProcessedOutput, StrategicRoadmap, ProcessDocument, CombinedOutput
+from prompts import (
+    TASK_SYSTEM_PROMPT,
+    ROADMAP_SYSTEM_PROMPT,
+    PROCESS_SYSTEM_PROMPT,
+    COMBINED_SYSTEM_PROMPT
+)
+from config import settings
+from utils import metrics, compact_transcript, estimate_tokens
+from .generation import DEFAULT_MODEL, generate_structured, request_payload, track, validate_with_repair
+from .breaker import upstream_error
+from .deadline import DeadlineExceeded
+from .batcher import structuring_batcher
+from .usage import note, stage
 
-async def process_transcript_to_tasks(transcript: str, openrouter_client: OpenAI) -> dict:
-    """Process the transcript into tasks using Claude 3.5 Sonnet."""
-    try:
-        if not openrouter_client or not hasattr(openrouter_client, 'chat'):
-            print("OpenRouter client not properly initialized")
-            raise ValueError("API client not properly initialized")
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# Model, system prompt and user instructions for each output format
+FORMAT_SPECS = {
+    "tasks": {
+        "model_cls": ProcessedOutput,
+        "system_prompt": TASK_SYSTEM_PROMPT,
+        "instructions": """Analyze this voice memo transcript and extract tasks, next steps, and important notes.
+                    Focus on creating a clear, actionable project plan while preserving the context and relationships between ideas."""
+    },
+    "roadmap": {
+        "model_cls": StrategicRoadmap,
+        "system_prompt": ROADMAP_SYSTEM_PROMPT,
+        "instructions": """Analyze this voice memo transcript and create a strategic roadmap.
+                    Focus on extracting key strategic elements and organizing them into a comprehensive plan."""
+    },
+    "process": {
+        "model_cls": ProcessDocument,
+        "system_prompt": PROCESS_SYSTEM_PROMPT,
+        "instructions": """Convert this voice memo transcript into a clear process document.
+                    Focus on extracting sequential steps, prerequisites, and important details while maintaining clarity."""
+    },
+    "all": {
+        "model_cls": CombinedOutput,
+        "system_prompt": COMBINED_SYSTEM_PROMPT,
+        "instructions": """Analyze this voice memo transcript and produce a task list, a strategic roadmap and a process document.
+                    Keep the three views consistent while preserving the context and relationships between ideas."""
+    }
+}
+
+def _user_prompt(instructions: str, transcript: str) -> str:
+    return f"""{instructions}
 
-        print("Starting task processing with OpenRouter...")
-        response = openrouter_client.chat.completions.create(
-            model="anthropic/claude-3.5-sonnet",
-            messages=[
-                {
-                    "role": "system",
-                    "content": TASK_SYSTEM_PROMPT
-                },
-                {
-                    "role": "user",
-                    "content": f"""Analyze this voice memo transcript and extract tasks, next steps, and important notes. 
-                    Focus on creating a clear, actionable project plan while preserving the context and relationships between ideas.
-                    
                     Transcript:
                     {transcript}"""
-                }
-            ]
-        )
-        
-        # Extract JSON from response
-        response_text = response.choices[0].message.content
-        print("Task API Response:", response_text)  # Debug log
-        
-        json_start = response_text.find('{')
-        json_end = response_text.rfind('}') + 1
-        
-        if json_start >= 0 and json_end > json_start:
-            json_str = response_text[json_start:json_end]
-            try:
-                return json.loads(json_str)
-            except json.JSONDecodeError as e:
-                print(f"JSON Decode Error: {str(e)}")
-                print(f"Attempted to parse: {json_str}")
-                raise HTTPException(
-                    status_code=500,
-                    detail="Error parsing AI response format"
-                )
-        else:
-            raise ValueError("No valid JSON found in response")
-            
-    except Exception as e:
-        print(f"Error in process_transcript_to_tasks: {str(e)}")
-        if "api_key" in str(e).lower():
-            raise HTTPException(
-                status_code=500,
-                detail="API key configuration error. Please check your environment variables."
-            )
-        elif "connection" in str(e).lower():
-            raise HTTPException(
-                status_code=500,
-                detail="Unable to connect to AI service. Please try again later."
+
+def _compact(transcript: str) -> str:
+    """Strip disfluencies before structuring and record the tokens that saves."""
+    with stage("compaction"):
+        compacted = compact_transcript(transcript, settings.TRANSCRIPT_COMPACTION)
+    before, after = estimate_tokens(transcript), estimate_tokens(compacted)
+    note(transcript_tokens=before, compacted_tokens=after)
+    metrics.incr("compaction.tokens_before", before)
+    metrics.incr("compaction.tokens_after", after)
+    return compacted
+
+async def _generate_combined(transcript: str, openrouter_client: "OpenAI", model: str = DEFAULT_MODEL) -> CombinedOutput:
+    """Generate all formats in one completion and validate each part on its own.
+
+    A part that is missing or cannot be repaired is regenerated with its
+    single-format prompt, so one bad section never discards the other two.
+    """
+    spec = FORMAT_SPECS["all"]
+    data = await request_payload(
+        openrouter_client,
+        CombinedOutput,
+        system_prompt=spec["system_prompt"],
+        user_prompt=_user_prompt(spec["instructions"], transcript),
+        label="all",
+        model=model
+    )
+
+    parts = {}
+    for key in ("tasks", "roadmap", "process"):
+        part_spec = FORMAT_SPECS[key]
+        label = f"all.{key}"
+        track(label)
+        try:
+            parts[key] = await validate_with_repair(
+                openrouter_client, part_spec["model_cls"], data.get(key), transcript, label, model
             )
-        else:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Error processing transcript: {str(e)}"
+        except (ValidationError, ValueError) as e:
+            print(f"Combined {key} part unusable ({str(e)}), falling back to a single-format call")
+            metrics.incr("generation.all.part_fallbacks")
+            parts[key] = await generate_structured(
+                openrouter_client,
+                part_spec["model_cls"],
+                system_prompt=part_spec["system_prompt"],
+                user_prompt=_user_prompt(part_spec["instructions"], transcript),
+                transcript=transcript,
+                label=key,
+                model=model
             )
+    # Every part is already validated; don't pay for it a second time
+    return CombinedOutput.model_construct(**parts)
 
-async def process_transcript_to_roadmap(transcript: str, openrouter_client: OpenAI) -> dict:
-    """Process the transcript into a strategic roadmap using Claude 3.5 Sonnet."""
+async def structure_transcript(
+    transcript: str,
+    openrouter_client: "OpenAI",
+    output_format: str,
+    model: str = DEFAULT_MODEL,
+    batch: bool = True
+) -> BaseModel:
+    """Run schema-constrained structuring for one format and map failures to HTTP errors.
+
+    Returns the validated model instance, ready to serialize without re-validation.
+    Pass ``batch=False`` when the caller already holds a structuring slot: the
+    batcher queues for slots of its own, so it must not be entered from one.
+    """
     try:
         if not openrouter_client or not hasattr(openrouter_client, 'chat'):
             print("OpenRouter client not properly initialized")
             raise ValueError("API client not properly initialized")
 
-        print("Starting roadmap processing with OpenRouter...")
-        response = openrouter_client.chat.completions.create(
-            model="anthropic/claude-3.5-sonnet",
-            messages=[
-                {
-                    "role": "system",
-                    "content": ROADMAP_SYSTEM_PROMPT
-                },
-                {
-                    "role": "user",
-                    "content": f"""Analyze this voice memo transcript and create a strategic roadmap. 
-                    Focus on extracting key strategic elements and organizing them into a comprehensive plan.
-                    
-                    Transcript:
-                    {transcript}"""
-                }
-            ]
-        )
-        
-        # Extract JSON from response
-        response_text = response.choices[0].message.content
-        print("Roadmap API Response:", response_text)  # Debug log
-        
-        json_start = response_text.find('{')
-        json_end = response_text.rfind('}') + 1
-        
-        if json_start >= 0 and json_end > json_start:
-            json_str = response_text[json_start:json_end]
-            try:
-                parsed_data = json.loads(json_str)
-                print("Successfully parsed JSON:", parsed_data)  # Debug log
-                return parsed_data
-            except json.JSONDecodeError as e:
-                print(f"JSON Decode Error: {str(e)}")
-                print(f"Attempted to parse: {json_str}")
-                raise HTTPException(
-                    status_code=500,
-                    detail="Error parsing AI response format"
-                )
-        else:
-            print("No JSON found in response")  # Debug log
-            raise ValueError("No valid JSON found in response")
-            
-    except Exception as e:
-        print(f"Error in process_transcript_to_roadmap: {str(e)}")
-        if "api_key" in str(e).lower():
-            raise HTTPException(
-                status_code=500,
-                detail="API key configuration error. Please check your environment variables."
-            )
-        elif "connection" in str(e).lower():
-            raise HTTPException(
-                status_code=500,
-                detail="Unable to connect to AI service. Please try again later."
+        print(f"Starting {output_format} processing with OpenRouter...")
+        transcript = _compact(transcript)
+        if output_format == "all":
+            result = await _generate_combined(transcript, openrouter_client, model)
+        elif batch and structuring_batcher.accepts(transcript, output_format):
+            spec = FORMAT_SPECS[output_format]
+            result = await structuring_batcher.structure(
+                openrouter_client,
+                output_format,
+                spec,
+                transcript,
+                _user_prompt(spec["instructions"], transcript),
+                model
             )
         else:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Error processing transcript: {str(e)}"
+            spec = FORMAT_SPECS[output_format]
+            result = await generate_structured(
+                openrouter_client,
+                spec["model_cls"],
+                system_prompt=spec["system_prompt"],
+                user_prompt=_user_prompt(spec["instructions"], transcript),
+                transcript=transcript,
+                label=output_format,
+                model=model
             )
+        return result
 
-async def process_transcript_to_process_doc(transcript: str, openrouter_client: OpenAI) -> dict:
-    """Process the transcript into a process document using Claude 3.5 Sonnet."""
-    try:
-        if not openrouter_client or not hasattr(openrouter_client, 'chat'):
-            print("OpenRouter client not properly initialized")
-            raise ValueError("API client not properly initialized")
-
-        print("Starting process doc processing with OpenRouter...")
-        response = openrouter_client.chat.completions.create(
-            model="anthropic/claude-3.5-sonnet",
-            messages=[
-                {
-                    "role": "system",
-                    "content": PROCESS_SYSTEM_PROMPT
-                },
-                {
-                    "role": "user",
-                    "content": f"""Convert this voice memo transcript into a clear process document. 
-                    Focus on extracting sequential steps, prerequisites, and important details while maintaining clarity.
-                    
-                    Transcript:
-                    {transcript}"""
-                }
-            ]
-        )
-        
-        # Extract JSON from response
-        response_text = response.choices[0].message.content
-        print("Process Doc API Response:", response_text)  # Debug log
-        
-        json_start = response_text.find('{')
-        json_end = response_text.rfind('}') + 1
-        
-        if json_start >= 0 and json_end > json_start:
-            json_str = response_text[json_start:json_end]
-            try:
-                return json.loads(json_str)
-            except json.JSONDecodeError as e:
-                print(f"JSON Decode Error: {str(e)}")
-                print(f"Attempted to parse: {json_str}")
-                raise HTTPException(
-                    status_code=500,
-                    detail="Error parsing AI response format"
-                )
-        else:
-            raise ValueError("No valid JSON found in response")
-            
+    except (HTTPException, DeadlineExceeded):
+        raise
     except Exception as e:
-        print(f"Error in process_transcript_to_process_doc: {str(e)}")
+        print(f"Error in {output_format} processing: {str(e)}")
         if "api_key" in str(e).lower():
-            raise HTTPException(
-                status_code=500,
-                detail="API key configuration error. Please check your environment variables."
-            )
+            detail = "API key configuration error. Please check your environment variables."
         elif "connection" in str(e).lower():
-            raise HTTPException(
-                status_code=500,
-                detail="Unable to connect to AI service. Please try again later."
-            )
+            detail = "Unable to connect to AI service. Please try again later."
         else:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Error processing transcript: {str(e)}"
-            )
+            detail = f"Error processing transcript: {str(e)}"
+        # The upstream's own status when it failed, so only its outages trip the breaker
+        raise upstream_error(e, detail)
+
+async def process_transcript_to_tasks(transcript: str, openrouter_client: "OpenAI") -> dict:
+    """Process the transcript into tasks using Claude 3.5 Sonnet."""
+    return (await structure_transcript(transcript, openrouter_client, "tasks")).model_dump()
+
+async def process_transcript_to_roadmap(transcript: str, openrouter_client: "OpenAI") -> dict:
+    """Process the transcript into a strategic roadmap using Claude 3.5 Sonnet."""
+    return (await structure_transcript(transcript, openrouter_client, "roadmap")).model_dump()
+
+async def process_transcript_to_process_doc(transcript: str, openrouter_client: "OpenAI") -> dict:
+    """Process the transcript into a process document using Claude 3.5 Sonnet."""
+    return (await structure_transcript(transcript, openrouter_client, "process")).model_dump()
+
+async def process_transcript_to_all(transcript: str, openrouter_client: "OpenAI") -> dict:
+    """Process the transcript into tasks, a roadmap and a process document in one completion."""
+    return (await structure_transcript(transcript, openrouter_client, "all")).model_dump()
@@ -0,0 +1,293 @@
+"""
+Structuring Micro-Batches
+
+Short memos are dominated by the fixed cost of a completion: the system
+prompt is larger than the transcript, and each call pays its own round
+trip. The batcher collects short transcripts of one format for a moment
+and sends them as one completion of delimited ``<memo id="N">`` blocks,
+whose tool returns one result per memo. Each caller then validates (and
+if needed repairs) only its own result, in its own request context.
+
+A batch takes a single structuring scheduler slot, and stays open to new
+memos until it gets one, so batches grow on their own when the upstream
+is busy. The initial wait adapts as well: it is derived from the recent
+gap between short memos of that format, and is zero when nobody is
+likely to join, so a quiet server adds no latency. The batch size limit
+halves whenever a batch comes back unusable and creeps back up after
+each good one. Memos of a failed batch, and any memo missing from a
+batch's results, fall back to their own single-format completion.
+
+Token usage of a shared completion is split between the requests in it
+in proportion to their transcript lengths.
+"""
+
+import asyncio
+import contextvars
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Type
+from pydantic import BaseModel, ValidationError, create_model
+from config import settings
+from prompts import BATCH_SYSTEM_PROMPT_SUFFIX
+from utils import metrics
+from .deadline import current_deadline, start_deadline
+from .generation import DEFAULT_MODEL, generate_structured, request_payload, validate_with_repair
+from .scheduler import JobScheduler, estimate_structuring_seconds, structuring_scheduler
+from .usage import begin_record, current_record, note_shared_completion
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# Formats whose outputs are small enough to return several of in one completion
+BATCHABLE_FORMATS = ("tasks", "roadmap", "process")
+# Gaps longer than this count as idle, so one quiet spell doesn't skew the estimate
+_IDLE_GAP_SECONDS = 10.0
+_GAP_SMOOTHING = 0.2
+
+@lru_cache(maxsize=None)
+def batch_model(model_cls: Type[BaseModel]) -> Type[BaseModel]:
+    """The tool model for a batch: one ``{memo, output}`` result per memo."""
+    item = create_model(f"{model_cls.__name__}BatchItem", memo=(int, ...), output=(model_cls, ...))
+    return create_model(f"{model_cls.__name__}Batch", results=(List[item], ...))
+
+class _Member:
+    __slots__ = ("transcript", "user_prompt", "future", "deadline", "record")
+
+    def __init__(self, transcript: str, user_prompt: str):
+        self.transcript = transcript
+        self.user_prompt = user_prompt
+        self.future = asyncio.get_running_loop().create_future()
+        self.deadline = current_deadline()
+        self.record = current_record()
+
+class _Batch:
+    __slots__ = ("members", "closed", "full")
+
+    def __init__(self):
+        self.members = []
+        self.closed = False
+        self.full = asyncio.Event()
+
+class StructuringBatcher:
+    """Coalesces concurrent short transcripts of one format into shared completions."""
+
+    def __init__(
+        self,
+        scheduler: JobScheduler,
+        max_chars: int = 600,
+        max_size: int = 8,
+        max_wait: float = 0.3,
+        enabled: bool = True
+    ):
+        self.scheduler = scheduler
+        self.max_chars = max_chars
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.enabled = enabled
+        self._open = {}
+        self._limits = {}
+        self._gaps = {}
+        self._last_arrival = {}
+        self._tasks = set()
+
+    def accepts(self, transcript: str, output_format: str) -> bool:
+        """True when a transcript would be batched rather than structured on its own."""
+        return (
+            self.enabled
+            and self.max_size > 1
+            and output_format in BATCHABLE_FORMATS
+            and len(transcript) <= self.max_chars
+        )
+
+    def _limit(self, output_format: str) -> int:
+        return self._limits.get(output_format, self.max_size)
+
+    def _note_arrival(self, output_format: str) -> None:
+        now = time.monotonic()
+        last = self._last_arrival.get(output_format)
+        self._last_arrival[output_format] = now
+        if last is None:
+            return
+        gap = min(now - last, _IDLE_GAP_SECONDS)
+        previous = self._gaps.get(output_format)
+        self._gaps[output_format] = gap if previous is None else (1 - _GAP_SMOOTHING) * previous + _GAP_SMOOTHING * gap
+
+    def _window(self, output_format: str) -> float:
+        """How long a new batch waits for company before queueing for a slot."""
+        gap = self._gaps.get(output_format)
+        if gap is None or gap >= self.max_wait:
+            return 0.0
+        return min(self.max_wait, gap * (self._limit(output_format) - 1))
+
+    async def structure(
+        self,
+        client: "OpenAI",
+        output_format: str,
+        spec: dict,
+        transcript: str,
+        user_prompt: str,
+        model: str = DEFAULT_MODEL
+    ) -> BaseModel:
+        """Structure one short transcript, sharing a completion with concurrent ones where possible."""
+        self._note_arrival(output_format)
+        key = (output_format, id(client), model)
+        batch = self._open.get(key)
+        if batch is None:
+            batch = self._open[key] = _Batch()
+            window = self._window(output_format)
+            # A clean context: the shared call belongs to no single request's deadline or usage record
+            task = asyncio.get_running_loop().create_task(
+                self._flush(key, batch, client, output_format, spec, window), context=contextvars.Context()
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        member = _Member(transcript, user_prompt)
+        batch.members.append(member)
+        if len(batch.members) >= self._limit(output_format):
+            self._close(key, batch)
+            batch.full.set()
+
+        try:
+            # Shielded: one caller going away must not cancel the others' completion
+            data = await asyncio.shield(member.future)
+        except asyncio.CancelledError:
+            if not batch.closed:
+                batch.members.remove(member)
+            raise
+
+        label = output_format
+        if data is not None:
+            try:
+                return await validate_with_repair(client, spec["model_cls"], data, transcript, label, model)
+            except (ValidationError, ValueError) as e:
+                print(f"Batched {output_format} result unusable ({str(e)}), falling back to a single call")
+        metrics.incr(f"batcher.{output_format}.fallbacks")
+        return await self.scheduler.run(
+            estimate_structuring_seconds(transcript),
+            generate_structured,
+            client,
+            spec["model_cls"],
+            system_prompt=spec["system_prompt"],
+            user_prompt=user_prompt,
+            transcript=transcript,
+            label=label,
+            model=model
+        )
+
+    def _close(self, key: tuple, batch: _Batch) -> None:
+        batch.closed = True
+        if self._open.get(key) is batch:
+            del self._open[key]
+
+    async def _flush(self, key: tuple, batch: _Batch, client: "OpenAI", output_format: str, spec: dict, window: float) -> None:
+        if window > 0:
+            try:
+                await asyncio.wait_for(batch.full.wait(), window)
+            except asyncio.TimeoutError:
+                pass
+        try:
+            estimate = estimate_structuring_seconds("".join(member.transcript for member in batch.members))
+            await self.scheduler.run(estimate, self._send, key, batch, client, output_format, spec)
+        except asyncio.CancelledError:
+            self._close(key, batch)
+            for member in batch.members:
+                member.future.cancel()
+            raise
+        except Exception as e:
+            self._close(key, batch)
+            # Upstream and deadline errors reach every caller, as they would have on their own
+            for member in batch.members:
+                if not member.future.done():
+                    member.future.set_exception(e)
+
+    async def _send(self, key: tuple, batch: _Batch, client: "OpenAI", output_format: str, spec: dict) -> None:
+        """Run the shared completion and hand each member its raw result (None: call on your own)."""
+        self._close(key, batch)
+        members = batch.members
+        if not members:
+            return
+        deadlines = [member.deadline for member in members if member.deadline is not None]
+        if deadlines:
+            # Worth finishing while any member is still waiting for it
+            start_deadline(max(deadline.remaining() for deadline in deadlines))
+        shared = begin_record()
+
+        if len(members) == 1:
+            # Alone after all: the usual single-format prompt, with no batch overhead
+            data = await request_payload(
+                client,
+                spec["model_cls"],
+                system_prompt=spec["system_prompt"],
+                user_prompt=members[0].user_prompt,
+                label=output_format,
+                model=key[2]
+            )
+            results = {0: data}
+        else:
+            metrics.incr(f"batcher.{output_format}.batches")
+            metrics.incr(f"batcher.{output_format}.batched", len(members))
+            results = await self._request_batch(client, output_format, spec, members, key[2])
+
+        total_chars = sum(len(member.transcript) for member in members) or 1
+        for index, member in enumerate(members):
+            note_shared_completion(member.record, shared, len(member.transcript) / total_chars)
+            if member.record is not None and len(members) > 1:
+                member.record["batch_size"] = len(members)
+            if not member.future.done():
+                member.future.set_result(results.get(index))
+
+    async def _request_batch(self, client: "OpenAI", output_format: str, spec: dict, members: list, model: str) -> dict:
+        memos = "\n\n".join(
+            f'<memo id="{index + 1}">\n{member.transcript}\n</memo>' for index, member in enumerate(members)
+        )
+        limit = self._limit(output_format)
+        try:
+            data = await request_payload(
+                client,
+                batch_model(spec["model_cls"]),
+                system_prompt=f"{spec['system_prompt']}\n\n{BATCH_SYSTEM_PROMPT_SUFFIX}",
+                user_prompt=f"{spec['instructions']}\n\n{memos}",
+                label=f"{output_format}.batch",
+                model=model
+            )
+            results = data.get("results")
+            if not isinstance(results, list):
+                raise ValueError("Batch response has no results list")
+        except ValueError as e:
+            # Smaller batches are easier to get right; every memo gets its own call this time
+            print(f"Batch of {len(members)} {output_format} memos unusable ({str(e)}), falling back to single calls")
+            metrics.incr(f"batcher.{output_format}.parse_failures")
+            self._limits[output_format] = max(2, limit // 2)
+            return {}
+
+        by_index = {}
+        for item in results:
+            if isinstance(item, dict) and isinstance(item.get("memo"), int) and isinstance(item.get("output"), dict):
+                by_index.setdefault(item["memo"] - 1, item["output"])
+        self._limits[output_format] = min(self.max_size, limit + 1)
+        metrics.set_gauge(f"batcher.{output_format}.limit", self._limits[output_format])
+        return by_index
+
+    def stats(self) -> dict:
+        """Batch counts, average batch size, fallbacks and current limits per format."""
+        stats = {}
+        for output_format in BATCHABLE_FORMATS:
+            prefix = f"batcher.{output_format}"
+            batches = metrics.get(f"{prefix}.batches")
+            stats[output_format] = {
+                "batches": batches,
+                "average_size": round(metrics.get(f"{prefix}.batched") / batches, 2) if batches else 0.0,
+                "parse_failures": metrics.get(f"{prefix}.parse_failures"),
+                "fallbacks": metrics.get(f"{prefix}.fallbacks"),
+                "size_limit": self._limit(output_format),
+                "wait_ms": round(self._window(output_format) * 1000)
+            }
+        return stats
+
+structuring_batcher = StructuringBatcher(
+    structuring_scheduler,
+    max_chars=settings.BATCH_MAX_CHARS,
+    max_size=settings.BATCH_MAX_SIZE,
+    max_wait=settings.BATCH_MAX_WAIT_MS / 1000,
+    enabled=settings.BATCH_ENABLED
+)
@@ -0,0 +1,205 @@
+"""
+Circuit Breakers
+
+One breaker per upstream (Whisper, OpenRouter). A breaker opens when, over
+its last ``window`` calls, the share of failed or slow calls reaches
+``failure_rate``; while open, calls fail immediately with
+``CircuitOpenError`` instead of waiting on a dead upstream. After
+``open_seconds`` a single trial call is let through (half-open): success
+closes the circuit, failure opens it again.
+
+Only what says something about the upstream counts as a failure: a 5xx
+from it, a timeout or a connection error. Its 4xx answers, our own
+validation and repair failures and our own deadline do not. Routes raise
+``UpstreamError`` to carry the upstream's status out to the client.
+"""
+
+import asyncio
+import time
+from collections import deque
+from fastapi import HTTPException
+from config import settings
+from utils import metrics
+from .deadline import DeadlineExceeded
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable (circuit open)")
+        self.name = name
+        self.retry_after = retry_after
+
+class UpstreamError(HTTPException):
+    """An upstream call failed; ``status_code`` is the upstream's own (see ``upstream_status``)."""
+
+def upstream_status(error: BaseException) -> int | None:
+    """The HTTP status an upstream failure maps to, or None when the error is not the upstream's.
+
+    An OpenAI ``APIStatusError`` keeps the status it carries; timeouts are
+    504 and connection errors 502. Matched by class name, so ``openai``
+    stays a lazy import.
+    """
+    if isinstance(error, (HTTPException, DeadlineExceeded)):
+        return None
+    names = {cls.__name__ for cls in type(error).__mro__}
+    if "APIStatusError" in names:
+        return error.status_code
+    if names & {"APITimeoutError", "TimeoutException"} or isinstance(error, TimeoutError):
+        return 504
+    if names & {"APIConnectionError", "ConnectError", "NetworkError"} or isinstance(error, ConnectionError):
+        return 502
+    return None
+
+def upstream_error(error: BaseException, detail: str) -> HTTPException:
+    """Wrap a failed upstream call: with the upstream's status when it has one, a plain 500 otherwise."""
+    status_code = upstream_status(error)
+    if status_code is None:
+        return HTTPException(status_code=500, detail=detail)
+    if status_code in (401, 403):
+        # Our credentials were refused: an outage, not the client's problem
+        status_code = 502
+    return UpstreamError(status_code=status_code, detail=detail)
+
+def _is_failure(error: BaseException) -> bool:
+    if isinstance(error, UpstreamError):
+        return error.status_code >= 500
+    if isinstance(error, HTTPException):
+        # Client errors and our own validation or repair failures say nothing about the upstream
+        return False
+    status_code = upstream_status(error)
+    return status_code is not None and status_code >= 500
+
+class CircuitBreaker:
+    """Error-rate and latency circuit breaker around calls to one upstream."""
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 120.0,
+        open_seconds: float = 30.0,
+        slow_call_per_second: float = 0.0
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_per_second = slow_call_per_second
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._trial_running = False
+        metrics.set_gauge(f"breaker.{name}.open", 0)
+
+    def retry_after(self) -> float:
+        """Seconds until the next half-open trial (0 when closed)."""
+        if self.state == CLOSED:
+            return 0.0
+        return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def rejects(self) -> bool:
+        """True when a call right now would be refused, without claiming the trial slot."""
+        if self.state == CLOSED:
+            return False
+        if self.state == OPEN and self.retry_after() > 0:
+            return True
+        return self._trial_running
+
+    def _admit(self) -> None:
+        if self.state == OPEN and self.retry_after() <= 0:
+            self.state = HALF_OPEN
+        if self.state == OPEN or (self.state == HALF_OPEN and self._trial_running):
+            metrics.incr(f"breaker.{self.name}.rejected")
+            raise CircuitOpenError(self.name, self.retry_after() or self.open_seconds)
+        if self.state == HALF_OPEN:
+            self._trial_running = True
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        metrics.incr(f"breaker.{self.name}.opened")
+        metrics.set_gauge(f"breaker.{self.name}.open", 1)
+        print(f"Circuit for {self.name} opened; failing fast for {self.open_seconds:.0f}s")
+
+    def record(self, ok: bool) -> None:
+        """Record one call outcome and move between states."""
+        if self.state == HALF_OPEN:
+            self._trial_running = False
+            if ok:
+                self.state = CLOSED
+                self._outcomes.clear()
+                metrics.set_gauge(f"breaker.{self.name}.open", 0)
+                print(f"Circuit for {self.name} closed after a successful trial")
+            else:
+                self._open()
+            return
+
+        self._outcomes.append(ok)
+        failures = self._outcomes.count(False)
+        if (
+            self.state == CLOSED
+            and len(self._outcomes) >= self.min_calls
+            and failures / len(self._outcomes) >= self.failure_rate
+        ):
+            self._open()
+
+    def slow_after(self, work_seconds: float = 0.0) -> float:
+        """Seconds after which a call is counted as slow, for a call over work_seconds of audio."""
+        return self.slow_call_seconds + self.slow_call_per_second * work_seconds
+
+    async def call(self, func, *args, work_seconds: float = 0.0, **kwargs):
+        """Run func through the breaker; sync callables run on a worker thread.
+
+        ``work_seconds`` (the audio duration for a transcription) raises the
+        slow-call threshold for calls that are expected to take longer.
+        """
+        self._admit()
+        started = time.monotonic()
+        try:
+            if asyncio.iscoroutinefunction(func):
+                result = await func(*args, **kwargs)
+            else:
+                result = await asyncio.to_thread(func, *args, **kwargs)
+        except BaseException as e:
+            if _is_failure(e):
+                self.record(False)
+            elif self.state == HALF_OPEN:
+                # A cancelled, expired or client-error trial proves nothing; let the next call try
+                self._trial_running = False
+            raise
+        # A call that works but takes forever is as bad as a failure for waiting users
+        self.record(time.monotonic() - started < self.slow_after(work_seconds))
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "recent_calls": len(self._outcomes),
+            "recent_failures": self._outcomes.count(False),
+            "retry_after": round(self.retry_after(), 1)
+        }
+
+def _breaker(name: str, slow_call_seconds: float, slow_call_per_second: float = 0.0) -> CircuitBreaker:
+    return CircuitBreaker(
+        name,
+        window=settings.BREAKER_WINDOW,
+        min_calls=settings.BREAKER_MIN_CALLS,
+        failure_rate=settings.BREAKER_FAILURE_RATE,
+        slow_call_seconds=slow_call_seconds,
+        open_seconds=settings.BREAKER_OPEN_SECONDS,
+        slow_call_per_second=slow_call_per_second
+    )
+
+# A transcription is slow relative to the audio it transcribes
+whisper_breaker = _breaker(
+    "whisper",
+    settings.BREAKER_WHISPER_SLOW_CALL_SECONDS,
+    settings.BREAKER_WHISPER_SLOW_CALL_PER_AUDIO_SECOND
+)
+openrouter_breaker = _breaker("openrouter", settings.BREAKER_SLOW_CALL_SECONDS)
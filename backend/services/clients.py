@@ -0,0 +1,89 @@
+import threading
+import time
+from typing import TYPE_CHECKING
+from config import settings
+from utils import metrics
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+
+def _http_client():
+    """Build the pooled HTTP client for one upstream, keeping warm connections around."""
+    import httpx
+    return httpx.Client(
+        timeout=httpx.Timeout(600.0, connect=10.0),
+        limits=httpx.Limits(
+            max_connections=100,
+            max_keepalive_connections=20,
+            keepalive_expiry=settings.UPSTREAM_KEEPALIVE_SECONDS
+        )
+    )
+
+def create_openai_client(api_key: str) -> "OpenAI":
+    """Create an OpenAI client (used for Whisper)."""
+    from openai import OpenAI
+    return OpenAI(api_key=api_key, http_client=_http_client())
+
+def create_openrouter_client(api_key: str) -> "OpenAI":
+    """Create an OpenRouter client."""
+    from openai import OpenAI
+    return OpenAI(
+        base_url=OPENROUTER_BASE_URL,
+        api_key=api_key,
+        default_headers={
+            "HTTP-Referer": "https://voxify.app",
+            "X-Title": "Voxify"
+        },
+        http_client=_http_client()
+    )
+
+class ClientProvider:
+    """Builds the upstream clients on first use instead of at import time.
+
+    Importing ``openai`` and constructing its clients is a large share of
+    cold-start time, and demo mode never needs them at all.
+    """
+
+    def __init__(self, openai_api_key: str, openrouter_api_key: str):
+        self._keys = {"openai": openai_api_key, "openrouter": openrouter_api_key}
+        self._factories = {"openai": create_openai_client, "openrouter": create_openrouter_client}
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name: str) -> "OpenAI":
+        client = self._clients.get(name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(name)
+                if client is None:
+                    start = time.perf_counter()
+                    client = self._factories[name](self._keys[name])
+                    metrics.set_gauge(f"startup.{name}_client_seconds", round(time.perf_counter() - start, 4))
+                    self._clients[name] = client
+        return client
+
+    @property
+    def openai(self) -> "OpenAI":
+        """The OpenAI client used for Whisper transcription."""
+        return self._get("openai")
+
+    @property
+    def openrouter(self) -> "OpenAI":
+        """The OpenRouter client used for structuring."""
+        return self._get("openrouter")
+
+    def warmup(self) -> None:
+        """Build both clients and open a pooled TLS connection to each upstream."""
+        for name in ("openai", "openrouter"):
+            client = self._get(name)
+            start = time.perf_counter()
+            try:
+                # Any response will do; the point is the TCP/TLS handshake left in the pool
+                client._client.head(str(client.base_url), timeout=5.0)
+            except Exception as e:
+                print(f"Warmup connection to {name} failed: {str(e)}")
+                continue
+            metrics.set_gauge(f"startup.{name}_connect_seconds", round(time.perf_counter() - start, 4))
@@ -0,0 +1,57 @@
+"""
+Request Deadlines
+
+One deadline per request, started when the request arrives and held in a
+context variable so every stage (upload, transcription, structuring and
+any repair calls) sees the same budget. Upstream calls take the remaining
+time as their client timeout, and work is refused outright once the
+deadline has passed.
+"""
+
+import time
+from contextvars import ContextVar
+
+_current_deadline: ContextVar = ContextVar("request_deadline", default=None)
+
+class DeadlineExceeded(TimeoutError):
+    """The request's deadline passed before the work could finish."""
+
+class Deadline:
+    """A point in (monotonic) time by which the request must be answered."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self, stage: str) -> None:
+        """Raise DeadlineExceeded if there is no time left to start a stage."""
+        if self.expired:
+            raise DeadlineExceeded(f"Request deadline of {self.seconds:.0f}s passed before {stage}")
+
+def start_deadline(seconds: float) -> Deadline:
+    """Start the deadline for the current request."""
+    deadline = Deadline(seconds)
+    _current_deadline.set(deadline)
+    return deadline
+
+def current_deadline() -> Deadline | None:
+    """The current request's deadline, or None outside a request."""
+    return _current_deadline.get()
+
+def upstream_timeout(stage: str, floor: float = 1.0) -> dict:
+    """Client kwargs that bound an upstream call by the remaining deadline.
+
+    Returns ``{}`` outside a request so the client's default timeout applies.
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return {}
+    deadline.check(stage)
+    return {"timeout": max(floor, deadline.remaining())}
@@ -0,0 +1,159 @@
+"""
+Fingerprint Index
+
+Finds an archived recording that sounds the same as a new upload, so its
+stored transcript can be reused instead of paying Whisper again for a
+memo that was only re-exported or converted.
+
+All landmark hashes of all indexed recordings live in three parallel
+NumPy arrays sorted by hash. A query looks up each of its hashes with a
+binary search, so the cost grows with the number of matching postings,
+not with the number of recordings. Matches are then counted per
+recording and time offset: a true duplicate lines up many hashes at one
+offset, while chance collisions scatter. The confidence is that count
+over the smaller fingerprint's size.
+
+Fingerprints are persisted in the audio archive, so every worker can
+refresh its index from the recordings the others have transcribed.
+"""
+
+import threading
+import time
+from config import settings
+from utils import metrics
+from utils.fingerprint import Fingerprint, load_numpy
+from .archive import AudioArchive, archive
+
+# Hashes shared by more recordings than this are noise (silence, hum) and are skipped
+MAX_POSTINGS_PER_HASH = 2000
+_OFFSET_BIAS = 1 << 20
+
+class FingerprintIndex:
+    """In-memory inverted index from landmark hash to (recording, time offset)."""
+
+    def __init__(
+        self,
+        store: AudioArchive,
+        min_confidence: float = 0.2,
+        min_matches: int = 20,
+        refresh_seconds: float = 30.0
+    ):
+        self.store = store
+        self.min_confidence = min_confidence
+        self.min_matches = min_matches
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._fingerprints = {}
+        self._pending = True
+        # Recordings seen in the archive; only these can be dropped as pruned
+        self._archived = set()
+        self._refreshed_at = time.monotonic()
+        self._ids = []
+        self._hashes = self._postings = self._offsets = self._sizes = None
+
+    def add(self, audio_id: str, fingerprint: Fingerprint) -> None:
+        with self._lock:
+            if audio_id not in self._fingerprints:
+                self._fingerprints[audio_id] = fingerprint
+                self._pending = True
+
+    def refresh(self) -> None:
+        """Pick up fingerprints archived by other workers and drop pruned recordings.
+
+        A fingerprint added here that has not reached the archive (yet) is
+        kept; only recordings that were archived and are gone are dropped.
+        """
+        archived = set(self.store.fingerprint_ids())
+        with self._lock:
+            known = set(self._fingerprints)
+        loaded = {}
+        for audio_id in archived - known:
+            fingerprint = self.store.get_fingerprint(audio_id)
+            if fingerprint is not None:
+                loaded[audio_id] = fingerprint
+        with self._lock:
+            pruned = (known & self._archived) - archived
+            for audio_id in pruned:
+                self._fingerprints.pop(audio_id, None)
+            self._fingerprints.update(loaded)
+            self._archived = (self._archived - pruned) | archived
+            self._pending = self._pending or bool(loaded) or bool(pruned)
+            self._refreshed_at = time.monotonic()
+
+    def _rebuild(self) -> None:
+        np = load_numpy()
+        ids = list(self._fingerprints)
+        fingerprints = [self._fingerprints[audio_id] for audio_id in ids]
+        if fingerprints:
+            hashes = np.concatenate([fp.hashes for fp in fingerprints])
+            offsets = np.concatenate([fp.offsets for fp in fingerprints])
+            postings = np.repeat(np.arange(len(ids), dtype=np.uint32), [len(fp) for fp in fingerprints])
+            order = np.argsort(hashes, kind="stable")
+            self._hashes, self._offsets, self._postings = hashes[order], offsets[order], postings[order]
+        else:
+            self._hashes = self._offsets = self._postings = np.zeros(0, dtype=np.uint32)
+        self._sizes = np.array([len(fp) for fp in fingerprints], dtype=np.int64)
+        self._ids = ids
+        self._pending = False
+        metrics.set_gauge("fingerprints.indexed", len(ids))
+        metrics.set_gauge("fingerprints.hashes", len(self._hashes))
+
+    def match(self, fingerprint: Fingerprint) -> tuple | None:
+        """Return ``(audio_id, confidence)`` of the best matching recording, or None."""
+        np = load_numpy()
+        if not len(fingerprint):
+            return None
+        if time.monotonic() - self._refreshed_at > self.refresh_seconds:
+            self.refresh()
+        with self._lock:
+            if self._pending:
+                self._rebuild()
+            ids, hashes, offsets, postings, sizes = self._ids, self._hashes, self._offsets, self._postings, self._sizes
+            fingerprints = self._fingerprints
+        if not len(hashes):
+            return None
+
+        left = np.searchsorted(hashes, fingerprint.hashes, side="left")
+        right = np.searchsorted(hashes, fingerprint.hashes, side="right")
+        counts = right - left
+        counts[counts > MAX_POSTINGS_PER_HASH] = 0
+        total = int(counts.sum())
+        if total == 0:
+            return None
+
+        # Flatten every (query hash, posting) pair without a Python loop
+        starts = np.repeat(left, counts)
+        within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        hit = starts + within
+        recordings = postings[hit].astype(np.int64)
+        shift = offsets[hit].astype(np.int64) - np.repeat(fingerprint.offsets.astype(np.int64), counts)
+        keys, aligned = np.unique(recordings * (2 * _OFFSET_BIAS) + shift + _OFFSET_BIAS, return_counts=True)
+
+        best_aligned = np.zeros(len(ids), dtype=np.int64)
+        np.maximum.at(best_aligned, keys // (2 * _OFFSET_BIAS), aligned)
+        scores = best_aligned / np.maximum(np.minimum(sizes, len(fingerprint)), 1)
+
+        for candidate in np.argsort(-scores):
+            confidence = float(scores[candidate])
+            if confidence < self.min_confidence or best_aligned[candidate] < self.min_matches:
+                break
+            candidate_fingerprint = fingerprints.get(ids[candidate])
+            if candidate_fingerprint is not None and _same_length(fingerprint, candidate_fingerprint):
+                return ids[candidate], round(confidence, 3)
+        return None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._fingerprints)
+
+def _same_length(a: Fingerprint, b: Fingerprint) -> bool:
+    # Only the start is fingerprinted; a recording that goes on differently must not match
+    if a.duration_seconds is None or b.duration_seconds is None:
+        return True
+    return abs(a.duration_seconds - b.duration_seconds) <= max(1.0, 0.02 * max(a.duration_seconds, b.duration_seconds))
+
+fingerprint_index = FingerprintIndex(
+    archive,
+    min_confidence=settings.FINGERPRINT_MIN_CONFIDENCE,
+    min_matches=settings.FINGERPRINT_MIN_MATCHES
+)
@@ -0,0 +1,275 @@
+import asyncio
+import json
+import re
+from functools import lru_cache
+from typing import TYPE_CHECKING, Type
+from pydantic import BaseModel, ValidationError
+from prompts import REPAIR_SYSTEM_PROMPT
+from utils import metrics, validate
+from .usage import note_completion
+from .deadline import upstream_timeout
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+DEFAULT_MODEL = "anthropic/claude-3.5-sonnet"
+
+# Labels that have produced at least one generation, for generation_stats()
+_labels = set()
+
+def _inline_refs(schema: dict) -> dict:
+    """Resolve local $ref pointers and drop titles so every provider accepts the schema.
+
+    readOnly properties are filled in by the server, so the model is never asked for them.
+    """
+    defs = schema.get("$defs", {})
+
+    def resolve(node, is_properties=False):
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return resolve(defs[node["$ref"].split("/")[-1]])
+            return {
+                key: resolve(value, is_properties=(key == "properties" and not is_properties))
+                for key, value in node.items()
+                if key != "$defs" and (is_properties or key != "title")
+                and not (is_properties and isinstance(value, dict) and value.get("readOnly"))
+            }
+        if isinstance(node, list):
+            return [resolve(item) for item in node]
+        return node
+
+    return resolve(schema)
+
+@lru_cache(maxsize=None)
+def get_json_schema(model_cls: Type[BaseModel]) -> dict:
+    """Return the self-contained JSON Schema generated from a Pydantic model."""
+    return _inline_refs(model_cls.model_json_schema())
+
+def tool_name(model_cls: Type[BaseModel]) -> str:
+    """Return the function name used to emit a model, e.g. emit_processed_output."""
+    return "emit_" + re.sub(r"(?<!^)(?=[A-Z])", "_", model_cls.__name__).lower()
+
+@lru_cache(maxsize=None)
+def get_tool(model_cls: Type[BaseModel]) -> dict:
+    """Return the tool definition that constrains a completion to a model's schema."""
+    return {
+        "type": "function",
+        "function": {
+            "name": tool_name(model_cls),
+            "description": f"Emit the {model_cls.__name__} extracted from the transcript.",
+            "parameters": get_json_schema(model_cls)
+        }
+    }
+
+def _tool_choice(tool: dict) -> dict:
+    return {"type": "function", "function": {"name": tool["function"]["name"]}}
+
+async def _complete(client: "OpenAI", **kwargs):
+    """Run a blocking chat completion on a worker thread so the event loop stays free.
+
+    The call's timeout is whatever is left of the request deadline.
+    """
+    kwargs.update(upstream_timeout("structuring"))
+    response = await asyncio.to_thread(client.chat.completions.create, **kwargs)
+    note_completion(kwargs["model"], getattr(response, "usage", None))
+    return response
+
+def extract_payload(message) -> dict | None:
+    """Return the JSON object from a tool call, falling back to JSON embedded in the text."""
+    for call in getattr(message, "tool_calls", None) or []:
+        try:
+            data = json.loads(call.function.arguments)
+        except (json.JSONDecodeError, TypeError):
+            continue
+        if isinstance(data, dict):
+            return data
+
+    text = getattr(message, "content", None) or ""
+    json_start = text.find('{')
+    json_end = text.rfind('}') + 1
+    if json_start >= 0 and json_end > json_start:
+        try:
+            data = json.loads(text[json_start:json_end])
+        except json.JSONDecodeError:
+            return None
+        return data if isinstance(data, dict) else None
+    return None
+
+def _failing_paths(error: ValidationError) -> dict:
+    """Group validation errors by the smallest repairable path: a field or one list item."""
+    paths = {}
+    for err in error.errors():
+        loc = tuple(err["loc"])
+        if len(loc) > 1 and isinstance(loc[1], int):
+            path = loc[:2]
+        else:
+            path = loc[:1]
+        paths.setdefault(path, []).append(f"{'.'.join(map(str, loc)) or '<root>'}: {err['msg']}")
+    return paths
+
+def _path_schema(model_cls: Type[BaseModel], path: tuple) -> dict:
+    schema = get_json_schema(model_cls)["properties"][path[0]]
+    if len(path) == 2:
+        schema = schema["items"]
+    return schema
+
+async def _repair_path(
+    client: "OpenAI",
+    model_cls: Type[BaseModel],
+    data: dict,
+    path: tuple,
+    errors: list,
+    transcript: str,
+    model: str
+) -> None:
+    """Re-request a single invalid field (or list item) and patch it into data."""
+    name = ".".join(map(str, path))
+    value = data.get(path[0]) if len(path) == 1 else data[path[0]][path[1]]
+    tool = {
+        "type": "function",
+        "function": {
+            "name": "emit_field",
+            "description": f"Emit the corrected value for `{name}` of {model_cls.__name__}.",
+            "parameters": {
+                "type": "object",
+                "properties": {"value": _path_schema(model_cls, path)},
+                "required": ["value"]
+            }
+        }
+    }
+    error_lines = "\n".join(f"- {line}" for line in errors)
+    response = await _complete(
+        client,
+        model=model,
+        messages=[
+            {"role": "system", "content": REPAIR_SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": f"Field: {name}\n\nInvalid value:\n{json.dumps(value)}\n\n"
+                           f"Validation errors:\n{error_lines}\n\nTranscript:\n{transcript}"
+            }
+        ],
+        tools=[tool],
+        tool_choice=_tool_choice(tool)
+    )
+    payload = extract_payload(response.choices[0].message)
+    if payload is None or "value" not in payload:
+        raise ValueError(f"Repair of field '{name}' returned no value")
+
+    if len(path) == 1:
+        data[path[0]] = payload["value"]
+    else:
+        data[path[0]][path[1]] = payload["value"]
+
+async def validate_with_repair(
+    client: "OpenAI",
+    model_cls: Type[BaseModel],
+    data: dict,
+    transcript: str,
+    label: str,
+    model: str = DEFAULT_MODEL
+) -> BaseModel:
+    """Validate data against model_cls, repairing only the fields that fail."""
+    try:
+        return validate(model_cls, data)
+    except ValidationError as e:
+        metrics.incr(f"generation.{label}.invalid")
+        paths = _failing_paths(e)
+
+    if () in paths:
+        metrics.incr(f"generation.{label}.repair_failures")
+        raise ValueError(f"AI response is not a {model_cls.__name__} object")
+
+    try:
+        for path, errors in paths.items():
+            print(f"Repairing field {'.'.join(map(str, path))} of {model_cls.__name__}")
+            metrics.incr(f"generation.{label}.field_repairs")
+            await _repair_path(client, model_cls, data, path, errors, transcript, model)
+        result = validate(model_cls, data)
+    except Exception:
+        # An unusable repair completion or an upstream error fails the repair too
+        metrics.incr(f"generation.{label}.repair_failures")
+        raise
+    metrics.incr(f"generation.{label}.repaired")
+    return result
+
+def track(label: str) -> None:
+    """Count one generation request for a format label."""
+    _labels.add(label)
+    metrics.incr(f"generation.{label}.requests")
+
+async def request_payload(
+    client: "OpenAI",
+    model_cls: Type[BaseModel],
+    *,
+    system_prompt: str,
+    user_prompt: str,
+    label: str,
+    model: str = DEFAULT_MODEL
+) -> dict:
+    """Run a schema-constrained completion and return the raw, unvalidated JSON object."""
+    track(label)
+    tool = get_tool(model_cls)
+    response = await _complete(
+        client,
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        tools=[tool],
+        tool_choice=_tool_choice(tool)
+    )
+
+    data = extract_payload(response.choices[0].message)
+    if data is None:
+        metrics.incr(f"generation.{label}.parse_failures")
+        print(f"No valid JSON found in {label} response: {response.choices[0].message.content}")
+        raise ValueError("No valid JSON found in response")
+    return data
+
+async def generate_structured(
+    client: "OpenAI",
+    model_cls: Type[BaseModel],
+    *,
+    system_prompt: str,
+    user_prompt: str,
+    transcript: str,
+    label: str,
+    model: str = DEFAULT_MODEL
+) -> BaseModel:
+    """Run a schema-constrained completion and return the validated model instance."""
+    data = await request_payload(
+        client,
+        model_cls,
+        system_prompt=system_prompt,
+        user_prompt=user_prompt,
+        label=label,
+        model=model
+    )
+    return await validate_with_repair(client, model_cls, data, transcript, label, model)
+
+def generation_stats() -> dict:
+    """Return parse-failure and repair rates per output format."""
+    stats = {}
+    for label in sorted(_labels):
+        prefix = f"generation.{label}"
+        stats[label] = {
+            "requests": metrics.get(f"{prefix}.requests"),
+            "parse_failure_rate": metrics.ratio(f"{prefix}.parse_failures", f"{prefix}.requests"),
+            "invalid_rate": metrics.ratio(f"{prefix}.invalid", f"{prefix}.requests"),
+            "field_repairs": metrics.get(f"{prefix}.field_repairs"),
+            "repair_success_rate": metrics.ratio(f"{prefix}.repaired", f"{prefix}.invalid")
+        }
+    return stats
+
+def warm_validators() -> None:
+    """Build every cached schema/tool definition and TypeAdapter, exercising each validator once."""
+    from .audio import FORMAT_SPECS
+    for spec in FORMAT_SPECS.values():
+        model_cls = spec["model_cls"]
+        get_tool(model_cls)
+        try:
+            validate(model_cls, {})
+        except ValidationError:
+            pass
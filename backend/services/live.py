@@ -0,0 +1,216 @@
+"""
+Live Recording
+
+A browser recording over ``/live/{format}`` streams 16-bit little-endian
+mono PCM while the user talks. ``LiveSession`` cuts that stream into
+segments at pauses (or at ``max_segment`` seconds), wraps each one in a WAV
+header and transcribes it right away. Segments are transcribed one after
+another, in order, each with the end of the transcript so far as Whisper's
+prompt so words and spelling carry across the cuts.
+
+When the recording stops only the last segment is left to transcribe, so
+structuring starts a few seconds after the user stops talking rather than
+after a full upload and a full transcription. Segments with no speech in
+them are never sent (Whisper invents text for silence).
+"""
+
+import asyncio
+import io
+import math
+import sys
+import wave
+from array import array
+from utils import metrics
+from utils.fingerprint import FingerprintUnavailable, load_numpy
+
+# Energy is measured over frames of this length
+FRAME_SECONDS = 0.03
+# Characters of the transcript so far passed as the next segment's Whisper prompt
+PROMPT_CHARS = 200
+
+def pcm_to_wav(pcm: bytes, sample_rate: int) -> bytes:
+    """Wrap 16-bit mono PCM in a WAV header."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+def frame_rms(frame: bytes) -> float:
+    """Root-mean-square level of a frame of 16-bit little-endian samples."""
+    samples = array("h", frame)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(sample * sample for sample in samples) / len(samples))
+
+def frame_levels(pcm: bytes, frame_bytes: int) -> list:
+    """RMS level of each whole frame in pcm, all frames at once with NumPy when it is installed."""
+    whole = len(pcm) - len(pcm) % frame_bytes
+    try:
+        np = load_numpy()
+    except FingerprintUnavailable:
+        return [frame_rms(pcm[offset:offset + frame_bytes]) for offset in range(0, whole, frame_bytes)]
+    samples = np.frombuffer(pcm, dtype="<i2", count=whole // 2).astype(np.float64).reshape(-1, frame_bytes // 2)
+    return np.sqrt(np.mean(samples * samples, axis=1)).tolist()
+
+class LiveSession:
+    """Segments, transcribes and joins one live recording.
+
+    ``transcribe(wav, prompt, seconds)`` is an async callable returning
+    ``(text, timestamps)`` for one segment; ``on_segment(segment)`` (if
+    given) is awaited with each transcribed segment as it lands.
+    """
+
+    def __init__(
+        self,
+        transcribe,
+        sample_rate: int = 16000,
+        min_segment: float = 5.0,
+        max_segment: float = 20.0,
+        pause: float = 0.5,
+        silence_level: float = 500.0,
+        keep_bytes: int = 0,
+        on_segment=None
+    ):
+        self.transcribe = transcribe
+        self.sample_rate = sample_rate
+        self.min_segment = min_segment
+        self.max_segment = max_segment
+        self.pause = pause
+        self.silence_level = silence_level
+        self.on_segment = on_segment
+        self.keep_bytes = keep_bytes
+        # The whole recording, for the archive, while it is no longer than keep_bytes
+        self.audio = bytearray() if keep_bytes else None
+        self.texts = []
+        self.segments = []
+        self.words = []
+        self.received_bytes = 0
+
+        self._frame_bytes = 2 * max(1, int(sample_rate * FRAME_SECONDS))
+        self._pending = b""
+        self._segment = bytearray()
+        self._segment_start = 0.0
+        self._silent_frames = 0
+        self._voiced = False
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    @property
+    def seconds(self) -> float:
+        """Duration of the audio received so far."""
+        return self.received_bytes / 2 / self.sample_rate
+
+    @property
+    def transcript(self) -> str:
+        return " ".join(text for text in self.texts if text)
+
+    def _check_worker(self) -> None:
+        # A failed segment fails the session; say so while the user is still recording
+        if self._worker.done() and not self._worker.cancelled() and self._worker.exception() is not None:
+            raise self._worker.exception()
+
+    def feed(self, chunk: bytes) -> None:
+        """Add PCM from the client, closing a segment at a pause or at the length limit."""
+        self._check_worker()
+        self.received_bytes += len(chunk)
+        if self.audio is not None:
+            if len(self.audio) + len(chunk) <= self.keep_bytes:
+                self.audio += chunk
+            else:
+                self.audio = None
+                metrics.incr("live.not_archived")
+
+        data = self._pending + chunk
+        whole = len(data) - len(data) % self._frame_bytes
+        self._pending = data[whole:]
+        pause_frames = self.pause / FRAME_SECONDS
+        levels = frame_levels(data[:whole], self._frame_bytes)
+        for offset, level in zip(range(0, whole, self._frame_bytes), levels):
+            self._segment += data[offset:offset + self._frame_bytes]
+            if level < self.silence_level:
+                self._silent_frames += 1
+            else:
+                self._silent_frames = 0
+                self._voiced = True
+            length = len(self._segment) / 2 / self.sample_rate
+            if (length >= self.min_segment and self._silent_frames >= pause_frames) or length >= self.max_segment:
+                self._close_segment()
+
+    def _close_segment(self) -> None:
+        segment, start = bytes(self._segment), self._segment_start
+        self._segment_start += len(segment) / 2 / self.sample_rate
+        self._segment = bytearray()
+        self._silent_frames = 0
+        if not self._voiced:
+            metrics.incr("live.silent_segments")
+            return
+        self._voiced = False
+        self._queue.put_nowait((len(self.texts), start, segment))
+        self.texts.append(None)
+
+    def _add_timestamps(self, timestamps: dict | None, offset: float) -> None:
+        if not timestamps:
+            return
+        for key, target in (("segments", self.segments), ("words", self.words)):
+            for item in timestamps.get(key) or ():
+                target.append({
+                    **item,
+                    "start": round(item["start"] + offset, 2),
+                    "end": round(item["end"] + offset, 2)
+                })
+
+    async def _run(self) -> None:
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            index, start, pcm = item
+            seconds = len(pcm) / 2 / self.sample_rate
+            prompt = self.transcript[-PROMPT_CHARS:]
+            text, timestamps = await self.transcribe(pcm_to_wav(pcm, self.sample_rate), prompt, seconds)
+            self.texts[index] = text.strip()
+            self._add_timestamps(timestamps, start)
+            metrics.incr("live.segments")
+            if self.on_segment is not None:
+                await self.on_segment({
+                    "index": index,
+                    "start": round(start, 2),
+                    "end": round(start + seconds, 2),
+                    "text": self.texts[index],
+                    "transcript": self.transcript
+                })
+
+    async def finish(self) -> str:
+        """Transcribe what is left after the recording stopped and return the full transcript."""
+        self._check_worker()
+        if self._pending:
+            self._segment += self._pending
+            self._pending = b""
+        if self._segment:
+            self._close_segment()
+        self._queue.put_nowait(None)
+        await self._worker
+        return self.transcript
+
+    def timestamps(self) -> dict | None:
+        """The recording's timestamp index, in the shape ``parse_timestamps`` returns."""
+        if not self.segments:
+            return None
+        return {"duration": round(self.seconds, 2), "language": None, "segments": self.segments, "words": self.words}
+
+    def wav(self) -> bytes | None:
+        """The whole recording as WAV, or None if it was too long to keep."""
+        return pcm_to_wav(bytes(self.audio), self.sample_rate) if self.audio else None
+
+    async def cancel(self) -> None:
+        """Stop transcribing; the client went away."""
+        self._worker.cancel()
+        try:
+            await self._worker
+        except (asyncio.CancelledError, Exception):
+            pass
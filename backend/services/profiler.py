@@ -0,0 +1,123 @@
+"""
+Sampling Profiler
+
+Samples every thread's Python stack from a background thread at a fixed
+interval and aggregates them into collapsed stacks (``frame;frame;frame
+count`` per line), the input format of flamegraph.pl and speedscope. Only
+the sampler thread does any work, so the overhead on request handling is
+one stack walk per interval.
+
+``task_snapshot`` complements it for the event loop: coroutines suspended
+on an ``await`` do not appear in any thread's stack, so it lists every
+pending asyncio task with the route it serves and where it is waiting.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from utils import metrics
+
+_lock = threading.Lock()
+
+class ProfilerBusy(RuntimeError):
+    """Another profile is already running in this worker."""
+
+def _label(code) -> str:
+    path = code.co_filename.replace("\\", "/").split("/")
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+def _collapse(frame) -> list:
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+def sample_stacks(seconds: float, interval: float) -> dict:
+    """Sample all threads for seconds, every interval seconds, from the calling thread.
+
+    Returns ``{"samples": n, "seconds": elapsed, "stacks": Counter}`` where
+    each key is a collapsed stack rooted at the thread's name. Only one
+    profile may run per process at a time (raises ProfilerBusy).
+    """
+    if not _lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running in this worker")
+    try:
+        me = threading.get_ident()
+        names = {}
+        stacks = Counter()
+        samples = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = [names.get(ident, f"thread-{ident}")] + _collapse(frame)
+                stacks[";".join(stack)] += 1
+            samples += 1
+            time.sleep(max(0.0, interval - (time.perf_counter() - now)))
+        elapsed = time.perf_counter() - started
+    finally:
+        _lock.release()
+    metrics.incr("profiler.runs")
+    return {"samples": samples, "seconds": round(elapsed, 3), "stacks": stacks}
+
+def format_collapsed(stacks: Counter) -> str:
+    """Render stacks as collapsed-stack text, heaviest first."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+def _task_route(frames: list) -> str:
+    # Outermost ASGI frames (middleware, router) keep the request scope as a local
+    for frame in frames:
+        scope = frame.f_locals.get("scope")
+        if isinstance(scope, dict) and scope.get("type") == "http" and "path" in scope:
+            return f"{scope.get('method', '')} {scope['path']}".strip()
+    return "(background)"
+
+def _awaiting(task: asyncio.Task) -> str | None:
+    """Type of the future a task is suspended on (None if it is ready to run)."""
+    # CPython records the blocking future on the task; coroutine chains end in an opaque iterator
+    waiter = getattr(task, "_fut_waiter", None)
+    return type(waiter).__qualname__ if waiter is not None else None
+
+def task_snapshot(loop: asyncio.AbstractEventLoop | None = None) -> dict:
+    """List pending asyncio tasks grouped by route, with where each one is waiting.
+
+    Must run on the event loop thread (e.g. directly inside a route).
+    """
+    current = asyncio.current_task(loop)
+    routes = {}
+    for task in asyncio.all_tasks(loop):
+        if task is current or task.done():
+            continue
+        frames = task.get_stack(limit=None)
+        route = _task_route(frames)
+        leaf = frames[-1] if frames else None
+        entry = {
+            "task": task.get_name(),
+            "waiting_at": f"{leaf.f_code.co_name} ({os.path.basename(leaf.f_code.co_filename)}:{leaf.f_lineno})" if leaf else None,
+            "awaiting": _awaiting(task),
+            "stack": [_label(frame.f_code) for frame in frames]
+        }
+        routes.setdefault(route, []).append(entry)
+    return {
+        "tasks": sum(len(entries) for entries in routes.values()),
+        "routes": {
+            route: {
+                "pending": len(entries),
+                "waiting_at": dict(Counter(entry["waiting_at"] for entry in entries).most_common()),
+                "tasks": entries
+            }
+            for route, entries in sorted(routes.items(), key=lambda item: -len(item[1]))
+        }
+    }
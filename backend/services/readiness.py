@@ -0,0 +1,130 @@
+import asyncio
+import sys
+import time
+from config import settings
+from utils import metrics
+from .clients import ClientProvider
+from .scheduler import transcription_scheduler, structuring_scheduler
+from .breaker import whisper_breaker, openrouter_breaker
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def current_rss_mb() -> float | None:
+    """Return the resident set size of this process in MB, or None if unknown."""
+    if resource is None:
+        return None
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * resource.getpagesize() / (1024 * 1024), 1)
+    except (OSError, ValueError, IndexError):
+        # Peak RSS is the best portable fallback (bytes on macOS, KB on Linux)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def cache_hit_rates() -> dict:
+    """Return the hit rate of every cache that counts '<name>.hits' and '<name>.misses'."""
+    snapshot = metrics.snapshot()
+    rates = {}
+    for key, hits in snapshot.items():
+        if not key.endswith(".hits"):
+            continue
+        name = key[:-len(".hits")]
+        total = hits + snapshot.get(f"{name}.misses", 0)
+        rates[name] = round(hits / total, 4) if total else 0.0
+    return rates
+
+class UpstreamProber:
+    """Periodically checks that Whisper and OpenRouter are reachable and caches the result.
+
+    The checks run on a background timer so the readiness endpoint only
+    reads the last result and never waits on the network.
+    """
+
+    def __init__(self, clients: ClientProvider, interval: float, timeout: float = 5.0):
+        self.clients = clients
+        self.interval = interval
+        self.timeout = timeout
+        self.results = {}
+        self._task = None
+
+    def _probe(self, name: str) -> dict:
+        client = self.clients.openai if name == "whisper" else self.clients.openrouter
+        started = time.perf_counter()
+        try:
+            response = client._client.head(str(client.base_url), timeout=self.timeout)
+            # Any non-5xx answer (401/404 included) proves the upstream is up
+            reachable, error = response.status_code < 500, None
+            if not reachable:
+                error = f"HTTP {response.status_code}"
+        except Exception as e:
+            reachable, error = False, str(e)
+        latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        metrics.set_gauge(f"upstream.{name}.latency_ms", latency_ms)
+        return {"reachable": reachable, "latency_ms": latency_ms, "error": error, "checked_at": time.time()}
+
+    async def probe_once(self) -> None:
+        """Probe both upstreams concurrently and store the results."""
+        names = ("whisper", "openrouter")
+        results = await asyncio.gather(*(asyncio.to_thread(self._probe, name) for name in names))
+        self.results = dict(zip(names, results))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.probe_once()
+            except Exception as e:
+                print(f"Upstream probe failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+def readiness_report(prober: UpstreamProber | None, draining: bool = False) -> tuple:
+    """Return (ready, report) from cached probes and live capacity figures."""
+    queue_depth = transcription_scheduler.queue_depth + structuring_scheduler.queue_depth
+    rss_mb = current_rss_mb()
+    upstreams = prober.results if prober else {}
+
+    reasons = []
+    if draining:
+        reasons.append("shutting down")
+    if prober is not None:
+        if not upstreams:
+            reasons.append("upstreams not probed yet")
+        reasons.extend(f"{name} unreachable" for name, result in upstreams.items() if not result["reachable"])
+    if settings.READY_MAX_QUEUE_DEPTH and queue_depth > settings.READY_MAX_QUEUE_DEPTH:
+        reasons.append(f"queue depth {queue_depth} over {settings.READY_MAX_QUEUE_DEPTH}")
+    if settings.READY_MAX_RSS_MB and rss_mb and rss_mb > settings.READY_MAX_RSS_MB:
+        reasons.append(f"memory {rss_mb} MB over {settings.READY_MAX_RSS_MB} MB")
+
+    report = {
+        "status": "ready" if not reasons else "unavailable",
+        "reasons": reasons,
+        "upstreams": upstreams,
+        # Informational only: an open circuit degrades responses but every instance shares the upstream
+        "breakers": {breaker.name: breaker.state for breaker in (whisper_breaker, openrouter_breaker)},
+        "in_flight": int(metrics.get("http.in_flight")),
+        "queue_depth": queue_depth,
+        "upload_budget": {
+            "reserved_bytes": int(metrics.get("upload_budget.reserved_bytes")),
+            "capacity_bytes": int(metrics.get("upload_budget.capacity_bytes")),
+            "waiting": int(metrics.get("upload_budget.waiting"))
+        },
+        "cache_hit_rates": cache_hit_rates(),
+        "memory_rss_mb": rss_mb
+    }
+    return not reasons, report
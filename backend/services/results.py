@@ -0,0 +1,56 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from config import settings
+from utils import metrics
+
+class ResultCache:
+    """Recently served results as serialized bytes.
+
+    Keys are content digests (of the audio or transcript) plus the output
+    format, so a cached entry is only ever served for the same input. Any
+    entry may answer a degraded request; fresh ones (``max_age``) also
+    answer identical retries without new upstream calls.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(content: bytes | str, output_format: str) -> str:
+        """Cache key for an upload's bytes or a transcript's text in one format."""
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        return ResultCache.digest_key(hashlib.sha256(content).hexdigest(), output_format)
+
+    @staticmethod
+    def digest_key(digest: str, output_format: str) -> str:
+        """Cache key for content whose SHA-256 is already known."""
+        return f"{digest}:{output_format}"
+
+    def put(self, key: str, body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str, max_age: float | None = None) -> bytes | None:
+        """Return the cached body, or None if missing or older than max_age seconds."""
+        with self._lock:
+            stored_at, body = self._entries.get(key, (0.0, None))
+            if body is not None and max_age is not None and time.monotonic() - stored_at > max_age:
+                body = None
+            if body is not None:
+                self._entries.move_to_end(key)
+        metrics.incr("results.hits" if body is not None else "results.misses")
+        return body
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+result_cache = ResultCache(settings.RESULT_CACHE_ENTRIES)
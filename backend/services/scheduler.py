@@ -0,0 +1,143 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from config import settings
+from utils import metrics
+
+# Upper bounds (estimated seconds of work) for the latency classes
+JOB_CLASSES = (("short", 120.0), ("medium", 900.0), ("long", float("inf")))
+
+# Typical compressed bitrates in bytes per second, used until the real duration is known
+_BYTES_PER_SECOND = {
+    "audio/wav": 176_400,   # 44.1 kHz, 16-bit stereo PCM
+    "audio/mpeg": 16_000,   # 128 kbps
+    "audio/mp3": 16_000,
+    "audio/m4a": 12_000,    # ~96 kbps AAC (iOS Voice Memos records less)
+    "audio/x-m4a": 12_000
+}
+
+def estimate_audio_seconds(num_bytes: int, content_type: str | None) -> float:
+    """Estimate audio duration from the upload size and container type."""
+    return num_bytes / _BYTES_PER_SECOND.get(content_type, 16_000)
+
+def estimate_structuring_seconds(transcript: str) -> float:
+    """Estimate LLM structuring time from the transcript's token count (~4 chars per token)."""
+    return 5.0 + (len(transcript) / 4) / 200
+
+def job_class(estimated_seconds: float) -> str:
+    """Return the latency class name for an estimated job duration."""
+    for name, upper in JOB_CLASSES:
+        if estimated_seconds < upper:
+            return name
+    return JOB_CLASSES[-1][0]
+
+def _percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
+
+class JobScheduler:
+    """Shortest-job-first admission with aging for expensive upstream work.
+
+    At most ``concurrency`` jobs run at once. Waiting jobs are started in
+    order of ``estimated_seconds - aging_rate * seconds_waited``. Since every
+    waiting job ages at the same rate, that order equals the order of the
+    static key ``estimated_seconds + aging_rate * enqueued_at``, so a plain
+    heap suffices and long jobs are never starved: after waiting
+    ``(long - short) / aging_rate`` seconds they overtake new short jobs.
+    """
+
+    def __init__(self, name: str, concurrency: int, aging_rate: float, history: int = 500):
+        self.name = name
+        self.concurrency = concurrency
+        self.aging_rate = aging_rate
+        self._heap = []
+        self._seq = itertools.count()
+        self._running = 0
+        self._waiting = 0
+        self._latencies = {name: deque(maxlen=history) for name, _ in JOB_CLASSES}
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for a slot."""
+        return self._waiting
+
+    @property
+    def running(self) -> int:
+        """Number of jobs currently holding a slot."""
+        return self._running
+
+    def _release(self) -> None:
+        """Hand the slot to the next waiting job, or free it."""
+        while self._heap:
+            _, _, future = heapq.heappop(self._heap)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._running -= 1
+
+    async def _acquire(self, estimated_seconds: float) -> None:
+        if self._running < self.concurrency and not self._heap:
+            self._running += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        key = estimated_seconds + self.aging_rate * time.monotonic()
+        heapq.heappush(self._heap, (key, next(self._seq), future))
+        self._waiting += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the cancellation landed
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+        finally:
+            self._waiting -= 1
+
+    async def run(self, estimated_seconds: float, func, *args, **kwargs):
+        """Run func once a slot is free; sync callables run on a worker thread."""
+        cls = job_class(estimated_seconds)
+        enqueued = time.monotonic()
+        await self._acquire(estimated_seconds)
+        started = time.monotonic()
+        metrics.set_gauge(f"scheduler.{self.name}.queue_depth", self._waiting)
+        try:
+            if asyncio.iscoroutinefunction(func):
+                return await func(*args, **kwargs)
+            return await asyncio.to_thread(func, *args, **kwargs)
+        finally:
+            self._release()
+            finished = time.monotonic()
+            self._latencies[cls].append((started - enqueued, finished - enqueued))
+            metrics.incr(f"scheduler.{self.name}.{cls}.jobs")
+            metrics.set_gauge(f"scheduler.{self.name}.queue_depth", self._waiting)
+
+    def stats(self) -> dict:
+        """Return queue state and per-class wait/total latency percentiles."""
+        classes = {}
+        for cls, samples in self._latencies.items():
+            if not samples:
+                continue
+            waits = [wait for wait, _ in samples]
+            totals = [total for _, total in samples]
+            classes[cls] = {
+                "jobs": len(samples),
+                "wait_p50": _percentile(waits, 0.5),
+                "latency_p50": _percentile(totals, 0.5),
+                "latency_p99": _percentile(totals, 0.99)
+            }
+        return {
+            "running": self._running,
+            "queue_depth": self._waiting,
+            "concurrency": self.concurrency,
+            "classes": classes
+        }
+
+transcription_scheduler = JobScheduler(
+    "transcription", settings.TRANSCRIPTION_CONCURRENCY, settings.SCHEDULER_AGING_RATE
+)
+structuring_scheduler = JobScheduler(
+    "structuring", settings.STRUCTURING_CONCURRENCY, settings.SCHEDULER_AGING_RATE
+)
@@ -0,0 +1,144 @@
+"""
+Transcript Timestamps
+
+Whisper's ``verbose_json`` response carries segment (and optionally word)
+timings. ``parse_timestamps`` reduces it to a small index, and
+``attach_source_spans`` links every extracted ``Task`` and ``ProcessStep``
+back to the segments it most likely came from, so a user can jump from a
+task to the moment it was said.
+
+Matching is lexical: each item's text is compared with every segment by
+the rarity-weighted share of its words the segment contains. Generated
+items paraphrase the speaker, so this finds the right stretch of the
+recording far more often than it finds the exact sentence, which is what
+playback needs.
+"""
+
+import math
+import re
+from collections import Counter
+from pydantic import BaseModel
+from models import Task, ProcessStep, SourceSpan
+
+# A segment must cover at least this rarity-weighted share of an item's words
+MIN_MATCH_SCORE = 0.3
+# Neighbouring segments scoring this close to the best one extend its span
+NEIGHBOUR_RATIO = 0.6
+MAX_SPANS = 3
+# Gap between words that starts a new segment when only word timings came back
+WORD_GAP_SECONDS = 0.8
+MAX_WORDS_PER_SEGMENT = 30
+
+_WORD = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset(
+    "the and for that this with you are was have has had not but they them then than "
+    "from will would should could can our your their there what when which who how "
+    "about into out all any some just also its it's i'm we're let's get got need make "
+    "going gonna want like really very more most".split()
+)
+
+def _field(item, name: str):
+    # The SDK returns extra response fields as plain dicts; test doubles use attributes
+    return item.get(name) if isinstance(item, dict) else getattr(item, name, None)
+
+def _segments_from_words(words: list) -> list:
+    segments = []
+    for word in words:
+        if (
+            not segments
+            or word["start"] - segments[-1]["end"] > WORD_GAP_SECONDS
+            or segments[-1]["_words"] >= MAX_WORDS_PER_SEGMENT
+        ):
+            segments.append({"start": word["start"], "end": word["end"], "text": word["word"], "_words": 1})
+        else:
+            segments[-1]["end"] = word["end"]
+            segments[-1]["text"] += " " + word["word"]
+            segments[-1]["_words"] += 1
+    for segment in segments:
+        del segment["_words"]
+    return segments
+
+def parse_timestamps(transcription) -> dict | None:
+    """Reduce a verbose_json transcription to ``{duration, language, segments, words}``.
+
+    Returns None when the response has no timings (e.g. a plain ``json`` one).
+    """
+    segments = [
+        {"start": round(float(_field(s, "start")), 2), "end": round(float(_field(s, "end")), 2), "text": _field(s, "text").strip()}
+        for s in _field(transcription, "segments") or ()
+    ]
+    words = [
+        {"start": round(float(_field(w, "start")), 2), "end": round(float(_field(w, "end")), 2), "word": _field(w, "word").strip()}
+        for w in _field(transcription, "words") or ()
+    ]
+    if not segments and words:
+        segments = _segments_from_words(words)
+    if not segments:
+        return None
+    return {
+        "duration": _field(transcription, "duration"),
+        "language": _field(transcription, "language"),
+        "segments": segments,
+        "words": words
+    }
+
+def _terms(text: str) -> list:
+    return [word for word in _WORD.findall(text.lower()) if len(word) > 2 and word not in _STOPWORDS]
+
+def _items(result: BaseModel):
+    """Yield every Task and ProcessStep in a result, with the text that describes it."""
+    if isinstance(result, Task):
+        yield result, f"{result.title} {result.description or ''}"
+    elif isinstance(result, ProcessStep):
+        yield result, f"{result.action} {result.details}"
+    elif isinstance(result, BaseModel):
+        for name in result.model_fields:
+            value = getattr(result, name)
+            for child in value if isinstance(value, list) else (value,):
+                if isinstance(child, BaseModel):
+                    yield from _items(child)
+
+def _spans_for(terms: list, segment_terms: list, idf: dict, segments: list, url: str | None) -> list:
+    weights = {term: idf.get(term, 0.0) for term in set(terms)}
+    total = sum(weights.values())
+    if not total:
+        return []
+    scores = [sum(weight for term, weight in weights.items() if term in seg) / total for seg in segment_terms]
+    best = max(range(len(scores)), key=scores.__getitem__)
+    if scores[best] < MIN_MATCH_SCORE:
+        return []
+
+    # Grow the best segment into a contiguous span while the neighbours keep matching
+    first = last = best
+    while first > 0 and scores[first - 1] >= scores[best] * NEIGHBOUR_RATIO:
+        first -= 1
+    while last < len(scores) - 1 and scores[last + 1] >= scores[best] * NEIGHBOUR_RATIO:
+        last += 1
+    spans = [(segments[first]["start"], segments[last]["end"])]
+
+    # Other strong matches elsewhere in the recording, best first
+    others = sorted(
+        (i for i in range(len(scores)) if (i < first or i > last) and scores[i] >= scores[best] * NEIGHBOUR_RATIO),
+        key=lambda i: -scores[i]
+    )
+    spans += [(segments[i]["start"], segments[i]["end"]) for i in others[:MAX_SPANS - 1]]
+    return [
+        SourceSpan(start=start, end=end, url=f"{url}#t={start:g},{end:g}" if url else None)
+        for start, end in spans
+    ]
+
+def attach_source_spans(result: BaseModel, timestamps: dict | None, audio_url: str | None = None) -> int:
+    """Set ``source_spans`` on every Task and ProcessStep in result; returns how many were linked."""
+    if not timestamps or not timestamps.get("segments"):
+        return 0
+    segments = timestamps["segments"]
+    segment_terms = [set(_terms(segment["text"])) for segment in segments]
+    document_frequency = Counter(term for terms in segment_terms for term in terms)
+    idf = {term: math.log(1 + len(segments) / count) for term, count in document_frequency.items()}
+
+    linked = 0
+    for item, text in _items(result):
+        spans = _spans_for(_terms(text), segment_terms, idf, segments, audio_url)
+        item.source_spans = spans or None
+        linked += bool(spans)
+    return linked
@@ -0,0 +1,104 @@
+import json
+import os
+import re
+import secrets
+import tempfile
+import time
+from pathlib import Path
+from config import settings
+from utils import metrics
+from .usage import note_cache_hit
+
+_HANDLE = re.compile(r"^[A-Za-z0-9_-]{22}$")
+
+class TranscriptStore:
+    """Short-lived store mapping opaque handles to transcripts, on disk so any worker can resolve them.
+
+    Each handle is a ``<handle>.json`` file under ``root``, written through
+    a temporary file and ``os.replace``. Entries expire ``ttl`` seconds
+    after they were stored, and the oldest are removed once
+    ``max_entries`` is reached.
+    """
+
+    def __init__(self, root: str, ttl: float = 900, max_entries: int = 1000):
+        self.root = Path(root)
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    def _path(self, handle: str) -> Path:
+        return self.root / f"{handle}.json"
+
+    def _load(self, handle: str) -> dict | None:
+        if not _HANDLE.match(handle):
+            return None
+        path = self._path(handle)
+        try:
+            age = time.time() - path.stat().st_mtime
+            entry = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        if age > self.ttl:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            return None
+        return entry
+
+    def prune(self) -> int:
+        """Remove expired handles, and the oldest beyond ``max_entries``; returns how many went."""
+        entries = []
+        try:
+            for path in self.root.glob("*.json"):
+                try:
+                    entries.append((path.stat().st_mtime, path))
+                except FileNotFoundError:
+                    continue
+        except OSError:
+            return 0
+        entries.sort()
+        cutoff = time.time() - self.ttl
+        expired = sum(1 for mtime, _ in entries if mtime < cutoff)
+        expired = max(expired, len(entries) - self.max_entries + 1)
+        for _, path in entries[:expired]:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        return max(0, expired)
+
+    def put(self, transcript: str, audio_id: str | None = None) -> str:
+        """Store a transcript (and the archived recording it came from) and return its handle."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.prune()
+        handle = secrets.token_urlsafe(16)
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp_")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"transcript": transcript, "audio_id": audio_id}, f)
+            os.replace(temp_path, self._path(handle))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return handle
+
+    def get(self, handle: str) -> str | None:
+        """Return the transcript for a handle, or None if unknown or expired."""
+        entry = self._load(handle)
+        metrics.incr("transcripts.hits" if entry else "transcripts.misses")
+        if entry:
+            note_cache_hit("transcripts")
+        return entry["transcript"] if entry else None
+
+    def audio_id(self, handle: str) -> str | None:
+        """Return the archive ID of the recording behind a handle, if it was archived."""
+        entry = self._load(handle)
+        return entry["audio_id"] if entry else None
+
+    def __len__(self) -> int:
+        try:
+            return sum(1 for _ in self.root.glob("*.json"))
+        except OSError:
+            return 0
+
+transcript_store = TranscriptStore(settings.TRANSCRIPT_DIR, ttl=settings.TRANSCRIPT_TTL_SECONDS)
@@ -0,0 +1,234 @@
+"""
+Progressive Upgrades
+
+A progressive request is answered with a draft from a fast model while
+the full model structures the same transcript in the background. Each
+upgrade is kept under an opaque ID until the client fetches it (``GET
+/upgrades/{id}``, or the event stream next to it), together with the
+draft so the finished result can be diffed against it.
+
+Upgrades live on disk under ``root`` as ``<id>.json``, rewritten whole
+(through a temporary file and ``os.replace``) when the background call
+finishes, so a poll or event stream landing on any worker sees the same
+state. The worker running the upgrade also keeps it in memory, so its
+own event streams are woken the moment it is published; other workers
+poll the file. Entries expire ``ttl`` seconds after their last write.
+"""
+
+import asyncio
+import json
+import os
+import re
+import secrets
+import tempfile
+import threading
+import time
+from pathlib import Path
+from config import settings
+from models import UpgradeStatus
+from utils import metrics, diff_results
+
+PENDING, READY, FAILED = "pending", "ready", "failed"
+
+# How often an event stream on another worker rereads a pending upgrade
+POLL_SECONDS = 0.5
+
+_UPGRADE_ID = re.compile(r"^[A-Za-z0-9_-]{22}$")
+
+class Upgrade:
+    """One draft and, once the background call finishes, its upgrade."""
+
+    def __init__(
+        self,
+        upgrade_id: str,
+        output_format: str,
+        draft_model: str,
+        model: str,
+        draft: dict,
+        state: str = PENDING,
+        result: dict | None = None,
+        diff: dict | None = None,
+        detail: str | None = None
+    ):
+        self.id = upgrade_id
+        self.output_format = output_format
+        self.draft_model = draft_model
+        self.model = model
+        self.draft = draft
+        self.state = state
+        self.result = result
+        self.diff = diff
+        self.detail = detail
+        # Only on the worker running the upgrade
+        self.task = None
+        self.done = asyncio.Event()
+        if state != PENDING:
+            self.done.set()
+
+    def to_dict(self) -> dict:
+        return {
+            "output_format": self.output_format,
+            "draft_model": self.draft_model,
+            "model": self.model,
+            "draft": self.draft,
+            "state": self.state,
+            "result": self.result,
+            "diff": self.diff,
+            "detail": self.detail
+        }
+
+    def status(self) -> UpgradeStatus:
+        return UpgradeStatus(
+            id=self.id,
+            status=self.state,
+            format=self.output_format,
+            draft_model=self.draft_model,
+            model=self.model,
+            result=self.result,
+            diff=self.diff,
+            detail=self.detail
+        )
+
+class UpgradeStore:
+    """Pending and recently finished upgrades on disk, shared by all workers."""
+
+    def __init__(self, root: str, ttl: float = 900, max_entries: int = 1000, good_enough: float = 0.8):
+        self.root = Path(root)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.good_enough = good_enough
+        self._lock = threading.Lock()
+        # Upgrade ID -> Upgrade, for the upgrades running on this worker
+        self._running = {}
+
+    def _path(self, upgrade_id: str) -> Path:
+        return self.root / f"{upgrade_id}.json"
+
+    def _save(self, upgrade: Upgrade) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp_")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(upgrade.to_dict(), f)
+            os.replace(temp_path, self._path(upgrade.id))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def _remove(self, upgrade_id: str) -> None:
+        try:
+            self._path(upgrade_id).unlink()
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            upgrade = self._running.pop(upgrade_id, None)
+        if upgrade is not None and upgrade.task is not None and not upgrade.task.done():
+            upgrade.task.cancel()
+
+    def prune(self) -> int:
+        """Remove expired upgrades, and the oldest beyond ``max_entries``; returns how many went."""
+        entries = []
+        try:
+            for path in self.root.glob("*.json"):
+                try:
+                    entries.append((path.stat().st_mtime, path.stem))
+                except FileNotFoundError:
+                    continue
+        except OSError:
+            return 0
+        entries.sort()
+        cutoff = time.time() - self.ttl
+        expired = [upgrade_id for mtime, upgrade_id in entries if mtime < cutoff]
+        kept = len(entries) - len(expired)
+        if kept > self.max_entries:
+            expired += [upgrade_id for _, upgrade_id in entries[len(expired):len(expired) + kept - self.max_entries]]
+        for upgrade_id in expired:
+            self._remove(upgrade_id)
+        return len(expired)
+
+    def create(self, output_format: str, draft_model: str, model: str, draft: dict) -> Upgrade:
+        self.prune()
+        upgrade = Upgrade(secrets.token_urlsafe(16), output_format, draft_model, model, draft)
+        self._save(upgrade)
+        with self._lock:
+            self._running[upgrade.id] = upgrade
+        metrics.incr("progressive.drafts")
+        return upgrade
+
+    def get(self, upgrade_id: str) -> Upgrade | None:
+        """Return an upgrade from any worker, or None if the ID is unknown or expired."""
+        if not _UPGRADE_ID.match(upgrade_id):
+            return None
+        with self._lock:
+            running = self._running.get(upgrade_id)
+        if running is not None:
+            return running
+        path = self._path(upgrade_id)
+        try:
+            age = time.time() - path.stat().st_mtime
+            fields = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        if age > self.ttl:
+            self._remove(upgrade_id)
+            return None
+        return Upgrade(upgrade_id, **fields)
+
+    async def wait(self, upgrade: Upgrade, timeout: float) -> Upgrade | None:
+        """Wait up to timeout seconds for a pending upgrade; returns its latest state, or None once it expired."""
+        if upgrade.done.is_set() or upgrade.task is not None:
+            try:
+                await asyncio.wait_for(upgrade.done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            return upgrade
+        # Running on another worker: watch its file
+        deadline = time.monotonic() + timeout
+        while True:
+            await asyncio.sleep(min(POLL_SECONDS, max(0.0, deadline - time.monotonic())))
+            latest = await asyncio.to_thread(self.get, upgrade.id)
+            if latest is None or latest.state != PENDING or time.monotonic() >= deadline:
+                return latest
+
+    def _publish(self, upgrade: Upgrade) -> None:
+        # Rewriting the file also restarts the TTL: it runs from when the upgrade is ready
+        self._save(upgrade)
+        with self._lock:
+            self._running.pop(upgrade.id, None)
+        upgrade.done.set()
+
+    def finish(self, upgrade: Upgrade, result: dict) -> dict:
+        """Publish the full model's result and return its diff from the draft."""
+        diff = diff_results(upgrade.draft, result)
+        upgrade.result, upgrade.diff, upgrade.state = result, diff, READY
+        self._publish(upgrade)
+        metrics.incr("progressive.upgrades")
+        if diff["similarity"] >= self.good_enough:
+            metrics.incr("progressive.draft_good_enough")
+        return diff
+
+    def fail(self, upgrade: Upgrade, detail: str) -> None:
+        """Give up on the upgrade; the draft is the final answer."""
+        upgrade.detail, upgrade.state = detail, FAILED
+        self._publish(upgrade)
+        metrics.incr("progressive.upgrade_failures")
+
+    def stats(self) -> dict:
+        return {
+            "drafts": metrics.get("progressive.drafts"),
+            "upgrades": metrics.get("progressive.upgrades"),
+            "failures": metrics.get("progressive.upgrade_failures"),
+            "draft_good_enough_rate": metrics.ratio("progressive.draft_good_enough", "progressive.upgrades")
+        }
+
+    def __len__(self) -> int:
+        try:
+            return sum(1 for _ in self.root.glob("*.json"))
+        except OSError:
+            return 0
+
+upgrade_store = UpgradeStore(
+    settings.UPGRADE_DIR,
+    ttl=settings.UPGRADE_TTL_SECONDS,
+    good_enough=settings.DRAFT_GOOD_ENOUGH_SIMILARITY
+)
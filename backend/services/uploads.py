@@ -0,0 +1,360 @@
+"""
+Resumable Uploads
+
+A long recording on a phone connection is sent as numbered chunks instead
+of one multipart body: ``POST /uploads`` declares the size and type,
+``PUT /uploads/{id}/chunks/{n}`` sends each chunk (in any order, and
+again when unsure it arrived), ``GET /uploads/{id}`` says which ranges
+have arrived, and ``POST /uploads/{id}/finalize`` runs the usual
+pipeline. A dropped connection costs one chunk, not the whole file.
+
+Everything lives on disk under ``root`` so any worker can take any chunk:
+
+- ``<id><ext>``: the recording, created sparse at its final size; each
+  chunk is written to its offset once it is complete, so nothing is ever
+  reassembled and at most one chunk per request is held in memory.
+- ``<id>.map``: one byte per chunk, set once the chunk is written. A
+  written chunk never changes.
+- ``<id>.json``: the declared size and type, the header facts once probed,
+  and whether the upload was rejected or finalized.
+
+Work that does not need the whole file happens while chunks arrive. The
+header is probed as soon as the first ``PROBE_BYTES`` are in, so a
+mislabeled or overlong file is refused on its first chunk rather than
+after the last, and the SHA-256 (the cache key and archive ID) is
+advanced over the contiguous prefix after every chunk, so finalize only
+hashes whatever arrived on another worker or out of order.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import re
+import secrets
+import tempfile
+import threading
+import time
+from pathlib import Path
+from config import settings
+from models import UploadStatus
+from utils import metrics, byte_lock, AudioInfo, AudioProbeError, probe_audio
+from utils.audio_probe import CONTAINER_MIME_TYPES, detect_container
+from .archive import CONTAINERS
+
+# Leading bytes needed before the header is probed (all of them for smaller files)
+PROBE_BYTES = 64 * 1024
+
+_UPLOAD_ID = re.compile(r"^[A-Za-z0-9_-]{22}$")
+
+class UploadError(Exception):
+    """A chunk or upload the client must fix; carries the HTTP status to answer with."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def _extension(content_type: str) -> str:
+    for container, mime_types in CONTAINER_MIME_TYPES.items():
+        if content_type in mime_types:
+            return CONTAINERS[container][0]
+    return ""
+
+class Upload:
+    """One resumable upload: its declared shape and the files holding it."""
+
+    def __init__(self, root: Path, upload_id: str, meta: dict):
+        self.id = upload_id
+        self.meta = meta
+        # Named for the declared type, since Whisper infers the format from the extension
+        self.path = root / (upload_id + meta["extension"])
+        self.map_path = root / f"{upload_id}.map"
+        self.meta_path = root / f"{upload_id}.json"
+
+    @property
+    def size(self) -> int:
+        return self.meta["size"]
+
+    @property
+    def chunk_size(self) -> int:
+        return self.meta["chunk_size"]
+
+    @property
+    def content_type(self) -> str:
+        return self.meta["content_type"]
+
+    @property
+    def filename(self) -> str:
+        return self.meta["filename"]
+
+    @property
+    def chunks(self) -> int:
+        return math.ceil(self.size / self.chunk_size)
+
+    def chunk_range(self, index: int) -> tuple:
+        """The ``[start, end)`` byte range of a chunk."""
+        start = index * self.chunk_size
+        return start, min(self.size, start + self.chunk_size)
+
+    def received(self) -> bytes:
+        """One byte per chunk, non-zero once the chunk has arrived."""
+        try:
+            return self.map_path.read_bytes()
+        except FileNotFoundError:
+            return bytes(self.chunks)
+
+    def prefix_bytes(self, received: bytes | None = None) -> int:
+        """Length of the contiguous run of received bytes from the start of the file."""
+        received = self.received() if received is None else received
+        index = 0
+        while index < self.chunks and received[index]:
+            index += 1
+        return self.chunk_range(index - 1)[1] if index else 0
+
+class UploadStore:
+    """On-disk resumable uploads shared by all workers; sessions expire ``ttl`` seconds after their last chunk."""
+
+    def __init__(self, root: str, chunk_size: int = 1024 * 1024, ttl: float = 3600, max_bytes: int = 0):
+        self.root = Path(root)
+        self.chunk_size = chunk_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        # Upload ID -> (sha256 of the prefix hashed so far, its length), on this worker only
+        self._hashes = {}
+
+    def _save(self, upload: Upload) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp_")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(upload.meta, f)
+            os.replace(temp_path, upload.meta_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def _age(self, upload: Upload) -> float:
+        # The map is rewritten by every chunk, so its mtime is the upload's last activity
+        try:
+            return time.time() - os.path.getmtime(upload.map_path)
+        except OSError:
+            return math.inf
+
+    def create(self, size: int, content_type: str, filename: str = "") -> Upload:
+        """Start an upload of ``size`` bytes."""
+        if self.max_bytes and size > self.max_bytes:
+            raise UploadError(413, f"File size must be under {self.max_bytes // (1024 * 1024)}MB")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.prune()
+        upload = Upload(self.root, secrets.token_urlsafe(16), {
+            "size": size,
+            "chunk_size": self.chunk_size,
+            "content_type": content_type,
+            "filename": filename,
+            "extension": _extension(content_type),
+            "info": None,
+            "error": None,
+            "finalized": False,
+            "created": time.time()
+        })
+        # Sparse where the filesystem allows it: no blocks until chunks land
+        with open(upload.path, "wb") as f:
+            f.truncate(size)
+        upload.map_path.write_bytes(bytes(upload.chunks))
+        self._save(upload)
+        metrics.incr("uploads.created")
+        return upload
+
+    def get(self, upload_id: str) -> Upload | None:
+        """Return an upload, or None if the ID is unknown or the upload expired."""
+        if not _UPLOAD_ID.match(upload_id):
+            return None
+        try:
+            meta = json.loads((self.root / f"{upload_id}.json").read_text())
+        except (OSError, ValueError):
+            return None
+        upload = Upload(self.root, upload_id, meta)
+        if self._age(upload) > self.ttl:
+            self.discard(upload)
+            return None
+        return upload
+
+    async def write_chunk(self, upload: Upload, index: int, stream) -> None:
+        """Receive one chunk from an async byte stream and write it to its place in the file.
+
+        A chunk is written once: resending the same bytes is a harmless
+        no-op, and different bytes for a received chunk are refused, so the
+        hash advanced over earlier chunks always matches the file.
+        """
+        if upload.meta["error"]:
+            raise UploadError(409, upload.meta["error"])
+        if upload.meta["finalized"]:
+            raise UploadError(409, "Upload is already finalized")
+        if not 0 <= index < upload.chunks:
+            raise UploadError(404, f"Chunk index must be between 0 and {upload.chunks - 1}")
+
+        start, end = upload.chunk_range(index)
+        # At most one chunk (UPLOAD_CHUNK_BYTES) is held, and only until it is complete
+        data = bytearray()
+        async for piece in stream:
+            if len(data) + len(piece) > end - start:
+                raise UploadError(400, f"Chunk {index} must be {end - start} bytes")
+            data += piece
+        if len(data) != end - start:
+            raise UploadError(400, f"Chunk {index} must be {end - start} bytes, received {len(data)}")
+
+        if await asyncio.to_thread(self._store_chunk, upload, index, bytes(data)):
+            metrics.incr("uploads.chunks")
+            metrics.incr("uploads.bytes", len(data))
+            await asyncio.to_thread(self._advance_hash, upload)
+
+    def _store_chunk(self, upload: Upload, index: int, data: bytes) -> bool:
+        """Write a complete chunk unless it is already there; returns whether it was written."""
+        start, _ = upload.chunk_range(index)
+        # Threads of this worker wait on the lock, other workers on the map byte's record lock
+        with self._write_lock, open(upload.map_path, "r+b") as chunk_map, byte_lock(chunk_map, index):
+            chunk_map.seek(index)
+            if chunk_map.read(1) != b"\x00":
+                with open(upload.path, "rb") as f:
+                    f.seek(start)
+                    if f.read(len(data)) != data:
+                        raise UploadError(409, f"Chunk {index} was already received with different content")
+                return False
+            with open(upload.path, "r+b") as f:
+                f.seek(start)
+                f.write(data)
+            chunk_map.seek(index)
+            chunk_map.write(b"\x01")
+            # Written through before the lock is released
+            chunk_map.flush()
+            return True
+
+    def _advance_hash(self, upload: Upload) -> None:
+        """Hash any newly contiguous chunks while they are still in the page cache."""
+        received = upload.received()
+        with self._lock:
+            hasher, done = self._hashes.get(upload.id) or (hashlib.sha256(), 0)
+            index = done // upload.chunk_size
+            if index >= upload.chunks or not received[index]:
+                return
+            with open(upload.path, "rb") as f:
+                f.seek(done)
+                while index < upload.chunks and received[index]:
+                    start, end = upload.chunk_range(index)
+                    hasher.update(f.read(end - start))
+                    done = end
+                    index += 1
+            self._hashes[upload.id] = (hasher, done)
+
+    def digest(self, upload: Upload) -> str:
+        """SHA-256 of the complete upload, hashing only what the chunk writes did not."""
+        with self._lock:
+            hasher, done = self._hashes.get(upload.id) or (hashlib.sha256(), 0)
+            hasher = hasher.copy()
+        metrics.incr("uploads.finalize_hashed_bytes", upload.size - done)
+        with open(upload.path, "rb") as f:
+            f.seek(done)
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(block)
+        return hasher.hexdigest()
+
+    def probe(self, upload: Upload) -> AudioInfo | None:
+        """Probe the header once enough leading bytes are in; None while it is too early to tell.
+
+        Raises AudioProbeError as soon as the bytes that have arrived cannot
+        be audio, or when the complete file does not probe.
+        """
+        prefix = upload.prefix_bytes()
+        if prefix < min(PROBE_BYTES, upload.size):
+            return None
+        with open(upload.path, "rb") as f:
+            if detect_container(f.read(12)) is None:
+                raise AudioProbeError("Not an MP3, M4A or WAV file")
+            try:
+                return probe_audio(f)
+            except AudioProbeError:
+                if prefix == upload.size:
+                    raise
+                # The header runs past what has arrived, e.g. an M4A with its index at the end
+                return None
+
+    def update(self, upload: Upload, **fields) -> None:
+        """Record header facts, a rejection or finalization in the upload's metadata."""
+        upload.meta.update(fields)
+        self._save(upload)
+
+    def reject(self, upload: Upload, detail: str) -> None:
+        """Refuse further chunks; the client sees ``detail`` on each one."""
+        self.update(upload, error=detail)
+        metrics.incr("uploads.rejected")
+
+    def status(self, upload: Upload) -> UploadStatus:
+        received = upload.received()
+        ranges = []
+        for index, flag in enumerate(received):
+            if not flag:
+                continue
+            start, end = upload.chunk_range(index)
+            if ranges and ranges[-1][1] == start:
+                ranges[-1][1] = end
+            else:
+                ranges.append([start, end])
+        missing = [index for index, flag in enumerate(received) if not flag]
+        return UploadStatus(
+            id=upload.id,
+            size=upload.size,
+            chunk_size=upload.chunk_size,
+            chunks=upload.chunks,
+            received_bytes=sum(end - start for start, end in ranges),
+            ranges=ranges,
+            missing=missing,
+            complete=not missing,
+            audio=upload.meta["info"],
+            expires_in=int(max(0, self.ttl - self._age(upload)))
+        )
+
+    def discard(self, upload: Upload) -> None:
+        """Remove an upload's files (the archive keeps its own link to the recording)."""
+        with self._lock:
+            self._hashes.pop(upload.id, None)
+        for path in (upload.path, upload.map_path, upload.meta_path):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def prune(self) -> int:
+        """Discard uploads with no chunk for ``ttl`` seconds; returns how many went."""
+        removed = 0
+        try:
+            meta_paths = list(self.root.glob("*.json"))
+        except OSError:
+            return 0
+        for meta_path in meta_paths:
+            try:
+                upload = Upload(self.root, meta_path.stem, json.loads(meta_path.read_text()))
+            except (OSError, ValueError, KeyError):
+                continue
+            if self._age(upload) > self.ttl:
+                self.discard(upload)
+                removed += 1
+        if removed:
+            metrics.incr("uploads.expired", removed)
+        return removed
+
+    def count(self) -> int:
+        """Uploads in progress on disk (all workers)."""
+        try:
+            return sum(1 for _ in self.root.glob("*.json"))
+        except OSError:
+            return 0
+
+upload_store = UploadStore(
+    settings.UPLOAD_DIR,
+    chunk_size=settings.UPLOAD_CHUNK_BYTES,
+    ttl=settings.UPLOAD_SESSION_TTL_SECONDS,
+    max_bytes=settings.MAX_UPLOAD_MB * 1024 * 1024
+)
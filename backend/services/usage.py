@@ -0,0 +1,268 @@
+"""
+Usage Ledger
+
+Each processing request gets a record (held in a context variable, so the
+services can add to it without threading it through every call) with the
+audio size and duration, Whisper time, chat token usage, model, format,
+stage timings, cache hits and an estimated cost. Finished records are
+buffered and appended to a local JSONL file in batches by a background
+task, so requests never wait on disk I/O and nothing is fsynced.
+
+``UsageLedger.stats`` aggregates the ledger over a time window, grouped by
+format, client, model, path, hour or day.
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from config import settings
+from utils import metrics, file_lock
+
+GROUP_BY = ("format", "client", "model", "path", "hour", "day")
+
+_current_record: ContextVar = ContextVar("usage_record", default=None)
+
+def begin_record(**fields) -> dict:
+    """Start a usage record for the current request and return it."""
+    record = {
+        "ts": time.time(),
+        "format": None,
+        "model": None,
+        "audio_bytes": 0,
+        "audio_seconds": None,
+        "whisper_seconds": 0.0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "completions": 0,
+        "stages": {},
+        "cache_hits": [],
+        **fields
+    }
+    _current_record.set(record)
+    return record
+
+def end_record() -> dict | None:
+    """Detach and return the current request's record."""
+    record = _current_record.get()
+    _current_record.set(None)
+    return record
+
+def current_record() -> dict | None:
+    """Return the current request's usage record, or None outside a tracked request."""
+    return _current_record.get()
+
+def note(**fields) -> None:
+    """Set fields on the current record (no-op outside a tracked request)."""
+    record = _current_record.get()
+    if record is not None:
+        record.update(fields)
+
+def note_cache_hit(name: str) -> None:
+    """Record that the current request was served partly from a cache."""
+    record = _current_record.get()
+    if record is not None:
+        record["cache_hits"].append(name)
+
+def note_completion(model: str, usage) -> None:
+    """Add one chat completion's token usage to the current record."""
+    record = _current_record.get()
+    if record is None:
+        return
+    record["model"] = record["model"] or model
+    record["completions"] += 1
+    if usage is not None:
+        record["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+        record["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+
+def note_shared_completion(record: dict | None, shared: dict, share: float) -> None:
+    """Charge a request's share of a completion made for several requests at once.
+
+    ``shared`` is the usage record the shared completion was counted in.
+    """
+    if record is None:
+        return
+    record["model"] = record["model"] or shared["model"]
+    record["completions"] += 1
+    record["prompt_tokens"] += round(shared["prompt_tokens"] * share)
+    record["completion_tokens"] += round(shared["completion_tokens"] * share)
+
+@contextmanager
+def stage(name: str):
+    """Time a block and add it to the current record's stage timings."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record = _current_record.get()
+        if record is not None:
+            elapsed = time.perf_counter() - started
+            record["stages"][name] = round(record["stages"].get(name, 0.0) + elapsed, 4)
+
+def estimate_cost(record: dict) -> float:
+    """Estimated USD cost of a record from the configured Whisper and token prices."""
+    cost = 0.0
+    if record.get("whisper_seconds"):
+        cost += (record.get("audio_seconds") or 0) / 60 * settings.WHISPER_USD_PER_MINUTE
+    prices = settings.MODEL_PRICES_PER_MTOK.get(record.get("model") or "")
+    if prices:
+        cost += record["prompt_tokens"] / 1e6 * prices["prompt"]
+        cost += record["completion_tokens"] / 1e6 * prices["completion"]
+    return round(cost, 6)
+
+def _group_key(record: dict, group_by: str) -> str:
+    if group_by == "hour":
+        return time.strftime("%Y-%m-%dT%H:00Z", time.gmtime(record["ts"]))
+    if group_by == "day":
+        return time.strftime("%Y-%m-%d", time.gmtime(record["ts"]))
+    return str(record.get(group_by))
+
+def _summarize(records: list) -> dict:
+    latencies = [r["total_seconds"] for r in records if r.get("total_seconds") is not None]
+    cost = sum(r.get("cost_usd", 0.0) for r in records)
+    # Only background upgrades of progressive requests say whether their draft was good enough
+    judged = [r["draft_good_enough"] for r in records if "draft_good_enough" in r]
+    return {
+        "requests": len(records),
+        "errors": sum(1 for r in records if (r.get("status") or 0) >= 400),
+        "audio_seconds": round(sum(r.get("audio_seconds") or 0 for r in records), 1),
+        "audio_bytes": sum(r.get("audio_bytes", 0) for r in records),
+        "whisper_seconds": round(sum(r.get("whisper_seconds", 0.0) for r in records), 3),
+        "prompt_tokens": sum(r.get("prompt_tokens", 0) for r in records),
+        "completion_tokens": sum(r.get("completion_tokens", 0) for r in records),
+        "client_compression_bytes_saved": sum(
+            r["original_bytes"] - r.get("audio_bytes", 0) for r in records if "original_bytes" in r
+        ),
+        "compaction_tokens_saved": sum(r.get("transcript_tokens", 0) - r.get("compacted_tokens", 0) for r in records),
+        "cache_hits": sum(len(r.get("cache_hits", ())) for r in records),
+        "cost_usd": round(cost, 4),
+        "cost_per_request_usd": round(cost / len(records), 6) if records else 0.0,
+        "latency_p50": round(statistics.median(latencies), 3) if latencies else None,
+        "draft_good_enough_rate": round(sum(judged) / len(judged), 3) if judged else None
+    }
+
+class UsageLedger:
+    """Append-only JSONL ledger with batched writes from a background task.
+
+    The file is reopened in append mode for each batch, which keeps whole
+    lines intact when several workers share it. Once it grows past
+    ``max_bytes`` it is moved to ``<path>.1``; workers check, rotate and
+    append under a lock on ``<path>.lock``, so two of them never rotate the
+    same file twice and push the rotated one out with a nearly empty one.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 5.0, max_batch: int = 200, max_bytes: int = 0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._task = None
+        self._wake = None
+
+    def append(self, record: dict) -> None:
+        """Queue a finished record; a full batch wakes the flusher early."""
+        record["cost_usd"] = estimate_cost(record)
+        with self._lock:
+            self._buffer.append(record)
+            full = len(self._buffer) >= self.max_batch
+        metrics.incr("ledger.records")
+        if full and self._wake is not None:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """Write buffered records with one append; returns how many were written."""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return 0
+        data = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in batch).encode("utf-8")
+        try:
+            with open(self.path + ".lock", "a") as lock, file_lock(lock):
+                if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                    os.replace(self.path, self.path + ".1")
+                # One O_APPEND write per batch, so batches from different workers never interleave
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, data)
+                finally:
+                    os.close(fd)
+        except OSError as e:
+            print(f"Failed to write usage ledger: {str(e)}")
+            metrics.incr("ledger.write_errors")
+            return 0
+        metrics.incr("ledger.flushes")
+        return len(batch)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await asyncio.to_thread(self.flush)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher and write whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    def read(self, since: float = 0.0):
+        """Yield ledger records newer than since, oldest file first."""
+        for path in (self.path + ".1", self.path):
+            try:
+                f = open(path, encoding="utf-8")
+            except FileNotFoundError:
+                continue
+            with f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a torn line from a crash mid-write
+                    if record.get("ts", 0) >= since:
+                        yield record
+
+    def stats(self, window_seconds: float = 3600, group_by: str = "format") -> dict:
+        """Aggregate records of the last window_seconds, overall and per group."""
+        self.flush()
+        since = time.time() - window_seconds
+        groups = defaultdict(list)
+        records = []
+        for record in self.read(since):
+            records.append(record)
+            groups[_group_key(record, group_by)].append(record)
+        return {
+            "window_seconds": window_seconds,
+            "group_by": group_by,
+            "total": _summarize(records),
+            "groups": {
+                key: _summarize(items)
+                for key, items in sorted(groups.items(), key=lambda item: -sum(r.get("cost_usd", 0.0) for r in item[1]))
+            }
+        }
+
+usage_ledger = UsageLedger(
+    settings.LEDGER_PATH,
+    flush_interval=settings.LEDGER_FLUSH_SECONDS,
+    max_batch=settings.LEDGER_MAX_BATCH,
+    max_bytes=settings.LEDGER_MAX_BYTES
+)
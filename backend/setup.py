@@ -7,6 +7,8 @@ setup(
     install_requires=[
         "fastapi",
         "uvicorn",
+        "websockets",
+        "gunicorn; sys_platform != 'win32'",
         "openai",
         "python-multipart",
         "pydantic",
@@ -0,0 +1,157 @@
+import asyncio
+import os
+from types import SimpleNamespace
+import pytest
+from fastapi.testclient import TestClient
+from .main import app
+from .conftest import FakeClient, make_wav
+
+from config import settings
+from models import ProcessedOutput
+from services import AudioArchive, archive, attach_source_spans, parse_timestamps
+from services.generation import get_json_schema
+from utils import RangeFileResponse, RangeNotSatisfiable, parse_range
+
+SEGMENTS = [
+    {"id": 0, "start": 0.0, "end": 4.2, "text": " Quick update on the launch."},
+    {"id": 1, "start": 4.2, "end": 9.8, "text": " We need to renew the SSL certificate before Friday."},
+    {"id": 2, "start": 9.8, "end": 15.0, "text": " Also hire a designer for the landing page."}
+]
+
+TASKS = {
+    "tasks": [
+        {"title": "Renew the SSL certificate", "priority": "High", "description": "Due Friday"},
+        {"title": "Hire a designer", "priority": "Medium", "description": "For the landing page"},
+        {"title": "Celebrate", "priority": "Low", "description": None}
+    ],
+    "next_steps": ["Renew certificate"],
+    "notes": ["Launch soon"]
+}
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=95-200", 100) == (95, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    # Multiple ranges are allowed to be answered with the whole file
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=100-", 100)
+
+def test_range_is_handed_to_zerocopy_servers(tmp_path):
+    path = tmp_path / "memo.wav"
+    path.write_bytes(b"x" * 1000)
+    response = RangeFileResponse(path, {"range": "bytes=10-19"}, media_type="audio/wav", etag="abc")
+    messages = []
+
+    async def send(message):
+        if message["type"] == "http.response.zerocopysend":
+            message = {**message, "data": os.pread(message["file"], message["count"], message["offset"])}
+        messages.append(message)
+
+    scope = {"type": "http", "extensions": {"http.response.zerocopysend": {}}}
+    asyncio.run(response(scope, None, send))
+    assert messages[0]["status"] == 206
+    assert messages[1]["type"] == "http.response.zerocopysend"
+    assert (messages[1]["offset"], messages[1]["count"], messages[1]["data"]) == (10, 10, b"x" * 10)
+
+def test_archive_deduplicates_and_prunes(tmp_path):
+    store = AudioArchive(str(tmp_path), max_bytes=2500)
+    first_id, first_path = store.put(b"a" * 1000, "mp3")
+    again_id, again_path = store.put(b"a" * 1000, "mp3")
+    assert (again_id, again_path) == (first_id, first_path)
+    assert first_path.name == first_id + ".mp3"
+    assert store.find(first_id) == (first_path, "audio/mpeg")
+    assert store.find("../etc/passwd") is None
+
+    store.put_transcript(first_id, {"segments": SEGMENTS})
+    assert store.get_transcript(first_id)["segments"][1]["start"] == 4.2
+
+    store.put(b"b" * 1000, "wav")
+    store.put(b"c" * 1000, "mp4")
+    # Over budget: the least recently used recording and its index go
+    assert store.find(first_id) is None
+    assert store.get_transcript(first_id) is None
+
+def test_source_spans_are_server_side_only():
+    schema = get_json_schema(ProcessedOutput)
+    assert "source_spans" not in schema["properties"]["tasks"]["items"]["properties"]
+
+def test_tasks_link_to_the_segments_they_came_from():
+    result = ProcessedOutput.model_validate(TASKS)
+    timestamps = parse_timestamps(SimpleNamespace(text="", segments=SEGMENTS, duration=15.0))
+    assert attach_source_spans(result, timestamps, "/audio/abc") == 2
+
+    certificate, designer, celebrate = result.tasks
+    assert (certificate.source_spans[0].start, certificate.source_spans[0].end) == (4.2, 9.8)
+    assert certificate.source_spans[0].url == "/audio/abc#t=4.2,9.8"
+    assert designer.source_spans[0].start == 9.8
+    assert celebrate.source_spans is None
+
+def test_segments_are_built_from_word_timings():
+    words = [
+        {"word": "renew", "start": 0.0, "end": 0.4},
+        {"word": "certificate", "start": 0.5, "end": 1.0},
+        {"word": "hire", "start": 3.0, "end": 3.3}
+    ]
+    timestamps = parse_timestamps({"text": "", "words": words})
+    assert [segment["text"] for segment in timestamps["segments"]] == ["renew certificate", "hire"]
+
+@pytest.fixture
+def archiving_client(tmp_path, monkeypatch):
+    """Production mode with a Whisper fake that returns segment timings."""
+    monkeypatch.setattr(archive, "root", tmp_path)
+    monkeypatch.setattr(settings, "RESULT_REUSE_SECONDS", 0)
+    requests = []
+
+    def transcribe(**kwargs):
+        requests.append(kwargs)
+        return SimpleNamespace(text="we need to renew the certificate", segments=SEGMENTS, duration=15.0)
+
+    whisper = SimpleNamespace(audio=SimpleNamespace(transcriptions=SimpleNamespace(create=transcribe)))
+    saved = (app.state.demo_mode, app.state.clients)
+    app.state.demo_mode = False
+    app.state.clients = SimpleNamespace(openai=whisper, openrouter=FakeClient(TASKS, TASKS))
+    try:
+        yield TestClient(app), requests
+    finally:
+        app.state.demo_mode, app.state.clients = saved
+
+def test_upload_is_archived_and_playable_by_range(archiving_client):
+    client, whisper_requests = archiving_client
+    wav = make_wav(seconds=1.0)
+    response = client.post("/process-audio", files={"file": ("memo.wav", wav, "audio/wav")})
+    assert response.status_code == 200
+    assert whisper_requests[0]["response_format"] == "verbose_json"
+    assert whisper_requests[0]["file"].name.endswith(".wav")
+
+    span = response.json()["tasks"][0]["source_spans"][0]
+    url, fragment = span["url"].split("#")
+    assert fragment == "t=4.2,9.8"
+    assert client.get(url + "/timestamps").json()["segments"][1]["start"] == 4.2
+
+    full = client.get(url)
+    assert full.status_code == 200
+    assert full.content == wav
+    assert full.headers["accept-ranges"] == "bytes"
+    assert full.headers["content-type"] == "audio/wav"
+    assert full.headers["cache-control"].startswith("private")
+
+    partial = client.get(url, headers={"Range": "bytes=100-199"})
+    assert partial.status_code == 206
+    assert partial.content == wav[100:200]
+    assert partial.headers["content-range"] == f"bytes 100-199/{len(wav)}"
+
+    assert client.get(url, headers={"Range": f"bytes={len(wav)}-"}).status_code == 416
+    assert client.get(url, headers={"If-None-Match": full.headers["etag"]}).status_code == 304
+    assert client.head(url).headers["content-length"] == str(len(wav))
+
+    # The same recording again is stored once
+    client.post("/process-audio", files={"file": ("copy.wav", wav, "audio/wav")})
+    assert len([p for p in archive.root.rglob("*.wav")]) == 1
+
+def test_unknown_recording_is_404(archiving_client):
+    client, _ = archiving_client
+    assert client.get("/audio/" + "0" * 64).status_code == 404
+    assert client.get("/audio/not-an-id").status_code == 404
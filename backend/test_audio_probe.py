@@ -0,0 +1,73 @@
+import io
+import struct
+import pytest
+from .main import app
+from .conftest import make_wav
+
+from utils.audio_probe import AudioProbeError, probe_audio, matches_content_type
+
+def make_mp3(frames: int = 100, xing: bool = False) -> bytes:
+    # MPEG-1 Layer III, 128 kbps, 44.1 kHz, stereo: 417-byte frames
+    header = b"\xff\xfb\x90\x00"
+    frame = header + b"\x00" * 413
+    body = frame * frames
+    if xing:
+        tag = bytearray(frame)
+        tag[36:48] = b"Xing" + struct.pack(">II", 0x1, frames)
+        body = bytes(tag) + body
+    id3 = b"ID3\x03\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10
+    return id3 + body
+
+def atom(kind: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I", 8 + len(payload)) + kind + payload
+
+def make_m4a(seconds: int = 90, rate: int = 44100) -> bytes:
+    mvhd = atom(b"mvhd", b"\x00" * 12 + struct.pack(">II", 1000, seconds * 1000) + b"\x00" * 80)
+    mdhd = atom(b"mdhd", b"\x00" * 12 + struct.pack(">II", rate, seconds * rate) + b"\x00" * 4)
+    hdlr = atom(b"hdlr", b"\x00" * 8 + b"soun" + b"\x00" * 13)
+    entry = atom(b"mp4a", b"\x00" * 6 + b"\x00\x01" + b"\x00" * 8 + struct.pack(">HHHHI", 2, 16, 0, 0, rate << 16))
+    stsd = atom(b"stsd", b"\x00" * 4 + struct.pack(">I", 1) + entry)
+    minf = atom(b"minf", atom(b"stbl", stsd))
+    trak = atom(b"trak", atom(b"mdia", mdhd + hdlr + minf))
+    # moov after mdat, as written by recorders that do not "fast start"
+    return atom(b"ftyp", b"M4A \x00\x00\x00\x00") + atom(b"mdat", b"\x00" * 5000) + atom(b"moov", mvhd + trak)
+
+def test_wav_header():
+    info = probe_audio(make_wav(seconds=1.5, rate=16000))
+    assert (info.container, info.codec, info.channels, info.sample_rate) == ("wav", "pcm", 1, 16000)
+    assert info.duration_seconds == 1.5
+
+def test_cbr_mp3_frame_scan():
+    info = probe_audio(make_mp3(frames=100))
+    assert (info.container, info.codec, info.sample_rate, info.channels) == ("mp3", "mp3", 44100, 2)
+    assert info.bitrate == 128000
+    assert info.duration_seconds == pytest.approx(100 * 1152 / 44100, rel=0.01)
+
+def test_vbr_mp3_xing_frame_count():
+    info = probe_audio(make_mp3(frames=300, xing=True))
+    assert info.duration_seconds == pytest.approx(300 * 1152 / 44100, rel=0.001)
+
+def test_m4a_atoms_with_trailing_moov():
+    info = probe_audio(make_m4a(seconds=90))
+    assert (info.container, info.codec, info.channels, info.sample_rate) == ("mp4", "aac", 2, 44100)
+    assert info.duration_seconds == 90
+
+def test_file_position_is_restored():
+    f = io.BytesIO(make_wav())
+    f.seek(3)
+    probe_audio(f)
+    assert f.tell() == 3
+
+def test_mislabeled_and_garbage_files():
+    assert not matches_content_type(probe_audio(make_wav()), "audio/mpeg")
+    assert matches_content_type(probe_audio(make_m4a()), "audio/x-m4a")
+    with pytest.raises(AudioProbeError):
+        probe_audio(b"definitely not audio")
+
+def test_upload_rejects_mislabeled_file():
+    from fastapi.testclient import TestClient
+    client = TestClient(app)
+    files = {"file": ("memo.mp3", make_wav(), "audio/mpeg")}
+    response = client.post("/process-audio", files=files)
+    assert response.status_code == 400
+    assert "WAV" in response.json()["detail"]
@@ -0,0 +1,67 @@
+import asyncio
+from .main import app  # noqa: F401 - puts the backend directory on sys.path
+from .conftest import MemoClient
+
+from services import FORMAT_SPECS, JobScheduler, StructuringBatcher
+from services.audio import _user_prompt
+from services.usage import begin_record
+
+def _structure_all(client, transcripts, batcher):
+    spec = FORMAT_SPECS["tasks"]
+
+    async def one(transcript):
+        record = begin_record()
+        result = await batcher.structure(client, "tasks", spec, transcript, _user_prompt(spec["instructions"], transcript))
+        return result, record
+
+    async def run():
+        return await asyncio.gather(*(one(transcript) for transcript in transcripts))
+
+    return asyncio.run(run())
+
+def _batcher(**kwargs):
+    return StructuringBatcher(JobScheduler("test", 4, 10.0), **kwargs)
+
+def test_concurrent_short_transcripts_share_one_completion():
+    client = MemoClient()
+    transcripts = ["call the printer", "book the venue", "email the speakers"]
+    results = _structure_all(client, transcripts, _batcher())
+
+    assert len(client.requests) == 1
+    assert client.requests[0]["tool_choice"]["function"]["name"] == "emit_processed_output_batch"
+    assert [result.tasks[0].title for result, _ in results] == transcripts
+    # The shared completion's tokens are split between the requests by transcript length
+    records = [record for _, record in results]
+    assert all(record["completions"] == 1 and record["batch_size"] == 3 for record in records)
+    assert sum(record["prompt_tokens"] for record in records) == 1000
+    assert records[2]["prompt_tokens"] > records[1]["prompt_tokens"]
+
+def test_unparseable_batch_falls_back_to_single_calls_and_shrinks():
+    client = MemoClient(broken_batches=True)
+    batcher = _batcher(max_size=8)
+    results = _structure_all(client, ["one thing", "another thing"], batcher)
+
+    assert len(client.requests) == 3
+    assert all(r["tool_choice"]["function"]["name"] == "emit_processed_output" for r in client.requests[1:])
+    assert sorted(result.tasks[0].title for result, _ in results) == ["another thing", "one thing"]
+    assert batcher.stats()["tasks"]["size_limit"] == 4
+
+def test_memo_missing_from_batch_gets_its_own_call():
+    client = MemoClient(drop_memo=2)
+    results = _structure_all(client, ["first", "second", "third"], _batcher())
+
+    assert len(client.requests) == 2
+    assert [result.tasks[0].title for result, _ in results] == ["first", "second", "third"]
+
+def test_batches_respect_size_limit_and_lone_memos_use_plain_prompt():
+    client = MemoClient()
+    _structure_all(client, [f"memo {i}" for i in range(5)], _batcher(max_size=2))
+    names = [r["tool_choice"]["function"]["name"] for r in client.requests]
+    assert names == ["emit_processed_output_batch", "emit_processed_output_batch", "emit_processed_output"]
+
+def test_only_short_single_format_transcripts_are_accepted():
+    batcher = _batcher(max_chars=100)
+    assert batcher.accepts("short", "tasks")
+    assert not batcher.accepts("x" * 101, "tasks")
+    assert not batcher.accepts("short", "all")
+    assert not _batcher(enabled=False).accepts("short", "tasks")
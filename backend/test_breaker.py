@@ -0,0 +1,138 @@
+import asyncio
+import time
+import pytest
+from fastapi import HTTPException
+from .conftest import make_wav
+
+from config import settings
+from services import CircuitBreaker, CircuitOpenError, UpstreamError, upstream_error, whisper_breaker, openrouter_breaker
+from services.breaker import CLOSED, OPEN
+
+class APIStatusError(Exception):
+    """Stands in for openai.APIStatusError, which the breaker recognizes by name."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+
+class APITimeoutError(Exception):
+    pass
+
+def _fail():
+    raise UpstreamError(status_code=503, detail="upstream down")
+
+def _run(breaker, func):
+    try:
+        return asyncio.run(breaker.call(func))
+    except HTTPException:
+        return None
+
+def test_opens_on_error_rate_and_fails_fast():
+    breaker = CircuitBreaker("test", window=4, min_calls=4, failure_rate=0.5, open_seconds=60)
+    for func in (lambda: "ok", _fail, lambda: "ok"):
+        _run(breaker, func)
+    assert breaker.state == CLOSED
+    _run(breaker, _fail)
+    assert breaker.state == OPEN
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(breaker.call(lambda: calls.append(1)))
+    assert calls == []
+    assert breaker.rejects()
+
+def test_client_errors_do_not_count():
+    breaker = CircuitBreaker("test", window=2, min_calls=2, failure_rate=0.5)
+    def bad_request():
+        raise HTTPException(status_code=400, detail="bad upload")
+    for _ in range(4):
+        _run(breaker, bad_request)
+    assert breaker.state == CLOSED
+
+def test_only_upstream_outages_count():
+    breaker = CircuitBreaker("test", window=2, min_calls=2, failure_rate=0.5)
+
+    def raising(error):
+        def func():
+            raise error
+        return func
+
+    # Our own validation failures and the upstream's 4xx answers say nothing about its health
+    for error in (HTTPException(status_code=500, detail="invalid output"), ValueError("bad JSON"), upstream_error(APIStatusError(429), "slow down")):
+        try:
+            asyncio.run(breaker.call(raising(error)))
+        except Exception:
+            pass
+    assert breaker.state == CLOSED
+
+    for error in (APIStatusError(502), APITimeoutError()):
+        try:
+            asyncio.run(breaker.call(raising(error)))
+        except Exception:
+            pass
+    assert breaker.state == OPEN
+
+def test_upstream_errors_carry_the_upstream_status():
+    assert upstream_error(APIStatusError(400), "bad audio").status_code == 400
+    assert upstream_error(APITimeoutError(), "timed out").status_code == 504
+    assert upstream_error(APIStatusError(401), "bad key").status_code == 502
+    assert type(upstream_error(ValueError("bug"), "broken")) is HTTPException
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker("test", window=2, min_calls=2, failure_rate=1.0, slow_call_seconds=0.01)
+    for _ in range(2):
+        _run(breaker, lambda: time.sleep(0.02))
+    assert breaker.state == OPEN
+
+def test_slow_call_threshold_grows_with_the_audio():
+    breaker = CircuitBreaker("test", window=2, min_calls=2, failure_rate=1.0, slow_call_seconds=0.01, slow_call_per_second=0.1)
+    for _ in range(2):
+        # 0.02 s is slow for no audio, but not for a second of it
+        asyncio.run(breaker.call(lambda: time.sleep(0.02), work_seconds=1.0))
+    assert breaker.state == CLOSED
+
+def test_half_open_trial_closes_or_reopens():
+    breaker = CircuitBreaker("test", window=2, min_calls=2, failure_rate=0.5, open_seconds=0.05)
+    _run(breaker, _fail)
+    _run(breaker, _fail)
+    assert breaker.state == OPEN
+
+    time.sleep(0.06)
+    assert not breaker.rejects()
+    _run(breaker, _fail)
+    assert breaker.state == OPEN
+
+    time.sleep(0.06)
+    assert _run(breaker, lambda: "ok") == "ok"
+    assert breaker.state == CLOSED
+
+def test_degraded_responses_while_circuits_are_open(production_client, monkeypatch):
+    # Without reuse, only an open circuit makes the cached result reachable
+    monkeypatch.setattr(settings, "RESULT_REUSE_SECONDS", 0)
+    wav = make_wav(seconds=2.0)
+    files = lambda: {"file": ("memo.wav", wav, "audio/wav")}
+
+    response = production_client.post("/process-audio", files=files())
+    assert response.status_code == 200
+    assert "x-degraded" not in response.headers
+
+    # Structuring down: the same recording is answered from the result cache...
+    openrouter_breaker._open()
+    response = production_client.post("/process-audio", files=files())
+    assert response.status_code == 200
+    assert response.headers["x-degraded"] == "cached"
+    assert response.json()["tasks"][0]["title"] == "Ship it"
+
+    # ...a new one gets its transcript and a handle to structure later
+    response = production_client.post("/process-audio", files={"file": ("new.wav", make_wav(), "audio/wav")})
+    assert response.status_code == 202
+    assert response.headers["x-degraded"] == "transcript-only"
+    assert response.json()["transcript"] == "we need to ship it"
+    assert response.json()["handle"]
+
+    # Transcription down: fail fast with Retry-After instead of waiting on a timeout
+    whisper_breaker._open()
+    response = production_client.post("/process-audio/roadmap", files=files())
+    assert response.status_code == 503
+    assert response.json()["degraded"] is True
+    assert int(response.headers["retry-after"]) > 0
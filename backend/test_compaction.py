@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from .conftest import MemoClient
+
+from config import settings
+from services import JobScheduler, StructuringBatcher, structure_transcript
+from services.usage import begin_record
+from utils import compact_transcript
+import routes.audio
+import services.audio
+
+DISFLUENT = (
+    "Um, okay, so, the the billing migration is, you know, done. "
+    "Uh, Priya- Priya is on that. I'll ask, I'll ask the data team for five hundred queries."
+)
+
+def test_light_removes_filler_sounds_fragments_and_stutters():
+    assert compact_transcript(DISFLUENT, "light") == (
+        "Okay, so, the billing migration is, you know, done. "
+        "Priya is on that. I'll ask, I'll ask the data team for five hundred queries."
+    )
+
+def test_standard_removes_discourse_markers_and_repeated_phrases():
+    assert compact_transcript(DISFLUENT, "standard") == (
+        "The billing migration is done. Priya is on that. I'll ask the data team for five hundred queries."
+    )
+
+def test_words_that_carry_meaning_are_kept():
+    text = "I like the new design. So many people asked. Right now that that works, right? It costs like $5,000."
+    for level in ("light", "standard"):
+        assert compact_transcript(text, level) == text
+
+def test_numbers_prefixes_and_names_are_kept():
+    text = (
+        "Call me at 555 555 1234. Rooms 101 101 are booked for four four-hour sessions. "
+        "Run the pre- and post-launch checks and the co- and self-assessment. Ask Er Wei about it."
+    )
+    for level in ("light", "standard", "aggressive"):
+        assert compact_transcript(text, level) == text
+    assert compact_transcript("Er, ask Wei. It was done, err.", "light") == "Ask Wei. It was done."
+
+def test_aggressive_drops_hedges_false_starts_and_acknowledgements():
+    text = "Okay. Yeah. We just really need to ship. I was going to -- let's ask Dana. We need to ship."
+    assert compact_transcript(text, "aggressive") == "We need to ship. Let's ask Dana."
+
+def test_off_and_unknown_levels():
+    assert compact_transcript(DISFLUENT, "off") == DISFLUENT
+    with pytest.raises(ValueError):
+        compact_transcript(DISFLUENT, "extreme")
+
+def test_structuring_sends_the_compacted_transcript_and_reports_the_saving(monkeypatch):
+    monkeypatch.setattr(settings, "TRANSCRIPT_COMPACTION", "standard")
+    client = MemoClient()
+
+    async def run():
+        record = begin_record()
+        # Long enough not to be micro-batched
+        await structure_transcript(DISFLUENT * 10, client, "tasks")
+        return record
+
+    record = asyncio.run(run())
+    prompt = client.requests[0]["messages"][1]["content"]
+    assert "Um," not in prompt and "Priya-" not in prompt
+    assert record["compacted_tokens"] < record["transcript_tokens"]
+    assert "compaction" in record["stages"]
+
+def test_memos_compacted_under_the_batch_limit_do_not_deadlock_the_scheduler(monkeypatch):
+    monkeypatch.setattr(settings, "TRANSCRIPT_COMPACTION", "standard")
+    scheduler = JobScheduler("test", 4, 10.0)
+    batcher = StructuringBatcher(scheduler, max_chars=500)
+    monkeypatch.setattr(routes.audio, "structuring_scheduler", scheduler)
+    monkeypatch.setattr(routes.audio, "structuring_batcher", batcher)
+    monkeypatch.setattr(services.audio, "structuring_batcher", batcher)
+    client = MemoClient()
+    # Too long to batch as sent, short enough once compacted
+    transcript = DISFLUENT * 4
+    assert len(compact_transcript(transcript, "standard")) <= 500 < len(transcript)
+
+    async def one():
+        begin_record()
+        return await routes.audio._schedule_structuring(client, transcript, "tasks")
+
+    async def run():
+        # More requests than the scheduler has slots
+        return await asyncio.wait_for(asyncio.gather(*(one() for _ in range(5))), 5.0)
+
+    results = asyncio.run(run())
+    assert len(results) == 5 and len(client.requests) == 5
+    assert scheduler.stats()["running"] == 0
@@ -0,0 +1,88 @@
+import asyncio
+import time
+from fastapi import HTTPException
+import pytest
+from .main import app  # noqa: F401 - puts the backend directory on sys.path
+from .conftest import FakeClient, VALID_TASKS, make_wav, run_generation
+
+from routes.audio import _run_until_disconnect
+from services import start_deadline
+from utils import metrics
+
+class FakeRequest:
+    """Request whose client disconnects after `after` seconds."""
+
+    def __init__(self, after: float = 60.0):
+        self.after = after
+
+    async def receive(self):
+        await asyncio.sleep(self.after)
+        return {"type": "http.disconnect"}
+
+def _watch(request, work, deadline: float = 60.0, **kwargs):
+    async def scenario():
+        start_deadline(deadline)
+        return await _run_until_disconnect(request, work(), **kwargs)
+    return asyncio.run(scenario())
+
+def test_disconnect_cancels_upstream_work():
+    metrics.reset()
+    progress = []
+
+    async def work():
+        await asyncio.sleep(1)
+        progress.append("structured")
+
+    response = _watch(FakeRequest(after=0.02), work)
+    assert response.status_code == 499
+    assert progress == []
+    assert metrics.get("requests.cancelled.disconnect") == 1
+
+def test_disconnect_keeps_work_whose_result_is_kept():
+    metrics.reset()
+    done = []
+
+    async def work():
+        await asyncio.sleep(0.05)
+        done.append(True)
+
+    async def scenario():
+        start_deadline(60)
+        response = await _run_until_disconnect(FakeRequest(after=0.01), work(), keep_on_disconnect=lambda: True)
+        await asyncio.sleep(0.1)
+        return response
+
+    assert asyncio.run(scenario()).status_code == 499
+    assert done == [True]
+    assert metrics.get("requests.disconnects_kept") == 1
+
+def test_deadline_expiry_cancels_with_504():
+    metrics.reset()
+    started = time.monotonic()
+    with pytest.raises(HTTPException) as error:
+        _watch(FakeRequest(), lambda: asyncio.sleep(5), deadline=0.05)
+    assert error.value.status_code == 504
+    assert time.monotonic() - started < 1
+    assert metrics.get("requests.cancelled.deadline") == 1
+
+def test_upstream_calls_get_the_remaining_deadline():
+    client = FakeClient(VALID_TASKS)
+
+    async def scenario():
+        start_deadline(30)
+        return await asyncio.to_thread(run_generation, client)
+
+    asyncio.run(scenario())
+    assert 1.0 <= client.requests[0]["timeout"] <= 30
+
+def test_identical_upload_reuses_recent_result(production_client):
+    files = lambda: {"file": ("memo.wav", make_wav(seconds=3.0), "audio/wav")}
+    first = production_client.post("/process-audio", files=files())
+    assert first.status_code == 200
+    calls = len(app.state.clients.openrouter.requests)
+
+    second = production_client.post("/process-audio", files=files(), headers={"X-Request-Timeout": "30"})
+    assert second.status_code == 200
+    assert second.headers["x-cache"] == "hit"
+    assert second.content == first.content
+    assert len(app.state.clients.openrouter.requests) == calls
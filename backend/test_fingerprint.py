@@ -0,0 +1,141 @@
+import io
+import wave
+from types import SimpleNamespace
+import pytest
+from fastapi.testclient import TestClient
+from .main import app
+from .conftest import FakeClient, VALID_TASKS
+
+np = pytest.importorskip("numpy")
+
+from config import settings
+from services import AudioArchive, FingerprintIndex, archive, fingerprint_index
+from utils import Fingerprint, metrics
+from utils.fingerprint import fingerprint, decode_pcm
+
+def speech_like(seed: int, seconds: float = 20.0, rate: int = 16000) -> "np.ndarray":
+    """Bursts of harmonic tones with a moving formant, roughly like syllables."""
+    rng = np.random.default_rng(seed)
+    out = np.zeros(int(seconds * rate))
+    position = 0
+    while position < len(out):
+        length = int(rng.uniform(0.08, 0.3) * rate)
+        t = np.arange(min(length, len(out) - position)) / rate
+        f0, formant = rng.uniform(100, 250), rng.uniform(300, 3000)
+        burst = sum(rng.uniform(0.2, 1) / k * np.sin(2 * np.pi * f0 * k * t) for k in range(1, 12))
+        burst += 0.8 * np.sin(2 * np.pi * formant * t)
+        out[position:position + len(t)] += np.sin(np.pi * t / (length / rate)) * burst
+        position += length + int(rng.uniform(0, 0.15) * rate)
+    return out / np.abs(out).max() * 0.8
+
+def reencoded(samples: "np.ndarray", rate: int = 16000, new_rate: int = 44100) -> "np.ndarray":
+    """Resampled, quieter, slightly delayed and noisy: what a lossy re-export does to the peaks."""
+    rng = np.random.default_rng(0)
+    resampled = np.interp(np.arange(int(len(samples) * new_rate / rate)) * rate / new_rate, np.arange(len(samples)), samples)
+    delayed = np.r_[np.zeros(int(0.04 * new_rate)), resampled[:-int(0.04 * new_rate)]]
+    return 0.5 * delayed + rng.normal(0, 0.01, len(delayed))
+
+def to_wav(samples: "np.ndarray", rate: int = 16000, channels: int = 1) -> bytes:
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(np.repeat(pcm, channels).tobytes())
+    return buffer.getvalue()
+
+def _fingerprint(wav: bytes, tmp_path, name: str) -> Fingerprint:
+    path = tmp_path / name
+    path.write_bytes(wav)
+    return fingerprint(decode_pcm(path, "wav"), duration_seconds=20.0)
+
+def test_reencoded_copy_matches_and_other_recordings_do_not(tmp_path):
+    original = speech_like(1)
+    index = FingerprintIndex(AudioArchive(str(tmp_path / "archive")), refresh_seconds=3600)
+    index.add("original", _fingerprint(to_wav(original), tmp_path, "a.wav"))
+    index.add("other", _fingerprint(to_wav(speech_like(2)), tmp_path, "b.wav"))
+
+    copy = _fingerprint(to_wav(reencoded(original), rate=44100, channels=2), tmp_path, "copy.wav")
+    audio_id, confidence = index.match(copy)
+    assert audio_id == "original"
+    assert confidence > 0.3
+
+    assert index.match(_fingerprint(to_wav(speech_like(3)), tmp_path, "c.wav")) is None
+
+def test_different_length_does_not_match(tmp_path):
+    original = speech_like(1)
+    index = FingerprintIndex(AudioArchive(str(tmp_path / "archive")), refresh_seconds=3600)
+    index.add("original", _fingerprint(to_wav(original), tmp_path, "a.wav"))
+    longer = _fingerprint(to_wav(original), tmp_path, "longer.wav")
+    longer.duration_seconds = 95.0
+    assert index.match(longer) is None
+
+def test_fingerprints_round_trip_through_the_archive(tmp_path):
+    store = AudioArchive(str(tmp_path))
+    audio_id, _ = store.put(to_wav(speech_like(1, seconds=5)), "wav")
+    fp = _fingerprint(to_wav(speech_like(1, seconds=5)), tmp_path, "a.wav")
+    store.put_fingerprint(audio_id, fp)
+
+    loaded = store.get_fingerprint(audio_id)
+    assert np.array_equal(loaded.hashes, fp.hashes) and loaded.duration_seconds == 20.0
+    # Another worker's index picks it up from disk
+    index = FingerprintIndex(store)
+    index.refresh()
+    assert len(index) == 1
+
+def test_refresh_keeps_added_fingerprints_and_drops_pruned_ones(tmp_path):
+    store = AudioArchive(str(tmp_path))
+    fp = _fingerprint(to_wav(speech_like(1, seconds=5)), tmp_path, "a.wav")
+    archived_id, _ = store.put(to_wav(speech_like(1, seconds=5)), "wav")
+    store.put_fingerprint(archived_id, fp)
+    index = FingerprintIndex(store)
+    index.add("not-archived-yet", fp)
+    index.refresh()
+    assert len(index) == 2
+
+    (tmp_path / archived_id[:2] / f"{archived_id}.fp").unlink()
+    index.refresh()
+    assert len(index) == 1
+
+@pytest.fixture
+def counting_client(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "root", tmp_path)
+    monkeypatch.setattr(fingerprint_index, "_fingerprints", {})
+    monkeypatch.setattr(fingerprint_index, "_pending", True)
+    monkeypatch.setattr(settings, "RESULT_REUSE_SECONDS", 0)
+    calls = []
+
+    def transcribe(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(text="we need to ship it")
+
+    whisper = SimpleNamespace(audio=SimpleNamespace(transcriptions=SimpleNamespace(create=transcribe)))
+    saved = (app.state.demo_mode, app.state.clients)
+    app.state.demo_mode = False
+    app.state.clients = SimpleNamespace(openai=whisper, openrouter=FakeClient(*[VALID_TASKS] * 3))
+    try:
+        yield TestClient(app), calls
+    finally:
+        app.state.demo_mode, app.state.clients = saved
+
+def test_reexported_upload_reuses_the_transcript(counting_client):
+    client, whisper_calls = counting_client
+    metrics.reset()
+    # Short, low-rate files: uploads are charged against the shared rate-limit bucket
+    original = speech_like(1, seconds=8)
+
+    response = client.post("/process-audio", files={"file": ("memo.wav", to_wav(original), "audio/wav")})
+    assert response.status_code == 200
+    assert len(whisper_calls) == 1
+
+    copy = to_wav(reencoded(original, new_rate=22050), rate=22050)
+    response = client.post("/process-audio", files={"file": ("memo-export.wav", copy, "audio/wav")})
+    assert response.status_code == 200
+    assert len(whisper_calls) == 1
+    assert metrics.get("fingerprints.matches") == 1
+
+    response = client.post("/transcribe", files={"file": ("new.wav", to_wav(speech_like(5, seconds=8)), "audio/wav")})
+    assert response.json()["transcript"] == "we need to ship it"
+    assert len(whisper_calls) == 2
+    assert metrics.get("fingerprints.misses") == 2
@@ -0,0 +1,63 @@
+import asyncio
+import json
+import pytest
+from .conftest import FakeClient, VALID_TASKS, run_generation
+
+from models import ProcessedOutput
+from services.generation import get_json_schema, generation_stats
+from utils import metrics
+
+def test_schema_is_self_contained():
+    schema = get_json_schema(ProcessedOutput)
+    assert "$defs" not in json.dumps(schema)
+    assert "title" in schema["properties"]["tasks"]["items"]["properties"]
+
+def test_valid_tool_call_needs_one_request():
+    metrics.reset()
+    client = FakeClient(VALID_TASKS)
+    result = run_generation(client)
+    assert result.tasks[0].title == "Ship it"
+    assert len(client.requests) == 1
+    assert client.requests[0]["tool_choice"]["function"]["name"] == "emit_processed_output"
+
+def test_invalid_item_is_repaired_alone():
+    metrics.reset()
+    broken = json.loads(json.dumps(VALID_TASKS))
+    broken["tasks"].append({"title": "Missing priority"})
+    client = FakeClient(broken, {"value": {"title": "Missing priority", "priority": "Low"}})
+    result = run_generation(client)
+
+    assert [task.priority for task in result.tasks] == ["High", "Low"]
+    repair_request = client.requests[1]
+    assert "Field: tasks.1" in repair_request["messages"][1]["content"]
+    assert repair_request["tools"][0]["function"]["parameters"]["properties"]["value"]["type"] == "object"
+    stats = generation_stats()["tasks"]
+    assert stats["invalid_rate"] == 1.0
+    assert stats["repair_success_rate"] == 1.0
+
+def test_repair_without_a_value_counts_as_a_repair_failure():
+    metrics.reset()
+    broken = json.loads(json.dumps(VALID_TASKS))
+    broken["tasks"].append({"title": "Missing priority"})
+    client = FakeClient(broken, {"nothing": "useful"})
+    with pytest.raises(ValueError):
+        run_generation(client)
+    assert metrics.get("generation.tasks.repair_failures") == 1
+    assert generation_stats()["tasks"]["repair_success_rate"] == 0.0
+
+def test_combined_part_falls_back_to_single_format():
+    from services import process_transcript_to_all
+    from utils import get_demo_process_doc, get_demo_roadmap
+
+    combined = {
+        "tasks": VALID_TASKS,
+        "roadmap": "not an object",
+        "process": get_demo_process_doc().model_dump()
+    }
+    client = FakeClient(combined, get_demo_roadmap().model_dump())
+    result = asyncio.run(process_transcript_to_all("transcript", client))
+
+    assert len(client.requests) == 2
+    assert client.requests[1]["tool_choice"]["function"]["name"] == "emit_strategic_roadmap"
+    assert result["roadmap"]["summary"] == get_demo_roadmap().summary
+    assert result["tasks"]["tasks"][0]["title"] == "Ship it"
@@ -0,0 +1,136 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from fastapi import FastAPI, WebSocketDisconnect
+from fastapi.testclient import TestClient
+from .main import app
+from .conftest import MemoClient, WhisperClient, make_tone
+
+from config import settings
+from middleware import RateLimitMiddleware, MemoryBucketStore
+from routes import live
+from services.live import LiveSession, frame_levels, frame_rms
+
+RATE = 8000
+
+def _silence(seconds: float) -> bytes:
+    return bytes(2 * int(seconds * RATE))
+
+def _recording() -> bytes:
+    # Two stretches of speech with a pause between them, then trailing silence
+    return make_tone(1.5) + _silence(0.5) + make_tone(1.0) + _silence(2.0)
+
+def _session(transcribed: list, **kwargs) -> LiveSession:
+    async def transcribe(wav, prompt, seconds):
+        transcribed.append((prompt, seconds, wav[:4]))
+        return f"part {len(transcribed)}", {"segments": [{"start": 0.0, "end": 0.5, "text": "x"}], "words": []}
+
+    return LiveSession(transcribe, RATE, min_segment=1.0, max_segment=3.0, pause=0.3, **kwargs)
+
+def test_segments_close_at_pauses_and_silence_is_never_transcribed():
+    transcribed = []
+
+    async def run():
+        session = _session(transcribed, keep_bytes=10**6)
+        audio = _recording()
+        # Odd-sized chunks, as a browser would send them
+        for offset in range(0, len(audio), 999):
+            session.feed(audio[offset:offset + 999])
+        return session, await session.finish()
+
+    session, transcript = asyncio.run(run())
+    assert transcript == "part 1 part 2"
+    # Cut at the first pause after a second of audio; the silent tail is dropped
+    assert [round(seconds, 1) for _, seconds, _ in transcribed] == [1.8, 1.5]
+    assert all(header == b"RIFF" for _, _, header in transcribed)
+    assert [prompt for prompt, _, _ in transcribed] == ["", "part 1"]
+    assert [segment["start"] for segment in session.timestamps()["segments"]] == [0.0, 1.8]
+    assert session.wav()[:4] == b"RIFF"
+
+def test_long_speech_is_cut_at_the_maximum_length():
+    transcribed = []
+
+    async def run():
+        session = _session(transcribed)
+        session.feed(make_tone(7.0))
+        return await session.finish()
+
+    asyncio.run(run())
+    assert [round(seconds, 1) for _, seconds, _ in transcribed] == [3.0, 3.0, 1.0]
+
+def test_frame_levels_match_the_per_frame_rms():
+    audio = make_tone(0.1) + _silence(0.05)
+    frame_bytes = 2 * int(RATE * 0.03)
+    levels = frame_levels(audio, frame_bytes)
+    assert len(levels) == len(audio) // frame_bytes
+    expected = [frame_rms(audio[offset:offset + frame_bytes]) for offset in range(0, len(levels) * frame_bytes, frame_bytes)]
+    assert levels == pytest.approx(expected)
+
+@pytest.fixture
+def live_client(monkeypatch):
+    monkeypatch.setattr(settings, "ARCHIVE_ENABLED", False)
+    monkeypatch.setattr(settings, "LIVE_SEGMENT_MIN_SECONDS", 1.0)
+    monkeypatch.setattr(settings, "LIVE_PAUSE_SECONDS", 0.3)
+    whisper = WhisperClient()
+    saved = (app.state.demo_mode, app.state.clients, app.state.draining)
+    app.state.demo_mode = False
+    app.state.clients = SimpleNamespace(openai=whisper, openrouter=MemoClient())
+    try:
+        with TestClient(app) as client:
+            yield client, whisper
+    finally:
+        app.state.demo_mode, app.state.clients, app.state.draining = saved
+
+def test_live_recording_streams_segments_then_the_result(live_client):
+    client, whisper = live_client
+    with client.websocket_connect(f"/live/tasks?sample_rate={RATE}") as ws:
+        assert ws.receive_json() == {"type": "ready", "sample_rate": RATE}
+        audio = _recording()
+        for offset in range(0, len(audio), 4000):
+            ws.send_bytes(audio[offset:offset + 4000])
+        ws.send_json({"type": "stop"})
+        messages = [ws.receive_json() for _ in range(4)]
+
+    assert [message["type"] for message in messages] == ["segment", "segment", "transcript", "result"]
+    assert messages[1]["transcript"] == "Part 1 renew the certificate. Part 2 renew the certificate."
+    assert whisper.prompts == ["", "Part 1 renew the certificate."]
+    result = messages[3]["result"]
+    assert result["tasks"][0]["title"].startswith("Part 1")
+    # Tasks are linked to the segment they were said in, offset into the whole recording
+    assert result["tasks"][0]["source_spans"][0]["start"] == 0.0
+
+def test_unknown_live_format_is_refused(live_client):
+    client, _ = live_client
+    with client.websocket_connect("/live/poems") as ws:
+        message = ws.receive_json()
+    assert message["type"] == "error"
+    assert "Unknown format" in message["detail"]
+
+def test_live_audio_is_charged_to_the_rate_limit():
+    limited = FastAPI()
+    limited.include_router(live.router)
+    limited.state.demo_mode = False
+    limited.state.clients = SimpleNamespace(openai=WhisperClient(), openrouter=MemoClient())
+    # Room for the connection and a few seconds of audio, with no refill to speak of
+    limited.add_middleware(
+        RateLimitMiddleware,
+        store=MemoryBucketStore(),
+        capacity=8.0,
+        refill_per_second=0.001,
+        request_cost=5.0
+    )
+    client = TestClient(limited)
+    with client.websocket_connect(f"/live/tasks?sample_rate={RATE}") as ws:
+        assert ws.receive_json()["type"] == "ready"
+        audio = make_tone(live.CHARGE_SECONDS + 1)
+        for offset in range(0, len(audio), 4000):
+            ws.send_bytes(audio[offset:offset + 4000])
+        message = ws.receive_json()
+    assert message["type"] == "error"
+    assert "Rate limit exceeded" in message["detail"] and message["retry_after"] > 0
+
+    # The bucket is now empty: the next recording is refused at the door
+    with pytest.raises(WebSocketDisconnect) as refused:
+        with client.websocket_connect(f"/live/tasks?sample_rate={RATE}"):
+            pass
+    assert refused.value.code == live.CLOSE_TRY_LATER
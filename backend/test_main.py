@@ -1,7 +1,9 @@
 import pytest
 from fastapi.testclient import TestClient
 from .main import app
+from .conftest import make_wav
 import os
+import re
 
 client = TestClient(app)
 
@@ -124,3 +126,114 @@ def test_cors_headers():
     assert response.status_code == 200
     assert "access-control-allow-origin" in response.headers
     assert "access-control-allow-methods" in response.headers
+
+def test_transcribe_then_structure_by_handle():
+    files = {"file": ("memo.wav", make_wav(), "audio/wav")}
+    response = client.post("/transcribe", files=files)
+    assert response.status_code == 200
+    handle = response.json()["handle"]
+    assert response.json()["duration_seconds"] == 1.5
+
+    response = client.post("/structure/roadmap", json={"handle": handle})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert "milestones" in response.json()
+
+def test_transcript_handles_resolve_on_any_worker(tmp_path):
+    from services import TranscriptStore
+    issuing, other = TranscriptStore(tmp_path, ttl=60), TranscriptStore(tmp_path, ttl=60)
+    handle = issuing.put("Renew the certificate.", "abc123")
+    assert other.get(handle) == "Renew the certificate."
+    assert other.audio_id(handle) == "abc123"
+    assert other.get("missing") is None and other.get("../" + handle) is None
+
+    expired = TranscriptStore(tmp_path, ttl=0)
+    os.utime(tmp_path / f"{handle}.json", (0, 0))
+    assert expired.get(handle) is None and len(other) == 0
+
+def test_demo_output_matches_model_serialization():
+    from utils import get_demo_json, get_demo_all
+    files = {"file": ("memo.wav", make_wav(), "audio/wav")}
+    response = client.post("/process-audio/all", files=files)
+    assert response.status_code == 200
+    assert response.content == get_demo_json("all")
+    assert response.json() == get_demo_all().model_dump()
+
+def test_stats_aggregates_processed_requests(monkeypatch):
+    from config import settings
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    admin = {"X-Admin-Token": "s3cret"}
+    files = {"file": ("memo.wav", make_wav(), "audio/wav")}
+    client.post("/process-audio/roadmap", files=files)
+    response = client.get("/stats", params={"window": 60, "group_by": "format"}, headers=admin)
+    assert response.status_code == 200
+    roadmap = response.json()["groups"]["roadmap"]
+    assert roadmap["requests"] >= 1
+    assert roadmap["audio_seconds"] >= 1.5
+    assert client.get("/stats", params={"group_by": "color"}, headers=admin).status_code == 400
+
+def test_stats_are_for_admins_only(monkeypatch):
+    from config import settings
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "")
+    assert client.get("/stats").status_code == 404
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/stats").status_code == 401
+    assert client.get("/stats", headers={"X-Admin-Token": "guess"}).status_code == 401
+
+def test_structure_rejects_unknown_handle_and_format():
+    assert client.post("/structure/tasks", json={"handle": "missing"}).status_code == 404
+    assert client.post("/structure/poem", json={"transcript": "hello"}).status_code == 404
+    assert client.post("/structure/tasks", json={}).status_code == 422
+
+def test_readiness_reports_capacity():
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "ready"
+    assert data["in_flight"] >= 1
+    assert "queue_depth" in data and "memory_rss_mb" in data
+
+def test_readiness_sheds_load_when_upstream_down():
+    from services import readiness_report
+
+    class DownProber:
+        results = {"whisper": {"reachable": False}, "openrouter": {"reachable": True}}
+
+    ready, report = readiness_report(DownProber())
+    assert not ready
+    assert report["reasons"] == ["whisper unreachable"]
+
+def test_static_assets_are_hashed_and_compressed():
+    index = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert index.status_code == 200
+    assert index.headers["cache-control"] == "no-cache"
+    match = re.search(r'static/(js/app\.[0-9a-f]{12}\.js)', index.text)
+    assert match, "index.html should reference the hashed app.js"
+
+    response = client.get(f"/static/{match.group(1)}", headers={"Accept-Encoding": "gzip, br"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] in ("br", "gzip")
+    assert "immutable" in response.headers["cache-control"]
+    assert "Accept-Encoding" in response.headers["vary"]
+
+    etag = response.headers["etag"]
+    cached = client.get(f"/static/{match.group(1)}", headers={"Accept-Encoding": "gzip, br", "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    assert client.get("/static/js/app.js").status_code == 200
+    assert client.get("/static/js/missing.js").status_code == 404
+    # Leftovers the page doesn't use are not served
+    assert client.get("/static/css/stylesBACKUP.css").status_code == 404
+
+def test_asset_manifest_is_built_on_first_use(tmp_path):
+    from utils.assets import AssetManifest
+    (tmp_path / "static").mkdir()
+    (tmp_path / "static" / "app.js").write_text("console.log('hi');")
+    (tmp_path / "static" / "old.js").write_text("console.log('old');")
+    (tmp_path / "index.html").write_text('<script src="static/app.js"></script>')
+    manifest = AssetManifest(tmp_path / "static", tmp_path / "index.html")
+    assert not manifest.loaded and manifest.get("app.js") is None
+
+    assert manifest.load() is manifest and manifest.loaded
+    assert manifest.get("app.js") is not None and manifest.get("old.js") is None
+    assert manifest.hashed_names["app.js"].encode() in manifest.index.variants["identity"]
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from .main import app
+
+from config import settings
+from services.profiler import _lock, sample_stacks, task_snapshot
+
+client = TestClient(app)
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    return {"X-Admin-Token": "s3cret"}
+
+def test_admin_routes_are_hidden_without_a_token(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "")
+    assert client.get("/admin/profile", params={"seconds": 0.1}).status_code == 404
+
+def test_admin_routes_reject_a_wrong_token(admin_token):
+    response = client.get("/admin/tasks", headers={"X-Admin-Token": "guess"})
+    assert response.status_code == 401
+
+def test_profile_returns_collapsed_stacks(admin_token):
+    stop = threading.Event()
+    def busy_work():
+        while not stop.is_set():
+            sum(range(1000))
+    worker = threading.Thread(target=busy_work, name="busy")
+    worker.start()
+    try:
+        response = client.get("/admin/profile", params={"seconds": 0.2, "interval_ms": 5}, headers=admin_token)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert any(line.startswith("busy;") and "busy_work (backend/test_profiler.py:" in line for line in lines)
+
+def test_only_one_profile_at_a_time(admin_token):
+    with _lock:
+        response = client.get("/admin/profile", params={"seconds": 0.1}, headers=admin_token)
+    assert response.status_code == 409
+
+def test_task_snapshot_groups_pending_awaits_by_route():
+    async def handler(scope):
+        await asyncio.sleep(10)
+
+    async def scenario():
+        tasks = [
+            asyncio.create_task(handler({"type": "http", "method": "POST", "path": "/process-audio"}))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        snapshot = task_snapshot()
+        for task in tasks:
+            task.cancel()
+        return snapshot
+
+    route = asyncio.run(scenario())["routes"]["POST /process-audio"]
+    assert route["pending"] == 3
+    assert route["tasks"][0]["awaiting"] == "Future"
+    assert "handler (backend/test_profiler.py:" in route["tasks"][0]["stack"][0]
+
+def test_sampler_skips_itself():
+    result = sample_stacks(0.05, 0.01)
+    assert result["samples"] >= 1
+    assert not any("sample_stacks" in stack for stack in result["stacks"])
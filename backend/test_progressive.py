@@ -0,0 +1,132 @@
+import asyncio
+import json
+from types import SimpleNamespace
+import pytest
+from fastapi.testclient import TestClient
+from .main import app
+
+from config import settings
+from services import UpgradeStore, result_cache, upgrade_store
+from utils import diff_results
+
+DRAFT = {
+    "tasks": [{"title": "Renew the certificate", "priority": "Low", "description": None}],
+    "next_steps": ["Email the vendor"],
+    "notes": []
+}
+FULL = {
+    "tasks": [
+        {"title": "Hire a contractor", "priority": "Medium", "description": None},
+        {"title": "Renew the certificate", "priority": "High", "description": None}
+    ],
+    "next_steps": ["Email the vendor"],
+    "notes": []
+}
+
+class ModelClient:
+    """Chat client answering with the draft or the full result depending on the requested model."""
+
+    def __init__(self):
+        self.models = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.models.append(kwargs["model"])
+        payload = DRAFT if kwargs["model"] == settings.DRAFT_MODEL else FULL
+        call = SimpleNamespace(function=SimpleNamespace(arguments=json.dumps(payload)))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=None, tool_calls=[call]))])
+
+@pytest.fixture
+def progressive_client(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "RESULT_REUSE_SECONDS", 0)
+    monkeypatch.setattr(upgrade_store, "root", tmp_path)
+    openrouter = ModelClient()
+    saved = (app.state.demo_mode, app.state.clients)
+    app.state.demo_mode = False
+    app.state.clients = SimpleNamespace(openai=None, openrouter=openrouter)
+    try:
+        # One event loop for the whole test, so the background upgrade keeps running between requests
+        with TestClient(app) as client:
+            yield client, openrouter
+    finally:
+        app.state.demo_mode, app.state.clients = saved
+
+def test_diff_pairs_items_by_wording_not_position():
+    diff = diff_results(DRAFT, FULL)
+    ops = {(change["op"], change["path"]) for change in diff["changes"]}
+    assert ops == {("added", "tasks.0"), ("changed", "tasks.1.priority")}
+    # One of three list items came through unchanged (next step), one changed, one added
+    assert diff["similarity"] == pytest.approx(1 / 3, abs=0.01)
+    assert diff_results(FULL, FULL) == {"changes": [], "similarity": 1.0}
+
+def test_draft_first_then_upgrade_with_diff(progressive_client):
+    client, openrouter = progressive_client
+    response = client.post("/structure/tasks?progressive=true", json={"transcript": "renew the certificate and hire someone"})
+    assert response.status_code == 200
+    assert response.headers["x-result-quality"] == "draft"
+    assert response.json()["tasks"][0]["priority"] == "Low"
+
+    events = client.get(response.headers["x-upgrade-events"])
+    assert events.headers["content-type"].startswith("text/event-stream")
+    event, data = [line for line in events.text.splitlines() if line.startswith(("event:", "data:"))]
+    assert event == "event: ready"
+    upgrade = json.loads(data[len("data: "):])
+    assert [task["title"] for task in upgrade["result"]["tasks"]] == ["Hire a contractor", "Renew the certificate"]
+    assert {change["op"] for change in upgrade["diff"]["changes"]} == {"added", "changed"}
+    assert openrouter.models == [settings.DRAFT_MODEL, "anthropic/claude-3.5-sonnet"]
+
+    polled = client.get(response.headers["x-upgrade-url"])
+    assert polled.status_code == 200
+    assert polled.json()["status"] == "ready"
+
+def test_pending_upgrade_polls_as_202_and_unknown_is_404(progressive_client):
+    client, _ = progressive_client
+    upgrade = upgrade_store.create("tasks", settings.DRAFT_MODEL, "anthropic/claude-3.5-sonnet", DRAFT)
+    response = client.get(f"/upgrades/{upgrade.id}")
+    assert response.status_code == 202
+    assert response.headers["retry-after"]
+    assert client.get("/upgrades/nope").status_code == 404
+
+def test_without_progressive_only_the_full_model_runs(progressive_client):
+    client, openrouter = progressive_client
+    response = client.post("/structure/tasks", json={"transcript": "renew the certificate"})
+    assert "x-upgrade-id" not in response.headers
+    assert openrouter.models == ["anthropic/claude-3.5-sonnet"]
+
+def test_upgrades_run_on_another_worker_are_visible(progressive_client, tmp_path):
+    client, _ = progressive_client
+    # A second store over the same directory stands in for the worker running the upgrade
+    other_worker = UpgradeStore(tmp_path)
+    upgrade = other_worker.create("tasks", settings.DRAFT_MODEL, "anthropic/claude-3.5-sonnet", DRAFT)
+    assert client.get(f"/upgrades/{upgrade.id}").status_code == 202
+
+    other_worker.finish(upgrade, FULL)
+    polled = client.get(f"/upgrades/{upgrade.id}")
+    assert polled.status_code == 200
+    assert polled.json()["result"]["tasks"][0]["title"] == "Hire a contractor"
+    events = client.get(f"/upgrades/{upgrade.id}/events")
+    assert "event: ready" in events.text.splitlines()
+
+def test_an_unexpected_error_fails_the_upgrade(progressive_client, monkeypatch):
+    client, _ = progressive_client
+
+    def broken_put(key, body):
+        raise RuntimeError("cache is broken")
+
+    monkeypatch.setattr(result_cache, "put", broken_put)
+    response = client.post("/structure/tasks?progressive=true", json={"transcript": "renew the certificate and hire someone"})
+    events = client.get(response.headers["x-upgrade-events"])
+    assert "event: failed" in events.text.splitlines()
+    assert client.get(response.headers["x-upgrade-url"]).json()["status"] == "failed"
+
+def test_a_pending_upgrade_is_watched_across_workers(tmp_path):
+    running, watching = UpgradeStore(tmp_path), UpgradeStore(tmp_path)
+
+    async def run():
+        upgrade = running.create("tasks", settings.DRAFT_MODEL, "anthropic/claude-3.5-sonnet", DRAFT)
+        seen = watching.get(upgrade.id)
+        assert seen.state == "pending"
+        asyncio.get_running_loop().call_later(0.2, running.finish, upgrade, FULL)
+        return await watching.wait(seen, 5.0)
+
+    assert asyncio.run(run()).state == "ready"
@@ -0,0 +1,62 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from .main import app  # noqa: F401 - puts the backend directory on sys.path
+
+from middleware import RateLimitMiddleware, MemoryBucketStore, SQLiteBucketStore, client_key, hash_api_key
+
+def _limited_app(store) -> TestClient:
+    limited = FastAPI()
+    limited.add_middleware(
+        RateLimitMiddleware,
+        store=store,
+        capacity=100.0,
+        refill_per_second=1.0,
+        request_cost=10.0,
+        key_multiplier=10.0,
+        api_keys=["k"]
+    )
+
+    @limited.post("/upload")
+    async def upload():
+        return {"ok": True}
+
+    @limited.get("/free")
+    async def free():
+        return {"ok": True}
+
+    return TestClient(limited)
+
+def test_buckets_are_weighted_by_audio_size():
+    client = _limited_app(MemoryBucketStore())
+    # ~60 s of estimated audio + 10 s flat cost fits once in a 100 s bucket
+    one_minute = b"\x00" * (16_000 * 60)
+    assert client.post("/upload", content=one_minute).status_code == 200
+    response = client.post("/upload", content=one_minute)
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) > 0
+    # Reads are never limited, and an API key has its own, larger bucket
+    assert client.get("/free").status_code == 200
+    assert client.post("/upload", content=one_minute, headers={"X-API-Key": "k"}).status_code == 200
+
+def test_unknown_keys_and_forged_addresses_share_the_client_bucket():
+    client = _limited_app(MemoryBucketStore())
+    one_minute = b"\x00" * (16_000 * 60)
+    assert client.post("/upload", content=one_minute).status_code == 200
+    # A made-up key or a forged X-Forwarded-For prefix doesn't buy a fresh bucket
+    assert client.post("/upload", content=one_minute, headers={"X-API-Key": "random"}).status_code == 429
+    assert client.post("/upload", content=one_minute, headers={"X-Forwarded-For": "9.9.9.9, testclient"}).status_code == 429
+
+def test_client_key_uses_the_proxy_appended_address():
+    scope = {"headers": [(b"x-forwarded-for", b"6.6.6.6, 1.2.3.4")], "client": ("10.0.0.1", 1)}
+    assert client_key(scope) == "ip:1.2.3.4"
+    assert client_key(scope, trust_forwarded_for=False) == "ip:10.0.0.1"
+    keyed = {"headers": [(b"x-api-key", b"k")], "client": ("10.0.0.1", 1)}
+    assert client_key(keyed) == "ip:10.0.0.1"
+    assert client_key(keyed, api_keys=frozenset({hash_api_key("k")})) == "key:" + hash_api_key("k")
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "buckets.sqlite3")
+    first, second = SQLiteBucketStore(path), SQLiteBucketStore(path)
+    assert first.take("ip:1.2.3.4", 80, 100, 1.0, now=1000.0) == 0
+    assert second.take("ip:1.2.3.4", 80, 100, 1.0, now=1000.0) == 60.0
+    assert second.take("ip:1.2.3.4", 80, 100, 1.0, now=1060.0) == 0
@@ -0,0 +1,58 @@
+import asyncio
+from .main import app  # noqa: F401 - puts the backend directory on sys.path
+
+from services.scheduler import JobScheduler, job_class
+
+async def _record(order, name):
+    await asyncio.sleep(0.01)
+    order.append(name)
+
+async def _submit_while_busy(scheduler, jobs):
+    order = []
+    blocker = asyncio.create_task(scheduler.run(1, _record, order, "blocker"))
+    await asyncio.sleep(0)
+    tasks = []
+    for name, estimate in jobs:
+        tasks.append(asyncio.create_task(scheduler.run(estimate, _record, order, name)))
+        await asyncio.sleep(0.001)
+    await asyncio.gather(blocker, *tasks)
+    return order
+
+def test_shortest_job_runs_first():
+    scheduler = JobScheduler("test", concurrency=1, aging_rate=0.0)
+    order = asyncio.run(_submit_while_busy(
+        scheduler, [("meeting", 3000), ("memo", 120), ("medium", 600)]
+    ))
+    assert order == ["blocker", "memo", "medium", "meeting"]
+    assert scheduler.stats()["classes"]["long"]["jobs"] == 1
+    assert scheduler.running == 0 and scheduler.queue_depth == 0
+
+def test_aging_prevents_starvation():
+    # With a huge aging rate, arrival order dominates the size estimate
+    scheduler = JobScheduler("test", concurrency=1, aging_rate=1e9)
+    order = asyncio.run(_submit_while_busy(
+        scheduler, [("meeting", 3000), ("memo", 120)]
+    ))
+    assert order == ["blocker", "meeting", "memo"]
+
+def test_cancelled_waiter_releases_nothing():
+    async def scenario():
+        scheduler = JobScheduler("test", concurrency=1, aging_rate=0.0)
+        order = []
+        blocker = asyncio.create_task(scheduler.run(1, _record, order, "blocker"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(scheduler.run(1, _record, order, "cancelled"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await blocker
+        await scheduler.run(1, _record, order, "after")
+        return scheduler, order
+
+    scheduler, order = asyncio.run(scenario())
+    assert order == ["blocker", "after"]
+    assert scheduler.running == 0
+
+def test_job_classes():
+    assert job_class(30) == "short"
+    assert job_class(600) == "medium"
+    assert job_class(3000) == "long"
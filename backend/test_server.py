@@ -0,0 +1,39 @@
+import signal
+import pytest
+from fastapi.testclient import TestClient
+from uvicorn import Config
+from .main import app
+
+import server
+from config import settings
+
+def test_worker_count_is_capped_by_memory_budget(monkeypatch):
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 0)
+    monkeypatch.setattr(settings, "MEMORY_BUDGET_MB", 512)
+    monkeypatch.setattr(settings, "WORKER_MEMORY_MB", 256)
+    monkeypatch.setattr(server.os, "sched_getaffinity", lambda pid: set(range(8)), raising=False)
+    assert server.worker_count() == 2
+
+    monkeypatch.setattr(settings, "MEMORY_BUDGET_MB", 100)
+    assert server.worker_count() == 1
+
+def test_gunicorn_options_preload_and_drain(monkeypatch):
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 3)
+    options = server.gunicorn_options()
+    assert options["workers"] == 3
+    assert options["preload_app"] is True
+    assert options["graceful_timeout"] > settings.DRAIN_TIMEOUT_SECONDS
+
+def test_shutdown_signal_marks_the_app_draining_at_once():
+    if server.BaseApplication is None:
+        pytest.skip("gunicorn is not installed")
+    saved = app.state.draining
+    try:
+        draining_server = server.DrainingServer(Config(app=app))
+        draining_server.handle_exit(signal.SIGTERM, None)
+        assert draining_server.should_exit
+        # Still serving in-flight requests, but no longer ready for new ones
+        response = TestClient(app).get("/health/ready")
+        assert response.status_code == 503
+    finally:
+        app.state.draining = saved
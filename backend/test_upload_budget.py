@@ -0,0 +1,111 @@
+import asyncio
+import httpx
+from fastapi import FastAPI, Request
+from .main import app  # noqa: F401 - puts the backend directory on sys.path
+
+from middleware import ByteBudget, UploadBudgetMiddleware
+from services.readiness import current_rss_mb
+
+MB = 1024 * 1024
+
+def _budgeted_app(budget_bytes: int, wait_seconds: float = 30.0, hold_seconds: float = 0.02):
+    held = {"now": 0, "peak": 0}
+    budgeted = FastAPI()
+    budgeted.add_middleware(
+        UploadBudgetMiddleware,
+        budget=ByteBudget(budget_bytes),
+        max_body_bytes=8 * MB,
+        wait_seconds=wait_seconds
+    )
+
+    @budgeted.post("/upload")
+    async def upload(request: Request):
+        body = await request.body()
+        # Stand-in for the audio copy the real pipeline makes
+        copy = bytearray(body)
+        held["now"] += len(body)
+        held["peak"] = max(held["peak"], held["now"])
+        await asyncio.sleep(hold_seconds)
+        held["now"] -= len(body)
+        return {"size": len(copy)}
+
+    return budgeted, held
+
+async def _post_many(target, count: int, size: int) -> list:
+    payload = b"\0" * size
+    transport = httpx.ASGITransport(app=target)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*(client.post("/upload", content=payload) for _ in range(count)))
+
+def test_concurrent_uploads_stay_within_budget():
+    budgeted, held = _budgeted_app(budget_bytes=16 * MB)
+    baseline = current_rss_mb()
+    peak_rss = [baseline]
+
+    async def scenario():
+        async def sample():
+            while True:
+                peak_rss.append(current_rss_mb())
+                await asyncio.sleep(0.005)
+        sampler = asyncio.create_task(sample())
+        # 48 x 4 MB = 192 MB of bodies if they were all admitted at once
+        responses = await _post_many(budgeted, count=48, size=4 * MB)
+        sampler.cancel()
+        return responses
+
+    responses = asyncio.run(scenario())
+    assert all(response.status_code == 200 for response in responses)
+    assert held["peak"] <= 16 * MB
+    if baseline is not None:
+        # Body + copy per admitted request, plus allocator slack; unbounded would be ~400 MB
+        assert max(peak_rss) - baseline < 120
+
+def test_exhausted_budget_answers_503():
+    budgeted, _ = _budgeted_app(budget_bytes=4 * MB, wait_seconds=0.01, hold_seconds=0.2)
+    responses = asyncio.run(_post_many(budgeted, count=3, size=3 * MB))
+    assert sorted(response.status_code for response in responses) == [200, 503, 503]
+    assert all("retry-after" in response.headers for response in responses if response.status_code == 503)
+
+def test_oversized_body_is_refused_before_reading():
+    budgeted, held = _budgeted_app(budget_bytes=64 * MB)
+    responses = asyncio.run(_post_many(budgeted, count=1, size=9 * MB))
+    assert responses[0].status_code == 413
+    assert held["peak"] == 0
+
+def test_chunked_body_over_the_limit_is_refused():
+    budgeted, held = _budgeted_app(budget_bytes=64 * MB)
+
+    async def chunks():
+        # No Content-Length: the body arrives in pieces until it passes max_body_bytes
+        for _ in range(9):
+            yield b"\0" * MB
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=budgeted)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/upload", content=chunks())
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 413
+    assert "File size must be under 8MB" in response.json()["detail"]
+    assert held["peak"] == 0
+
+def test_large_waiter_is_not_starved():
+    budget = ByteBudget(10)
+
+    async def scenario():
+        assert await budget.reserve(6, timeout=1)
+        large = asyncio.create_task(budget.reserve(10, timeout=1))
+        await asyncio.sleep(0)
+        # A small request that would fit must still queue behind the large one
+        small = asyncio.create_task(budget.reserve(2, timeout=1))
+        await asyncio.sleep(0)
+        assert budget.waiting == 2
+        budget.release(6)
+        assert await large
+        assert not small.done()
+        budget.release(10)
+        assert await small
+        assert budget.reserved == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,121 @@
+import hashlib
+from types import SimpleNamespace
+import pytest
+from fastapi.testclient import TestClient
+from .main import app
+from .conftest import MemoClient, WhisperClient, make_tone
+
+from config import settings
+from services import upload_store
+from services.live import pcm_to_wav
+import services.uploads as uploads
+
+CHUNK = 4096
+
+@pytest.fixture
+def upload_client(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "ARCHIVE_ENABLED", False)
+    monkeypatch.setattr(settings, "FINGERPRINT_ENABLED", False)
+    monkeypatch.setattr(upload_store, "root", tmp_path)
+    monkeypatch.setattr(upload_store, "chunk_size", CHUNK)
+    monkeypatch.setattr(uploads, "PROBE_BYTES", 1024)
+    whisper = WhisperClient()
+    saved = (app.state.demo_mode, app.state.clients, app.state.draining)
+    app.state.demo_mode = False
+    app.state.clients = SimpleNamespace(openai=whisper, openrouter=MemoClient())
+    try:
+        with TestClient(app) as client:
+            yield client, whisper
+    finally:
+        app.state.demo_mode, app.state.clients, app.state.draining = saved
+
+def _start(client, content: bytes, content_type: str = "audio/wav") -> dict:
+    response = client.post("/uploads", json={"filename": "memo.wav", "content_type": content_type, "size": len(content)})
+    assert response.status_code == 201
+    return response.json()
+
+def _put(client, upload_id: str, content: bytes, index: int):
+    return client.put(f"/uploads/{upload_id}/chunks/{index}", content=content[index * CHUNK:(index + 1) * CHUNK])
+
+def test_chunks_arrive_in_any_order_and_resends_are_harmless(upload_client):
+    client, _ = upload_client
+    content = pcm_to_wav(make_tone(1.5), 8000)
+    upload = _start(client, content)
+    assert upload["chunks"] == 6
+    assert upload["missing"] == [0, 1, 2, 3, 4, 5]
+
+    for index in (0, 1, 4):
+        assert _put(client, upload["id"], content, index).status_code == 200
+    status = client.get(f"/uploads/{upload['id']}").json()
+    assert status["ranges"] == [[0, 2 * CHUNK], [4 * CHUNK, 5 * CHUNK]]
+    assert status["missing"] == [2, 3, 5]
+    # The header was checked as soon as the start of the file was in
+    assert status["audio"]["container"] == "wav"
+
+    assert _put(client, upload["id"], content, 1).json()["ranges"] == status["ranges"]
+    for index in (5, 3, 2):
+        _put(client, upload["id"], content, index)
+    status = client.get(f"/uploads/{upload['id']}").json()
+    assert status["complete"] and status["received_bytes"] == len(content)
+    assert upload_store.digest(upload_store.get(upload["id"])) == hashlib.sha256(content).hexdigest()
+
+def test_a_received_chunk_cannot_be_replaced(upload_client):
+    client, _ = upload_client
+    content = pcm_to_wav(make_tone(1.0), 8000)
+    upload = _start(client, content)
+    for index in range(upload["chunks"]):
+        _put(client, upload["id"], content, index)
+    other = content[:CHUNK - 4] + b"BBBB" + content[CHUNK:]
+    # Otherwise the hash kept since the first write would name a different file
+    assert _put(client, upload["id"], other, 0).status_code == 409
+    assert upload_store.digest(upload_store.get(upload["id"])) == hashlib.sha256(content).hexdigest()
+
+def test_a_chunk_of_the_wrong_length_is_refused(upload_client):
+    client, _ = upload_client
+    content = pcm_to_wav(make_tone(1.0), 8000)
+    upload = _start(client, content)
+    response = client.put(f"/uploads/{upload['id']}/chunks/0", content=content[:100])
+    assert response.status_code == 400
+    assert client.get(f"/uploads/{upload['id']}").json()["missing"][0] == 0
+
+def test_a_file_that_is_not_audio_is_refused_on_its_first_chunk(upload_client):
+    client, _ = upload_client
+    content = b"%PDF-1.4 " + bytes(3 * CHUNK)
+    upload = _start(client, content)
+    response = _put(client, upload["id"], content, 0)
+    assert response.status_code == 400
+    assert "Could not read audio file" in response.json()["detail"]
+    # The rest of the file is not wanted
+    assert _put(client, upload["id"], content, 1).status_code == 409
+
+def test_finalize_processes_the_assembled_file(upload_client):
+    client, whisper = upload_client
+    content = pcm_to_wav(make_tone(1.5), 8000)
+    upload = _start(client, content)
+    assert client.post(f"/uploads/{upload['id']}/finalize?format=tasks").status_code == 409
+
+    for index in range(upload["chunks"]):
+        _put(client, upload["id"], content, index)
+    response = client.post(f"/uploads/{upload['id']}/finalize?format=tasks")
+    assert response.status_code == 200
+    assert response.json()["tasks"][0]["title"] == "Part 1 renew the certificate."
+    assert len(whisper.prompts) == 1
+    # A finished upload is gone
+    assert client.get(f"/uploads/{upload['id']}").status_code == 404
+
+    # The same recording again is answered from the result cache, keyed by the incremental hash
+    again = _start(client, content)
+    for index in range(again["chunks"]):
+        _put(client, again["id"], content, index)
+    response = client.post(f"/uploads/{again['id']}/finalize?format=tasks")
+    assert response.headers.get("X-Cache") == "hit"
+    assert len(whisper.prompts) == 1
+
+def test_wav_labels_from_every_browser_are_accepted(upload_client):
+    client, _ = upload_client
+    content = pcm_to_wav(make_tone(0.5), 8000)
+    for content_type in ("audio/x-wav", "audio/wave"):
+        upload = _start(client, content, content_type)
+        for index in range(upload["chunks"]):
+            assert _put(client, upload["id"], content, index).status_code == 200
+        assert client.get(f"/uploads/{upload['id']}").json()["audio"]["container"] == "wav"
@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from .main import app  # noqa: F401 - puts the backend directory on sys.path
+
+from middleware import UsageMiddleware
+from services import UsageLedger, note, stage
+from services.usage import note_completion
+
+def _tracked_app(ledger) -> TestClient:
+    tracked = FastAPI()
+    tracked.add_middleware(UsageMiddleware, ledger=ledger)
+
+    @tracked.post("/process/{output_format}")
+    async def process(output_format: str):
+        note(format=output_format, audio_seconds=60.0, whisper_seconds=1.5)
+        with stage("structuring"):
+            usage = SimpleNamespace(prompt_tokens=1000, completion_tokens=500)
+            note_completion("anthropic/claude-3.5-sonnet", usage)
+        return {"ok": True}
+
+    @tracked.get("/free")
+    async def free():
+        return {"ok": True}
+
+    return TestClient(tracked)
+
+def test_requests_are_ledgered_in_batches(tmp_path):
+    ledger = UsageLedger(str(tmp_path / "usage.jsonl"))
+    client = _tracked_app(ledger)
+    for output_format in ("tasks", "tasks", "roadmap"):
+        assert client.post(f"/process/{output_format}").status_code == 200
+    client.get("/free")
+
+    # Nothing touches the disk until a flush
+    assert not (tmp_path / "usage.jsonl").exists()
+    assert ledger.flush() == 3
+
+    record = json.loads((tmp_path / "usage.jsonl").read_text().splitlines()[0])
+    assert record["format"] == "tasks"
+    assert record["status"] == 200
+    assert record["prompt_tokens"] == 1000
+    assert "structuring" in record["stages"]
+    # 1 min of Whisper at $0.006 + 1k/0.5k tokens at $3/$15 per million
+    assert record["cost_usd"] == 0.0165
+
+def test_stats_group_and_window(tmp_path):
+    path = tmp_path / "usage.jsonl"
+    ledger = UsageLedger(str(path))
+    client = _tracked_app(ledger)
+    client.post("/process/tasks")
+    client.post("/process/roadmap")
+    ledger.flush()
+    with open(path, "a") as f:
+        f.write(json.dumps({"ts": time.time() - 7200, "format": "tasks", "cost_usd": 1.0}) + "\n")
+        f.write('{"ts": torn')
+
+    stats = ledger.stats(window_seconds=3600, group_by="format")
+    assert stats["total"]["requests"] == 2
+    assert set(stats["groups"]) == {"tasks", "roadmap"}
+    assert stats["groups"]["tasks"]["completion_tokens"] == 500
+
+    assert ledger.stats(window_seconds=86400)["groups"]["tasks"]["requests"] == 2
+    assert len(ledger.stats(group_by="client")["groups"]) == 1
+
+def test_ledger_rotates_when_full(tmp_path):
+    path = tmp_path / "usage.jsonl"
+    ledger = UsageLedger(str(path), max_bytes=10)
+    ledger.append({"ts": time.time(), "prompt_tokens": 0, "completion_tokens": 0})
+    ledger.flush()
+    ledger.append({"ts": time.time(), "prompt_tokens": 0, "completion_tokens": 0})
+    ledger.flush()
+    assert (tmp_path / "usage.jsonl.1").exists()
+    assert ledger.stats()["total"]["requests"] == 2
+
+def test_workers_rotate_the_ledger_once(tmp_path):
+    path = str(tmp_path / "usage.jsonl")
+    # One ledger per thread stands in for the workers sharing the file
+    ledgers = [UsageLedger(path, max_bytes=2000) for _ in range(8)]
+
+    def write(ledger):
+        for _ in range(50):
+            ledger.append({"ts": time.time(), "format": "tasks"})
+            ledger.flush()
+
+    threads = [threading.Thread(target=write, args=(ledger,)) for ledger in ledgers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Only a full file is ever rotated out, never one another worker had just started
+    assert (tmp_path / "usage.jsonl.1").stat().st_size > 2000
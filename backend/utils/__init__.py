@@ -1,7 +1,50 @@
-from .demo import get_demo_tasks, get_demo_roadmap, get_demo_process_doc
+from .demo import (
+    DEMO_OUTPUTS,
+    get_demo_tasks,
+    get_demo_roadmap,
+    get_demo_process_doc,
+    get_demo_all,
+    get_demo_transcript,
+    get_demo_json
+)
+from .metrics import Metrics, metrics
+from .audio_probe import AudioInfo, AudioProbeError, probe_audio, matches_content_type
+from .serialization import ModelJSONResponse, get_adapter, validate, dump_json
+from .ranges import RangeFileResponse, RangeNotSatisfiable, parse_range
+from .fingerprint import Fingerprint, FingerprintUnavailable, fingerprint_file
+from .fingerprint import available as fingerprint_available
+from .diff import diff_results
+from .compaction import compact_transcript, estimate_tokens
+from .locking import file_lock, byte_lock
 
 __all__ = [
+    'DEMO_OUTPUTS',
     'get_demo_tasks',
     'get_demo_roadmap',
-    'get_demo_process_doc'
+    'get_demo_process_doc',
+    'get_demo_all',
+    'get_demo_transcript',
+    'get_demo_json',
+    'Metrics',
+    'metrics',
+    'AudioInfo',
+    'AudioProbeError',
+    'probe_audio',
+    'matches_content_type',
+    'ModelJSONResponse',
+    'get_adapter',
+    'validate',
+    'dump_json',
+    'RangeFileResponse',
+    'RangeNotSatisfiable',
+    'parse_range',
+    'Fingerprint',
+    'FingerprintUnavailable',
+    'fingerprint_file',
+    'fingerprint_available',
+    'diff_results',
+    'compact_transcript',
+    'estimate_tokens',
+    'file_lock',
+    'byte_lock'
 ]
@@ -0,0 +1,150 @@
+"""
+Static Asset Pipeline
+
+Builds an in-memory manifest of the files under ``static/`` that
+``index.html`` references: each file gets a content-hashed name
+(``css/styles.1a2b3c4d5e6f.css``), a strong ETag, and precompressed gzip
+and brotli variants for text formats. ``index.html`` is rewritten to
+reference the hashed names, so those can be served with ``Cache-Control:
+immutable`` while the page itself is always revalidated.
+
+Brotli at quality 11 is slow, so nothing is built at import: the manifest
+is loaded by the warmup hook after boot, or by the first static request
+if that comes sooner. Files the page doesn't reference (backups such as
+``stylesBACKUP.css``) are never read or served.
+
+Brotli is optional; without the ``brotli`` package only gzip variants are
+generated.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import re
+import threading
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/javascript",
+    "application/json",
+    "image/svg+xml"
+)
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+_STATIC_REFERENCE = re.compile(r"""(?P<prefix>["'(=]\s*/?)static/(?P<path>[^"')?#\s]+)""")
+
+@dataclass
+class Asset:
+    """One servable file with its precomputed headers and encodings."""
+    content_type: str
+    etag: str
+    cache_control: str
+    variants: dict = field(default_factory=dict)
+
+    def negotiate(self, accept_encoding: str) -> tuple:
+        """Return (encoding or None, body) for the client's Accept-Encoding header."""
+        accepted = _parse_accept_encoding(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and accepted.get(encoding, accepted.get("*", 0)) > 0:
+                return encoding, self.variants[encoding]
+        return None, self.variants["identity"]
+
+def _parse_accept_encoding(header: str) -> dict:
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+def _content_type(path: Path) -> str:
+    content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type == "application/javascript":
+        content_type += "; charset=utf-8"
+    return content_type
+
+def _build_asset(body: bytes, content_type: str, cache_control: str) -> Asset:
+    asset = Asset(
+        content_type=content_type,
+        etag='"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+        cache_control=cache_control,
+        variants={"identity": body}
+    )
+    if content_type.startswith(COMPRESSIBLE_TYPES):
+        compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(body, quality=11)
+        # Only keep encodings that actually save bytes
+        asset.variants.update({name: data for name, data in compressed.items() if len(data) < len(body)})
+    return asset
+
+class AssetManifest:
+    """Hashed static files plus the rewritten index page, ready to serve from memory once loaded."""
+
+    def __init__(self, static_dir: Path, index_path: Path):
+        self.static_dir = static_dir
+        self.index_path = index_path
+        self.assets = {}
+        self.hashed_names = {}
+        self.index = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.index is not None
+
+    def load(self) -> "AssetManifest":
+        """Hash and compress the referenced files, once; later calls return straight away."""
+        with self._lock:
+            if self.index is None:
+                self._build()
+        return self
+
+    def _build(self) -> None:
+        html = self.index_path.read_text(encoding="utf-8")
+        referenced = {match.group("path") for match in _STATIC_REFERENCE.finditer(html)}
+        for relative in sorted(referenced):
+            path = self.static_dir / relative
+            if not path.is_file():
+                continue
+            body = path.read_bytes()
+            digest = hashlib.sha256(body).hexdigest()[:12]
+            stem, dot, suffix = relative.rpartition(".")
+            hashed = f"{stem}.{digest}.{suffix}" if dot else f"{relative}.{digest}"
+            content_type = _content_type(path)
+            self.hashed_names[relative] = hashed
+            self.assets[hashed] = _build_asset(body, content_type, IMMUTABLE_CACHE)
+            # Unhashed names keep working for embeds that hard-code them, but always revalidate
+            self.assets[relative] = replace(self.assets[hashed], cache_control=REVALIDATE_CACHE)
+
+        # Set last: a manifest with an index is complete
+        self.index = _build_asset(self.rewrite(html).encode("utf-8"), "text/html; charset=utf-8", REVALIDATE_CACHE)
+
+    def rewrite(self, html: str) -> str:
+        """Point every static/... reference that has a hashed twin at the hashed name."""
+        def substitute(match):
+            hashed = self.hashed_names.get(match.group("path"))
+            if hashed is None:
+                return match.group(0)
+            return f"{match.group('prefix')}static/{hashed}"
+        return _STATIC_REFERENCE.sub(substitute, html)
+
+    def get(self, path: str) -> Asset | None:
+        return self.assets.get(path)
@@ -0,0 +1,327 @@
+"""
+Audio Probe Module
+
+Reads duration, sample rate, channels and codec from MP3, M4A/MP4 and WAV
+headers without decoding any audio. Only headers are read: MP3 frame headers
+plus the Xing/Info/VBRI tag (or a short frame scan), MP4 atom headers down
+to ``mvhd``/``mdhd``/``stsd`` (``mdat`` is skipped by seeking) and the WAV
+``fmt``/``data`` chunk headers. A probe typically touches a few KB of the
+upload and takes microseconds, so mislabeled files can be rejected before
+they are buffered or sent upstream.
+"""
+
+import io
+import struct
+from dataclasses import dataclass, asdict
+
+# MIME types accepted for each container
+CONTAINER_MIME_TYPES = {
+    "mp3": {"audio/mp3", "audio/mpeg"},
+    "mp4": {"audio/m4a", "audio/x-m4a", "audio/mp4"},
+    "wav": {"audio/wav", "audio/x-wav", "audio/wave", "audio/vnd.wave"}
+}
+
+# How far into an MP3 to look for the first frame after any ID3 tag
+_MP3_SYNC_SEARCH_BYTES = 64 * 1024
+# Frames examined to estimate the bitrate of MP3s without a Xing/VBRI tag
+_MP3_SCAN_FRAMES = 32
+
+_MP3_BITRATES = {
+    # (version_is_1, layer): kbps by index
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+}
+_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+_WAV_CODECS = {1: "pcm", 3: "pcm_float", 6: "alaw", 7: "mulaw", 0xFFFE: "pcm"}
+_MP4_CODECS = {b"mp4a": "aac", b"alac": "alac", b"Opus": "opus", b"ac-3": "ac3", b"ec-3": "eac3"}
+
+class AudioProbeError(ValueError):
+    """Raised when a file is not a recognisable MP3, MP4 or WAV stream."""
+
+@dataclass
+class AudioInfo:
+    """Header-level facts about an audio file."""
+    container: str
+    codec: str
+    duration_seconds: float | None
+    sample_rate: int | None
+    channels: int | None
+    bitrate: int | None = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+def _read_at(f, offset: int, size: int) -> bytes:
+    f.seek(offset)
+    return f.read(size)
+
+def _file_size(f) -> int:
+    f.seek(0, io.SEEK_END)
+    return f.tell()
+
+# --- MP3 -------------------------------------------------------------------
+
+def _parse_mp3_header(header: bytes) -> dict | None:
+    """Decode a 4-byte MPEG audio frame header, or return None if it is not one."""
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+    version_bits = (header[1] >> 3) & 0x3
+    layer_bits = (header[1] >> 1) & 0x3
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x3
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    layer = 4 - layer_bits
+    is_v1 = version_bits == 3
+    bitrate = _MP3_BITRATES[(is_v1, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version_bits][rate_index]
+    padding = (header[2] >> 1) & 0x1
+    channels = 1 if (header[3] >> 6) == 3 else 2
+
+    if layer == 1:
+        samples_per_frame = 384
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples_per_frame = 1152 if (is_v1 or layer == 2) else 576
+        frame_length = samples_per_frame // 8 * bitrate // sample_rate + padding
+
+    return {
+        "is_v1": is_v1,
+        "layer": layer,
+        "bitrate": bitrate,
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "samples_per_frame": samples_per_frame,
+        "frame_length": frame_length
+    }
+
+def _find_first_frame(f, start: int) -> tuple:
+    """Return (offset, header) of the first frame whose successor also parses."""
+    window = _read_at(f, start, _MP3_SYNC_SEARCH_BYTES)
+    for i in range(len(window) - 3):
+        if window[i] != 0xFF:
+            continue
+        header = _parse_mp3_header(window[i:i + 4])
+        if header is None:
+            continue
+        following = _parse_mp3_header(_read_at(f, start + i + header["frame_length"], 4))
+        if following is not None and following["sample_rate"] == header["sample_rate"]:
+            return start + i, header
+    raise AudioProbeError("No MPEG audio frames found")
+
+def _probe_mp3(f) -> AudioInfo:
+    size = _file_size(f)
+    start = 0
+    id3 = _read_at(f, 0, 10)
+    if id3[:3] == b"ID3":
+        tag_size = (id3[6] << 21) | (id3[7] << 14) | (id3[8] << 7) | id3[9]
+        start = 10 + tag_size + (10 if id3[5] & 0x10 else 0)
+
+    offset, header = _find_first_frame(f, start)
+    end = size - 128 if size >= 128 and _read_at(f, size - 128, 3) == b"TAG" else size
+    frame = _read_at(f, offset, 192)
+    spf, rate = header["samples_per_frame"], header["sample_rate"]
+
+    # Xing/Info tag sits right after the side information of the first frame
+    if header["is_v1"]:
+        side_info = 17 if header["channels"] == 1 else 32
+    else:
+        side_info = 9 if header["channels"] == 1 else 17
+    xing = frame[4 + side_info:4 + side_info + 12]
+    vbri = frame[36:36 + 18]
+
+    frames = None
+    if xing[:4] in (b"Xing", b"Info") and struct.unpack(">I", xing[4:8])[0] & 0x1:
+        frames = struct.unpack(">I", xing[8:12])[0]
+    elif vbri[:4] == b"VBRI":
+        frames = struct.unpack(">I", vbri[14:18])[0]
+
+    if frames:
+        duration = frames * spf / rate
+        bitrate = int((end - offset) * 8 / duration) if duration else None
+    else:
+        # No tag: average the bitrate over the first frames (CBR files repeat one value)
+        bitrates, position = [], offset
+        for _ in range(_MP3_SCAN_FRAMES):
+            current = _parse_mp3_header(_read_at(f, position, 4))
+            if current is None:
+                break
+            bitrates.append(current["bitrate"])
+            position += current["frame_length"]
+        bitrate = int(sum(bitrates) / len(bitrates))
+        duration = (end - offset) * 8 / bitrate
+
+    return AudioInfo(
+        container="mp3",
+        codec="mp3" if header["layer"] == 3 else f"mp{header['layer']}",
+        duration_seconds=round(duration, 3),
+        sample_rate=rate,
+        channels=header["channels"],
+        bitrate=bitrate
+    )
+
+# --- MP4 / M4A ---------------------------------------------------------------
+
+def _atoms(f, start: int, end: int):
+    """Yield (type, payload_offset, payload_end) for the atoms between start and end."""
+    position = start
+    while position + 8 <= end:
+        header = _read_at(f, position, 16)
+        if len(header) < 8:
+            return
+        size, kind = struct.unpack(">I4s", header[:8])
+        payload = position + 8
+        if size == 1:
+            size = struct.unpack(">Q", header[8:16])[0]
+            payload = position + 16
+        elif size == 0:
+            size = end - position
+        if size < payload - position:
+            raise AudioProbeError("Corrupt MP4 atom header")
+        yield kind, payload, min(position + size, end)
+        position += size
+
+def _child(f, start: int, end: int, kind: bytes) -> tuple | None:
+    for child_kind, payload, child_end in _atoms(f, start, end):
+        if child_kind == kind:
+            return payload, child_end
+    return None
+
+def _media_header(f, payload: int) -> tuple:
+    """Return (timescale, duration) from an mvhd or mdhd payload."""
+    data = _read_at(f, payload, 32)
+    if data[0] == 1:
+        timescale, duration = struct.unpack(">IQ", data[20:32])
+    else:
+        timescale, duration = struct.unpack(">II", data[12:20])
+    return timescale, duration
+
+def _probe_mp4(f) -> AudioInfo:
+    size = _file_size(f)
+    moov = _child(f, 0, size, b"moov")
+    if moov is None:
+        raise AudioProbeError("MP4 file has no moov atom")
+
+    duration = None
+    mvhd = _child(f, *moov, b"mvhd")
+    if mvhd:
+        timescale, ticks = _media_header(f, mvhd[0])
+        duration = ticks / timescale if timescale else None
+
+    codec, sample_rate, channels = "unknown", None, None
+    for kind, payload, end in _atoms(f, *moov):
+        if kind != b"trak":
+            continue
+        mdia = _child(f, payload, end, b"mdia")
+        hdlr = mdia and _child(f, *mdia, b"hdlr")
+        if not hdlr or _read_at(f, hdlr[0] + 8, 4) != b"soun":
+            continue
+
+        mdhd = _child(f, *mdia, b"mdhd")
+        if mdhd:
+            timescale, ticks = _media_header(f, mdhd[0])
+            if timescale:
+                duration, sample_rate = ticks / timescale, timescale
+
+        minf = _child(f, *mdia, b"minf")
+        stbl = minf and _child(f, *minf, b"stbl")
+        stsd = stbl and _child(f, *stbl, b"stsd")
+        if stsd:
+            entry = _read_at(f, stsd[0] + 8, 36)
+            if len(entry) == 36:
+                codec = _MP4_CODECS.get(entry[4:8], entry[4:8].decode("latin-1").strip())
+                channels = struct.unpack(">H", entry[24:26])[0]
+                sample_rate = struct.unpack(">I", entry[32:36])[0] >> 16 or sample_rate
+        break
+    else:
+        raise AudioProbeError("MP4 file has no audio track")
+
+    return AudioInfo(
+        container="mp4",
+        codec=codec,
+        duration_seconds=round(duration, 3) if duration is not None else None,
+        sample_rate=sample_rate,
+        channels=channels,
+        bitrate=int(size * 8 / duration) if duration else None
+    )
+
+# --- WAV -------------------------------------------------------------------
+
+def wav_layout(f) -> tuple:
+    """Return ``(fmt, data_offset, data_size)`` of a WAV file.
+
+    ``fmt`` is the unpacked ``fmt`` chunk (format, channels, sample rate,
+    byte rate, block align, bits per sample); the data fields are None
+    when there is no ``data`` chunk.
+    """
+    size = _file_size(f)
+    fmt, data_offset, data_size = None, None, None
+    position = 12
+    while position + 8 <= size and (fmt is None or data_offset is None):
+        kind, chunk_size = struct.unpack("<4sI", _read_at(f, position, 8))
+        if kind == b"fmt ":
+            fmt = struct.unpack("<HHIIHH", _read_at(f, position + 8, 16))
+        elif kind == b"data":
+            data_offset, data_size = position + 8, chunk_size
+        position += 8 + chunk_size + (chunk_size & 1)
+
+    if fmt is None:
+        raise AudioProbeError("WAV file has no fmt chunk")
+    # Streaming writers leave the size at 0 or 0xFFFFFFFF; fall back to the file size
+    if data_offset is not None and (data_size in (0, 0xFFFFFFFF) or data_offset + data_size > size):
+        data_size = size - data_offset
+    return fmt, data_offset, data_size
+
+def _probe_wav(f) -> AudioInfo:
+    fmt, data_offset, data_size = wav_layout(f)
+    audio_format, channels, sample_rate, byte_rate, _, _ = fmt
+
+    duration = None
+    if data_offset is not None and byte_rate:
+        duration = data_size / byte_rate
+
+    return AudioInfo(
+        container="wav",
+        codec=_WAV_CODECS.get(audio_format, f"wav_0x{audio_format:04x}"),
+        duration_seconds=round(duration, 3) if duration is not None else None,
+        sample_rate=sample_rate,
+        channels=channels,
+        bitrate=byte_rate * 8
+    )
+
+# --- Public API -----------------------------------------------------------
+
+def detect_container(head: bytes) -> str | None:
+    """Return 'wav', 'mp4' or 'mp3' from the first bytes of a file, or None."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[4:8] == b"ftyp":
+        return "mp4"
+    if head[:3] == b"ID3" or _parse_mp3_header(head[:4]) is not None:
+        return "mp3"
+    return None
+
+def probe_audio(source) -> AudioInfo:
+    """Probe bytes or a seekable binary file object; the file position is restored."""
+    f = io.BytesIO(source) if isinstance(source, (bytes, bytearray, memoryview)) else source
+    original_position = f.tell()
+    try:
+        container = detect_container(_read_at(f, 0, 12))
+        if container is None:
+            raise AudioProbeError("Not an MP3, M4A or WAV file")
+        try:
+            return {"wav": _probe_wav, "mp4": _probe_mp4, "mp3": _probe_mp3}[container](f)
+        except (struct.error, IndexError, ZeroDivisionError) as e:
+            raise AudioProbeError(f"Truncated or corrupt {container} header") from e
+    finally:
+        f.seek(original_position)
+
+def matches_content_type(info: AudioInfo, content_type: str | None) -> bool:
+    """Return True if the declared MIME type agrees with the probed container."""
+    return content_type in CONTAINER_MIME_TYPES[info.container]
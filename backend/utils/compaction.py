@@ -0,0 +1,128 @@
+"""
+Transcript Compaction
+
+Whisper transcribes casual speech verbatim: "um", "uh", stutters ("I I
+think"), false starts, "you know" and "like" used as pauses, and the same
+phrase said twice while thinking. None of it helps the structuring model,
+and all of it is billed as prompt tokens. ``compact_transcript`` removes
+it locally with a few regular-expression passes (well under a millisecond
+for a typical memo) before the transcript is sent.
+
+Levels, each including the ones before it:
+
+- ``light``: filler sounds (um, uh, er, hmm), cut-off word fragments
+  ("pro- project"), immediately repeated words, and whitespace/punctuation
+  left behind.
+- ``standard``: discourse markers set off by commas ("so, like, we",
+  ", you know,"), sentence-opening "Okay, so" / "Well," and immediately
+  repeated phrases of up to six words.
+- ``aggressive``: hedges (just, really, actually, basically, literally,
+  I guess), false starts ending in a dash, sentences that are only
+  acknowledgements ("Okay. Yeah."), and repeated sentences. This trades a
+  little tone for tokens; the facts, names and numbers stay.
+
+Anything that could carry meaning is left alone: "like" as a verb, "so"
+without a comma, "right now", "that that", repeated numbers ("555 555
+1234"), shared prefixes ("pre- and post-launch") and "er" as a name.
+"""
+
+import re
+
+LEVELS = ("off", "light", "standard", "aggressive")
+
+# Filler sounds, with the comma Whisper often puts after them; "er" only
+# before a pause, since it is also a name ("Ask Er Wei")
+_FILLER_SOUNDS = re.compile(
+    r"(?i)(?<![\w'-])(?:(?:u+m+|u+h+|e+r+m+|a+h+|h+m+|m+h*m+|uh-huh)(?![\w'-])|e+r+(?=\s*(?:[,.;:!?…]|--|—|$))),?"
+)
+# A cut-off word: letters then a hyphen before a space ("pro- project"),
+# but not a shared prefix ("pre- and post-launch")
+_FRAGMENTS = re.compile(r"(?i)(?<![\w-])[A-Za-z]{1,8}-(?=\s)(?!\s+(?:and|or|nor|to|through|vs)\b)")
+# Not before a hyphen: "four four-hour sessions" says two things
+_REPEATED_WORD = re.compile(r"(?i)(?<![\w'])([\w']+)(?:,?\s+\1(?![\w'-]))+")
+# "that that" and "had had" are often correct
+_LEGIT_DOUBLES = {"that", "had"}
+# Repeated numbers are data, not stutters ("555 555 1234", "Rooms 101 101")
+_NUMBER = re.compile(
+    r"(?i)^(?:[\w']*\d[\w']*|zero|oh|one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve"
+    r"|thirteen|fourteen|fifteen|sixteen|seventeen|eighteen|nineteen|twenty|thirty|forty|fifty"
+    r"|sixty|seventy|eighty|ninety|hundred|thousand|million|billion)$"
+)
+
+_MARKERS = r"you know|i mean|like|basically|literally|actually|anyway|you see"
+_COMMA_MARKERS = re.compile(rf"(?i)(^|[,.!?;])\s*(?:{_MARKERS})\s*,")
+# Not before "?": ", right?" asks a question
+_TRAILING_MARKERS = re.compile(r"(?i),\s*(?:you know|i mean|right|or whatever|and stuff)(?=\s*[.!]|\s*$)")
+_OPENERS = re.compile(
+    r"(?i)(^|[.!?]\s+)(?:(?:so|okay|ok|well|right|alright|yeah|anyway)\s*,\s*|(?:okay|ok|alright)\s+so\b,?\s*)+"
+)
+_REPEATED_PHRASE = re.compile(r"(?i)(?<![\w'])((?:[\w']+[\s,]+){1,5}?[\w']+)(?:[\s,]+\1(?![\w'-]))+")
+
+_HEDGES = re.compile(r"(?i)\b(?:just|really|actually|basically|literally|totally|i guess)\b,?\s*")
+# A few words at the start of a clause, abandoned with a dash
+_FALSE_STARTS = re.compile(r"(^|[.!?,]\s+)(?:[\w']+\s+){0,4}[\w']+\s*(?:—|--)\s*")
+_ACK = r"(?:okay|ok|yeah|right|anyway|alright|so|cool)"
+_ACKNOWLEDGEMENTS = re.compile(rf"(?i)(^|[.!?]\s+)(?:{_ACK}(?:[,\s]+{_ACK})*[.!?]+(?:\s+|$))+")
+_SENTENCES = re.compile(r"[^.!?]+[.!?]*")
+
+def _collapse_word(match: re.Match) -> str:
+    word = match.group(1)
+    return match.group(0) if word.lower() in _LEGIT_DOUBLES or _NUMBER.match(word) else word
+
+def _collapse_phrase(match: re.Match) -> str:
+    phrase = match.group(1)
+    return match.group(0) if any(_NUMBER.match(word) for word in re.split(r"[\s,]+", phrase)) else phrase
+
+def _drop_marker(match: re.Match) -> str:
+    # ", you know," goes with both its commas: "is, you know, done" -> "is done"
+    return " " if match.group(1) == "," else match.group(1) + " "
+
+def _tidy(text: str) -> str:
+    """Fix the spacing, punctuation and capitals that removals leave behind."""
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s+([,.;:!?])", r"\1", text)
+    text = re.sub(r",(?:\s*,)+", ",", text)
+    text = re.sub(r",\s*([.;:!?])", r"\1", text)
+    text = re.sub(r"([.!?])(?:\s*[.,;])+", r"\1", text)
+    text = re.sub(r"(^|[.!?]\s)\s*[,;]\s*", r"\1", text).strip(" ,;")
+    return re.sub(r"(^|[.!?]\s)([a-z])", lambda m: m.group(1) + m.group(2).upper(), text)
+
+def _drop_repeated_sentences(text: str) -> str:
+    seen = set()
+    kept = []
+    for sentence in _SENTENCES.findall(text):
+        key = " ".join(re.findall(r"[a-z0-9']+", sentence.lower()))
+        if len(key.split()) >= 3 and key in seen:
+            continue
+        seen.add(key)
+        kept.append(sentence)
+    return "".join(kept)
+
+def compact_transcript(text: str, level: str = "standard") -> str:
+    """Return the transcript without disfluencies, at one of ``LEVELS``."""
+    if level not in LEVELS:
+        raise ValueError(f"Unknown compaction level '{level}'. Use one of: {', '.join(LEVELS)}")
+    if level == "off" or not text:
+        return text
+
+    text = _FILLER_SOUNDS.sub("", text)
+    text = _FRAGMENTS.sub("", text)
+    text = _REPEATED_WORD.sub(_collapse_word, text)
+    if level in ("standard", "aggressive"):
+        text = _COMMA_MARKERS.sub(_drop_marker, text)
+        text = _TRAILING_MARKERS.sub("", text)
+        text = _tidy(text)
+        text = _OPENERS.sub(r"\1", text)
+        text = _REPEATED_PHRASE.sub(_collapse_phrase, text)
+    if level == "aggressive":
+        text = _FALSE_STARTS.sub(r"\1", text)
+        text = _HEDGES.sub("", text)
+        # Without the hedges, more repeats line up ("we just need to, we need to")
+        text = _REPEATED_PHRASE.sub(_collapse_phrase, _tidy(text))
+        text = _ACKNOWLEDGEMENTS.sub(r"\1", text)
+        text = _drop_repeated_sentences(text)
+    return _tidy(text)
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English text (~4 characters per token)."""
+    return (len(text) + 3) // 4
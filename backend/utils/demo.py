@@ -1,4 +1,6 @@
-from models import Task, ProcessedOutput, RoadmapSection, StrategicRoadmap, ProcessStep, ProcessDocument
+from functools import lru_cache
+from models import Task, ProcessedOutput, RoadmapSection, StrategicRoadmap, ProcessStep, ProcessDocument, CombinedOutput
+from .serialization import dump_json
 
 def get_demo_tasks() -> ProcessedOutput:
     """Return mock data for tasks demo mode."""
@@ -148,3 +150,31 @@ def get_demo_process_doc() -> ProcessDocument:
             "[DEMO] Update documentation after successful deployment"
         ]
     )
+
+def get_demo_all() -> CombinedOutput:
+    """Return mock data for the combined demo mode."""
+    return CombinedOutput(
+        tasks=get_demo_tasks(),
+        roadmap=get_demo_roadmap(),
+        process=get_demo_process_doc()
+    )
+
+def get_demo_transcript() -> str:
+    """Return a mock transcript for demo mode."""
+    return (
+        "[DEMO] We need to review the project timeline against the Q4 goals, "
+        "schedule a team meeting that includes the remote team, and update the "
+        "documentation for the new features next week."
+    )
+
+DEMO_OUTPUTS = {
+    "tasks": get_demo_tasks,
+    "roadmap": get_demo_roadmap,
+    "process": get_demo_process_doc,
+    "all": get_demo_all
+}
+
+@lru_cache(maxsize=None)
+def get_demo_json(output_format: str) -> bytes:
+    """Return the serialized demo output for a format, built once per process."""
+    return dump_json(DEMO_OUTPUTS[output_format]())
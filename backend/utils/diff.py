@@ -0,0 +1,118 @@
+"""
+Result Diffs
+
+Describes how one structured result differs from another of the same
+format, for showing what a refined result changed. List items are paired
+by wording rather than position, since a model that adds one task
+shifts every index after it: the most similar pairs are matched first,
+and items without a partner of at least ``MATCH_THRESHOLD`` word overlap
+count as added or removed. Server-filled fields (``source_spans``) are
+ignored.
+
+``similarity`` is the share of list items and top-level fields that came
+through unchanged, so 1.0 means the two results say the same thing.
+"""
+
+import re
+
+IGNORED_KEYS = ("source_spans",)
+MATCH_THRESHOLD = 0.5
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+def _strip(value):
+    if isinstance(value, dict):
+        return {key: _strip(item) for key, item in value.items() if key not in IGNORED_KEYS}
+    if isinstance(value, list):
+        return [_strip(item) for item in value]
+    return value
+
+def _words(value) -> set:
+    if isinstance(value, dict):
+        return set().union(*(_words(item) for key, item in value.items() if key not in IGNORED_KEYS))
+    if isinstance(value, list):
+        return set().union(*(_words(item) for item in value))
+    return set(_WORD.findall(str(value).lower())) if value is not None else set()
+
+def _similarity(a, b) -> float:
+    a, b = _words(a), _words(b)
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+def _join(path: str, key) -> str:
+    return f"{path}.{key}" if path else str(key)
+
+def _diff(before, after, path: str, changes: list, counts: dict | None) -> None:
+    if isinstance(before, dict) and isinstance(after, dict):
+        keys = list(after) + [key for key in before if key not in after]
+        for key in keys:
+            if key in IGNORED_KEYS:
+                continue
+            if key not in before:
+                changes.append({"op": "added", "path": _join(path, key), "after": _strip(after[key])})
+            elif key not in after:
+                changes.append({"op": "removed", "path": _join(path, key), "before": _strip(before[key])})
+            else:
+                _diff(before[key], after[key], _join(path, key), changes, counts)
+        return
+    if isinstance(before, list) and isinstance(after, list):
+        _diff_list(before, after, path, changes, counts)
+        return
+    if before == after:
+        if counts is not None:
+            counts["same"] += 1
+        return
+    changes.append({"op": "changed", "path": path, "before": before, "after": after})
+    if counts is not None:
+        counts["changed"] += 1
+
+def _diff_list(before: list, after: list, path: str, changes: list, counts: dict | None) -> None:
+    pairs = sorted(
+        ((_similarity(old, new), i, j) for i, old in enumerate(before) for j, new in enumerate(after)),
+        key=lambda pair: (-pair[0], pair[1], pair[2])
+    )
+    matched, used = {}, set()
+    for score, i, j in pairs:
+        if score < MATCH_THRESHOLD:
+            break
+        if j in matched or i in used:
+            continue
+        matched[j] = i
+        used.add(i)
+
+    for j, new in enumerate(after):
+        item_path = _join(path, j)
+        if j not in matched:
+            changes.append({"op": "added", "path": item_path, "after": _strip(new)})
+            if counts is not None:
+                counts["changed"] += 1
+            continue
+        old = before[matched[j]]
+        same = _strip(old) == _strip(new)
+        if not same:
+            # Field-level detail, but the item counts once towards similarity
+            _diff(old, new, item_path, changes, None)
+        if counts is not None:
+            counts["same" if same else "changed"] += 1
+    for i, old in enumerate(before):
+        if i not in used:
+            changes.append({"op": "removed", "path": _join(path, i), "before": _strip(old)})
+            if counts is not None:
+                counts["changed"] += 1
+
+def diff_results(before: dict, after: dict) -> dict:
+    """Return ``{"changes": [...], "similarity": float}`` from ``before`` to ``after``.
+
+    Each change is ``{"op": "added" | "removed" | "changed", "path", "before"?, "after"?}``
+    with dotted paths such as ``tasks.2.priority`` (indexes into ``after``
+    for added and changed items, into ``before`` for removed ones).
+    """
+    changes = []
+    counts = {"same": 0, "changed": 0}
+    _diff(before, after, "", changes, counts)
+    total = counts["same"] + counts["changed"]
+    return {
+        "changes": changes,
+        "similarity": round(counts["same"] / total, 3) if total else 1.0
+    }
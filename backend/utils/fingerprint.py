@@ -0,0 +1,211 @@
+"""
+Acoustic Fingerprints
+
+A compact fingerprint that survives re-encoding: the first
+``FINGERPRINT_SECONDS`` of audio are decoded to 8 kHz mono PCM, turned into
+a log-magnitude spectrogram, and reduced to its local spectral peaks.
+Pairs of nearby peaks become 22-bit landmark hashes (both frequencies and
+their time distance) stored with the time of the first peak. Codecs move
+quiet detail around but keep the loudest time-frequency points, so an
+M4A exported again, or converted to MP3, shares many landmarks with the
+original at a constant time offset, while another recording shares almost
+none.
+
+WAV is decoded here. Other containers need ``ffmpeg`` on the PATH and are
+skipped without it, as is everything when NumPy is not installed. NumPy is
+imported on first use so it stays out of the startup path.
+"""
+
+import math
+import shutil
+import struct
+import subprocess
+from dataclasses import dataclass
+from .audio_probe import AudioProbeError, wav_layout
+
+np = None
+
+SAMPLE_RATE = 8000
+FINGERPRINT_SECONDS = 120
+FRAME_SIZE = 512
+HOP_SIZE = 256
+FRAMES_PER_SECOND = SAMPLE_RATE / HOP_SIZE
+
+# Peak picking: a peak is the loudest point of its neighbourhood and well above the floor
+PEAK_NEIGHBOURHOOD = (15, 11)  # frames, frequency bins
+PEAK_MIN_DB_ABOVE_MEDIAN = 10.0
+MAX_BIN = 255
+# Landmarks: each anchor peak pairs with the next FAN_OUT peaks in its target zone
+FAN_OUT = 4
+MAX_DT = 63
+MAX_DF = 96
+
+_FFMPEG_TIMEOUT_SECONDS = 30
+
+class FingerprintUnavailable(RuntimeError):
+    """The audio can't be fingerprinted here (no NumPy, no decoder, unsupported codec)."""
+
+@dataclass
+class Fingerprint:
+    """Landmark hashes and the frame each one starts at, sorted by hash."""
+    hashes: "np.ndarray"
+    offsets: "np.ndarray"
+    duration_seconds: float | None = None
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def to_bytes(self) -> bytes:
+        duration = math.nan if self.duration_seconds is None else self.duration_seconds
+        return struct.pack("<dI", duration, len(self.hashes)) + self.hashes.tobytes() + self.offsets.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Fingerprint":
+        load_numpy()
+        duration, count = struct.unpack_from("<dI", data)
+        arrays = np.frombuffer(data, dtype=np.uint32, offset=12)
+        if len(arrays) != 2 * count:
+            raise ValueError("Truncated fingerprint")
+        return cls(
+            hashes=arrays[:count],
+            offsets=arrays[count:],
+            duration_seconds=None if math.isnan(duration) else duration
+        )
+
+def load_numpy():
+    """Import NumPy on first use; raises FingerprintUnavailable when it is not installed."""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError as e:
+            raise FingerprintUnavailable("NumPy is not installed") from e
+        np = numpy
+    return np
+
+def available() -> bool:
+    try:
+        load_numpy()
+    except FingerprintUnavailable:
+        return False
+    return True
+
+def _decode_wav(path) -> tuple:
+    with open(path, "rb") as f:
+        try:
+            (audio_format, channels, sample_rate, _, block_align, bits), data_offset, data_size = wav_layout(f)
+        except AudioProbeError as e:
+            raise FingerprintUnavailable(str(e)) from e
+        if audio_format not in (1, 0xFFFE) or bits not in (8, 16, 32) or data_offset is None:
+            raise FingerprintUnavailable(f"Unsupported WAV encoding (format {audio_format}, {bits}-bit)")
+        frames = min(data_size // block_align, FINGERPRINT_SECONDS * sample_rate)
+        f.seek(data_offset)
+        raw = f.read(frames * block_align)
+
+    dtype = {8: np.uint8, 16: np.int16, 32: np.int32}[bits]
+    samples = np.frombuffer(raw, dtype=dtype).astype(np.float32)
+    if bits == 8:
+        samples -= 128
+    samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, sample_rate
+
+def _resample(samples: "np.ndarray", sample_rate: int) -> "np.ndarray":
+    if sample_rate == SAMPLE_RATE:
+        return samples
+    # Average blocks first so the interpolation below doesn't alias high frequencies down
+    factor = max(1, sample_rate // SAMPLE_RATE)
+    if factor > 1:
+        usable = len(samples) // factor * factor
+        samples = samples[:usable].reshape(-1, factor).mean(axis=1)
+        sample_rate /= factor
+    count = int(len(samples) * SAMPLE_RATE / sample_rate)
+    return np.interp(np.arange(count) * (sample_rate / SAMPLE_RATE), np.arange(len(samples)), samples).astype(np.float32)
+
+def _decode_ffmpeg(path) -> "np.ndarray":
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise FingerprintUnavailable("ffmpeg is not installed")
+    try:
+        result = subprocess.run(
+            [ffmpeg, "-nostdin", "-v", "error", "-i", str(path), "-t", str(FINGERPRINT_SECONDS),
+             "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "-"],
+            capture_output=True,
+            timeout=_FFMPEG_TIMEOUT_SECONDS,
+            check=True
+        )
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        raise FingerprintUnavailable(f"ffmpeg could not decode the audio: {str(e)}") from e
+    return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32)
+
+def decode_pcm(path, container: str) -> "np.ndarray":
+    """Decode the start of a recording to 8 kHz mono float samples."""
+    load_numpy()
+    if container == "wav":
+        try:
+            return _resample(*_decode_wav(path))
+        except FingerprintUnavailable:
+            if shutil.which("ffmpeg") is None:
+                raise
+    return _decode_ffmpeg(path)
+
+def _spectrogram(samples: "np.ndarray") -> "np.ndarray":
+    """Log-magnitude spectrogram in dB, shape (frames, bins)."""
+    if len(samples) < FRAME_SIZE:
+        return np.zeros((0, MAX_BIN + 1), dtype=np.float32)
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME_SIZE)[::HOP_SIZE]
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(FRAME_SIZE).astype(np.float32), axis=1))
+    return 20 * np.log10(spectrum[:, :MAX_BIN + 1] + 1e-6)
+
+def _sliding_max(values: "np.ndarray", size: int, axis: int) -> "np.ndarray":
+    pad = [(0, 0), (0, 0)]
+    pad[axis] = (size // 2, size // 2)
+    padded = np.pad(values, pad, mode="constant", constant_values=-np.inf)
+    return np.lib.stride_tricks.sliding_window_view(padded, size, axis=axis).max(axis=-1)
+
+def _peaks(spectrogram: "np.ndarray") -> tuple:
+    """Frame and bin of every local maximum, in time order."""
+    if not spectrogram.size:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    # Separable max filter: over time, then over frequency
+    local_max = _sliding_max(_sliding_max(spectrogram, PEAK_NEIGHBOURHOOD[0], 0), PEAK_NEIGHBOURHOOD[1], 1)
+    floor = np.median(spectrogram) + PEAK_MIN_DB_ABOVE_MEDIAN
+    frames, bins = np.nonzero((spectrogram == local_max) & (spectrogram > floor))
+    return frames, bins
+
+def fingerprint(samples: "np.ndarray", duration_seconds: float | None = None) -> Fingerprint:
+    """Landmark fingerprint of 8 kHz mono samples."""
+    load_numpy()
+    frames, bins = _peaks(_spectrogram(samples))
+    index = np.arange(len(frames))
+    hashes, offsets, anchors = [], [], []
+    # Pair each peak with later peaks in its target zone, one distance in the peak list at a time
+    for step in range(1, FAN_OUT * 4 + 1):
+        if step >= len(frames):
+            break
+        dt = frames[step:] - frames[:-step]
+        df = bins[step:] - bins[:-step]
+        keep = (dt > 0) & (dt <= MAX_DT) & (np.abs(df) <= MAX_DF)
+        hashes.append((bins[:-step][keep] << 14) | (bins[step:][keep] << 6) | dt[keep])
+        offsets.append(frames[:-step][keep])
+        anchors.append(index[:-step][keep])
+    if hashes:
+        hashes, offsets, anchors = np.concatenate(hashes), np.concatenate(offsets), np.concatenate(anchors)
+        # Keep only the FAN_OUT nearest partners of each anchor (stable: nearer steps come first)
+        order = np.argsort(anchors, kind="stable")
+        hashes, offsets, anchors = hashes[order], offsets[order], anchors[order]
+        starts = np.flatnonzero(np.r_[True, anchors[1:] != anchors[:-1]])
+        rank = np.arange(len(anchors)) - np.repeat(starts, np.diff(np.r_[starts, len(anchors)]))
+        hashes, offsets = hashes[rank < FAN_OUT], offsets[rank < FAN_OUT]
+    else:
+        hashes, offsets = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    order = np.argsort(hashes, kind="stable")
+    return Fingerprint(
+        hashes=hashes[order].astype(np.uint32),
+        offsets=offsets[order].astype(np.uint32),
+        duration_seconds=duration_seconds
+    )
+
+def fingerprint_file(path, container: str, duration_seconds: float | None = None) -> Fingerprint:
+    """Decode and fingerprint the start of an audio file."""
+    return fingerprint(decode_pcm(path, container), duration_seconds)
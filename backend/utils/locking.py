@@ -0,0 +1,56 @@
+"""
+Cross-Process File Locks
+
+Workers share the usage ledger and resumable uploads through files on disk
+and take turns with them through file locks. POSIX has ``fcntl``; on
+Windows the same locks are byte-range locks taken with ``msvcrt.locking``,
+which waits up to ten seconds and then raises ``OSError``.
+"""
+
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+@contextmanager
+def _msvcrt_lock(f, offset: int):
+    f.seek(offset)
+    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+    try:
+        yield
+    finally:
+        f.seek(offset)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+@contextmanager
+def file_lock(f):
+    """Hold an exclusive lock on the open file f, waiting for other processes and threads."""
+    if fcntl is None:
+        with _msvcrt_lock(f, 0):
+            yield
+        return
+    fcntl.flock(f, fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+@contextmanager
+def byte_lock(f, offset: int):
+    """Hold an exclusive lock on one byte of the open file f, waiting for other processes.
+
+    On POSIX this is a record lock, which threads of one process share;
+    callers serialize their own threads first.
+    """
+    if fcntl is None:
+        with _msvcrt_lock(f, offset):
+            yield
+        return
+    fcntl.lockf(f, fcntl.LOCK_EX, 1, offset)
+    try:
+        yield
+    finally:
+        fcntl.lockf(f, fcntl.LOCK_UN, 1, offset)
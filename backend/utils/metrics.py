@@ -0,0 +1,45 @@
+import threading
+from collections import defaultdict
+
+class Metrics:
+    """Process-local counters and gauges shared by the services and routes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+        self._gauges = {}
+
+    def incr(self, name: str, value: int = 1) -> None:
+        """Increment a counter."""
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Set a gauge to its current value."""
+        with self._lock:
+            self._gauges[name] = value
+
+    def get(self, name: str) -> float:
+        """Return the current value of a counter or gauge (0 if unset)."""
+        with self._lock:
+            if name in self._gauges:
+                return self._gauges[name]
+            return self._counters.get(name, 0)
+
+    def ratio(self, numerator: str, denominator: str) -> float:
+        """Return numerator / denominator, or 0.0 when nothing was counted yet."""
+        total = self.get(denominator)
+        return round(self.get(numerator) / total, 4) if total else 0.0
+
+    def snapshot(self) -> dict:
+        """Return a copy of all counters and gauges."""
+        with self._lock:
+            return {**self._counters, **self._gauges}
+
+    def reset(self) -> None:
+        """Clear all values (used by tests)."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+
+metrics = Metrics()
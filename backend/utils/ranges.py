@@ -0,0 +1,126 @@
+"""
+Byte-Range File Responses
+
+Serves a file, or the single byte range a client asks for, without
+loading it into memory. When the ASGI server offers the
+``http.response.zerocopysend`` extension the range is handed to it as a
+file descriptor plus offset, so the kernel copies it straight to the
+socket (sendfile); otherwise it is streamed in fixed-size chunks read
+with ``os.pread`` on a worker thread. Either way seeking to the end of a
+two-hour recording costs one small read, not a whole-file load.
+"""
+
+import os
+import re
+import anyio
+from starlette.responses import Response
+
+CHUNK_SIZE = 256 * 1024
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+class RangeNotSatisfiable(ValueError):
+    """The Range header asks for bytes outside the file."""
+
+def parse_range(header: str | None, size: int) -> tuple | None:
+    """Return the inclusive ``(start, end)`` of a single-range Range header.
+
+    None means serve the whole file: no header, a header in a unit or shape
+    we don't support (multiple ranges), which RFC 9110 lets us ignore.
+    """
+    if not header:
+        return None
+    match = _RANGE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable(header)
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable(header)
+    return start, end
+
+class RangeFileResponse(Response):
+    """File response honouring Range, If-Range and If-None-Match for a fixed ETag.
+
+    ``etag`` should change whenever the file's bytes do; for
+    content-addressed files the address itself is ideal.
+    """
+
+    def __init__(self, path, request_headers, media_type: str, etag: str, method: str = "GET", headers: dict | None = None):
+        self.path = path
+        self.media_type = media_type
+        self.background = None
+        self.send_header_only = method.upper() == "HEAD"
+        self.range = None
+
+        size = os.stat(path).st_size
+        quoted_etag = f'"{etag}"'
+        response_headers = {
+            "accept-ranges": "bytes",
+            "etag": quoted_etag,
+            **(headers or {})
+        }
+        if_range = request_headers.get("if-range")
+
+        if quoted_etag in (request_headers.get("if-none-match") or ""):
+            self.status_code = 304
+            self.send_header_only = True
+        else:
+            try:
+                byte_range = None if if_range not in (None, quoted_etag) else parse_range(request_headers.get("range"), size)
+            except RangeNotSatisfiable:
+                self.status_code = 416
+                self.send_header_only = True
+                response_headers["content-range"] = f"bytes */{size}"
+                response_headers["content-length"] = "0"
+            else:
+                if byte_range is None:
+                    self.status_code = 200
+                    self.range = (0, size - 1) if size else None
+                    response_headers["content-length"] = str(size)
+                else:
+                    start, end = byte_range
+                    self.status_code = 206
+                    self.range = byte_range
+                    response_headers["content-range"] = f"bytes {start}-{end}/{size}"
+                    response_headers["content-length"] = str(end - start + 1)
+        self.init_headers(response_headers)
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only or self.range is None:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        start, end = self.range
+        fd = await anyio.to_thread.run_sync(os.open, self.path, os.O_RDONLY)
+        try:
+            if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+                await send({
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": fd,
+                    "offset": start,
+                    "count": end - start + 1,
+                    "more_body": False
+                })
+                return
+
+            offset = start
+            while offset <= end:
+                chunk = await anyio.to_thread.run_sync(os.pread, fd, min(CHUNK_SIZE, end - offset + 1), offset)
+                if not chunk:
+                    break  # truncated underneath us; the client sees a short body
+                offset += len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": offset <= end})
+            if offset <= end:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            os.close(fd)
@@ -0,0 +1,38 @@
+"""
+Response Serialization
+
+One cached ``TypeAdapter`` per model validates AI output exactly once and
+serializes it straight to JSON bytes in pydantic-core, skipping FastAPI's
+``response_model`` re-validation and ``jsonable_encoder`` pass. Routes
+return a ``ModelJSONResponse`` so FastAPI sends the bytes as they are.
+"""
+
+from functools import lru_cache
+from typing import Any, Type
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+from starlette.responses import Response
+
+@lru_cache(maxsize=None)
+def get_adapter(model_cls: Type[BaseModel]) -> TypeAdapter:
+    """Return the compiled TypeAdapter for a model, built on first use."""
+    return TypeAdapter(model_cls)
+
+def validate(model_cls: Type[BaseModel], data: Any) -> BaseModel:
+    """Validate data into a model_cls instance (raises pydantic.ValidationError)."""
+    return get_adapter(model_cls).validate_python(data)
+
+def dump_json(value: Any) -> bytes:
+    """Serialize a model instance (or any JSON-compatible value) to compact JSON bytes."""
+    if isinstance(value, BaseModel):
+        return get_adapter(type(value)).dump_json(value)
+    return to_json(value)
+
+class ModelJSONResponse(Response):
+    """JSON response for an already-validated model, plain data, or pre-serialized bytes."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dump_json(content)
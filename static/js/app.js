@@ -1,3 +1,53 @@
+// Live recordings are streamed as 16-bit mono PCM at this rate (Whisper's own)
+const LIVE_SAMPLE_RATE = 16000;
+// Larger files are sent as resumable chunks, so a dropped connection costs one chunk
+const RESUMABLE_UPLOAD_BYTES = 4 * 1024 * 1024;
+// Uploads are downmixed to mono at Whisper's 16 kHz when that makes them smaller
+const COMPRESSED_SAMPLE_RATE = 16000;
+// Longest recording compressed in the browser; decoding holds all of it in memory
+const COMPRESS_MAX_SECONDS = 15 * 60;
+
+// Runs in a Web Worker: downmixes decoded channels to mono, resamples and encodes 16-bit PCM WAV
+function compressWorker() {
+    self.onmessage = ({ data }) => {
+        const { channels, sampleRate, targetRate } = data;
+        const ratio = sampleRate / targetRate;
+        const length = Math.floor(channels[0].length / ratio);
+        const buffer = new ArrayBuffer(44 + length * 2);
+        const view = new DataView(buffer);
+        const text = (offset, value) => [...value].forEach((char, i) => view.setUint8(offset + i, char.charCodeAt(0)));
+
+        text(0, 'RIFF');
+        view.setUint32(4, 36 + length * 2, true);
+        text(8, 'WAVE');
+        text(12, 'fmt ');
+        view.setUint32(16, 16, true);
+        view.setUint16(20, 1, true); // PCM
+        view.setUint16(22, 1, true); // mono
+        view.setUint32(24, targetRate, true);
+        view.setUint32(28, targetRate * 2, true);
+        view.setUint16(32, 2, true);
+        view.setUint16(34, 16, true);
+        text(36, 'data');
+        view.setUint32(40, length * 2, true);
+
+        // Averaging every source sample an output sample covers downmixes and low-passes in one pass
+        for (let i = 0; i < length; i++) {
+            const start = Math.floor(i * ratio);
+            const end = Math.max(start + 1, Math.floor((i + 1) * ratio));
+            let sum = 0;
+            for (const channel of channels) {
+                for (let j = start; j < end; j++) {
+                    sum += channel[j];
+                }
+            }
+            const sample = Math.max(-1, Math.min(1, sum / ((end - start) * channels.length)));
+            view.setInt16(44 + i * 2, sample < 0 ? sample * 0x8000 : sample * 0x7fff, true);
+        }
+        self.postMessage(buffer, [buffer]);
+    };
+}
+
 class VoicePM {
     constructor() {
         // Get API URL from environment or default to Render.com deployment
@@ -16,8 +66,15 @@ class VoicePM {
             status: document.getElementById('status'),
             audioList: document.getElementById('audioList'),
             modeBadge: document.getElementById('modeBadge'),
-            formatSelector: document.getElementById('formatSelector')
+            formatSelector: document.getElementById('formatSelector'),
+            liveButton: document.getElementById('liveButton')
         };
+        this.live = null;
+        // Resumable upload per file, so a retry picks up where the last attempt stopped
+        this.uploads = new WeakMap();
+        // Compress uploads in the browser when it makes them smaller; the result is kept per file for retries
+        this.compressUploads = true;
+        this.prepared = new WeakMap();
         
         // Debug log
         console.log('VoicePM initializing...');
@@ -92,6 +149,7 @@ class VoicePM {
         this.elements.uploadArea.addEventListener('drop', (e) => this.handleDrop(e), false);
         this.elements.uploadArea.addEventListener('click', () => this.elements.fileInput.click());
         this.elements.fileInput.addEventListener('change', (e) => this.handleFileSelect(e));
+        this.elements.liveButton.addEventListener('click', () => this.toggleLiveRecording());
         
         // Upload area hover effect
         this.elements.uploadArea.addEventListener('mouseenter', () => {
@@ -236,7 +294,7 @@ class VoicePM {
         const maxSize = 25 * 1024 * 1024; // 25MB limit
         
         // Enhanced file validation
-        if (!file.type.match(/^audio\/(mp3|mpeg|wav|x-m4a)$/)) {
+        if (!file.type.match(/^audio\/(mp3|mpeg|wav|x-wav|wave|x-m4a)$/)) {
             this.showStatus('Please upload an MP3, M4A, or WAV file', 'error');
             return;
         }
@@ -344,15 +402,14 @@ class VoicePM {
 
     async processAudio(file, audioItem, button, retryCount = 0) {
         button.disabled = true;
-        button.innerHTML = `
-            <div class="loading"></div>
-            <span>Processing${retryCount > 0 ? ` (Retry ${retryCount}/${this.maxRetries})` : ''}</span>
-        `;
+        const processingLabel = `Processing${retryCount > 0 ? ` (Retry ${retryCount}/${this.maxRetries})` : ''}`;
         
         try {
-            const formData = new FormData();
-            formData.append('file', file);
-            
+            const upload = await this.prepareUpload(file, audioItem, button);
+            // Lets the server ledger what compression saved
+            const headers = upload === file ? {} : { 'X-Original-Size': String(file.size) };
+            this.setButtonBusy(button, processingLabel);
+
             const endpoints = {
                 tasks: '/process-audio',
                 roadmap: '/process-audio/roadmap',
@@ -366,17 +423,28 @@ class VoicePM {
 
             console.log('Processing with endpoint:', endpoint);
 
-            const response = await fetch(`${this.API_URL}${endpoint}`, {
-                method: 'POST',
-                body: formData
-            });
+            // Progressive: a quick draft now, the full model's result pushed when it is ready
+            let response;
+            if (upload.size > RESUMABLE_UPLOAD_BYTES) {
+                response = await this.uploadInChunks(upload, button, processingLabel, headers);
+            } else {
+                const formData = new FormData();
+                formData.append('file', upload);
+                response = await fetch(`${this.API_URL}${endpoint}?progressive=true`, {
+                    method: 'POST',
+                    headers,
+                    body: formData
+                });
+            }
             
             if (!response.ok) {
                 const errorData = await response.json().catch(() => ({}));
                 const errorMessage = errorData.detail || 'Processing failed';
                 
-                // Retry logic for 5xx errors
-                if (response.status >= 500 && retryCount < this.maxRetries) {
+                // Retry logic for 5xx errors. Degraded (circuit open) and rate-limited
+                // responses already failed fast on purpose; retrying would only add load.
+                const failedFast = errorData.degraded || response.headers.has('Retry-After');
+                if (response.status >= 500 && !failedFast && retryCount < this.maxRetries) {
                     console.log(`Retrying request (${retryCount + 1}/${this.maxRetries})...`);
                     await new Promise(resolve => setTimeout(resolve, 1000 * (retryCount + 1)));
                     return this.processAudio(file, audioItem, button, retryCount + 1);
@@ -388,8 +456,17 @@ class VoicePM {
             const data = await response.json();
             this.displayProcessedContent(data, audioItem);
             
-            if (this.isDemoMode) {
+            const degraded = response.headers.get('X-Degraded');
+            if (data.degraded) {
+                // Transcript-only result while AI analysis is unavailable
+                this.showStatus(data.detail, 'warning');
+            } else if (degraded === 'cached') {
+                this.showStatus('AI analysis is temporarily unavailable - showing the last result for this recording', 'warning');
+            } else if (this.isDemoMode) {
                 this.showStatus('Processed in demo mode - using mock data', 'warning');
+            } else if (response.headers.get('X-Upgrade-Events')) {
+                this.showStatus('Draft ready - refining with the full model...', 'success');
+                this.awaitUpgrade(response.headers.get('X-Upgrade-Events'), audioItem);
             } else {
                 this.showStatus('Processing complete!', 'success');
             }
@@ -418,6 +495,338 @@ class VoicePM {
         }
     }
 
+    setButtonBusy(button, label) {
+        button.innerHTML = `
+            <div class="loading"></div>
+            <span>${label}</span>
+        `;
+    }
+
+    async prepareUpload(file, audioItem, button) {
+        if (this.prepared.has(file)) {
+            return this.prepared.get(file);
+        }
+        let upload = file;
+        if (this.compressUploads) {
+            this.setButtonBusy(button, 'Compressing');
+            try {
+                upload = await this.compressAudio(file) || file;
+            } catch (error) {
+                console.log('Compression failed, sending the original file:', error);
+            }
+        }
+        if (upload !== file) {
+            const saved = this.formatFileSize(file.size - upload.size);
+            audioItem.querySelector('.audio-size').textContent =
+                `${this.formatFileSize(file.size)} → ${this.formatFileSize(upload.size)} (${saved} saved)`;
+            this.showStatus(`Compressed for upload: ${saved} saved`, 'success');
+        }
+        this.prepared.set(file, upload);
+        return upload;
+    }
+
+    async compressAudio(file) {
+        // Decode, downmix to mono and resample to 16 kHz; null when that wouldn't make the upload smaller
+        if (!window.OfflineAudioContext || !window.Worker) {
+            return null;
+        }
+        const duration = await this.audioDuration(file);
+        // The result is 32 KB per second, so most MP3s and M4As are already smaller
+        if (!duration || duration > COMPRESS_MAX_SECONDS || file.size <= 44 + duration * COMPRESSED_SAMPLE_RATE * 2) {
+            return null;
+        }
+
+        // Decoding into a 16 kHz context uses the browser's own resampler
+        const context = new OfflineAudioContext(1, 1, COMPRESSED_SAMPLE_RATE);
+        const decoded = await context.decodeAudioData(await file.arrayBuffer());
+        const channels = Array.from({ length: decoded.numberOfChannels }, (_, i) => decoded.getChannelData(i));
+        const wav = await this.runCompressWorker({
+            channels,
+            sampleRate: decoded.sampleRate,
+            targetRate: Math.min(decoded.sampleRate, COMPRESSED_SAMPLE_RATE)
+        });
+        if (wav.byteLength >= file.size) {
+            return null;
+        }
+        return new File([wav], file.name.replace(/\.[^.]+$/, '') + '.wav', { type: 'audio/wav' });
+    }
+
+    runCompressWorker(message) {
+        return new Promise((resolve, reject) => {
+            const url = URL.createObjectURL(new Blob([`(${compressWorker.toString()})()`], { type: 'application/javascript' }));
+            const worker = new Worker(url);
+            const finish = () => {
+                worker.terminate();
+                URL.revokeObjectURL(url);
+            };
+            worker.onmessage = ({ data }) => {
+                finish();
+                resolve(data);
+            };
+            worker.onerror = (error) => {
+                finish();
+                reject(error);
+            };
+            worker.postMessage(message);
+        });
+    }
+
+    audioDuration(file) {
+        return new Promise(resolve => {
+            const audio = new Audio();
+            const url = URL.createObjectURL(file);
+            const done = (duration) => {
+                URL.revokeObjectURL(url);
+                resolve(duration);
+            };
+            audio.preload = 'metadata';
+            audio.onloadedmetadata = () => done(Number.isFinite(audio.duration) ? audio.duration : null);
+            audio.onerror = () => done(null);
+            audio.src = url;
+        });
+    }
+
+    async uploadInChunks(file, button, processingLabel, headers = {}) {
+        // Resume this file's upload if the server still has it; after a failed finalize nothing is resent
+        let upload = this.uploads.get(file);
+        if (upload) {
+            const status = await fetch(`${this.API_URL}/uploads/${upload.id}`);
+            upload = status.ok ? await status.json() : null;
+        }
+        if (!upload) {
+            const created = await fetch(`${this.API_URL}/uploads`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ filename: file.name, content_type: file.type, size: file.size })
+            });
+            if (!created.ok) {
+                return created;
+            }
+            upload = await created.json();
+            this.uploads.set(file, upload);
+        }
+
+        let sent = upload.received_bytes;
+        for (const index of upload.missing) {
+            this.setUploadProgress(button, sent / file.size);
+            const start = index * upload.chunk_size;
+            const chunk = file.slice(start, Math.min(file.size, start + upload.chunk_size));
+            const response = await this.putChunk(upload.id, index, chunk);
+            if (!response.ok) {
+                // Refused or expired uploads can't be resumed; the next attempt starts over
+                this.uploads.delete(file);
+                return response;
+            }
+            sent += chunk.size;
+        }
+
+        this.setButtonBusy(button, processingLabel);
+        return fetch(`${this.API_URL}/uploads/${upload.id}/finalize?format=${this.selectedFormat}&progressive=true`, {
+            method: 'POST',
+            headers
+        });
+    }
+
+    async putChunk(uploadId, index, chunk) {
+        // Chunks are idempotent, so a failed one is simply sent again
+        for (let attempt = 0; ; attempt++) {
+            try {
+                const response = await fetch(`${this.API_URL}/uploads/${uploadId}/chunks/${index}`, {
+                    method: 'PUT',
+                    body: chunk
+                });
+                if (response.status < 500 || response.headers.has('Retry-After') || attempt >= this.maxRetries) {
+                    return response;
+                }
+            } catch (error) {
+                if (attempt >= this.maxRetries) {
+                    throw error;
+                }
+            }
+            await new Promise(resolve => setTimeout(resolve, 1000 * (attempt + 1)));
+        }
+    }
+
+    setUploadProgress(button, fraction) {
+        this.setButtonBusy(button, `Uploading ${Math.round(fraction * 100)}%`);
+    }
+
+    setLiveButton(icon, label, disabled = false) {
+        this.elements.liveButton.disabled = disabled;
+        this.elements.liveButton.innerHTML = `
+            <i data-feather="${icon}"></i>
+            <span>${label}</span>
+        `;
+        feather.replace();
+    }
+
+    async toggleLiveRecording() {
+        if (this.live) {
+            this.stopLiveRecording();
+            return;
+        }
+        if (!navigator.mediaDevices?.getUserMedia || !window.WebSocket || !window.AudioContext) {
+            this.showStatus('Live recording is not supported in this browser - please upload a file', 'error');
+            return;
+        }
+        if (this.selectedFormat !== 'tasks' && !this.isProUser()) {
+            this.showProFeaturePrompt();
+            return;
+        }
+
+        let stream;
+        try {
+            stream = await navigator.mediaDevices.getUserMedia({
+                audio: { channelCount: 1, echoCancellation: true, noiseSuppression: true }
+            });
+        } catch (error) {
+            this.showStatus('Microphone access is needed for live recording', 'error');
+            return;
+        }
+
+        const context = new AudioContext();
+        const rate = Math.min(LIVE_SAMPLE_RATE, context.sampleRate);
+        const socket = new WebSocket(
+            `${this.API_URL.replace(/^http/, 'ws')}/live/${this.selectedFormat}?sample_rate=${rate}`
+        );
+        socket.binaryType = 'arraybuffer';
+
+        // The server transcribes each stretch of speech while the user keeps talking
+        const source = context.createMediaStreamSource(stream);
+        const processor = context.createScriptProcessor(4096, 1, 1);
+        processor.onaudioprocess = event => {
+            if (socket.readyState === WebSocket.OPEN) {
+                socket.send(this.toPcm16(event.inputBuffer.getChannelData(0), context.sampleRate, rate));
+            }
+        };
+        source.connect(processor);
+        processor.connect(context.destination);
+
+        const audioItem = this.addLiveRecording();
+        this.live = { socket, stream, context, source, processor, audioItem, startedAt: Date.now() };
+        socket.onmessage = event => this.handleLiveMessage(JSON.parse(event.data), audioItem);
+        socket.onclose = () => {
+            this.endLiveCapture();
+            this.setLiveButton('mic', 'Record Live');
+        };
+        socket.onerror = () => this.showStatus('Lost the connection to the server while recording', 'error');
+        this.setLiveButton('square', 'Stop Recording');
+    }
+
+    toPcm16(samples, inputRate, outputRate) {
+        // Average each run of input samples down to one output sample
+        const ratio = inputRate / outputRate;
+        const pcm = new Int16Array(Math.floor(samples.length / ratio));
+        for (let i = 0; i < pcm.length; i++) {
+            const start = Math.floor(i * ratio);
+            const end = Math.max(start + 1, Math.floor((i + 1) * ratio));
+            let sum = 0;
+            for (let j = start; j < end; j++) sum += samples[j];
+            const value = Math.max(-1, Math.min(1, sum / (end - start)));
+            pcm[i] = value < 0 ? value * 0x8000 : value * 0x7fff;
+        }
+        return pcm.buffer;
+    }
+
+    stopLiveRecording() {
+        const { socket } = this.live;
+        this.endLiveCapture();
+        if (socket.readyState === WebSocket.OPEN) {
+            socket.send(JSON.stringify({ type: 'stop' }));
+        }
+        this.setLiveButton('loader', 'Finishing...', true);
+    }
+
+    endLiveCapture() {
+        if (!this.live) return;
+        const { stream, context, source, processor } = this.live;
+        processor.onaudioprocess = null;
+        source.disconnect();
+        processor.disconnect();
+        stream.getTracks().forEach(track => track.stop());
+        context.close();
+        this.live = null;
+    }
+
+    addLiveRecording() {
+        const audioItem = document.createElement('div');
+        audioItem.className = 'audio-item';
+        audioItem.innerHTML = `
+            <div class="audio-content">
+                <div class="audio-details">
+                    <div class="audio-name">Live recording</div>
+                    <div class="audio-size">Listening...</div>
+                </div>
+            </div>
+            <p class="live-transcript"></p>
+        `;
+        this.elements.audioList.appendChild(audioItem);
+        return audioItem;
+    }
+
+    handleLiveMessage(message, audioItem) {
+        const transcript = audioItem.querySelector('.live-transcript');
+        switch (message.type) {
+            case 'segment':
+                transcript.textContent = message.transcript;
+                break;
+            case 'transcript':
+                transcript.textContent = message.text;
+                audioItem.querySelector('.audio-size').textContent =
+                    `${Math.round(message.duration_seconds)}s - structuring...`;
+                break;
+            case 'result':
+                transcript.remove();
+                audioItem.querySelector('.audio-size').textContent = 'Done';
+                if (message.audio_url) {
+                    const audio = document.createElement('audio');
+                    audio.controls = true;
+                    audio.src = `${this.API_URL}${message.audio_url}`;
+                    audioItem.querySelector('.audio-content').appendChild(audio);
+                }
+                this.displayProcessedContent(message.result, audioItem);
+                this.showStatus(this.isDemoMode ? 'Processed in demo mode - using mock data' : 'Processing complete!', this.isDemoMode ? 'warning' : 'success');
+                break;
+            case 'degraded':
+                transcript.remove();
+                this.displayProcessedContent({ ...message, degraded: true }, audioItem);
+                this.showStatus(message.detail, 'warning');
+                break;
+            case 'error':
+                audioItem.querySelector('.audio-size').textContent = 'Failed';
+                this.showStatus(message.detail, 'error');
+                break;
+        }
+    }
+
+    awaitUpgrade(eventsPath, audioItem) {
+        const source = new EventSource(`${this.API_URL}${eventsPath}`);
+        const draft = audioItem.querySelector('.processed-content');
+        if (draft) draft.classList.add('draft');
+
+        source.addEventListener('ready', event => {
+            source.close();
+            const upgrade = JSON.parse(event.data);
+            audioItem.querySelector('.processed-content')?.remove();
+            this.displayProcessedContent(upgrade.result, audioItem);
+            const count = upgrade.diff.changes.length;
+            this.showStatus(
+                count ? `Refined: ${count} change${count === 1 ? '' : 's'} from the draft` : 'Refined: the draft was already right',
+                'success'
+            );
+        });
+        source.addEventListener('failed', () => {
+            source.close();
+            audioItem.querySelector('.processed-content')?.classList.remove('draft');
+            this.showStatus('Could not refine the draft - showing the quick result', 'warning');
+        });
+        // The stream ends after its one event; an error before that means the upgrade is gone
+        source.onerror = () => {
+            source.close();
+            audioItem.querySelector('.processed-content')?.classList.remove('draft');
+        };
+    }
+
     displayProcessedContent(data, audioItem) {
         const processedContent = document.createElement('div');
         processedContent.className = 'processed-content';
@@ -426,7 +835,15 @@ class VoicePM {
 
         let sections;
         
-        switch (this.selectedFormat) {
+        if (data.degraded) {
+            sections = [
+                {
+                    title: 'Transcript',
+                    icon: 'file-text',
+                    content: `<div class="process-overview">${data.transcript}</div>`
+                }
+            ];
+        } else switch (this.selectedFormat) {
             case 'tasks':
                 sections = [
                     {
@@ -541,6 +958,7 @@ class VoicePM {
                         <div class="task-content">
                             <div class="task-title">${task.title}</div>
                             ${task.description ? `<div class="task-description">${task.description}</div>` : ''}
+                            ${this.renderSourceSpans(task.source_spans)}
                         </div>
                     </li>
                 `).join('')}
@@ -548,6 +966,25 @@ class VoicePM {
         `;
     }
     
+    formatTimestamp(seconds) {
+        const minutes = Math.floor(seconds / 60);
+        return `${minutes}:${String(Math.floor(seconds % 60)).padStart(2, '0')}`;
+    }
+
+    // Links to where in the recording an item was said; the URLs carry a #t=start,end fragment
+    renderSourceSpans(spans) {
+        if (!spans || !spans.length) return '';
+        return `
+            <div class="source-spans">
+                ${spans.filter(span => span.url).map(span => `
+                    <a class="source-span" href="${this.API_URL}${span.url}" target="_blank" rel="noopener">
+                        <i data-feather="play-circle"></i>${this.formatTimestamp(span.start)}
+                    </a>
+                `).join('')}
+            </div>
+        `;
+    }
+
     renderRoadmapSections(sections) {
         return `
             <ul class="roadmap-list">
@@ -577,6 +1014,7 @@ class VoicePM {
                             <div class="step-action">${step.action}</div>
                             <div class="step-details">${step.details}</div>
                             <div class="step-outcome">Expected: ${step.outcome}</div>
+                            ${this.renderSourceSpans(step.source_spans)}
                         </div>
                     </li>
                 `).join('')}